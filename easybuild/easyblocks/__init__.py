@@ -32,6 +32,7 @@ easybuild.easyblocks package declaration
 @author: Jens Timmerman (Ghent University)
 """
 import os
+import sys
 from distutils.version import LooseVersion
 from pkgutil import extend_path
 
@@ -46,46 +47,96 @@ from pkgutil import extend_path
 VERSION = LooseVersion('4.9.5.dev0')
 UNKNOWN = 'UNKNOWN'
 
+# subdirectories in which easyblocks are located
+EASYBLOCKS_SUBDIRS = [chr(x) for x in range(ord('a'), ord('z') + 1)] + ['0']
+
+_git_revision_cache = {}
+
 
 def get_git_revision():
     """
     Returns the git revision (e.g. aab4afc016b742c6d4b157427e192942d0e131fe),
     or UNKNOWN is getting the git revision fails
 
-    relies on GitPython (see http://gitorious.org/git-python)
+    relies on GitPython (see http://gitorious.org/git-python);
+    result is cached, since determining the git revision is relatively expensive
     """
+    if 'HEAD' in _git_revision_cache:
+        return _git_revision_cache['HEAD']
+
     try:
         from git import Git, GitCommandError
     except ImportError:
-        return UNKNOWN
-    try:
-        path = os.path.dirname(__file__)
-        gitrepo = Git(path)
-        res = gitrepo.rev_list('HEAD').splitlines()[0]
-        # 'encode' may be required to make sure a regular string is returned rather than a unicode string
-        # (only needed in Python 2; in Python 3, regular strings are already unicode)
-        if not isinstance(res, str):
-            res = res.encode('ascii')
-    except GitCommandError:
         res = UNKNOWN
+    else:
+        try:
+            path = os.path.dirname(__file__)
+            gitrepo = Git(path)
+            res = gitrepo.rev_list('HEAD').splitlines()[0]
+            # 'encode' may be required to make sure a regular string is returned rather than a unicode string
+            # (only needed in Python 2; in Python 3, regular strings are already unicode)
+            if not isinstance(res, str):
+                res = res.encode('ascii')
+        except GitCommandError:
+            res = UNKNOWN
+
+    _git_revision_cache['HEAD'] = res
 
     return res
 
 
-git_rev = get_git_revision()
-if git_rev == UNKNOWN:
-    VERBOSE_VERSION = VERSION
-else:
-    VERBOSE_VERSION = LooseVersion("%s-r%s" % (VERSION, git_rev))
+def get_verbose_version():
+    """Return verbose version of easyblocks, which includes the git revision (if known)."""
+    git_rev = get_git_revision()
+    if git_rev == UNKNOWN:
+        return VERSION
+    else:
+        return LooseVersion("%s-r%s" % (VERSION, git_rev))
+
+
+def __getattr__(name):
+    """
+    Determine VERBOSE_VERSION lazily, on first access:
+    determining the git revision is expensive, and should not be done when only importing easyblocks.
+    """
+    if name == 'VERBOSE_VERSION':
+        verbose_version = get_verbose_version()
+        globals()['VERBOSE_VERSION'] = verbose_version
+        return verbose_version
+
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
-# extend path so python finds our easyblocks in the subdirectories where they are located
-subdirs = [chr(x) for x in range(ord('a'), ord('z') + 1)] + ['0']
-for subdir in subdirs:
-    __path__ = extend_path(__path__, '%s.%s' % (__name__, subdir))
 
-del subdir, subdirs, git_rev
-if 'x' in dir():
-    del x
+# module-level __getattr__ is only supported in Python 3.7 and newer
+if sys.version_info < (3, 7):
+    VERBOSE_VERSION = get_verbose_version()
+
+
+def det_easyblocks_path(path):
+    """
+    Determine Python search path for easyblocks package, by adding the subdirectories in which easyblocks are located
+    to the specified paths (equivalent to calling pkgutil.extend_path for each subdirectory, but much cheaper).
+    """
+    res = list(path)
+    subdirs = set(EASYBLOCKS_SUBDIRS)
+    existing_subdirs = []
+    for pkg_dir in path:
+        try:
+            existing_subdirs.append(subdirs.intersection(os.listdir(pkg_dir)))
+        except OSError:
+            existing_subdirs.append(set())
+
+    for subdir in EASYBLOCKS_SUBDIRS:
+        for pkg_dir, pkg_subdirs in zip(path, existing_subdirs):
+            subdir_path = os.path.join(pkg_dir, subdir)
+            if subdir in pkg_subdirs and subdir_path not in res and os.path.isdir(subdir_path):
+                res.append(subdir_path)
+
+    return res
+
+
+# extend path so python finds our easyblocks in the subdirectories where they are located
+__path__ = det_easyblocks_path(__path__)
 
 # let python know this is not the only place to look for easyblocks, so we can have multiple
 # easybuild/easyblocks paths in the Python search path, next to the official easyblocks distribution
@@ -0,0 +1,621 @@
+##
+# Copyright 2009-2024 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Helper functions for BLAS/LAPACK micro-benchmarks that are run for installations of numpy
+(via the installed numpy, see run_blas_benchmark) and of BLAS/LAPACK libraries like OpenBLAS, FlexiBLAS and imkl
+(via a small C driver that is linked with the installed library, see run_blas_lapack_benchmark).
+
+Note: this module does not provide an easyblock.
+
+@author: Kenneth Hoste (Ghent University)
+"""
+import glob
+import json
+import os
+import re
+import tempfile
+import time
+
+from easybuild.base import fancylogger
+from easybuild.framework.easyconfig import CUSTOM
+from easybuild.tools.build_log import EasyBuildError, print_warning
+from easybuild.tools.config import build_option, log_path
+from easybuild.tools.filetools import read_file, remove_dir, write_file
+from easybuild.tools.run import run_cmd
+from easybuild.tools.systemtools import get_avail_core_count, get_cpu_features, get_cpu_model, get_cpu_speed
+from easybuild.tools.utilities import nub
+
+# matrix sizes to use in BLAS/LAPACK micro-benchmarks (by default)
+BLAS_BENCHMARK_SIZES = [500, 1000, 2000]
+
+# environment variables that control the number of threads used by BLAS/LAPACK libraries
+BLAS_NUM_THREADS_ENV_VARS = ['BLIS_NUM_THREADS', 'MKL_NUM_THREADS', 'OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS']
+
+# description of thread counts that are used in BLAS/LAPACK micro-benchmarks (by default), see det_benchmark_threads
+BENCHMARK_THREADS_DESCR = "1 and number of available cores"
+
+# BLAS micro-benchmark using numpy, see run_blas_benchmark;
+# each kernel is called once to warm up, after which the best of a couple of timings is retained;
+# must be compatible with both Python 2 and 3, result is printed as JSON on the last line of output
+BLAS_BENCHMARK_SCRIPT = """
+import json
+import math
+import timeit
+
+import numpy
+
+results = []
+for kernel in %(kernels)s:
+    for size in %(sizes)s:
+        if kernel == "gemm":
+            a, b = numpy.random.random((size, size)), numpy.random.random((size, size))
+            func, flops = (lambda: numpy.dot(a, b)), 2.0 * size ** 3
+        elif kernel == "gemv":
+            a, b = numpy.random.random((size, size)), numpy.random.random(size)
+            func, flops = (lambda: numpy.dot(a, b)), 2.0 * size ** 2
+        elif kernel == "fft":
+            a = numpy.random.random((size, size)) + 1j * numpy.random.random((size, size))
+            func, flops = (lambda: numpy.fft.fft2(a)), 5.0 * size ** 2 * math.log(size ** 2, 2)
+        # cheap kernels are called multiple times per timing, to get a reliable measurement
+        number = max(1, int(%(min_flops)s // flops))
+        func()
+        best = min(timeit.repeat(func, number=number, repeat=%(repeat)s)) / number
+        results.append({"kernel": kernel, "size": size, "time": best, "gflops": flops / best / 1e9})
+
+print(json.dumps(results))
+"""
+BLAS_BENCHMARK_KERNELS = ['gemm', 'gemv', 'fft']
+
+# number of double-precision floating-point operations per cycle per core, for CPU features that determine
+# the peak performance of a core (first match wins), see det_cpu_peak_gflops;
+# values assume two FMA units (e.g. 2 x 8 x 2 for AVX-512), so peak performance is overestimated for CPUs that have
+# a single FMA unit (like some Xeon Silver/Bronze models), and underestimated for SVE with vectors wider than 128 bits
+CPU_FEATURES_DP_FLOPS_PER_CYCLE = [
+    ('avx512f', 32),
+    ('fma', 16),
+    ('avx', 8),
+    ('sve', 8),
+    ('asimd', 8),
+    ('vsx', 8),
+    ('sse2', 4),
+]
+DEFAULT_DP_FLOPS_PER_CYCLE = 2
+
+# C driver for BLAS/LAPACK micro-benchmark, see run_blas_lapack_benchmark;
+# usage: <repeat> <size> [<size> ...], prints '<kernel> <size> <time> <GFLOP/s>' for each kernel & size
+BLAS_LAPACK_BENCHMARK_C_SOURCE = r"""
+#include <stdio.h>
+#include <stdlib.h>
+#include <sys/time.h>
+
+#ifdef BENCHMARK_ILP64
+typedef long blasint;
+#else
+typedef int blasint;
+#endif
+
+extern void dgemm_(const char *transa, const char *transb, const blasint *m, const blasint *n, const blasint *k,
+                   const double *alpha, const double *a, const blasint *lda, const double *b, const blasint *ldb,
+                   const double *beta, double *c, const blasint *ldc);
+#ifndef BENCHMARK_NO_LAPACK
+extern void dgetrf_(const blasint *m, const blasint *n, double *a, const blasint *lda, blasint *ipiv, blasint *info);
+extern void dpotrf_(const char *uplo, const blasint *n, double *a, const blasint *lda, blasint *info);
+#endif
+
+static double wtime(void)
+{
+    struct timeval tv;
+    gettimeofday(&tv, NULL);
+    return tv.tv_sec + 1e-6 * tv.tv_usec;
+}
+
+/* random symmetric matrix with a large diagonal, so it is also positive definite (required for DPOTRF) */
+static void init_matrix(double *a, blasint n)
+{
+    blasint i, j;
+    for (j = 0; j < n; j++) {
+        for (i = 0; i <= j; i++) {
+            a[i + j * n] = a[j + i * n] = (double) rand() / RAND_MAX;
+        }
+        a[j + j * n] += n;
+    }
+}
+
+static void update_best(double *best, double start)
+{
+    double t = wtime() - start;
+    if (*best < 0 || t < *best) {
+        *best = t;
+    }
+}
+
+static void report(const char *kernel, blasint n, double best, double flops)
+{
+    /* avoid division by zero for very small matrices (timer resolution is 1 microsecond) */
+    if (best <= 0) {
+        best = 1e-6;
+    }
+    printf("%s %ld %.9f %.6f\n", kernel, (long) n, best, flops / best / 1e9);
+}
+
+int main(int argc, char **argv)
+{
+    const double one = 1.0, zero = 0.0;
+    double best[3], start;
+    double *a, *b, *c;
+    blasint n, info = 0, *ipiv;
+    int idx, r, repeat;
+
+    if (argc < 3) {
+        fprintf(stderr, "usage: %s <repeat> <size> [<size> ...]\n", argv[0]);
+        return 2;
+    }
+    repeat = atoi(argv[1]);
+
+    for (idx = 2; idx < argc; idx++) {
+        n = atol(argv[idx]);
+        a = malloc((size_t) n * n * sizeof(double));
+        b = malloc((size_t) n * n * sizeof(double));
+        c = malloc((size_t) n * n * sizeof(double));
+        ipiv = malloc((size_t) n * sizeof(blasint));
+        if (!a || !b || !c || !ipiv) {
+            fprintf(stderr, "failed to allocate memory for matrices of size %ld\n", (long) n);
+            return 1;
+        }
+        best[0] = best[1] = best[2] = -1;
+        init_matrix(b, n);
+
+        /* first round is a warm-up round, which is not taken into account */
+        for (r = 0; r <= repeat; r++) {
+            init_matrix(a, n);
+            start = wtime();
+            dgemm_("N", "N", &n, &n, &n, &one, a, &n, b, &n, &zero, c, &n);
+            if (r > 0) update_best(&best[0], start);
+#ifndef BENCHMARK_NO_LAPACK
+            start = wtime();
+            dgetrf_(&n, &n, a, &n, ipiv, &info);
+            if (r > 0) update_best(&best[1], start);
+            if (info != 0) {
+                fprintf(stderr, "dgetrf failed for size %ld: info=%ld\n", (long) n, (long) info);
+                return 1;
+            }
+            init_matrix(a, n);
+            start = wtime();
+            dpotrf_("L", &n, a, &n, &info);
+            if (r > 0) update_best(&best[2], start);
+            if (info != 0) {
+                fprintf(stderr, "dpotrf failed for size %ld: info=%ld\n", (long) n, (long) info);
+                return 1;
+            }
+#endif
+        }
+
+        report("dgemm", n, best[0], 2.0 * n * n * n);
+#ifndef BENCHMARK_NO_LAPACK
+        report("dgetrf", n, best[1], 2.0 / 3.0 * n * n * n);
+        report("dpotrf", n, best[2], 1.0 / 3.0 * n * n * n);
+#endif
+        fflush(stdout);
+        free(a);
+        free(b);
+        free(c);
+        free(ipiv);
+    }
+
+    return 0;
+}
+"""
+BLAS_LAPACK_BENCHMARK_FILENAME = 'blas-lapack-benchmark.json'
+BLAS_LAPACK_BENCHMARK_RESULT_REGEX = re.compile(r"^(?P<kernel>d[a-z]+) (?P<size>[0-9]+) (?P<time>\S+) (?P<gflops>\S+)$",
+                                                re.M)
+
+# custom easyconfig parameters for easyblocks that use blas_lapack_benchmark
+BLAS_LAPACK_BENCHMARK_EXTRA_OPTIONS = {
+    'blas_lapack_benchmark': [True, "Run BLAS/LAPACK micro-benchmark after installation, and compare results "
+                                    "with previous installation on same CPU model", CUSTOM],
+    'blas_lapack_benchmark_fail_on_regression': [False, "Fail installation (rather than only warn) when "
+                                                        "performance regressed beyond threshold", CUSTOM],
+    'blas_lapack_benchmark_max_regression': [0.2, "Maximum performance regression (as fraction) in "
+                                                  "BLAS/LAPACK micro-benchmark compared to previous "
+                                                  "installation", CUSTOM],
+    'blas_lapack_benchmark_sizes': [None, "Matrix sizes to use in BLAS/LAPACK micro-benchmark "
+                                          "(if None: %s)" % BLAS_BENCHMARK_SIZES, CUSTOM],
+    'blas_lapack_benchmark_threads': [None, "Thread counts to use in BLAS/LAPACK micro-benchmark "
+                                            "(if None: %s)" % BENCHMARK_THREADS_DESCR, CUSTOM],
+}
+
+
+def det_benchmark_threads(threads=None):
+    """
+    Determine (unique) thread counts to use in BLAS/LAPACK micro-benchmark (see also BENCHMARK_THREADS_DESCR).
+    """
+    return nub(int(x) for x in threads or [1, get_avail_core_count()])
+
+
+def blas_num_threads_env_vars(nthreads):
+    """
+    Return definitions of environment variables to prefix a command with,
+    so BLAS/LAPACK libraries use the specified number of threads.
+    """
+    return ' '.join('%s=%d' % (key, nthreads) for key in BLAS_NUM_THREADS_ENV_VARS)
+
+
+def write_benchmark_results(installdir, filename, data):
+    """
+    Store results of micro-benchmark in JSON format in easybuild subdirectory of specified installation directory.
+    Nothing is written when only the sanity check is run, since the installation should not be changed then.
+
+    :return: path to file with benchmark results, or None if nothing was written
+    """
+    log = fancylogger.getLogger('write_benchmark_results', fname=False)
+
+    if build_option('sanity_check_only'):
+        log.info("Not storing results of benchmark in %s when only running sanity check", installdir)
+        return None
+
+    path = os.path.join(installdir, log_path(), filename)
+    write_file(path, json.dumps(data, indent=4, sort_keys=True))
+    log.info("Results of benchmark stored in %s", path)
+    return path
+
+
+def det_cpu_peak_gflops():
+    """
+    Estimate peak double-precision performance (in GFLOP/s) of a single core of the CPU,
+    based on the (maximum) CPU clock frequency and the available CPU features.
+
+    :return: estimated peak performance per core, or None if it could not be determined
+    """
+    log = fancylogger.getLogger('det_cpu_peak_gflops', fname=False)
+
+    try:
+        cpu_speed = get_cpu_speed()
+        cpu_features = get_cpu_features()
+    except Exception as err:
+        log.warning("Failed to determine CPU clock frequency and features: %s", err)
+        return None
+
+    if not cpu_speed:
+        log.info("CPU clock frequency unknown, so can't estimate peak performance")
+        return None
+
+    flops_per_cycle = DEFAULT_DP_FLOPS_PER_CYCLE
+    for cpu_feature, flops in CPU_FEATURES_DP_FLOPS_PER_CYCLE:
+        if cpu_feature in cpu_features:
+            flops_per_cycle = flops
+            break
+
+    peak_gflops = flops_per_cycle * cpu_speed / 1000.0
+    log.info("Estimated peak performance per core: %s GFLOP/s (%s MHz, %s flops/cycle)",
+             peak_gflops, cpu_speed, flops_per_cycle)
+    return peak_gflops
+
+
+def run_blas_benchmark(python_cmd, kernels=None, sizes=None, threads=None, repeat=3, min_flops=1e8):
+    """
+    Run BLAS micro-benchmark with specified 'python' command, using the numpy installation that it picks up:
+    matrix-matrix product (gemm), matrix-vector product (gemv) and 2D FFT (fft) of specified (matrix) sizes,
+    each for the specified numbers of threads.
+
+    :param python_cmd: 'python' command to use
+    :param kernels: list of kernels to benchmark (default: all, see BLAS_BENCHMARK_KERNELS)
+    :param sizes: list of matrix sizes to use (default: see BLAS_BENCHMARK_SIZES)
+    :param threads: list of thread counts to use (default: see det_benchmark_threads)
+    :param repeat: number of timings for each kernel/size, best one is retained
+    :param min_flops: minimal number of floating-point operations per timing (cheap kernels are called repeatedly)
+    :return: list of dicts with kernel, size, number of threads, time (in seconds) and performance (in GFLOP/s)
+    """
+    log = fancylogger.getLogger('run_blas_benchmark', fname=False)
+
+    kernels = kernels or BLAS_BENCHMARK_KERNELS
+    unknown_kernels = [k for k in kernels if k not in BLAS_BENCHMARK_KERNELS]
+    if unknown_kernels:
+        raise EasyBuildError("Unknown kernel(s) for BLAS benchmark: %s (known kernels: %s)",
+                             ', '.join(unknown_kernels), ', '.join(BLAS_BENCHMARK_KERNELS))
+
+    sizes = [int(x) for x in sizes or BLAS_BENCHMARK_SIZES]
+    threads = det_benchmark_threads(threads)
+
+    # script is passed via stdin to avoid trouble with quoting
+    script = BLAS_BENCHMARK_SCRIPT % {
+        'kernels': json.dumps(kernels),
+        'min_flops': float(min_flops),
+        'repeat': int(repeat),
+        'sizes': json.dumps(sizes),
+    }
+
+    res = []
+    for nthreads in threads:
+        cmd = "%s %s -" % (blas_num_threads_env_vars(nthreads), python_cmd)
+        log.info("Running BLAS benchmark using %d thread(s) with '%s'", nthreads, cmd)
+
+        out, ec = run_cmd(cmd, inp=script, log_ok=False, simple=False, regexp=False, trace=False)
+
+        # only consider last line of output, warnings may be printed before it
+        try:
+            results = json.loads(out.strip().split('\n')[-1])
+        except ValueError:
+            results = None
+
+        if ec or not isinstance(results, list):
+            raise EasyBuildError("BLAS benchmark using %d thread(s) failed (exit code %s), output:\n%s",
+                                 nthreads, ec, out)
+
+        for result in results:
+            result['threads'] = nthreads
+            log.info("BLAS benchmark result for %(kernel)s (size %(size)d, %(threads)d threads): "
+                     "%(gflops).2f GFLOP/s (%(time).6f sec)", result)
+        res.extend(results)
+
+    return res
+
+
+def check_blas_benchmark(results, peak_gflops=None, min_efficiency=None, time_limit=None):
+    """
+    Check results of BLAS micro-benchmark (see run_blas_benchmark).
+
+    :param results: results of BLAS micro-benchmark
+    :param peak_gflops: estimated peak performance (in GFLOP/s) of a single core, see det_cpu_peak_gflops
+    :param min_efficiency: minimal fraction of peak performance of the cores being used that should be achieved
+                           for matrix-matrix product (best result over all sizes is considered for each thread count);
+                           if not specified, efficiency is only logged
+    :param time_limit: time limit (in milliseconds) for 1000x1000 matrix-matrix product using most threads
+    :return: list of messages for performance problems (empty if no problems were found)
+    """
+    log = fancylogger.getLogger('check_blas_benchmark', fname=False)
+
+    fails = []
+    gemm_results = [x for x in results if x['kernel'] == 'gemm']
+
+    if peak_gflops:
+        for nthreads in sorted(nub(x['threads'] for x in gemm_results)):
+            gflops = max(x['gflops'] for x in gemm_results if x['threads'] == nthreads)
+            msg = "Performance of matrix-matrix product using %d thread(s): %.2f GFLOP/s (%.1f%% of peak)"
+            msg = msg % (nthreads, gflops, 100 * gflops / (nthreads * peak_gflops))
+            if min_efficiency:
+                min_gflops = min_efficiency * nthreads * peak_gflops
+                if gflops < min_gflops:
+                    fails.append("%s < %.2f GFLOP/s" % (msg, min_gflops))
+                else:
+                    log.info("%s >= %.2f GFLOP/s => OK", msg, min_gflops)
+            else:
+                # peak performance is only an estimate, so efficiency is only reported if no minimum is specified
+                log.info(msg)
+    elif min_efficiency:
+        log.warning("Peak performance of CPU is unknown, not checking efficiency of matrix-matrix product")
+
+    if time_limit:
+        ref_results = [x for x in gemm_results if x['size'] == 1000]
+        if ref_results:
+            ref_result = max(ref_results, key=lambda x: x['threads'])
+            time_msec = 1000 * ref_result['time']
+            msg = "Time for 1000x1000 matrix-matrix product using %d thread(s): %d msec"
+            msg = msg % (ref_result['threads'], time_msec)
+            if time_msec < time_limit:
+                log.info("%s < %d msec => OK", msg, time_limit)
+            else:
+                fails.append("%s >= %d msec" % (msg, time_limit))
+        else:
+            log.warning("No result for 1000x1000 matrix-matrix product, can't check time limit of %s msec", time_limit)
+
+    return fails
+
+
+def blas_benchmark(easyblock, python_cmd, sizes=None, threads=None, min_efficiency=None, time_limit=None):
+    """
+    Run BLAS micro-benchmark using installed numpy (see run_blas_benchmark),
+    store results in JSON format in easybuild subdirectory of installation directory, and check them
+    (see check_blas_benchmark).
+
+    :return: list of messages for performance problems (empty if no problems were found)
+    """
+    results = run_blas_benchmark(python_cmd, sizes=sizes, threads=threads)
+    peak_gflops = det_cpu_peak_gflops()
+
+    data = {
+        'name': easyblock.name,
+        'version': easyblock.version,
+        'cpu_model': get_cpu_model(),
+        'peak_gflops_per_core': peak_gflops,
+        'results': results,
+    }
+    write_benchmark_results(easyblock.installdir, 'blas-benchmark-%s.json' % easyblock.name, data)
+
+    return check_blas_benchmark(results, peak_gflops=peak_gflops, min_efficiency=min_efficiency,
+                                time_limit=time_limit)
+
+
+def run_blas_lapack_benchmark(link_opts, sizes=None, threads=None, repeat=3, lapack=True, ilp64=False,
+                              pre_cmd=''):
+    """
+    Run BLAS/LAPACK micro-benchmark: compile C driver and link it with specified options,
+    and time DGEMM, DGETRF and DPOTRF (latter two only if lapack is True) for specified sizes and thread counts.
+
+    :param link_opts: options to link C driver with BLAS/LAPACK library (e.g. '-L/path/to/lib -lopenblas')
+    :param sizes: list of matrix sizes to use (default: see BLAS_BENCHMARK_SIZES)
+    :param threads: list of thread counts to use (default: see det_benchmark_threads)
+    :param repeat: number of timings for each kernel/size, best one is retained
+    :param lapack: whether LAPACK routines should be benchmarked as well
+    :param ilp64: whether BLAS/LAPACK library uses 64-bit integers
+    :param pre_cmd: prefix for command to run benchmark (e.g. to define environment variables)
+    :return: list of dicts with kernel, size, number of threads, time (in seconds) and performance (in GFLOP/s)
+    """
+    log = fancylogger.getLogger('run_blas_lapack_benchmark', fname=False)
+
+    sizes = [int(x) for x in sizes or BLAS_BENCHMARK_SIZES]
+    threads = det_benchmark_threads(threads)
+
+    tmpdir = tempfile.mkdtemp(prefix='blas-lapack-benchmark-')
+    try:
+        src = os.path.join(tmpdir, 'benchmark.c')
+        write_file(src, BLAS_LAPACK_BENCHMARK_C_SOURCE)
+        exe = os.path.join(tmpdir, 'benchmark')
+
+        defines = []
+        if ilp64:
+            defines.append('-DBENCHMARK_ILP64')
+        if not lapack:
+            defines.append('-DBENCHMARK_NO_LAPACK')
+
+        cmd = ' '.join([os.getenv('CC') or 'cc', '-O2'] + defines + ['-o', exe, src, link_opts])
+        out, ec = run_cmd(cmd, log_ok=False, simple=False, regexp=False, trace=False)
+        if ec:
+            raise EasyBuildError("Failed to compile BLAS/LAPACK benchmark with '%s': %s", cmd, out)
+
+        res = []
+        for nthreads in threads:
+            cmd = ' '.join([pre_cmd, blas_num_threads_env_vars(nthreads), exe, str(repeat)] + [str(x) for x in sizes])
+            log.info("Running BLAS/LAPACK benchmark using %d thread(s): %s", nthreads, cmd)
+            out, ec = run_cmd(cmd, log_ok=False, simple=False, regexp=False, trace=False)
+            if ec:
+                raise EasyBuildError("BLAS/LAPACK benchmark using %d thread(s) failed (exit code %s), output:\n%s",
+                                     nthreads, ec, out)
+
+            for match in BLAS_LAPACK_BENCHMARK_RESULT_REGEX.finditer(out):
+                result = {
+                    'kernel': match.group('kernel'),
+                    'size': int(match.group('size')),
+                    'threads': nthreads,
+                    'time': float(match.group('time')),
+                    'gflops': float(match.group('gflops')),
+                }
+                log.info("BLAS/LAPACK benchmark result for %(kernel)s (size %(size)d, %(threads)d threads): "
+                         "%(gflops).2f GFLOP/s (%(time).6f sec)", result)
+                res.append(result)
+    finally:
+        remove_dir(tmpdir)
+
+    return res
+
+
+def load_blas_lapack_benchmarks(installdir):
+    """
+    Load results of BLAS/LAPACK micro-benchmark for specified installation directory,
+    and for other installations of the same software (i.e. installation directories next to it).
+
+    :return: list of dicts with benchmark data (see blas_lapack_benchmark)
+    """
+    log = fancylogger.getLogger('load_blas_lapack_benchmarks', fname=False)
+
+    res = []
+    paths = glob.glob(os.path.join(os.path.dirname(installdir), '*', log_path(), BLAS_LAPACK_BENCHMARK_FILENAME))
+    for path in sorted(paths):
+        try:
+            data = json.loads(read_file(path))
+        except (EasyBuildError, ValueError) as err:
+            log.warning("Ignoring results of BLAS/LAPACK benchmark in %s: %s", path, err)
+            continue
+        if isinstance(data, dict) and isinstance(data.get('results'), list):
+            data['path'] = path
+            res.append(data)
+
+    log.info("Found results of BLAS/LAPACK benchmark for %d installation(s)", len(res))
+    return res
+
+
+def det_blas_lapack_benchmark_regressions(results, prev_results, max_regression):
+    """
+    Compare results of BLAS/LAPACK micro-benchmark with results for a previous installation.
+
+    :param results: list of benchmark results, see run_blas_lapack_benchmark
+    :param prev_results: list of benchmark results for previous installation
+    :param max_regression: maximal performance regression allowed (as a fraction, e.g. 0.2 for 20%)
+    :return: list of messages for performance regressions beyond specified threshold
+    """
+    prev_gflops = dict(((x['kernel'], x['size'], x['threads']), x['gflops']) for x in prev_results)
+
+    regressions = []
+    for result in results:
+        prev = prev_gflops.get((result['kernel'], result['size'], result['threads']))
+        if prev and result['gflops'] < (1 - max_regression) * prev:
+            msg = "%s (size %d, %d threads): %.2f GFLOP/s vs %.2f GFLOP/s (%.1f%%)"
+            diff = 100.0 * (result['gflops'] - prev) / prev
+            regressions.append(msg % (result['kernel'], result['size'], result['threads'], result['gflops'], prev,
+                                      diff))
+    return regressions
+
+
+def blas_lapack_benchmark(easyblock, link_opts, lapack=True, ilp64=False, pre_cmd=''):
+    """
+    Run BLAS/LAPACK micro-benchmark for installation performed by specified easyblock (see run_blas_lapack_benchmark),
+    store results in easybuild subdirectory of installation directory, and compare them with the most recent results
+    for a previous installation of the same software on the same CPU model.
+
+    Easyblocks that use this should define the 'blas_lapack_benchmark*' custom easyconfig parameters,
+    and set the prev_blas_lapack_benchmarks attribute before the installation directory is (re)created.
+    """
+    cfg = easyblock.cfg
+    if not cfg['blas_lapack_benchmark'] or easyblock.dry_run:
+        easyblock.log.info("Not running BLAS/LAPACK benchmark")
+        return
+
+    try:
+        results = run_blas_lapack_benchmark(link_opts, sizes=cfg['blas_lapack_benchmark_sizes'],
+                                            threads=cfg['blas_lapack_benchmark_threads'],
+                                            lapack=lapack, ilp64=ilp64, pre_cmd=pre_cmd)
+    except EasyBuildError as err:
+        # failing to run the benchmark (for example due to missing C compiler) is no reason to fail the installation
+        print_warning("Failed to run BLAS/LAPACK benchmark for %s: %s", easyblock.name, err)
+        return
+
+    cpu_model = get_cpu_model()
+    data = {
+        'name': easyblock.name,
+        'version': easyblock.version,
+        'installdir': easyblock.installdir,
+        'timestamp': time.time(),
+        'cpu_model': cpu_model,
+        'results': results,
+    }
+
+    # most recent results for an installation of the same software on the same CPU model are used as reference
+    prev_benchmarks = [x for x in getattr(easyblock, 'prev_blas_lapack_benchmarks', None) or []
+                       if x.get('name') == easyblock.name and x.get('cpu_model') == cpu_model]
+    if prev_benchmarks:
+        prev = max(prev_benchmarks, key=lambda x: x.get('timestamp', 0))
+        max_regression = cfg['blas_lapack_benchmark_max_regression']
+        regressions = det_blas_lapack_benchmark_regressions(results, prev['results'], max_regression)
+        if regressions:
+            msg = "Performance of %s regressed by more than %d%% compared to installation in %s (%s):\n%s"
+            msg = msg % (easyblock.name, 100 * max_regression, prev.get('installdir'), prev.get('version'),
+                         '\n'.join(regressions))
+            data['regressions'] = regressions
+            if cfg['blas_lapack_benchmark_fail_on_regression']:
+                write_blas_lapack_benchmark(easyblock.installdir, data)
+                raise EasyBuildError(msg)
+            print_warning(msg)
+        else:
+            easyblock.log.info("No performance regressions found for %s compared to installation in %s",
+                               easyblock.name, prev.get('installdir'))
+    else:
+        easyblock.log.info("No previous results of BLAS/LAPACK benchmark found for %s on %s",
+                           easyblock.name, cpu_model)
+
+    write_blas_lapack_benchmark(easyblock.installdir, data)
+
+
+def write_blas_lapack_benchmark(installdir, data):
+    """Store results of BLAS/LAPACK micro-benchmark in easybuild subdirectory of specified installation directory."""
+    return write_benchmark_results(installdir, BLAS_LAPACK_BENCHMARK_FILENAME, data)
@@ -40,18 +40,19 @@ import os
 import shutil
 from easybuild.tools import LooseVersion
 
-from easybuild.easyblocks.generic.cmakemake import CMakeMake
+from easybuild.easyblocks.generic.cmakemake import COMPILER_LAUNCHER_LANGS, CMakeMake
+from easybuild.easyblocks.generic.configuremake import ConfigureMake
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.toolchains.compiler.clang import Clang
 from easybuild.tools import run
 from easybuild.tools.build_log import EasyBuildError, print_warning
 from easybuild.tools.config import build_option
-from easybuild.tools.filetools import apply_regex_substitutions, change_dir, mkdir, symlink, which
+from easybuild.tools.filetools import apply_regex_substitutions, change_dir, compute_checksum, mkdir, symlink, which
 from easybuild.tools.modules import get_software_root
 from easybuild.tools.run import run_cmd
 from easybuild.tools.systemtools import AARCH32, AARCH64, POWER, RISCV64, X86_64
 from easybuild.tools.systemtools import get_cpu_architecture, get_os_name, get_os_version, get_shared_lib_ext
-from easybuild.tools.environment import setvar
+from easybuild.tools.environment import setvar, unset_env_vars
 
 # List of all possible build targets for Clang
 CLANG_TARGETS = ["all", "AArch64", "AMDGPU", "ARM", "CppBackend", "Hexagon", "Mips",
@@ -527,6 +528,23 @@ class EB_Clang(CMakeMake):
         clang = which('clang')
         clangxx = which('clang++')
 
+        # compiler launcher options (if any) are already included in configopts (via configure step for stage 1);
+        # since the compilers of the previous stage are rebuilt every time,
+        # make sure that cached compilation results can be reused if they're identical to before
+        launcher_opts = []
+        orig_compiler_check = os.getenv('CCACHE_COMPILERCHECK')
+        if self.compiler_launcher:
+            prev_clang = os.path.join(prev_obj_path, 'clang')
+            if os.path.basename(self.compiler_launcher) == 'ccache':
+                # identify compiler by checksum of actual clang binary of previous stage,
+                # not its modification time, nor the contents of the RPATH wrapper script (if any)
+                compiler_id = compute_checksum(os.path.realpath(prev_clang), checksum_type='sha256')
+                setvar('CCACHE_COMPILERCHECK', 'string:%s' % compiler_id)
+            elif build_option('rpath'):
+                # sccache only looks at the RPATH wrapper script, so it can't tell whether clang was changed
+                self.log.info("Not using %s for stage built with %s (RPATH wrapper)", self.compiler_launcher, clang)
+                launcher_opts = ["-DCMAKE_%s_COMPILER_LAUNCHER=''" % lang for lang in COMPILER_LAUNCHER_LANGS]
+
         # Configure.
         options = [
             "-DCMAKE_INSTALL_PREFIX=%s " % self.installdir,
@@ -534,7 +552,7 @@ class EB_Clang(CMakeMake):
             "-DCMAKE_CXX_COMPILER='%s' " % clangxx,
             self.cfg['configopts'],
             "-DCMAKE_BUILD_TYPE=%s " % self.build_type,
-        ]
+        ] + launcher_opts
 
         # Cmake looks for llvm-link by default in the same directory as the compiler
         # However, when compiling with rpath, the clang 'compiler' is not actually the compiler, but the wrapper
@@ -555,6 +573,10 @@ class EB_Clang(CMakeMake):
 
         # restore $PATH
         setvar('PATH', orig_path)
+        if orig_compiler_check is None:
+            unset_env_vars(['CCACHE_COMPILERCHECK'], verbose=False)
+        else:
+            setvar('CCACHE_COMPILERCHECK', orig_compiler_check)
 
     def build_step(self):
         """Build Clang stage 1, 2, 3"""
@@ -562,14 +584,20 @@ class EB_Clang(CMakeMake):
         # Stage 1: build using system compiler.
         self.log.info("Building stage 1")
         change_dir(self.llvm_obj_dir_stage1)
-        super(EB_Clang, self).build_step()
+        start_stats = self.compiler_launcher_stats()
+        ConfigureMake.build_step(self)
+        self.log_compiler_launcher_stats(start_stats, "stage 1")
 
         if self.cfg['bootstrap']:
             self.log.info("Building stage 2")
+            start_stats = self.compiler_launcher_stats()
             self.build_with_prev_stage(self.llvm_obj_dir_stage1, self.llvm_obj_dir_stage2)
+            self.log_compiler_launcher_stats(start_stats, "stage 2")
 
             self.log.info("Building stage 3")
+            start_stats = self.compiler_launcher_stats()
             self.build_with_prev_stage(self.llvm_obj_dir_stage2, self.llvm_obj_dir_stage3)
+            self.log_compiler_launcher_stats(start_stats, "stage 3")
 
     def test_step(self):
         """Run Clang tests on final stage (unless disabled)."""
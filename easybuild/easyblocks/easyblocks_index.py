@@ -0,0 +1,331 @@
+##
+# Copyright 2009-2024 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Index of available easyblocks, mapping easyblock class names to the module they are defined in,
+their base classes, and the names of the custom easyconfig parameters they define.
+
+The index is generated by statically analysing the easyblock modules (so without importing them),
+and is shipped alongside the easyblocks (see also setup.py, which regenerates it at install time).
+It allows resolving an easyblock class with a single targeted import.
+
+Note: this module should only rely on the Python standard library at module level,
+since it is also used by setup.py when installing easybuild-easyblocks.
+
+@author: Kenneth Hoste (Ghent University)
+"""
+import ast
+import importlib
+import json
+import os
+import re
+
+EASYBLOCKS_INDEX_FILENAME = 'easyblocks_index.json'
+
+# base classes provided by EasyBuild framework for easyblocks
+FRAMEWORK_EASYBLOCK_CLASSES = ['EasyBlock', 'ExtensionEasyBlock']
+
+GENERIC_EASYBLOCKS_SUBDIR = 'generic'
+EASYBLOCKS_SUBDIR_REGEX = re.compile(r'^[a-z0-9]$')
+
+_easyblocks_index_cache = {}
+
+
+def _str_value(node):
+    """Return value of specified AST node if it is a string constant, None otherwise."""
+    if type(node).__name__ in ('Constant', 'Str'):
+        value = getattr(node, 'value', getattr(node, 's', None))
+        if isinstance(value, str):
+            return value
+    return None
+
+
+def _is_param_spec(node):
+    """Check whether specified AST node looks like an easyconfig parameter specification: [default, help, category]"""
+    return isinstance(node, (ast.List, ast.Tuple)) and len(node.elts) == 3
+
+
+def _base_name(node):
+    """Return (unqualified) name of base class for specified AST node."""
+    if isinstance(node, ast.Name):
+        return node.id
+    elif isinstance(node, ast.Attribute):
+        return node.attr
+    return None
+
+
+def _param_dict_names(node):
+    """
+    Return names of easyconfig parameters for specified AST node if it is a dict literal
+    with parameter specs as values, like {'foo': [None, "Foo", CUSTOM]}; None otherwise.
+    """
+    if isinstance(node, ast.Dict) and node.values and all(_is_param_spec(value) for value in node.values):
+        return [x for x in (_str_value(key) for key in node.keys) if x]
+    return None
+
+
+def det_param_dicts(tree):
+    """
+    Determine module-level dicts with easyconfig parameter specs (which can be shared across easyblocks),
+    based on AST of a module: dict with name of variable as key, and list of parameter names as value
+    """
+    res = {}
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            names = _param_dict_names(node.value)
+            if names is not None:
+                res[node.targets[0].id] = names
+    return res
+
+
+def det_extra_options_names(func_node, param_dicts=None):
+    """
+    Determine names of custom easyconfig parameters defined in extra_options method, based on its AST node.
+
+    :param param_dicts: known module-level dicts with parameter specs (see det_param_dicts),
+                        which may be used in extra_options like extra_vars.update(SHARED_PARAMS)
+    """
+    param_dicts = param_dicts or {}
+
+    names = set()
+    for node in ast.walk(func_node):
+        # dict literals with parameter specs as values, like {'foo': [None, "Foo", CUSTOM]}
+        if isinstance(node, ast.Dict):
+            names.update(_param_dict_names(node) or [])
+
+        # updates with module-level dicts with parameter specs, like extra_vars.update(SHARED_PARAMS)
+        elif isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == 'update':
+            for arg in node.args:
+                if isinstance(arg, ast.Name) and arg.id in param_dicts:
+                    names.update(param_dicts[arg.id])
+
+        # item assignments, like extra_vars['foo'] = [None, "Foo", CUSTOM]
+        elif isinstance(node, ast.Assign) and _is_param_spec(node.value):
+            for target in node.targets:
+                if isinstance(target, ast.Subscript):
+                    key = target.slice
+                    # Python < 3.9: subscript key is wrapped in an Index node
+                    if type(key).__name__ == 'Index':
+                        key = key.value
+                    name = _str_value(key)
+                    if name:
+                        names.add(name)
+
+    return sorted(names)
+
+
+def _parse_module(path):
+    """Parse specified Python module, and return its AST."""
+    with open(path) as handle:
+        return ast.parse(handle.read(), filename=path)
+
+
+def parse_easyblock_module(path, param_dicts=None, tree=None):
+    """
+    Parse specified Python module, and return information on classes that are defined in it:
+    dict with class name as key, and dict with list of base classes and extra_options names as value
+
+    :param param_dicts: module-level dicts with parameter specs defined in other modules (see det_param_dicts)
+    :param tree: AST for specified module (if it was already parsed)
+    """
+    if tree is None:
+        tree = _parse_module(path)
+
+    all_param_dicts = dict(param_dicts or {})
+    all_param_dicts.update(det_param_dicts(tree))
+
+    res = {}
+    for node in tree.body:
+        if isinstance(node, ast.ClassDef):
+            extra_options = []
+            for item in node.body:
+                if isinstance(item, ast.FunctionDef) and item.name == 'extra_options':
+                    extra_options = det_extra_options_names(item, param_dicts=all_param_dicts)
+            res[node.name] = {
+                'bases': [x for x in (_base_name(base) for base in node.bases) if x],
+                'extra_options': extra_options,
+            }
+
+    return res
+
+
+def generate_easyblocks_index(easyblocks_dir, known_easyblocks=None):
+    """
+    Generate index of easyblocks available in specified easyblocks directory (i.e. an easybuild/easyblocks directory)
+
+    :param easyblocks_dir: easyblocks directory to generate index for
+    :param known_easyblocks: names of easyblock classes available elsewhere, that easyblocks may derive from
+                             (for example when generating an index for a repository of custom easyblocks)
+
+    :return: dict with easyblock class name as key, and dict with module path, base classes,
+             and names of custom easyconfig parameters defined by extra_options as value
+    """
+    modules = []
+    for subdir in sorted(os.listdir(easyblocks_dir)):
+        if subdir == GENERIC_EASYBLOCKS_SUBDIR:
+            modpath_prefix = 'easybuild.easyblocks.generic.'
+        elif EASYBLOCKS_SUBDIR_REGEX.match(subdir):
+            # software-specific easyblocks are located in subdirectories, but are available in easybuild.easyblocks
+            modpath_prefix = 'easybuild.easyblocks.'
+        else:
+            continue
+
+        subdir_path = os.path.join(easyblocks_dir, subdir)
+        if not os.path.isdir(subdir_path):
+            continue
+
+        for fn in sorted(os.listdir(subdir_path)):
+            if fn.endswith('.py') and fn != '__init__.py':
+                path = os.path.join(subdir_path, fn)
+                modules.append((modpath_prefix + fn[:-3], path, _parse_module(path)))
+
+    # dicts with parameter specs may be defined in one module, and used in extra_options of easyblocks in others,
+    # incl. in helper modules that are located directly in the easyblocks directory (which don't provide easyblocks)
+    helper_trees = []
+    for fn in sorted(os.listdir(easyblocks_dir)):
+        path = os.path.join(easyblocks_dir, fn)
+        if fn.endswith('.py') and fn != '__init__.py' and os.path.isfile(path):
+            helper_trees.append(_parse_module(path))
+
+    param_dicts = {}
+    for tree in helper_trees + [tree for (_, _, tree) in modules]:
+        param_dicts.update(det_param_dicts(tree))
+
+    classes = {}
+    for modpath, path, tree in modules:
+        for class_name, info in sorted(parse_easyblock_module(path, param_dicts=param_dicts, tree=tree).items()):
+            info['module'] = modpath
+            classes.setdefault(class_name, info)
+
+    # only retain classes that are easyblocks, i.e. that (indirectly) derive from an easyblock class from framework;
+    # other classes (helper classes defined in easyblock modules) are filtered out
+    easyblocks = set(FRAMEWORK_EASYBLOCK_CLASSES + list(known_easyblocks or []))
+    added = True
+    while added:
+        added = False
+        for class_name, info in classes.items():
+            if class_name not in easyblocks and any(base in easyblocks for base in info['bases']):
+                easyblocks.add(class_name)
+                added = True
+
+    return dict((name, info) for (name, info) in classes.items() if name in easyblocks)
+
+
+def write_easyblocks_index(easyblocks_dir, path=None, known_easyblocks=None):
+    """
+    Generate index of easyblocks available in specified easyblocks directory, and write it to specified path
+    (or the default location in the easyblocks directory).
+
+    See generate_easyblocks_index for more information on known_easyblocks.
+    """
+    if path is None:
+        path = os.path.join(easyblocks_dir, EASYBLOCKS_INDEX_FILENAME)
+
+    index = generate_easyblocks_index(easyblocks_dir, known_easyblocks=known_easyblocks)
+
+    # one line per easyblock, to keep changes to the index easy to review
+    lines = ['%s: %s' % (json.dumps(key), json.dumps(index[key], sort_keys=True)) for key in sorted(index)]
+    with open(path, 'w') as handle:
+        handle.write('{\n' + ',\n'.join(lines) + '\n}\n')
+
+    return path
+
+
+def load_easyblocks_index(path=None):
+    """
+    Load index of easyblocks (cached); returns empty dict if no (valid) index is available
+    """
+    if path is None:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), EASYBLOCKS_INDEX_FILENAME)
+
+    if path not in _easyblocks_index_cache:
+        try:
+            with open(path) as handle:
+                index = json.load(handle)
+            if not isinstance(index, dict):
+                index = {}
+        except (IOError, OSError, ValueError):
+            index = {}
+        _easyblocks_index_cache[path] = index
+
+    return _easyblocks_index_cache[path]
+
+
+def get_easyblock_params(class_name, index=None):
+    """
+    Determine names of all custom easyconfig parameters for specified easyblock (including inherited ones),
+    based on easyblocks index, without importing any easyblock module.
+
+    :return: sorted list of parameter names, or None if easyblock is not included in index
+    """
+    if index is None:
+        index = load_easyblocks_index()
+
+    if class_name not in index:
+        return None
+
+    params = set()
+    todo, seen = [class_name], set()
+    while todo:
+        name = todo.pop()
+        if name not in seen and name in index:
+            seen.add(name)
+            params.update(index[name]['extra_options'])
+            todo.extend(index[name]['bases'])
+
+    return sorted(params)
+
+
+def get_easyblock_class_from_index(easyblock, name=None, index=None):
+    """
+    Obtain class for specified easyblock (or software-specific easyblock for specified software name)
+    via index of easyblocks, which only requires importing the module that provides it.
+
+    :return: easyblock class, or None if it could not be obtained via the index
+             (in which case get_easyblock_class from the framework should be used)
+    """
+    if easyblock:
+        # full module path was specified, nothing to look up
+        if '.' in easyblock:
+            return None
+        class_name = easyblock
+    elif name:
+        from easybuild.tools.filetools import encode_class_name
+        class_name = encode_class_name(name)
+    else:
+        return None
+
+    if index is None:
+        index = load_easyblocks_index()
+
+    cls = None
+    if class_name in index:
+        # import via the regular import mechanism, so easyblocks included via --include-easyblocks are picked up
+        try:
+            mod = importlib.import_module(index[class_name]['module'])
+            cls = getattr(mod, class_name, None)
+        except ImportError:
+            cls = None
+
+    return cls
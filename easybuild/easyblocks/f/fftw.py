@@ -27,15 +27,17 @@ EasyBuild support for building and installing FFTW, implemented as an easyblock
 
 @author: Kenneth Hoste (HPC-UGent)
 """
+import os
 from easybuild.tools import LooseVersion
 
 import easybuild.tools.toolchain as toolchain
-from easybuild.easyblocks.generic.configuremake import ConfigureMake
+from easybuild.easyblocks.generic.configuremake import ConfigureMake, run_cmds_concurrently, spread_parallel
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.toolchains.compiler.gcc import TC_CONSTANT_GCC
 from easybuild.toolchains.compiler.fujitsu import TC_CONSTANT_FUJITSU
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import build_option
+from easybuild.tools.filetools import change_dir, mkdir
 from easybuild.tools.modules import get_software_version
 from easybuild.tools.systemtools import AARCH32, AARCH64, POWER, RISCV32, RISCV64, X86_64
 from easybuild.tools.systemtools import get_cpu_architecture, get_cpu_features, get_shared_lib_ext
@@ -64,6 +66,12 @@ class EB_FFTW(ConfigureMake):
         """Custom easyconfig parameters for FFTW."""
         extra_vars = {
             'auto_detect_cpu_features': [True, "Auto-detect available CPU features, and configure accordingly", CUSTOM],
+            'concurrent_precision_builds': [False, "Configure each precision in a separate build directory, "
+                                            "and build them concurrently (splitting the number of parallel build "
+                                            "jobs across them); testing and installing is still done "
+                                            "one precision at a time", CUSTOM],
+            'share_configure_cache': [True, "Share cache file for configure checks (config.cache) across precisions, "
+                                            "to avoid repeating checks that do not depend on the precision", CUSTOM],
             'use_fma': [None, "Configure with --enable-avx-128-fma (DEPRECATED, use 'use_fma4' instead)", CUSTOM],
             'with_mpi': [True, "Enable building of FFTW MPI library", CUSTOM],
             'with_openmp': [True, "Enable building of FFTW OpenMP library", CUSTOM],
@@ -145,6 +153,9 @@ class EB_FFTW(ConfigureMake):
             self.cfg['with_quad_prec'] = False
             self.log.debug("Quad-precision automatically disabled; not supported on %s.", cpu_arch)
 
+        # list of precisions that are configured/built in separate build directories (concurrent_precision_builds)
+        self.precisions = None
+
     def run_all_steps(self, *args, **kwargs):
         """
         Put configure options in place for different precisions (single, double, long double, quad).
@@ -153,6 +164,7 @@ class EB_FFTW(ConfigureMake):
         common_config_opts = self.cfg['configopts']
 
         self.cfg['configopts'] = []
+        precs = []
 
         for prec in FFTW_PRECISION_FLAGS:
             if self.cfg[EB_FFTW._prec_param(prec)]:
@@ -224,13 +236,103 @@ class EB_FFTW(ConfigureMake):
 
                 # append additional configure options (may be empty string, but that's OK)
                 self.cfg.update('configopts', [' '.join(prec_configopts) + ' ' + common_config_opts])
+                precs.append(prec)
 
-        self.log.debug("List of configure options to iterate over: %s", self.cfg['configopts'])
+        if self.cfg['concurrent_precision_builds'] and len(precs) > 1:
+            # no iterating over configure options, all precisions are handled in a single run of the steps
+            prec_opts = zip(precs, self.cfg['configopts'])
+            self.precisions = [{'name': prec, 'configopts': opts} for (prec, opts) in prec_opts]
+            self.cfg['configopts'] = common_config_opts
+            self.log.info("Building precisions of FFTW concurrently: %s", ', '.join(precs))
+        else:
+            self.log.debug("List of configure options to iterate over: %s", self.cfg['configopts'])
 
         return super(EB_FFTW, self).run_all_steps(*args, **kwargs)
 
+    def configure_step(self, cmd_prefix=''):
+        """
+        Configure FFTW; if precisions are built concurrently, configure each of them in a separate build directory
+        (one after the other, so the cache file for configure checks can be shared).
+        """
+        if self.precisions is None:
+            self.configure_precision(cmd_prefix=cmd_prefix)
+        else:
+            src_dir = os.getcwd()
+            common_config_opts = self.cfg['configopts']
+            for prec in self.precisions:
+                prec['builddir'] = os.path.join(self.builddir, 'easybuild_obj_%s' % prec['name'])
+                mkdir(prec['builddir'], parents=True)
+                change_dir(prec['builddir'])
+                self.cfg['configopts'] = prec['configopts']
+                try:
+                    # out-of-source build, so configure script must be run from source directory
+                    self.configure_precision(cmd_prefix=src_dir + os.path.sep)
+                finally:
+                    self.cfg['configopts'] = common_config_opts
+                    change_dir(src_dir)
+
+    def configure_precision(self, cmd_prefix=''):
+        """Run configure script for a single precision of FFTW."""
+        configopts = self.cfg['configopts']
+        if self.cfg['share_configure_cache']:
+            # precision-independent configure checks (compiler features, headers, ...) only need to be done once
+            config_cache = os.path.join(self.builddir, 'config.cache')
+            self.log.info("Using shared cache file for configure checks: %s", config_cache)
+            self.cfg.update('configopts', '--cache-file=%s' % config_cache)
+        try:
+            super(EB_FFTW, self).configure_step(cmd_prefix=cmd_prefix)
+        finally:
+            self.cfg['configopts'] = configopts
+
+    def build_step(self, verbose=False, path=None):
+        """
+        Build FFTW; if precisions are built concurrently, the number of parallel build jobs is split across them.
+        """
+        if self.precisions is None:
+            return super(EB_FFTW, self).build_step(verbose=verbose, path=path)
+
+        cmds_and_dirs = []
+        for prec, jobs in zip(self.precisions, spread_parallel(self.cfg['parallel'], len(self.precisions))):
+            cmd = ' && '.join(cmd for (_, cmd) in self.det_build_cmds(jobs))
+            self.log.info("Building %s precision of FFTW using %d jobs: %s", prec['name'], jobs, cmd)
+            cmds_and_dirs.append((cmd, prec['builddir']))
+
+        res = run_cmds_concurrently(cmds_and_dirs)
+
+        for prec, (out, ec) in zip(self.precisions, res):
+            if ec:
+                raise EasyBuildError("Building %s precision of FFTW failed with exit code %s and output:\n%s",
+                                     prec['name'], ec, out)
+
+        return '\n'.join(out for (out, _) in res)
+
+    def run_for_precisions(self, step):
+        """
+        Run specified function in the build directory of each precision (one after the other)
+        if precisions are built concurrently, or just once otherwise.
+        """
+        if self.precisions is None:
+            step()
+        else:
+            start_dir = os.getcwd()
+            for prec in self.precisions:
+                self.log.info("Running %s for %s precision of FFTW", step.__name__, prec['name'])
+                change_dir(prec['builddir'])
+                try:
+                    step()
+                finally:
+                    change_dir(start_dir)
+
     def test_step(self):
         """Custom implementation of test step for FFTW."""
+        self.run_for_precisions(self.test_precision)
+
+    def install_step(self):
+        """Install FFTW; if precisions are built concurrently, install them one after the other."""
+        self.run_for_precisions(super(EB_FFTW, self).install_step)
+
+    def test_precision(self):
+        """Run tests for a single precision of FFTW."""
 
         if self.toolchain.mpi_family() is not None and not build_option('mpi_tests'):
             self.log.info("Skipping testing of FFTW since MPI testing is disabled")
@@ -29,6 +29,8 @@ author: Kenneth Hoste (HPC-UGent)
 """
 import os
 
+from easybuild.easyblocks.blasbenchmark import BLAS_LAPACK_BENCHMARK_EXTRA_OPTIONS
+from easybuild.easyblocks.blasbenchmark import blas_lapack_benchmark, load_blas_lapack_benchmarks
 from easybuild.easyblocks.generic.cmakemake import CMakeMake
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools import toolchain
@@ -62,6 +64,7 @@ class EB_FlexiBLAS(CMakeMake):
                          "'imkl', which does not need to be a (build)dependency." +
                          "If not defined, use the list of dependencies.", CUSTOM],
         })
+        extra_vars.update(BLAS_LAPACK_BENCHMARK_EXTRA_OPTIONS)
         extra_vars['separate_build_dir'][0] = True
         return extra_vars
 
@@ -84,6 +87,15 @@ class EB_FlexiBLAS(CMakeMake):
             self.blas_libs = [x for x in dep_names if x not in build_dep_names]
 
         self.obj_builddir = os.path.join(self.builddir, 'easybuild_obj')
+        self.prev_blas_lapack_benchmarks = None
+
+    def prepare_step(self, *args, **kwargs):
+        """Prepare build environment, and collect benchmark results for previous installations."""
+        super(EB_FlexiBLAS, self).prepare_step(*args, **kwargs)
+
+        # must be done before installation directory is (re)created
+        if self.cfg['blas_lapack_benchmark'] and self.prev_blas_lapack_benchmarks is None:
+            self.prev_blas_lapack_benchmarks = load_blas_lapack_benchmarks(self.installdir)
 
     def configure_step(self):
         """Custom configuration for FlexiBLAS, based on which BLAS libraries are included as dependencies."""
@@ -159,6 +171,14 @@ class EB_FlexiBLAS(CMakeMake):
             write_file(os.path.join(self.installdir, 'etc', 'flexiblasrc.d', 'imkl.conf'),
                        IMKL_CONF_TEMPLATE % {'parallel': parallel})
 
+    def post_install_step(self):
+        """Run BLAS/LAPACK micro-benchmark for installed FlexiBLAS library (using default backend)."""
+        super(EB_FlexiBLAS, self).post_install_step()
+
+        libdir = os.path.join(self.installdir, 'lib')
+        blas_lapack_benchmark(self, '-L%s -Wl,-rpath,%s -lflexiblas' % (libdir, libdir),
+                              lapack=self.cfg['enable_lapack'])
+
     def test_step(self):
         """Run tests using each of the backends."""
 
@@ -35,25 +35,30 @@ EasyBuild support for building and installing GCC, implemented as an easyblock
 @author: Bart Oldeman (McGill University, Calcul Quebec, Compute Canada)
 """
 import glob
+import hashlib
+import json
 import os
 import re
 import shutil
 import stat
+import tarfile
 from copy import copy
 from easybuild.tools import LooseVersion
 
 import easybuild.tools.environment as env
 from easybuild.easyblocks.clang import DEFAULT_TARGETS_MAP as LLVM_ARCH_MAP
-from easybuild.easyblocks.generic.configuremake import ConfigureMake
+from easybuild.easyblocks.generic.configuremake import ConfigureMake, run_cmds_concurrently, spread_parallel
+from easybuild.easyblocks.sharedcache import TarballCache
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import build_option
-from easybuild.tools.filetools import apply_regex_substitutions, adjust_permissions, change_dir, copy_file
-from easybuild.tools.filetools import mkdir, move_file, read_file, symlink, which, write_file
+from easybuild.tools.filetools import apply_regex_substitutions, adjust_permissions, change_dir, compute_checksum
+from easybuild.tools.filetools import copy_file, create_unused_dir, mkdir, move_file, read_file, remove_dir, symlink
+from easybuild.tools.filetools import which, write_file
 from easybuild.tools.modules import get_software_root
 from easybuild.tools.run import run_cmd
 from easybuild.tools.systemtools import RISCV, check_os_dependency, get_cpu_architecture, get_cpu_family
-from easybuild.tools.systemtools import get_gcc_version, get_shared_lib_ext, get_os_name, get_os_type
+from easybuild.tools.systemtools import get_cpu_model, get_gcc_version, get_shared_lib_ext, get_os_name, get_os_type
 from easybuild.tools.toolchain.compiler import OPTARCH_GENERIC
 from easybuild.tools.utilities import nub
 
@@ -64,6 +69,15 @@ AMD_NEWLIB = 'AMD_GCN_NEWLIB'
 HOST_COMPILER = 'HOST_COMPILER'
 NVIDIA_NEWLIB = 'NVIDIA_NEWLIB'
 NVPTX_TOOLS = 'NVIDIA_NVPTX_TOOLS'
+# Libraries that may be built in stage 2 of a staged build, and which other ones they depend on (if they're built)
+STAGE2_LIB_DEPS = {
+    'gmp': [],
+    'isl': ['gmp'],
+    'ppl': ['gmp'],
+    'cloog': ['gmp', 'isl', 'ppl'],
+}
+# Placeholder for installation prefix in libtool/pkg-config files stored in cache of stage 2 libraries
+STAGE2_CACHE_PREFIX = '@EB_GCC_STAGE2_PREFIX@'
 # Additional symlinks to create for compiler commands
 COMP_CMD_SYMLINKS = {
     'cc': 'gcc',
@@ -147,6 +161,9 @@ class EB_GCC(ConfigureMake):
             'pplwatchdog': [False, "Enable PPL watchdog", CUSTOM],
             'prefer_lib_subdir': [False, "Configure GCC to prefer 'lib' subdirs over 'lib64' when linking", CUSTOM],
             'profiled': [False, "Bootstrap GCC with profile-guided optimizations", CUSTOM],
+            'stage2_cache': [None, "Path to cache of static libraries built in stage 2 of a staged build "
+                                   "(GMP, ISL, PPL, CLooG) that is shared across installations "
+                                   "(default: $EB_GCC_STAGE2_CACHE, if defined)", CUSTOM],
             'use_gold_linker': [None, "Configure GCC to use GOLD as default linker "
                                       "(default: enable automatically for GCC < 11.3.0, except on RISC-V)", CUSTOM],
             'withcloog': [False, "Build GCC with CLooG support", CUSTOM],
@@ -172,6 +189,8 @@ class EB_GCC(ConfigureMake):
         self.llvm_dir = None  # LLVM is necessary when offloading to AMD
         self.lld_dir = None  # LLD is the only required component of LLVM
         self.newlib_dir = None  # Used by both NVPTX and AMD GCN backend
+        # identification of compiler used to build stage 2 libraries (for cache of stage 2 libraries)
+        self.stage2_compiler_id = None
 
         # need to make sure version is an actual version
         # required because of support in SystemCompiler generic easyblock to specify 'system' as version,
@@ -430,9 +449,9 @@ class EB_GCC(ConfigureMake):
                       f"architecture: {str(sorted_gcc_cc)}")
         return sorted_gcc_cc[0]
 
-    def run_configure_cmd(self, cmd):
+    def complete_configure_cmd(self, cmd):
         """
-        Run a configure command, with some extra checking (e.g. for unrecognized options).
+        Complete configure command: specify build/host type, and prepend preconfigopts.
         """
         # note: this also triggers the use of an updated config.guess script
         # (unless both the 'build_type' and 'host_type' easyconfig parameters are specified)
@@ -442,8 +461,19 @@ class EB_GCC(ConfigureMake):
         if host_type:
             cmd += ' --host=' + host_type
 
-        (out, ec) = run_cmd("%s %s" % (self.cfg['preconfigopts'], cmd), log_all=True, simple=False)
+        return "%s %s" % (self.cfg['preconfigopts'], cmd)
+
+    def run_configure_cmd(self, cmd):
+        """
+        Run a configure command, with some extra checking (e.g. for unrecognized options).
+        """
+        (out, ec) = run_cmd(self.complete_configure_cmd(cmd), log_all=True, simple=False)
+        self.check_configure_output(cmd, out, ec)
 
+    def check_configure_output(self, cmd, out, ec):
+        """
+        Check exit code and output of configure command (e.g. for unrecognized options).
+        """
         if ec != 0:
             raise EasyBuildError("Command '%s' exited with exit code != 0 (%s)", cmd, ec)
 
@@ -768,9 +798,9 @@ class EB_GCC(ConfigureMake):
             configopts = stage2_info['configopts']
 
             # build PPL and CLooG (GMP as dependency)
-
+            # first determine configure command for each library, then build them (concurrently, if possible)
+            configure_cmds = {}
             for lib in ["gmp"] + self.with_dirs:
-                self.log.debug("Building %s in stage 2" % lib)
                 if lib == "gmp" or self.cfg['with%s' % lib]:
                     libdir = os.path.join(stage2prefix, lib)
                     try:
@@ -853,31 +883,9 @@ class EB_GCC(ConfigureMake):
                     else:
                         raise EasyBuildError("Don't know how to configure for %s", lib)
 
-                    # configure
-                    self.run_configure_cmd(cmd)
+                    configure_cmds[lib] = cmd
 
-                    # build and 'install'
-                    cmd = "make %s" % paracmd
-                    run_cmd(cmd, log_all=True, simple=True)
-
-                    cmd = "make install"
-                    run_cmd(cmd, log_all=True, simple=True)
-
-                    if lib == "gmp":
-                        # make sure correct GMP is found
-                        libpath = os.path.join(stage2prefix, 'lib')
-
-                        # fall back to lib64 directory if lib was not found,
-                        # give up if neither are there
-                        if not os.path.exists(libpath):
-                            libpath += '64'
-                        if not os.path.exists(libpath):
-                            raise EasyBuildError("lib(64) subdirectory not found in %s!" % stage2prefix)
-
-                        incpath = os.path.join(stage2prefix, 'include')
-
-                        cppflags = os.getenv('CPPFLAGS', '')
-                        env.setvar('CPPFLAGS', "%s -L%s -I%s " % (cppflags, libpath, incpath))
+            self.build_stage2_libs(stage2prefix, stage2_info, configure_cmds)
 
             #
             # STAGE 3: bootstrap build of final GCC (with PPL/CLooG support)
@@ -939,6 +947,144 @@ class EB_GCC(ConfigureMake):
         # call standard build_step
         super(EB_GCC, self).build_step()
 
+    def stage2_cache(self):
+        """
+        Return cache of libraries built in stage 2 of a staged build to use, if any.
+        """
+        cache = None
+        path = self.cfg['stage2_cache'] or os.getenv('EB_GCC_STAGE2_CACHE')
+        if path:
+            self.log.info("Using cache of stage 2 libraries at %s", path)
+            cache = Stage2Cache(path)
+        return cache
+
+    def stage2_lib_key(self, lib, stage2prefix, stage2_info, configure_cmd, dep_keys):
+        """
+        Determine key for library built in stage 2 in cache of stage 2 libraries,
+        based on everything that determines the result of the build:
+        library version, checksum of source tarball, compiler being used, configure command, build environment,
+        whether a generic build is done (or the host CPU otherwise), and the keys of the libraries it depends on.
+
+        :return: SHA256 checksum (or None if the library can not be cached)
+        """
+        name, version = stage2_info['names'].get(lib), stage2_info['versions'].get(lib)
+        src_prefix = '%s-%s.' % (name, version)
+        src_paths = [src['path'] for src in self.src if os.path.basename(src['name']).startswith(src_prefix)]
+        if not name or len(src_paths) != 1 or any(key is None for key in dep_keys):
+            self.log.info("Not using cache of stage 2 libraries for %s", lib)
+            return None
+
+        if self.stage2_compiler_id is None:
+            # stage 1 GCC is used to build stage 2 libraries
+            self.stage2_compiler_id, _ = run_cmd("gcc --version && gcc -dumpmachine", log_ok=False, simple=False)
+
+        optarch_generic = build_option('optarch') == OPTARCH_GENERIC
+        generic = bool(self.cfg['generic'] or (optarch_generic and self.cfg['generic'] is not False))
+
+        key_items = [
+            lib,
+            version,
+            compute_checksum(src_paths[0], checksum_type='sha256'),
+            self.stage2_compiler_id,
+            self.complete_configure_cmd(configure_cmd),
+            [os.getenv(var, '') for var in ('CFLAGS', 'CXXFLAGS', 'CPPFLAGS', 'LDFLAGS')],
+            generic,
+            # non-generic builds of GMP/ISL are tuned for the host CPU
+            None if generic else [get_cpu_architecture(), get_cpu_model()],
+            dep_keys,
+        ]
+        # location of build directory does not matter
+        key_txt = json.dumps(key_items, sort_keys=True).replace(stage2prefix, STAGE2_CACHE_PREFIX)
+        return hashlib.sha256(key_txt.encode('utf-8')).hexdigest()
+
+    def build_stage2_libs(self, stage2prefix, stage2_info, configure_cmds):
+        """
+        Build libraries in stage 2 of staged build, using specified configure commands:
+        libraries that do not depend on each other are built concurrently,
+        and they are taken from the cache of stage 2 libraries if possible.
+        """
+        cache = self.stage2_cache()
+
+        libs = list(configure_cmds.keys())
+        done, keys = [], {}
+        while len(done) < len(libs):
+            batch = [lib for lib in libs if lib not in done and
+                     all(dep in done for dep in STAGE2_LIB_DEPS[lib] if dep in libs)]
+            if not batch:
+                raise EasyBuildError("Failed to determine order in which to build stage 2 libraries: %s", libs)
+
+            to_build = []
+            for lib in batch:
+                if cache:
+                    dep_keys = [keys[dep] for dep in STAGE2_LIB_DEPS[lib] if dep in libs]
+                    keys[lib] = self.stage2_lib_key(lib, stage2prefix, stage2_info, configure_cmds[lib], dep_keys)
+                    if keys[lib]:
+                        try:
+                            if cache.restore(keys[lib], stage2prefix):
+                                self.log.info("Using %s from cache of stage 2 libraries (key: %s)", lib, keys[lib])
+                                continue
+                        except (IOError, OSError, tarfile.TarError) as err:
+                            self.log.warning("Failed to restore %s from cache of stage 2 libraries: %s", lib, err)
+                to_build.append(lib)
+
+            self.build_stage2_batch(stage2prefix, to_build, configure_cmds, cache, keys)
+
+            if 'gmp' in batch:
+                # make sure correct GMP is found
+                libpath = os.path.join(stage2prefix, 'lib')
+
+                # fall back to lib64 directory if lib was not found,
+                # give up if neither are there
+                if not os.path.exists(libpath):
+                    libpath += '64'
+                if not os.path.exists(libpath):
+                    raise EasyBuildError("lib(64) subdirectory not found in %s!" % stage2prefix)
+
+                incpath = os.path.join(stage2prefix, 'include')
+
+                cppflags = os.getenv('CPPFLAGS', '')
+                env.setvar('CPPFLAGS', "%s -L%s -I%s " % (cppflags, libpath, incpath))
+
+            done.extend(batch)
+
+    def build_stage2_batch(self, stage2prefix, libs, configure_cmds, cache, keys):
+        """
+        Concurrently configure and build specified (independent) stage 2 libraries,
+        sharing the available build jobs, and install them one at a time.
+        """
+        if not libs:
+            return
+
+        cmds_and_dirs = []
+        for lib, jobs in zip(libs, spread_parallel(self.cfg['parallel'], len(libs))):
+            self.log.debug("Building %s in stage 2" % lib)
+            cmd = "%s && make -j %s" % (self.complete_configure_cmd(configure_cmds[lib]), jobs)
+            cmds_and_dirs.append((cmd, os.path.join(stage2prefix, lib)))
+
+        res = run_cmds_concurrently(cmds_and_dirs)
+
+        for lib, (cmd, _), (out, ec) in zip(libs, cmds_and_dirs, res):
+            if ec:
+                self.log.info("Output of configuring and building %s in stage 2:\n%s", lib, out)
+            self.check_configure_output(cmd, out, ec)
+
+        # install one library at a time, since they're all installed in the same prefix
+        for lib in libs:
+            change_dir(os.path.join(stage2prefix, lib))
+
+            if cache and keys.get(lib):
+                # also install in staging directory, to add installed files to cache of stage 2 libraries
+                destdir = create_unused_dir(stage2prefix, '%s_eb_destdir' % lib)
+                run_cmd("make install DESTDIR=%s" % destdir, log_all=True, simple=True)
+                try:
+                    cache.add(keys[lib], destdir + stage2prefix, stage2prefix)
+                    self.log.info("Added %s to cache of stage 2 libraries (key: %s)", lib, keys[lib])
+                except (IOError, OSError, tarfile.TarError) as err:
+                    self.log.warning("Failed to add %s to cache of stage 2 libraries: %s", lib, err)
+                remove_dir(destdir)
+
+            run_cmd("make install", log_all=True, simple=True)
+
     def install_step(self, *args, **kwargs):
         """Custom install step: avoid installing LLVM when building with AMD GCN offloading support"""
         # When building AMD offloading do not install the LLVM source files with 'make install', instead move a few
@@ -1207,3 +1353,44 @@ class EB_GCC(ConfigureMake):
             'MANPATH': ['man', 'share/man']
         })
         return guesses
+
+
+class Stage2Cache(TarballCache):
+    """
+    Cache of (static) libraries built in stage 2 of a staged GCC build, that is shared across installations.
+
+    Each entry is a tarball with the files installed for a particular library, named after the key for the library
+    (see EB_GCC.stage2_lib_key). The installation prefix in libtool/pkg-config files is replaced by a placeholder,
+    so entries can be restored in any prefix.
+    """
+
+    @staticmethod
+    def prefix_files(path):
+        """
+        Return list of libtool/pkg-config files in specified directory (which may include installation prefix).
+        """
+        res = []
+        for dirpath, _, filenames in os.walk(path):
+            for filename in filenames:
+                filepath = os.path.join(dirpath, filename)
+                if filename.endswith(('.la', '.pc')) and not os.path.islink(filepath):
+                    res.append(filepath)
+        return res
+
+    def add(self, key, path, prefix):
+        """
+        Add files in specified directory, which were installed for specified prefix, to cache using specified key.
+        """
+        for filepath in self.prefix_files(path):
+            write_file(filepath, read_file(filepath).replace(prefix, STAGE2_CACHE_PREFIX))
+
+        self.add_files(key, path, sorted(os.listdir(path)))
+
+    def post_restore(self, prefix, members):
+        """
+        Replace placeholder in restored libtool/pkg-config files with installation prefix.
+        """
+        for member in members:
+            if member.isfile() and member.name.endswith(('.la', '.pc')):
+                filepath = os.path.join(prefix, member.name)
+                write_file(filepath, read_file(filepath).replace(STAGE2_CACHE_PREFIX, prefix))
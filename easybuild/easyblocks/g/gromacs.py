@@ -33,6 +33,7 @@ EasyBuild support for building and installing GROMACS, implemented as an easyblo
 @author: Oliver Stueker (Compute Canada/ACENET)
 @author: Davide Vanzo (Vanderbilt University)
 """
+import copy
 import glob
 import os
 import re
@@ -41,12 +42,13 @@ from easybuild.tools import LooseVersion
 
 import easybuild.tools.environment as env
 import easybuild.tools.toolchain as toolchain
-from easybuild.easyblocks.generic.configuremake import ConfigureMake
+from easybuild.easyblocks.generic.configuremake import ConfigureMake, run_cmds_concurrently, spread_parallel
 from easybuild.easyblocks.generic.cmakemake import CMakeMake
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools.build_log import EasyBuildError, print_warning
 from easybuild.tools.config import build_option
-from easybuild.tools.filetools import copy_dir, find_backup_name_candidate, remove_dir, which
+from easybuild.tools.environment import restore_env
+from easybuild.tools.filetools import change_dir, copy_dir, find_backup_name_candidate, remove_dir, which
 from easybuild.tools.modules import get_software_libdir, get_software_root, get_software_version
 from easybuild.tools.run import run_cmd
 from easybuild.tools.toolchain.compiler import OPTARCH_GENERIC
@@ -54,6 +56,10 @@ from easybuild.tools.systemtools import X86_64, get_cpu_architecture, get_shared
 from easybuild.tools.version import VERBOSE_VERSION as EASYBUILD_VERSION
 
 
+# easyconfig parameters that are specific to a particular variant
+VARIANT_OPTS = ['configopts', 'buildopts', 'installopts']
+
+
 class EB_GROMACS(CMakeMake):
     """Support for building/installing GROMACS."""
 
@@ -61,6 +67,13 @@ class EB_GROMACS(CMakeMake):
     def extra_options():
         extra_vars = CMakeMake.extra_options()
         extra_vars.update({
+            'concurrent_variant_builds': [False, "Configure each variant (single/double precision, with/without MPI) "
+                                          "in a separate build directory and build them concurrently, "
+                                          "splitting the number of parallel build jobs across them; "
+                                          "testing and installation are still done one variant at a time "
+                                          "(only for GROMACS >= 4.6, not supported when applying PLUMED patches; "
+                                          "implies separate_build_dir)",
+                                          CUSTOM],
             'double_precision': [None, "Build with double precision enabled (-DGMX_DOUBLE=ON), " +
                                  "default is to build double precision unless CUDA is enabled", CUSTOM],
             'mpisuffix': ['_mpi', "Suffix to append to MPI-enabled executables (only for GROMACS < 4.6)", CUSTOM],
@@ -79,6 +92,8 @@ class EB_GROMACS(CMakeMake):
         super(EB_GROMACS, self).__init__(*args, **kwargs)
         self.lib_subdir = ''
         self.pre_env = ''
+        # list of variants that are configured/built in separate build directories (concurrent_variant_builds)
+        self.variants = None
         self.cfg['build_shared_libs'] = self.cfg.get('build_shared_libs', False)
         if LooseVersion(self.version) >= LooseVersion('2019'):
             # Building the gmxapi interface requires shared libraries
@@ -164,7 +179,53 @@ class EB_GROMACS(CMakeMake):
         # change will be ignored.
         super(EB_GROMACS, self).prepare_step(*args, **kwargs)
 
+    def activate_variant(self, variant):
+        """
+        Activate variant that is configured/built in a separate build directory:
+        put config/build/installopts in place, restore environment and change to build directory (if known).
+        """
+        for opt in VARIANT_OPTS:
+            self.cfg[opt] = variant[opt]
+        if variant.get('env') is not None:
+            restore_env(variant['env'])
+        if variant.get('builddir'):
+            change_dir(variant['builddir'])
+
     def configure_step(self):
+        """
+        Custom configuration procedure for GROMACS;
+        if variants are built concurrently, configure all of them (one after the other), each in a separate build dir.
+        """
+        if self.variants is None:
+            self.configure_variant()
+        else:
+            # each variant must be configured starting from the same environment & working directory,
+            # since configuring a variant involves changing both of them
+            start_env = copy.deepcopy(os.environ)
+            start_dir = os.getcwd()
+
+            for idx, variant in enumerate(self.variants):
+                restore_env(start_env)
+                change_dir(start_dir)
+                self.activate_variant(variant)
+                self.log.info("Configuring variant #%d of GROMACS (configopts: %s)", idx, variant['configopts'])
+
+                # make sure we don't keep track of build directory of previous variant,
+                # configure step is skipped for double precision CUDA build
+                self.separate_build_dir = None
+                self.configure_variant()
+
+                variant.update({
+                    'builddir': self.separate_build_dir,
+                    'configopts': self.cfg['configopts'],
+                    'env': copy.deepcopy(os.environ),
+                    'skip': bool(self.is_double_precision_cuda_build()),
+                })
+                if self.separate_build_dir is None and not variant['skip']:
+                    raise EasyBuildError("No separate build directory for variant #%d of GROMACS, "
+                                         "required when building variants concurrently", idx)
+
+    def configure_variant(self):
         """Custom configuration procedure for GROMACS: set configure options for configure or cmake."""
 
         gromacs_version = LooseVersion(self.version)
@@ -456,13 +517,55 @@ class EB_GROMACS(CMakeMake):
         Custom build step for GROMACS; Skip if CUDA is enabled and the current
         iteration is for double precision
         """
-
-        if self.is_double_precision_cuda_build():
+        if self.variants is not None:
+            self.build_variants()
+        elif self.is_double_precision_cuda_build():
             self.log.info("skipping build step")
         else:
             super(EB_GROMACS, self).build_step()
 
+    def build_variants(self):
+        """
+        Build all variants concurrently, each in its own build directory;
+        the number of parallel build jobs is split across the variants.
+        """
+        variants = [v for v in self.variants if not v['skip']]
+        if not variants:
+            self.log.info("No variants of GROMACS to build")
+            return
+
+        start_env = copy.deepcopy(os.environ)
+        start_dir = os.getcwd()
+
+        cmds_and_dirs, envs = [], []
+        for variant, jobs in zip(variants, spread_parallel(self.cfg['parallel'], len(variants))):
+            # build options are specific to each variant
+            self.activate_variant(variant)
+            cmd = ' && '.join(cmd for (_, cmd) in self.det_build_cmds(jobs))
+            self.log.info("Building GROMACS variant in %s using %d jobs: %s", variant['builddir'], jobs, cmd)
+            cmds_and_dirs.append((cmd, variant['builddir']))
+            envs.append(variant.get('env'))
+
+        restore_env(start_env)
+        change_dir(start_dir)
+
+        res = run_cmds_concurrently(cmds_and_dirs, envs=envs)
+
+        for (cmd, _), (out, ec) in zip(cmds_and_dirs, res):
+            if ec:
+                raise EasyBuildError("Building GROMACS variant failed, cmd %s exited with exit code %s and output:\n%s",
+                                     cmd, ec, out)
+
     def test_step(self):
+        """Run the basic tests for each variant, one after the other."""
+        if self.variants is None:
+            self.test_variant()
+        else:
+            for variant in self.variants:
+                self.activate_variant(variant)
+                self.test_variant()
+
+    def test_variant(self):
         """Run the basic tests (but not necessarily the full regression tests) using make check"""
 
         if self.is_double_precision_cuda_build():
@@ -517,6 +620,15 @@ class EB_GROMACS(CMakeMake):
                 self.cfg['runtest'] = orig_runtest
 
     def install_step(self):
+        """Install each variant, one after the other."""
+        if self.variants is None:
+            self.install_variant()
+        else:
+            for variant in self.variants:
+                self.activate_variant(variant)
+                self.install_variant()
+
+    def install_variant(self):
         """
         Custom install step for GROMACS; figure out where libraries were installed to.
         """
@@ -530,7 +642,7 @@ class EB_GROMACS(CMakeMake):
 
     def extensions_step(self, fetch=False):
         """ Custom extensions step, only handle extensions after the last iteration round"""
-        if self.iter_idx < self.variants_to_build - 1:
+        if self.variants is None and self.iter_idx < self.variants_to_build - 1:
             self.log.info("skipping extension step %s", self.iter_idx)
         else:
             # Reset installopts etc for the benefit of the gmxapi extension
@@ -779,8 +891,31 @@ class EB_GROMACS(CMakeMake):
                 self.cfg.update('installopts', ' '.join(var_installopts + [common_install_opts]))
         self.variants_to_build = len(self.cfg['configopts'])
 
-        self.log.debug("List of configure options to iterate over: %s", self.cfg['configopts'])
         self.log.info("Building these variants of GROMACS: %s", ', '.join(versions_built))
+
+        if self.cfg['concurrent_variant_builds'] and self.variants_to_build > 1:
+            plumed_dep = any(dep['name'] == 'PLUMED' for dep in self.cfg.dependencies())
+            if LooseVersion(self.version) < LooseVersion('4.6'):
+                self.log.info("Concurrent builds of variants not supported for GROMACS < 4.6 (in-source builds)")
+            elif plumed_dep and self.cfg['plumed'] is not False:
+                self.log.info("Concurrent builds of variants not supported when PLUMED patches are applied")
+            else:
+                # no iterating over configure/build/install options,
+                # all variants are handled in a single pass of the configure/build/test/install steps instead
+                self.variants = []
+                for values in zip(*[self.cfg[opt] for opt in VARIANT_OPTS]):
+                    self.variants.append(dict(zip(VARIANT_OPTS, values)))
+                self.cfg['configopts'] = common_config_opts
+                self.cfg['buildopts'] = common_build_opts
+                self.cfg['installopts'] = common_install_opts
+                self.log.info("Building %d variants of GROMACS concurrently", len(self.variants))
+                # variants can only be built concurrently if each of them is built in a separate build directory
+                if not self.cfg['separate_build_dir']:
+                    self.log.info("Enabling separate_build_dir, required for concurrent builds of variants")
+                    self.cfg['separate_build_dir'] = True
+
+        if self.variants is None:
+            self.log.debug("List of configure options to iterate over: %s", self.cfg['configopts'])
         return super(EB_GROMACS, self).run_all_steps(*args, **kwargs)
 
         self.cfg['install_cmd'] = self.orig_install_cmd
@@ -33,17 +33,70 @@ EasyBuild support for installing a bundle of modules, implemented as a generic e
 @author: Jasper Grimm (University of York)
 """
 import copy
+import hashlib
+import inspect
+import json
+import multiprocessing
 import os
+import threading
+import time
 
 import easybuild.tools.environment as env
+from easybuild.easyblocks.easyblocks_index import get_easyblock_class_from_index
+from easybuild.easyblocks.sharedcache import TarballCache
 from easybuild.framework.easyblock import EasyBlock
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.framework.easyconfig.easyconfig import get_easyblock_class
 from easybuild.tools.build_log import EasyBuildError, print_msg
+from easybuild.tools.filetools import compute_checksum, mkdir
 from easybuild.tools.modules import get_software_root, get_software_version
 from easybuild.tools.py2vs3 import string_type
 
 
+# easyconfig parameters that do not affect the installation of a particular component
+COMPONENT_CACHE_IGNORED_PARAMS = ['component_cache', 'components', 'default_component_specs', 'exts_list', 'parallel',
+                                  'parallel_components', 'sanity_check_all_components', 'sanity_check_components',
+                                  'start_dir']
+
+
+def order_exts_by_required_deps(exts, log=None):
+    """
+    Order specified extensions (class instances) for parallel installation, based on their required dependencies:
+    extensions are sorted by their level in the dependency graph (extensions that do not depend on any of
+    the other extensions first), while retaining the original order for extensions at the same level.
+    This maximizes the number of extensions that can be installed concurrently at any point.
+
+    Original order is retained if required dependencies are unknown for any extension, or if cyclic
+    dependencies are found.
+
+    :return: list of ordered extensions
+    """
+    ext_names = set(ext.name for ext in exts)
+    deps = {}
+    for ext in exts:
+        required_deps = ext.required_deps
+        if required_deps is None:
+            if log:
+                log.info("Required dependencies for extension %s are unknown, retaining order of extensions", ext.name)
+            return exts[:]
+        deps[ext.name] = [dep for dep in required_deps if dep in ext_names and dep != ext.name]
+
+    levels = {}
+    todo = [ext.name for ext in exts]
+    while todo:
+        ready = [name for name in todo if all(dep in levels for dep in deps[name])]
+        if not ready:
+            if log:
+                log.info("Cyclic dependencies found between extensions %s, retaining order of extensions", todo)
+            return exts[:]
+        for name in ready:
+            levels[name] = max([levels[dep] + 1 for dep in deps[name]] or [0])
+        todo = [name for name in todo if name not in levels]
+
+    # sorting is stable, so original order is retained for extensions at the same level
+    return sorted(exts, key=lambda ext: levels[ext.name])
+
+
 class Bundle(EasyBlock):
     """
     Bundle of modules: only generate module files, nothing to build/install
@@ -62,6 +115,14 @@ class Bundle(EasyBlock):
             'sanity_check_components': [[], "List of components for which to run sanity checks", CUSTOM],
             'sanity_check_all_components': [False, "Enable sanity checks for all components", CUSTOM],
             'default_easyblock': [None, "Default easyblock to use for components", CUSTOM],
+            'parallel_components': [1, "Maximum number of components to build concurrently, each in a separate "
+                                       "process with its own build directory and environment; dependencies between "
+                                       "components can be specified via 'depends_on' in the component specs "
+                                       "(if not specified, a component depends on all components listed before it)",
+                                    CUSTOM],
+            'component_cache': [None, "Path to cache of installed files of components, used to restore unchanged "
+                                      "components rather than rebuilding them when the bundle is reinstalled "
+                                      "(default: $EB_BUNDLE_COMPONENT_CACHE, if defined)", CUSTOM],
         })
         return EasyBlock.extra_options(extra_vars)
 
@@ -74,6 +135,9 @@ class Bundle(EasyBlock):
         # list of EasyConfig instances for components
         self.comp_cfgs = []
 
+        # list of names of components that each component depends on (None if not specified)
+        self.comp_deps = []
+
         # list of EasyConfig instances of components for which to run sanity checks
         self.comp_cfgs_sanity_check = []
 
@@ -112,7 +176,11 @@ class Bundle(EasyBlock):
         for comp in self.cfg['components']:
             comp_name, comp_version, comp_specs = comp[0], comp[1], {}
             if len(comp) == 3:
-                comp_specs = comp[2]
+                comp_specs = copy.copy(comp[2])
+
+            # dependencies on other components are not an easyconfig parameter, so handle them separately
+            default_depends_on = self.cfg['default_component_specs'].get('depends_on')
+            depends_on = comp_specs.pop('depends_on', default_depends_on)
 
             comp_cfg = self.cfg.copy()
 
@@ -123,12 +191,16 @@ class Bundle(EasyBlock):
             # - if an easyblock is specified explicitely, that will be used
             # - if not, a software-specific easyblock will be considered by get_easyblock_class
             # - if no easyblock was found, default_easyblock is considered
+            # easyblocks are resolved via the index of easyblocks if possible (only imports the relevant module),
+            # get_easyblock_class is used as fallback (for example for easyblocks that are not included in the index)
             comp_easyblock = comp_specs.get('easyblock')
-            easyblock_class = get_easyblock_class(comp_easyblock, name=comp_name, error_on_missing_easyblock=False)
+            easyblock_class = get_easyblock_class_from_index(comp_easyblock, name=comp_name)
+            if easyblock_class is None:
+                easyblock_class = get_easyblock_class(comp_easyblock, name=comp_name, error_on_missing_easyblock=False)
             if easyblock_class is None:
                 if self.cfg['default_easyblock']:
                     easyblock = self.cfg['default_easyblock']
-                    easyblock_class = get_easyblock_class(easyblock)
+                    easyblock_class = get_easyblock_class_from_index(easyblock) or get_easyblock_class(easyblock)
 
                 if easyblock_class is None:
                     raise EasyBuildError("No easyblock found for component %s v%s", comp_name, comp_version)
@@ -156,7 +228,8 @@ class Bundle(EasyBlock):
             comp_cfg['sources'] = comp_cfg['source_urls'] = comp_cfg['checksums'] = comp_cfg['patches'] = []
 
             for key in self.cfg['default_component_specs']:
-                comp_cfg[key] = self.cfg['default_component_specs'][key]
+                if key != 'depends_on':
+                    comp_cfg[key] = self.cfg['default_component_specs'][key]
 
             for key in comp_specs:
                 comp_cfg[key] = comp_specs[key]
@@ -199,6 +272,7 @@ class Bundle(EasyBlock):
                 self.cfg.update('patches', comp_cfg['patches'])
 
             self.comp_cfgs.append(comp_cfg)
+            self.comp_deps.append(depends_on)
 
         self.cfg.update('checksums', checksums_patches)
 
@@ -246,83 +320,309 @@ class Bundle(EasyBlock):
 
     def install_step(self):
         """Install components, if specified."""
-        comp_cnt = len(self.cfg['components'])
-        for idx, cfg in enumerate(self.comp_cfgs):
+        if self.cfg['parallel_components'] > 1 and len(self.comp_cfgs) > 1:
+            self.install_components_concurrently()
+        else:
+            comp_cnt = len(self.cfg['components'])
+            cache = self.component_cache()
+            cache_keys = []
+            for idx, cfg in enumerate(self.comp_cfgs):
 
-            print_msg("installing bundle component %s v%s (%d/%d)..." %
-                      (cfg['name'], cfg['version'], idx + 1, comp_cnt))
-            self.log.info("Installing component %s v%s using easyblock %s", cfg['name'], cfg['version'], cfg.easyblock)
+                print_msg("installing bundle component %s v%s (%d/%d)..." %
+                          (cfg['name'], cfg['version'], idx + 1, comp_cnt))
 
-            comp = cfg.easyblock(cfg)
+                comp = self.prepare_component(cfg)
 
-            # correct build/install dirs
-            comp.builddir = self.builddir
-            comp.install_subdir, comp.installdir = self.install_subdir, self.installdir
+                # each component depends on all components installed before it
+                cache_key = None
+                if cache:
+                    cache_key = self.component_cache_key(comp, cache_keys)
+                    cache_keys.append(cache_key)
 
-            # make sure we can build in parallel
-            comp.set_parallel()
+                self.run_component_steps(comp, cache_key=cache_key)
+                self.update_env_for_component(comp)
 
-            # figure out correct start directory
-            comp.guess_start_dir()
+                # close log for this component
+                comp.close_log()
 
-            # need to run fetch_patches to ensure per-component patches are applied
-            comp.fetch_patches()
+    def prepare_component(self, cfg):
+        """Create easyblock instance for specified component, and prepare it for installation."""
+        self.log.info("Installing component %s v%s using easyblock %s", cfg['name'], cfg['version'], cfg.easyblock)
 
-            comp.src = []
+        comp = cfg.easyblock(cfg)
 
-            # find match entries in self.src for this component
-            for source in comp.cfg['sources']:
-                if isinstance(source, string_type):
-                    comp_src_fn = source
-                elif isinstance(source, dict):
-                    if 'filename' in source:
-                        comp_src_fn = source['filename']
-                    else:
-                        raise EasyBuildError("Encountered source file specified as dict without 'filename': %s", source)
-                else:
-                    raise EasyBuildError("Specification of unknown type for source file: %s", source)
-
-                found = False
-                for src in self.src:
-                    if src['name'] == comp_src_fn:
-                        self.log.info("Found spec for source %s for component %s: %s", comp_src_fn, comp.name, src)
-                        comp.src.append(src)
-                        found = True
-                        break
-                if not found:
-                    raise EasyBuildError("Failed to find spec for source %s for component %s", comp_src_fn, comp.name)
+        # correct build/install dirs
+        comp.builddir = self.builddir
+        comp.install_subdir, comp.installdir = self.install_subdir, self.installdir
 
-                # location of first unpacked source is used to determine where to apply patch(es)
-                comp.src[-1]['finalpath'] = comp.cfg['start_dir']
+        # make sure we can build in parallel
+        comp.set_parallel()
 
-            # check if sanity checks are enabled for the component
-            if self.cfg['sanity_check_all_components'] or comp.cfg['name'] in self.cfg['sanity_check_components']:
-                self.comp_cfgs_sanity_check.append(comp)
+        # figure out correct start directory
+        comp.guess_start_dir()
 
-            # run relevant steps
-            for step_name in ['patch', 'configure', 'build', 'install']:
-                if step_name in cfg['skipsteps']:
-                    comp.log.info("Skipping '%s' step for component %s v%s", step_name, cfg['name'], cfg['version'])
+        # need to run fetch_patches to ensure per-component patches are applied
+        comp.fetch_patches()
+
+        comp.src = []
+
+        # find match entries in self.src for this component
+        for source in comp.cfg['sources']:
+            if isinstance(source, string_type):
+                comp_src_fn = source
+            elif isinstance(source, dict):
+                if 'filename' in source:
+                    comp_src_fn = source['filename']
                 else:
+                    raise EasyBuildError("Encountered source file specified as dict without 'filename': %s", source)
+            else:
+                raise EasyBuildError("Specification of unknown type for source file: %s", source)
+
+            found = False
+            for src in self.src:
+                if src['name'] == comp_src_fn:
+                    self.log.info("Found spec for source %s for component %s: %s", comp_src_fn, comp.name, src)
+                    comp.src.append(src)
+                    found = True
+                    break
+            if not found:
+                raise EasyBuildError("Failed to find spec for source %s for component %s", comp_src_fn, comp.name)
+
+            # location of first unpacked source is used to determine where to apply patch(es)
+            comp.src[-1]['finalpath'] = comp.cfg['start_dir']
+
+        # check if sanity checks are enabled for the component
+        if self.cfg['sanity_check_all_components'] or comp.cfg['name'] in self.cfg['sanity_check_components']:
+            self.comp_cfgs_sanity_check.append(comp)
+
+        return comp
+
+    def run_component_steps(self, comp, install_lock=None, cache_key=None):
+        """
+        Run relevant steps for specified component, or restore it from the cache of components.
+
+        :param install_lock: lock to acquire for making changes to the installation directory (if any)
+        :param cache_key: key for component in cache of components (if any)
+        """
+        if install_lock is None:
+            install_lock = threading.Lock()
+
+        cfg = comp.cfg
+
+        cache = None
+        if cache_key:
+            cache = self.component_cache()
+            with install_lock:
+                restored = cache.restore(cache_key, self.installdir)
+            if restored:
+                print_msg("restored bundle component %s v%s from cache" % (cfg['name'], cfg['version']), log=self.log)
+                return
+
+        for step_name in ['patch', 'configure', 'build', 'install']:
+            if step_name in cfg['skipsteps']:
+                comp.log.info("Skipping '%s' step for component %s v%s", step_name, cfg['name'], cfg['version'])
+            elif step_name == 'install':
+                with install_lock:
+                    if cache:
+                        installed_files = cache.snapshot(self.installdir)
                     comp.run_step(step_name, [lambda x: getattr(x, '%s_step' % step_name)])
+                    # record files installed by this component, so it can be restored later
+                    if cache:
+                        cache.add(cache_key, self.installdir, installed_files)
+            else:
+                comp.run_step(step_name, [lambda x: getattr(x, '%s_step' % step_name)])
 
-            # update environment to ensure stuff provided by former components can be picked up by latter components
-            # once the installation is finalised, this is handled by the generated module
-            reqs = comp.make_module_req_guess()
-            for envvar in reqs:
-                curr_val = os.getenv(envvar, '')
-                curr_paths = curr_val.split(os.pathsep)
-                for subdir in reqs[envvar]:
-                    path = os.path.join(self.installdir, subdir)
-                    if path not in curr_paths:
-                        if curr_val:
-                            new_val = '%s:%s' % (path, curr_val)
-                        else:
-                            new_val = path
-                        env.setvar(envvar, new_val)
+    def component_cache(self):
+        """
+        Return cache of installed components to use, if any.
+        """
+        cache = None
+        path = self.cfg['component_cache'] or os.getenv('EB_BUNDLE_COMPONENT_CACHE')
+        if path:
+            self.log.info("Using cache of bundle components at %s", path)
+            cache = ComponentCache(path)
+        return cache
+
+    def component_cache_key(self, comp, dep_keys):
+        """
+        Determine key for specified component in cache of components, based on everything that determines
+        the installation of the component: the (resolved) easyconfig parameters for the component,
+        checksums of sources and patches, the easyblock being used, the toolchain, the installation directory,
+        and the keys of the components it depends on.
+
+        :return: SHA256 checksum
+        """
+        comp_cfg = comp.cfg.asdict()
+        for key in COMPONENT_CACHE_IGNORED_PARAMS:
+            comp_cfg.pop(key, None)
+
+        easyblock_path = inspect.getsourcefile(comp.__class__)
+        key_items = [
+            comp_cfg,
+            [compute_checksum(src['path'], checksum_type='sha256') for src in comp.src],
+            [compute_checksum(patch['path'], checksum_type='sha256') for patch in comp.patches],
+            [comp.__class__.__name__, compute_checksum(easyblock_path, checksum_type='sha256')],
+            [comp.toolchain.name, comp.toolchain.version],
+            self.installdir,
+            dep_keys,
+        ]
+        key_txt = json.dumps(key_items, sort_keys=True, default=str)
+        key = hashlib.sha256(key_txt.encode('utf-8')).hexdigest()
+        self.log.info("Key for component %s v%s in cache of components: %s", comp.name, comp.version, key)
+        return key
+
+    def update_env_for_component(self, comp):
+        """
+        Update environment to ensure stuff provided by specified component can be picked up by other components;
+        once the installation is finalised, this is handled by the generated module
+        """
+        reqs = comp.make_module_req_guess()
+        for envvar in reqs:
+            curr_val = os.getenv(envvar, '')
+            curr_paths = curr_val.split(os.pathsep)
+            for subdir in reqs[envvar]:
+                path = os.path.join(self.installdir, subdir)
+                if path not in curr_paths:
+                    if curr_val:
+                        new_val = '%s:%s' % (path, curr_val)
+                    else:
+                        new_val = path
+                    env.setvar(envvar, new_val)
 
-            # close log for this component
-            comp.close_log()
+    def det_component_deps(self):
+        """
+        Determine dependencies between components: list with set of indices of components that each component
+        depends on (based on 'depends_on' in component specs, or all preceding components if not specified)
+        """
+        comp_deps = []
+        for idx, (cfg, depends_on) in enumerate(zip(self.comp_cfgs, self.comp_deps)):
+            if depends_on is None:
+                deps = set(range(idx))
+            else:
+                if isinstance(depends_on, string_type):
+                    depends_on = [depends_on]
+                deps = set()
+                for dep_name in depends_on:
+                    dep_idxs = [i for (i, c) in enumerate(self.comp_cfgs) if c['name'] == dep_name and i != idx]
+                    if not dep_idxs:
+                        raise EasyBuildError("Unknown component '%s' listed in depends_on for component %s",
+                                             dep_name, cfg['name'])
+                    deps.update(dep_idxs)
+            comp_deps.append(deps)
+
+        # check for cyclic dependencies
+        done = set()
+        while len(done) < len(comp_deps):
+            ready = [idx for idx, deps in enumerate(comp_deps) if idx not in done and deps.issubset(done)]
+            if not ready:
+                names = [self.comp_cfgs[idx]['name'] for idx in range(len(comp_deps)) if idx not in done]
+                raise EasyBuildError("Cyclic dependencies found between components: %s", ', '.join(names))
+            done.update(ready)
+
+        self.log.info("Dependencies between components: %s", comp_deps)
+        return comp_deps
+
+    def install_components_concurrently(self):
+        """
+        Install components concurrently, taking into account dependencies between components.
+
+        Each component is built in a separate (forked) process, with its own build directory and environment,
+        while install steps are serialised.
+        """
+        max_comps = self.cfg['parallel_components']
+        comp_deps = self.det_component_deps()
+        comp_cnt = len(self.comp_cfgs)
+        cache = self.component_cache()
+        cache_keys = {}
+
+        # spread build jobs across components being built concurrently
+        parallel = max(1, (self.cfg['parallel'] or 1) // max_comps)
+
+        # processes are forked, so component easyblock instances don't need to be pickled
+        if hasattr(multiprocessing, 'get_context'):
+            mp_ctx = multiprocessing.get_context('fork')
+        else:
+            mp_ctx = multiprocessing
+        install_lock = mp_ctx.Lock()
+
+        def run_component(comp, cache_key, conn):
+            """Run steps for component, report result via specified connection."""
+            try:
+                self.run_component_steps(comp, install_lock=install_lock, cache_key=cache_key)
+                comp.close_log()
+                conn.send(None)
+            except Exception as err:
+                conn.send(getattr(err, 'msg', None) or "%s" % err)
+            conn.close()
+
+        done, failed = set(), []
+        running = {}
+        start_cnt = 0
+        while len(done) + len(failed) < comp_cnt:
+            # start as many components as possible, for which all dependencies are installed
+            if not failed:
+                for idx, cfg in enumerate(self.comp_cfgs):
+                    if len(running) >= max_comps:
+                        break
+                    if idx in done or idx in running or not comp_deps[idx].issubset(done):
+                        continue
+
+                    start_cnt += 1
+                    print_msg("installing bundle component %s v%s (%d/%d)..." %
+                              (cfg['name'], cfg['version'], start_cnt, comp_cnt))
+                    comp = self.prepare_component(cfg)
+                    comp.cfg['parallel'] = parallel
+                    # use separate build directory for each component (sources are already unpacked)
+                    comp.builddir = os.path.join(self.builddir, 'easybuild_component_%d' % idx)
+                    mkdir(comp.builddir)
+
+                    cache_key = None
+                    if cache:
+                        cache_key = self.component_cache_key(comp, [cache_keys[dep] for dep in sorted(comp_deps[idx])])
+                        cache_keys[idx] = cache_key
+
+                    recv_conn, send_conn = mp_ctx.Pipe(duplex=False)
+                    proc = mp_ctx.Process(target=run_component, args=(comp, cache_key, send_conn))
+                    proc.start()
+                    send_conn.close()
+                    running[idx] = (comp, proc, recv_conn, [])
+                    self.log.info("Started process %s for component %s v%s", proc.pid, cfg['name'], cfg['version'])
+
+            if not running:
+                break
+
+            time.sleep(0.1)
+
+            for idx, (comp, proc, recv_conn, result) in list(running.items()):
+                if not result and recv_conn.poll():
+                    try:
+                        result.append(recv_conn.recv())
+                    except EOFError:
+                        result.append("no result reported")
+                if result or not proc.is_alive():
+                    proc.join()
+                    del running[idx]
+                    if not result:
+                        result.append("process exited with exit code %s" % proc.exitcode)
+                    cfg = self.comp_cfgs[idx]
+                    if result[0] is None and proc.exitcode == 0:
+                        self.log.info("Installation of component %s v%s completed", cfg['name'], cfg['version'])
+                        self.update_env_for_component(comp)
+                        done.add(idx)
+                    else:
+                        failed.append("%s v%s: %s" % (cfg['name'], cfg['version'], result[0]))
+
+        # wait for components that are still being installed (only relevant when an installation failed)
+        for _, proc, _, _ in running.values():
+            proc.join()
+
+        if failed:
+            raise EasyBuildError("Installation of %d bundle component(s) failed:\n%s", len(failed), '\n'.join(failed))
+
+    def install_extensions_parallel(self, *args, **kwargs):
+        """Install extensions in parallel, in order of their level in the graph of required dependencies."""
+        self.ext_instances = order_exts_by_required_deps(self.ext_instances, log=self.log)
+        super(Bundle, self).install_extensions_parallel(*args, **kwargs)
 
     def make_module_extra(self, *args, **kwargs):
         """Set extra stuff in module file, e.g. $EBROOT*, $EBVERSION*, etc."""
@@ -356,3 +656,36 @@ class Bundle(EasyBlock):
             self.log.info("Starting sanity check step for component %s v%s", comp_name, comp_ver)
 
             comp.run_step('sanity_check', [lambda x: x.sanity_check_step])
+
+
+class ComponentCache(TarballCache):
+    """
+    Cache of files installed by components of bundles, that is shared across installations.
+
+    Each entry is a tarball with the files that were installed (or changed) by a particular component,
+    named after the key for the component (see Bundle.component_cache_key).
+    """
+
+    @staticmethod
+    def snapshot(prefix):
+        """
+        Take snapshot of specified installation prefix: dict with relative paths of all files and directories
+        as keys, and metadata that changes when the file is changed as value.
+        """
+        res = {}
+        for dirpath, dirnames, filenames in os.walk(prefix):
+            for name in dirnames + filenames:
+                path = os.path.join(dirpath, name)
+                st = os.lstat(path)
+                res[os.path.relpath(path, prefix)] = (st.st_mode, st.st_size, st.st_mtime, st.st_ino)
+        return res
+
+    def add(self, key, prefix, snapshot):
+        """
+        Add files that were installed in specified prefix since specified snapshot was taken to cache,
+        using specified key.
+        """
+        new_snapshot = self.snapshot(prefix)
+        paths = sorted(path for path, info in new_snapshot.items() if snapshot.get(path) != info)
+        self.log.info("Adding %d files/directories to cache of bundle components using key %s", len(paths), key)
+        self.add_files(key, prefix, paths, recursive=False)
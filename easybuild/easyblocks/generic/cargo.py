@@ -29,18 +29,29 @@ EasyBuild support for installing Cargo packages (Rust lang package system)
 @author: Alex Domingo (Vrije Universiteit Brussel)
 """
 
+import contextlib
+import fcntl
+import hashlib
+import json
 import os
 import re
+import shutil
+import stat
+import tarfile
+import time
+from multiprocessing.pool import ThreadPool
 
 import easybuild.tools.environment as env
 import easybuild.tools.systemtools as systemtools
 from easybuild.tools.build_log import EasyBuildError, print_warning
+from easybuild.easyblocks.sharedcache import SHARED_CACHE_TMP_PREFIX, SharedCache
+from easybuild.easyblocks.sharedcache import safe_tar_members, tar_extract_kwargs
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.framework.extensioneasyblock import ExtensionEasyBlock
 from easybuild.tools.filetools import extract_file, change_dir
 from easybuild.tools.run import run_cmd
 from easybuild.tools.config import build_option
-from easybuild.tools.filetools import compute_checksum, mkdir, write_file
+from easybuild.tools.filetools import compute_checksum, mkdir, read_file, remove_dir, write_file
 from easybuild.tools.toolchain.compiler import OPTARCH_GENERIC
 
 CRATESIO_SOURCE = "https://crates.io/api/v1/crates"
@@ -63,6 +74,16 @@ CONFIG_TOML_PATCH_GIT_CRATES = """{0} = {{ path = "{1}" }}
 
 CARGO_CHECKSUM_JSON = '{{"files": {{}}, "package": "{chksum}"}}'
 
+# size of chunks to read when computing checksum of remainder of crate tarball after unpacking it
+CRATE_READ_CHUNK_SIZE = 1024 * 1024
+
+# default maximum size of store of unpacked crates (in MiB), see CratesStore
+CRATES_STORE_DEFAULT_MAX_SIZE = 10240
+CRATES_STORE_LOCK = '.lock'
+CRATES_STORE_METADATA = '.eb-crate.json'
+# maximum age (in seconds) of temporary directories in store of unpacked crates, before they're cleaned up
+CRATES_STORE_TMP_MAX_AGE = 24 * 3600
+
 
 class Cargo(ExtensionEasyBlock):
     """Support for installing Cargo packages (Rust)"""
@@ -76,6 +97,12 @@ class Cargo(ExtensionEasyBlock):
             'offline': [True, "Build offline", CUSTOM],
             'lto': [None, "Override default LTO flag ('fat', 'thin', 'off')", CUSTOM],
             'crates': [[], "List of (crate, version, [repo, rev]) tuples to use", CUSTOM],
+            'crates_store': [None, "Path to persistent store of unpacked crates that is shared across installations, "
+                                   "only used when building offline (default: $EB_CARGO_CRATES_STORE, if defined)",
+                             CUSTOM],
+            'crates_store_max_size': [None, "Maximum size of store of unpacked crates, in MiB (default: "
+                                            "$EB_CARGO_CRATES_STORE_MAX_SIZE, or %d)" % CRATES_STORE_DEFAULT_MAX_SIZE,
+                                      CUSTOM],
         })
 
         return extra_vars
@@ -170,7 +197,17 @@ class Cargo(ExtensionEasyBlock):
         vendor_crates = {self.crate_src_filename(*crate): crate for crate in self.crates}
         git_sources = {crate[2]: [] for crate in self.crates if len(crate) == 4}
 
+        # crate tarballs are unpacked concurrently, other sources are unpacked via extract_file
+        # (only possible if no custom command or options to unpack sources are used)
+        crate_srcs, other_srcs = [], []
         for src in self.src:
+            if src['name'] in vendor_crates and not (src['cmd'] or self.cfg['unpack_options'] or self.dry_run):
+                crate_srcs.append(src)
+            else:
+                other_srcs.append(src)
+
+        crate_dirs = {}
+        for src in other_srcs:
             extraction_dir = self.builddir
             # Extract dependency crates into vendor subdirectory, separate from sources of main package
             if src['name'] in vendor_crates:
@@ -195,7 +232,7 @@ class Cargo(ExtensionEasyBlock):
             # this is currently in a grey area, might still be used by cargo
 
             change_dir(src_dir)
-            self.src[self.src.index(src)]['finalpath'] = src_dir
+            src['finalpath'] = src_dir
 
             if self.cfg['offline'] and crate_dir:
                 # Create checksum file for extracted sources required by vendored crates.io sources
@@ -203,33 +240,127 @@ class Cargo(ExtensionEasyBlock):
                 chksum = compute_checksum(src['path'], checksum_type='sha256')
                 chkfile = os.path.join(extraction_dir, crate_dir, '.cargo-checksum.json')
                 write_file(chkfile, CARGO_CHECKSUM_JSON.format(chksum=chksum))
-                # Add path to extracted sources for any crate from a git repo
+                crate_dirs[src['name']] = src_dir
+
+        if crate_srcs:
+            self.extract_crates(crate_srcs, crate_dirs)
+
+        if self.cfg['offline']:
+            # Add path to extracted sources for any crate from a git repo
+            for src in self.src:
                 try:
                     crate_name, _, crate_repo, _ = vendor_crates[src['name']]
                 except (ValueError, KeyError):
                     pass
                 else:
-                    self.log.debug("Sources of %s belong to git repo: %s", src['name'], crate_repo)
-                    git_src_dir = (crate_name, src_dir)
-                    git_sources[crate_repo].append(git_src_dir)
+                    if src['name'] in crate_dirs:
+                        self.log.debug("Sources of %s belong to git repo: %s", src['name'], crate_repo)
+                        git_sources[crate_repo].append((crate_name, crate_dirs[src['name']]))
 
-        if self.cfg['offline']:
             self.log.info("Setting vendored crates dir for offline operation")
-            config_toml = os.path.join(self.cargo_home, 'config.toml')
             # Replace crates-io with vendored sources using build dir wide toml file in CARGO_HOME
             # because the rust source subdirectories might differ with python packages
             self.log.debug("Writting config.toml entry for vendored crates from crate.io")
-            write_file(config_toml, CONFIG_TOML_SOURCE_VENDOR.format(vendor_dir=self.vendor_dir), append=True)
+            config_toml_txt = CONFIG_TOML_SOURCE_VENDOR.format(vendor_dir=self.vendor_dir)
 
             # also vendor sources from other git sources (could be many crates for one git source)
             for git_repo, repo_crates in git_sources.items():
                 self.log.debug("Writting config.toml entry for git repo: %s", git_repo)
                 config_crates = ''.join([CONFIG_TOML_PATCH_GIT_CRATES.format(*crate) for crate in repo_crates])
-                write_file(config_toml, CONFIG_TOML_PATCH_GIT.format(repo=git_repo, crates=config_crates), append=True)
+                config_toml_txt += CONFIG_TOML_PATCH_GIT.format(repo=git_repo, crates=config_crates)
+
+            write_file(os.path.join(self.cargo_home, 'config.toml'), config_toml_txt, append=True)
 
             # Use environment variable since it would also be passed along to builds triggered via python packages
             env.setvar('CARGO_NET_OFFLINE', 'true')
 
+    def extract_crates(self, crate_srcs, crate_dirs):
+        """
+        Concurrently unpack specified crate tarballs into vendor directory,
+        and create .cargo-checksum.json file in unpacked crate if offline.
+
+        :param crate_srcs: list of sources for crates to unpack
+        :param crate_dirs: dict to update with path to unpacked crate for each source, if checksum file was created
+        """
+        offline = self.cfg['offline']
+        store = self.crates_store()
+        vendor_crates = {self.crate_src_filename(*crate): crate for crate in self.crates}
+
+        def extract(src):
+            try:
+                if store:
+                    name, version = vendor_crates[src['name']][:2]
+                    try:
+                        return store.unpack(src['path'], name, version, self.vendor_dir)
+                    except (IOError, OSError) as err:
+                        self.log.warning("Failed to use store of unpacked crates for %s: %s", src['name'], err)
+
+                return extract_crate(src['path'], self.vendor_dir, compute_chksum=offline)
+            except EasyBuildError as err:
+                return err
+
+        nproc = max(1, min(self.cfg['parallel'] or 1, len(crate_srcs)))
+        self.log.info("Unpacking %d crates using %d threads", len(crate_srcs), nproc)
+
+        pool = ThreadPool(nproc)
+        try:
+            results = pool.map(extract, crate_srcs)
+        finally:
+            pool.close()
+            pool.join()
+
+        if store:
+            store.evict()
+
+        seen_dirs = set()
+        for src, res in zip(crate_srcs, results):
+            if isinstance(res, EasyBuildError):
+                raise EasyBuildError("Unpacking sources of '%s' failed: %s", src['name'], res.msg)
+
+            top_dirs, chksum = res
+            # sources of different crates must not be unpacked into the same directory
+            if not top_dirs or any(x in seen_dirs for x in top_dirs):
+                raise EasyBuildError("Unpacking sources of '%s' failed", src['name'])
+            seen_dirs.update(top_dirs)
+
+            if len(top_dirs) == 1:
+                # Expected crate tarball with 1 folder
+                src['finalpath'] = os.path.join(self.vendor_dir, top_dirs[0])
+                self.log.debug("Unpacked sources of %s into: %s", src['name'], src['finalpath'])
+
+                if offline:
+                    # Create checksum file for extracted sources required by vendored crates.io sources
+                    chkfile = os.path.join(src['finalpath'], '.cargo-checksum.json')
+                    # don't write to file that may be hard linked to store of unpacked crates
+                    if os.path.exists(chkfile):
+                        os.remove(chkfile)
+                    write_file(chkfile, CARGO_CHECKSUM_JSON.format(chksum=chksum))
+                    crate_dirs[src['name']] = src['finalpath']
+            else:
+                # TODO: properly handle case with multiple extracted folders
+                src['finalpath'] = self.vendor_dir
+
+    def crates_store(self):
+        """
+        Return store of unpacked crates to use, if any (only used when building offline).
+        """
+        store = None
+
+        path = self.cfg['crates_store'] or os.getenv('EB_CARGO_CRATES_STORE')
+        if path and self.cfg['offline']:
+            max_size = self.cfg['crates_store_max_size']
+            if max_size is None:
+                max_size = os.getenv('EB_CARGO_CRATES_STORE_MAX_SIZE', CRATES_STORE_DEFAULT_MAX_SIZE)
+            try:
+                max_size = int(max_size) * 1024 * 1024
+            except ValueError:
+                raise EasyBuildError("Invalid maximum size for store of unpacked crates: %s", max_size)
+
+            self.log.info("Using store of unpacked crates at %s (max. size: %d bytes)", path, max_size)
+            store = CratesStore(path, max_size)
+
+        return store
+
     def configure_step(self):
         """Empty configuration step."""
         pass
@@ -288,6 +419,225 @@ class Cargo(ExtensionEasyBlock):
         run_cmd(cmd, log_all=True, simple=True)
 
 
+class ChecksumReader(object):
+    """File-like object that computes checksum of data that is read from wrapped file object."""
+
+    def __init__(self, fileobj, checksum_type='sha256'):
+        """Constructor: wrap specified file object"""
+        self.fileobj = fileobj
+        self.hasher = hashlib.new(checksum_type)
+
+    def read(self, size=-1):
+        """Read data from wrapped file object, and update checksum"""
+        data = self.fileobj.read(size)
+        self.hasher.update(data)
+        return data
+
+    def hexdigest(self):
+        """Return checksum for all data read so far"""
+        return self.hasher.hexdigest()
+
+
+def extract_crate(path, dest, compute_chksum=False):
+    """
+    Unpack crate tarball at specified path into specified directory, in a single pass over the tarball:
+    tarball is unpacked as a stream, while the checksum of the tarball is computed for the data being read.
+
+    Unlike extract_file, this does not change the current working directory, so it can be used concurrently.
+
+    :param path: path to crate tarball
+    :param dest: directory to unpack crate tarball in
+    :param compute_chksum: also compute SHA256 checksum of crate tarball
+    :return: tuple with list of top-level directories in crate tarball, and SHA256 checksum (or None)
+    """
+    top_dirs = []
+
+    # only take into account members of tarball that have a safe path
+    def members(tar):
+        for member in safe_tar_members(tar, path):
+            path_parts = [x for x in os.path.normpath(member.name).split(os.path.sep) if x != '.']
+            if path_parts and path_parts[0] not in top_dirs and (member.isdir() or len(path_parts) > 1):
+                top_dirs.append(path_parts[0])
+            yield member
+
+    with open(path, 'rb') as fh:
+        reader = ChecksumReader(fh)
+        try:
+            with tarfile.open(fileobj=reader, mode='r|*') as tar:
+                tar.extractall(dest, members=members(tar), **tar_extract_kwargs())
+        except (IOError, OSError, tarfile.TarError) as err:
+            raise EasyBuildError("Failed to unpack %s into %s: %s", path, dest, err)
+
+        chksum = None
+        if compute_chksum:
+            # also consider trailing data in crate tarball which is not relevant for unpacking it
+            while reader.read(CRATE_READ_CHUNK_SIZE):
+                pass
+            chksum = reader.hexdigest()
+
+    return top_dirs, chksum
+
+
+class CratesStore(SharedCache):
+    """
+    Persistent store of unpacked crates that is shared across installations.
+
+    Entries are keyed by crate name, version and SHA256 checksum of the crate tarball,
+    and are hard linked (or copied if that's not possible) into the vendor directory.
+    Entries that were used least recently are evicted when the size of the store exceeds the specified maximum.
+    A lock file is used to make sure the store can be used by concurrent EasyBuild sessions.
+    """
+
+    def __init__(self, path, max_size):
+        """
+        Constructor for store of unpacked crates.
+
+        :param path: location of store
+        :param max_size: maximum size of store (in bytes)
+        """
+        super(CratesStore, self).__init__(path)
+        self.max_size = max_size
+
+        mkdir(self.path, parents=True)
+
+    @contextlib.contextmanager
+    def lock(self):
+        """Context manager to acquire (exclusive) lock on store."""
+        # each use opens lock file again, so lock also works across threads in same process
+        with open(os.path.join(self.path, CRATES_STORE_LOCK), 'a') as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def link_entry(self, entry, dest):
+        """
+        Link unpacked crate in specified store entry into specified directory (must be called with lock held).
+
+        :return: list of top-level directories of unpacked crate, or None if no (valid) entry is available
+        """
+        try:
+            metadata = json.loads(read_file(os.path.join(entry, CRATES_STORE_METADATA), log_error=False))
+        except (IOError, OSError, TypeError, ValueError):
+            return None
+
+        linked_dirs = []
+        try:
+            for top_dir in metadata['top_dirs']:
+                linked_dirs.append(os.path.join(dest, top_dir))
+                link_tree(os.path.join(entry, top_dir), linked_dirs[-1])
+        except (IOError, OSError):
+            # clean up partial results, files in store must not be overwritten when unpacking crate tarball directly
+            for linked_dir in linked_dirs:
+                if os.path.exists(linked_dir):
+                    remove_dir(linked_dir)
+            raise
+
+        # modification time of entry is used to determine which entries were used least recently
+        self.touch(entry)
+
+        return metadata['top_dirs']
+
+    def unpack(self, path, name, version, dest):
+        """
+        Populate specified directory with unpacked crate from store, after unpacking it into the store if needed.
+
+        :param path: path to crate tarball
+        :param name: crate name
+        :param version: crate version
+        :param dest: directory to populate
+        :return: tuple with list of top-level directories of unpacked crate and SHA256 checksum of crate tarball
+        """
+        chksum = compute_checksum(path, checksum_type='sha256')
+        key = '%s-%s-%s' % (name, version, chksum)
+        entry = self.entry_path(key)
+
+        with self.lock():
+            top_dirs = self.link_entry(entry, dest)
+
+        if top_dirs is None:
+            self.log.debug("No entry for %s found in store of unpacked crates, creating %s", path, entry)
+            tmpdir = self.mk_tmp_entry(is_dir=True)
+            try:
+                top_dirs, _ = extract_crate(path, tmpdir)
+
+                size = 0
+                for dirpath, _, filenames in os.walk(tmpdir):
+                    for filename in filenames:
+                        filepath = os.path.join(dirpath, filename)
+                        size += os.lstat(filepath).st_size
+                        # make sure files in store are not changed via hard links in vendor directory
+                        if not os.path.islink(filepath):
+                            read_only_mode = os.stat(filepath).st_mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH)
+                            os.chmod(filepath, read_only_mode)
+
+                metadata = {'size': size, 'top_dirs': top_dirs}
+                write_file(os.path.join(tmpdir, CRATES_STORE_METADATA), json.dumps(metadata))
+
+                with self.lock():
+                    # entry may have been created in the meantime by another EasyBuild session
+                    top_dirs = self.link_entry(entry, dest)
+                    if top_dirs is None:
+                        if os.path.exists(entry):
+                            remove_dir(entry)
+                        self.commit_entry(tmpdir, key)
+                        top_dirs = self.link_entry(entry, dest)
+            finally:
+                if os.path.exists(tmpdir):
+                    remove_dir(tmpdir)
+
+        if top_dirs is None:
+            raise EasyBuildError("Failed to obtain %s from store of unpacked crates at %s", path, self.path)
+
+        return top_dirs, chksum
+
+    def evict(self):
+        """Evict entries that were used least recently until size of store doesn't exceed maximum size anymore."""
+        with self.lock():
+            entries = []
+            for entry_name in os.listdir(self.path):
+                entry = os.path.join(self.path, entry_name)
+                if entry_name.startswith(SHARED_CACHE_TMP_PREFIX):
+                    # clean up leftovers of crashed EasyBuild sessions
+                    if time.time() - os.stat(entry).st_mtime > CRATES_STORE_TMP_MAX_AGE:
+                        remove_dir(entry)
+                elif os.path.isdir(entry):
+                    try:
+                        metadata_path = os.path.join(entry, CRATES_STORE_METADATA)
+                        size = json.loads(read_file(metadata_path, log_error=False))['size']
+                    except (IOError, OSError, TypeError, ValueError, KeyError):
+                        # entry without valid metadata, so evict it right away
+                        size = self.max_size + 1
+                    entries.append((os.stat(entry).st_mtime, entry, size))
+
+            total_size = 0
+            for _, entry, size in sorted(entries, reverse=True):
+                total_size += size
+                if total_size > self.max_size:
+                    self.log.debug("Evicting %s from store of unpacked crates", entry)
+                    remove_dir(entry)
+
+
+def link_tree(src, dest):
+    """
+    Recreate directory tree at specified source location at specified destination,
+    using hard links to the files in the source directory (or copying them if hard linking is not possible).
+    """
+    mkdir(dest, parents=True)
+    for name in os.listdir(src):
+        src_path, dest_path = os.path.join(src, name), os.path.join(dest, name)
+        if os.path.islink(src_path):
+            os.symlink(os.readlink(src_path), dest_path)
+        elif os.path.isdir(src_path):
+            link_tree(src_path, dest_path)
+        else:
+            try:
+                os.link(src_path, dest_path)
+            except OSError:
+                shutil.copy2(src_path, dest_path)
+
+
 def generate_crate_list(sourcedir):
     """Helper for generating crate list"""
     import toml
@@ -34,6 +34,7 @@ EasyBuild support for software that is configured with CMake, implemented as an
 @author: Maxime Boissonneault (Compute Canada - Universite Laval)
 """
 import glob
+import json
 import re
 import os
 from easybuild.tools import LooseVersion
@@ -52,6 +53,14 @@ from easybuild.tools.utilities import nub
 
 DEFAULT_CONFIGURE_CMD = 'cmake'
 
+# supported compiler launchers, and prefix for environment variables to configure them
+COMPILER_LAUNCHERS = {
+    'ccache': 'CCACHE',
+    'sccache': 'SCCACHE',
+}
+# languages for which compiler launcher is used
+COMPILER_LAUNCHER_LANGS = ['C', 'CXX', 'CUDA']
+
 
 def det_cmake_version():
     """
@@ -73,6 +82,41 @@ def det_cmake_version():
     return cmake_version
 
 
+def det_compiler_launcher_stats(launcher):
+    """
+    Determine cache statistics of specified compiler launcher (ccache or sccache).
+
+    :return: tuple with number of cache hits and cache misses, or None if statistics could not be determined
+    """
+    name = os.path.basename(launcher)
+    if name == 'ccache':
+        # machine-readable statistics are supported since ccache 4.5
+        cmd = "%s --print-stats" % launcher
+    elif name == 'sccache':
+        cmd = "%s --show-stats --stats-format=json" % launcher
+    else:
+        raise EasyBuildError("Unknown compiler launcher: %s", launcher)
+
+    (out, ec) = run_cmd(cmd, simple=False, log_ok=False, log_all=False, trace=False, regexp=False)
+    if ec:
+        return None
+
+    try:
+        if name == 'ccache':
+            stats = dict(line.split('\t', 1) for line in out.splitlines() if '\t' in line)
+            hits = int(stats['direct_cache_hit']) + int(stats['preprocessed_cache_hit'])
+            misses = int(stats['cache_miss'])
+        else:
+            stats = json.loads(out)
+            stats = stats.get('stats', stats)
+            hits = sum(stats['cache_hits']['counts'].values())
+            misses = sum(stats['cache_misses']['counts'].values())
+    except (KeyError, TypeError, ValueError):
+        return None
+
+    return hits, misses
+
+
 def setup_cmake_env(tc):
     """Setup env variables that cmake needs in an EasyBuild context."""
 
@@ -102,6 +146,13 @@ class CMakeMake(ConfigureMake):
                                         "None can be used to add no flag (usually results in static library)", CUSTOM],
             'build_type': [None, "Build type for CMake, e.g. Release."
                                  "Defaults to 'Release' or 'Debug' depending on toolchainopts[debug]", CUSTOM],
+            'compiler_launcher': [None, "Compiler launcher to use for caching compilation results, "
+                                        "via CMAKE_<LANG>_COMPILER_LAUNCHER: %s (or path to it)" %
+                                        ', '.join(sorted(COMPILER_LAUNCHERS)), CUSTOM],
+            'compiler_launcher_cache_dir': [None, "Cache directory to use for compiler launcher "
+                                                  "(default: determined by compiler launcher)", CUSTOM],
+            'compiler_launcher_max_size': [None, "Maximum size of cache of compiler launcher, for example '20G' "
+                                                 "(default: determined by compiler launcher)", CUSTOM],
             'configure_cmd': [DEFAULT_CONFIGURE_CMD, "Configure command to use", CUSTOM],
             'generator': [None, "Build file generator to use. None to use CMakes default", CUSTOM],
             'install_target_subdir': [None, "Subdirectory to use as installation target", CUSTOM],
@@ -117,6 +168,7 @@ class CMakeMake(ConfigureMake):
         self._lib_ext = None
         self._cmake_version = None
         self.separate_build_dir = None
+        self.compiler_launcher = None
 
     @property
     def lib_ext(self):
@@ -160,6 +212,75 @@ class CMakeMake(ConfigureMake):
                             if '-D%s=' % key not in cfg_configopts)
         self.cfg['configopts'] = ' '.join([new_opts, cfg_configopts])
 
+    def setup_compiler_launcher(self):
+        """
+        Set up compiler launcher (ccache or sccache) to use, if any:
+        specify location and maximum size of cache via environment variables.
+
+        :return: dict with CMake options to use compiler launcher
+        """
+        launcher = self.cfg.get('compiler_launcher')
+        if not launcher:
+            return {}
+
+        name = os.path.basename(launcher)
+        if name not in COMPILER_LAUNCHERS:
+            raise EasyBuildError("Unknown compiler launcher '%s', supported are: %s",
+                                 launcher, ', '.join(sorted(COMPILER_LAUNCHERS)))
+
+        self.compiler_launcher = which(launcher)
+        if not self.compiler_launcher:
+            raise EasyBuildError("Compiler launcher '%s' not found", launcher)
+
+        env_prefix = COMPILER_LAUNCHERS[name]
+        cache_dir = self.cfg.get('compiler_launcher_cache_dir')
+        if cache_dir:
+            setvar('%s_DIR' % env_prefix, cache_dir)
+
+        max_size = self.cfg.get('compiler_launcher_max_size')
+        if max_size:
+            if name == 'ccache':
+                setvar('CCACHE_MAXSIZE', str(max_size))
+            else:
+                setvar('SCCACHE_CACHE_SIZE', str(max_size))
+
+        if name == 'ccache':
+            # rewrite absolute paths in build directory to relative paths,
+            # so results can be reused across builds in different locations
+            setvar('CCACHE_BASEDIR', self.builddir)
+
+        self.log.info("Using compiler launcher %s (cache dir: %s, max. size: %s)",
+                      self.compiler_launcher, cache_dir or 'default', max_size or 'default')
+
+        return dict(('CMAKE_%s_COMPILER_LAUNCHER' % lang, self.compiler_launcher) for lang in COMPILER_LAUNCHER_LANGS)
+
+    def compiler_launcher_stats(self):
+        """
+        Determine cache statistics of compiler launcher being used, if any.
+
+        :return: tuple with number of cache hits and cache misses (or None)
+        """
+        stats = None
+        if self.compiler_launcher:
+            stats = det_compiler_launcher_stats(self.compiler_launcher)
+        return stats
+
+    def log_compiler_launcher_stats(self, start_stats, descr):
+        """
+        Log hit rate of cache of compiler launcher, compared to specified statistics.
+
+        :param start_stats: statistics (as returned by compiler_launcher_stats) to compare with
+        :param descr: description of what was being built
+        """
+        stats = self.compiler_launcher_stats()
+        if start_stats and stats:
+            hits, misses = stats[0] - start_stats[0], stats[1] - start_stats[1]
+            if hits + misses > 0:
+                self.log.info("Hit rate of compiler cache for %s: %.1f%% (%d hits, %d misses)",
+                              descr, 100.0 * hits / (hits + misses), hits, misses)
+            else:
+                self.log.info("No compiler cache hits or misses for %s", descr)
+
     def configure_step(self, srcdir=None, builddir=None):
         """Configure build using cmake"""
 
@@ -281,6 +402,8 @@ class CMakeMake(ConfigureMake):
         # show what CMake is doing by default
         options['CMAKE_VERBOSE_MAKEFILE'] = 'ON'
 
+        options.update(self.setup_compiler_launcher())
+
         # disable CMake user package repository
         options['CMAKE_FIND_USE_PACKAGE_REGISTRY'] = 'OFF'
 
@@ -320,6 +443,13 @@ class CMakeMake(ConfigureMake):
 
         return out
 
+    def build_step(self, *args, **kwargs):
+        """Build with CMake-generated build files, log hit rate of compiler cache if a compiler launcher is used."""
+        start_stats = self.compiler_launcher_stats()
+        res = super(CMakeMake, self).build_step(*args, **kwargs)
+        self.log_compiler_launcher_stats(start_stats, self.name)
+        return res
+
     def test_step(self):
         """CMake specific test setup"""
         # When using ctest for tests (default) then show verbose output if a test fails
@@ -53,7 +53,9 @@ class CMakeNinja(CMakeMake, MesonNinja):
 
     def build_step(self, *args, **kwargs):
         """Build using MesonNinja."""
+        start_stats = self.compiler_launcher_stats()
         MesonNinja.build_step(self, *args, **kwargs)
+        self.log_compiler_launcher_stats(start_stats, self.name)
 
     def install_step(self, *args, **kwargs):
         """Install using MesonNinja."""
@@ -35,10 +35,12 @@ i.e. configure/make/make install, implemented as an easyblock.
 @author: Maxime Boissonneault (Compute Canada - Universite Laval)
 @author: Alan O'Cais (Juelich Supercomputing Centre)
 """
+import copy
 import os
 import re
 import stat
 from datetime import datetime
+from multiprocessing.pool import ThreadPool
 
 from easybuild.base import fancylogger
 from easybuild.easyblocks import VERSION as EASYBLOCKS_VERSION
@@ -46,10 +48,11 @@ from easybuild.framework.easyblock import EasyBlock
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools.build_log import print_warning
 from easybuild.tools.config import source_paths, build_option
-from easybuild.tools.filetools import CHECKSUM_TYPE_SHA256, adjust_permissions, compute_checksum, download_file
-from easybuild.tools.filetools import read_file, remove_file
+from easybuild.tools.environment import restore_env
+from easybuild.tools.filetools import CHECKSUM_TYPE_SHA256, adjust_permissions, change_dir, compute_checksum
+from easybuild.tools.filetools import download_file, read_file, remove_file
 from easybuild.tools.py2vs3 import string_type
-from easybuild.tools.run import run_cmd
+from easybuild.tools.run import complete_cmd, run_cmd
 
 # string that indicates that a configure script was generated by Autoconf
 # note: bytes string since this constant is used to check the contents of 'configure' which is read as bytes
@@ -167,6 +170,61 @@ def obtain_config_guess(download_source_path=None, search_source_paths=None):
     return config_guess_path
 
 
+def spread_parallel(parallel, cnt):
+    """
+    Spread specified number of parallel jobs as evenly as possible across specified number of concurrent commands,
+    each command gets at least one job.
+
+    :return: list with number of parallel jobs for each command
+    """
+    parallel = parallel or 1
+    return [max(1, parallel // cnt + (idx < parallel % cnt)) for idx in range(cnt)]
+
+
+def run_cmds_concurrently(cmds_and_dirs, envs=None):
+    """
+    Run specified commands concurrently, each in the specified working directory, and wait until all complete.
+
+    :param cmds_and_dirs: list of (command, working directory) tuples
+    :param envs: list of environments to start commands in (optional, one for each command, None to use current)
+    :return: list of (output, exit code) tuples, in the same order as the commands
+    """
+    log = fancylogger.getLogger('run_cmds_concurrently', fname=False)
+
+    start_dir = os.getcwd()
+    start_env = copy.deepcopy(os.environ) if envs else None
+    async_cmds = []
+    try:
+        for idx, (cmd, path) in enumerate(cmds_and_dirs):
+            # command inherits environment & working directory when it is started
+            if envs and envs[idx] is not None:
+                restore_env(envs[idx])
+            change_dir(path)
+            log.info("Starting command in %s: %s", path, cmd)
+            async_cmds.append(run_cmd(cmd, asynchronous=True))
+    finally:
+        change_dir(start_dir)
+        if start_env is not None:
+            restore_env(start_env)
+
+    def wait_for_cmd(async_cmd):
+        """Wait until command started asynchronously completes, return output and exit code."""
+        (proc, cmd, owd, start_time, cmd_log) = async_cmd
+        return complete_cmd(proc, cmd, owd, start_time, cmd_log, log_ok=False, simple=False)
+
+    # use a thread per command, to make sure that the output of each command is being consumed
+    pool = ThreadPool(max(1, len(async_cmds)))
+    try:
+        res = pool.map(wait_for_cmd, async_cmds)
+    finally:
+        pool.close()
+        pool.join()
+        # completing a command changes back to the working directory it was started from
+        change_dir(start_dir)
+
+    return res
+
+
 class ConfigureMake(EasyBlock):
     """
     Support for building and installing applications with configure/make/make install
@@ -327,28 +385,40 @@ class ConfigureMake(EasyBlock):
 
         return out
 
-    def build_step(self, verbose=False, path=None):
-        """
-        Start the actual build
-        - typical: make -j X
+    def det_build_cmds(self, parallel):
         """
+        Determine build commands to run, one for each build target.
 
+        :param parallel: number of parallel build jobs to use (no '-j' option is used if None or 0)
+        :return: list of (target, command) tuples
+        """
         paracmd = ''
-        if self.cfg['parallel']:
-            paracmd = "-j %s" % self.cfg['parallel']
+        if parallel:
+            paracmd = "-j %s" % parallel
 
         targets = self.cfg.get('build_cmd_targets') or DEFAULT_BUILD_TARGET
         # ensure strings are converted to list
         targets = [targets] if isinstance(targets, string_type) else targets
 
+        build_cmds = []
         for target in targets:
-            cmd = ' '.join([
+            build_cmds.append((target, ' '.join([
                 self.cfg['prebuildopts'],
                 self.cfg.get('build_cmd') or DEFAULT_BUILD_CMD,
                 target,
                 paracmd,
                 self.cfg['buildopts'],
-            ])
+            ])))
+
+        return build_cmds
+
+    def build_step(self, verbose=False, path=None):
+        """
+        Start the actual build
+        - typical: make -j X
+        """
+
+        for target, cmd in self.det_build_cmds(self.cfg['parallel']):
             self.log.info("Building target '%s'", target)
 
             (out, _) = run_cmd(cmd, path=path, log_all=True, simple=False, log_output=verbose)
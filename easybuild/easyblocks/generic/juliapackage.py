@@ -31,6 +31,7 @@ import ast
 import glob
 import os
 import re
+import tempfile
 
 from easybuild.tools import LooseVersion
 
@@ -38,14 +39,67 @@ import easybuild.tools.environment as env
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.framework.extensioneasyblock import ExtensionEasyBlock
 from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.config import IGNORE
 from easybuild.tools.modules import get_software_root, get_software_version
-from easybuild.tools.filetools import copy_dir, mkdir
+from easybuild.tools.filetools import copy_dir, mkdir, remove_file, which, write_file
 from easybuild.tools.run import run_cmd
 from easybuild.tools.utilities import trace_msg
 
 EXTS_FILTER_JULIA_PACKAGES = ("julia -e 'using %(ext_name)s'", "")
 USER_DEPOT_PATTERN = re.compile(r"\/\.julia\/?(.*\.toml)*$")
 
+# Julia environment variables that can be queried, and Julia expression for each of them
+JULIA_ENV_EXPRS = {
+    "DEPOT_PATH": "Base.DEPOT_PATH",
+    "LOAD_PATH": "Base.load_path()",
+}
+# environment variables that affect the values of the Julia environment variables
+JULIA_ENV_DEPS = ['HOME', 'JULIA_DEPOT_PATH', 'JULIA_LOAD_PATH', 'JULIA_PROJECT']
+
+# Julia script to install multiple packages from their sources in a single Julia session
+JULIA_INSTALL_PKGS_SCRIPT = """
+using Pkg
+# precompile only once, after all packages are installed
+ENV["JULIA_PKG_PRECOMPILE_AUTO"] = "0"
+Pkg.activate(%(environment)s)
+
+failed = Tuple{String,String}[]
+
+# try to install all packages in one go, then one at a time to determine which ones failed
+function eb_install(install, srcs, specs)
+    isempty(specs) && return
+    try
+        install(srcs, specs)
+    catch
+        for (src, spec) in zip(srcs, specs)
+            try
+                install([src], [spec])
+            catch err
+                push!(failed, (src, sprint(showerror, err)))
+            end
+        end
+    end
+end
+
+# sources from git repos can be installed as any remote package
+eb_install((srcs, specs) -> Pkg.add(specs; preserve=PRESERVE_ALL), String[%(add_srcs)s], PackageSpec[%(add_specs)s])
+
+# plain sources have to be installed in develop mode
+function eb_develop(srcs, specs)
+    Pkg.develop(specs; preserve=PRESERVE_ALL)
+    Pkg.build(String[basename(src) for src in srcs])
+end
+eb_install(eb_develop, String[%(dev_srcs)s], PackageSpec[%(dev_specs)s])
+
+for (src, msg) in failed
+    println("%(failed_marker)s", src, ": ", replace(msg, "\\n" => " "))
+end
+isempty(failed) || exit(1)
+
+Pkg.precompile()
+"""
+JULIA_PKG_FAILED_MARKER = "EB_JULIA_PKG_FAILED: "
+
 JULIA_PATHS_SOFT_INIT = {
     "Lua": """
 if ( mode() == "load" ) then
@@ -61,6 +115,46 @@ if { [ module-info mode load ] } {
 """,
 }
 
+_julia_env_cache = {}
+
+
+def julia_str(value):
+    """
+    Return Julia string literal for specified value.
+    """
+    for char in ('\\', '"', '$'):
+        value = value.replace(char, '\\' + char)
+    return '"%s"' % value
+
+
+def det_julia_env():
+    """
+    Determine all supported Julia environment variables (see JULIA_ENV_EXPRS) in a single Julia session;
+    result is cached for the active julia command and the environment variables that affect it.
+    """
+    cache_key = tuple([which('julia', log_ok=False, on_error=IGNORE)] + [os.getenv(x) for x in JULIA_ENV_DEPS])
+
+    if cache_key not in _julia_env_cache:
+        env_vars = sorted(JULIA_ENV_EXPRS)
+        julia_expr = '; '.join("println(repr(%s))" % JULIA_ENV_EXPRS[x] for x in env_vars)
+        out, _ = run_cmd("julia -e '%s'" % julia_expr, log_all=True, simple=False, trace=False)
+
+        # only consider last lines of output, there may be warnings printed first
+        lines = [line for line in out.splitlines() if line.strip()][-len(env_vars):]
+        if len(lines) != len(env_vars):
+            raise EasyBuildError("Failed to parse %s from julia shell: %s", ', '.join(env_vars), out)
+
+        julia_env = {}
+        for env_var, line in zip(env_vars, lines):
+            try:
+                julia_env[env_var] = ast.literal_eval(line.replace('String[]', '[]'))
+            except (SyntaxError, ValueError):
+                raise EasyBuildError("Failed to parse %s from julia shell: %s", env_var, out)
+
+        _julia_env_cache[cache_key] = julia_env
+
+    return _julia_env_cache[cache_key]
+
 
 class JuliaPackage(ExtensionEasyBlock):
     """
@@ -101,22 +195,10 @@ class JuliaPackage(ExtensionEasyBlock):
         Query environment variable to julia shell and parse it
         :param env_var: string with name of environment variable
         """
-        julia_read_cmd = {
-            "DEPOT_PATH": "julia -E 'Base.DEPOT_PATH'",
-            "LOAD_PATH": "julia -E 'Base.load_path()'",
-        }
-
-        try:
-            out, _ = run_cmd(julia_read_cmd[env_var], log_all=True, simple=False, trace=False)
-        except KeyError:
+        if env_var not in JULIA_ENV_EXPRS:
             raise EasyBuildError("Unknown Julia environment variable requested: %s", env_var)
 
-        try:
-            parsed_var = ast.literal_eval(out)
-        except SyntaxError:
-            raise EasyBuildError("Failed to parse %s from julia shell: %s", env_var, out)
-
-        return parsed_var
+        return det_julia_env()[env_var]
 
     def julia_env_path(self, absolute=True, base=True):
         """
@@ -231,17 +313,66 @@ class JuliaPackage(ExtensionEasyBlock):
 
         return out
 
+    def install_pkg_sources(self, pkg_sources, environment, trace=True):
+        """
+        Install Julia packages from their sources in a single Julia session:
+        environment is activated once, all packages are added together, and precompilation is done once at the end.
+        """
+        add_srcs, dev_srcs = [], []
+        for pkg_source in pkg_sources:
+            if os.path.isdir(os.path.join(pkg_source, '.git')):
+                add_srcs.append(pkg_source)
+            else:
+                dev_srcs.append(pkg_source)
+
+        self.log.debug("Installing Julia packages in normal mode (Pkg.add): %s", add_srcs)
+        self.log.debug("Installing Julia packages in develop mode (Pkg.develop): %s", dev_srcs)
+
+        script = JULIA_INSTALL_PKGS_SCRIPT % {
+            'environment': julia_str(environment),
+            'add_srcs': ', '.join(julia_str(x) for x in add_srcs),
+            'add_specs': ', '.join('PackageSpec(url=%s)' % julia_str(x) for x in add_srcs),
+            'dev_srcs': ', '.join(julia_str(x) for x in dev_srcs),
+            'dev_specs': ', '.join('PackageSpec(path=%s)' % julia_str(x) for x in dev_srcs),
+            'failed_marker': JULIA_PKG_FAILED_MARKER,
+        }
+        fd, script_path = tempfile.mkstemp(prefix='eb-julia-install-pkgs-', suffix='.jl')
+        os.close(fd)
+        write_file(script_path, script)
+
+        cmd = ' '.join([
+            self.cfg['preinstallopts'],
+            "julia %s" % script_path,
+            self.cfg['installopts'],
+        ])
+        (out, ec) = run_cmd(cmd, log_all=False, log_ok=False, simple=False, trace=trace)
+        remove_file(script_path)
+
+        failed = [line[len(JULIA_PKG_FAILED_MARKER):] for line in out.splitlines()
+                  if line.startswith(JULIA_PKG_FAILED_MARKER)]
+        if failed:
+            raise EasyBuildError("Failed to install %d out of %d Julia packages:\n%s",
+                                 len(failed), len(pkg_sources), '\n'.join(failed))
+        elif ec:
+            raise EasyBuildError("Installing Julia packages failed (exit code %s): %s", ec, out)
+
+        return out
+
     def include_pkg_dependencies(self):
         """Add to installation environment all Julia packages already present in its dependencies"""
         # Location of project environment files in install dir
         mkdir(self.julia_env_path(), parents=True)
 
         # add packages found in dependencies to this installation environment
+        pkgs = []
         for dep in self.cfg.dependencies():
             dep_root = get_software_root(dep['name'])
-            for pkg in glob.glob(os.path.join(dep_root, 'packages/*')):
+            for pkg in sorted(glob.glob(os.path.join(dep_root, 'packages/*'))):
                 trace_msg("incorporating Julia package from dependencies: %s" % os.path.basename(pkg))
-                self.install_pkg_source(pkg, self.julia_env_path(), trace=False)
+                pkgs.append(pkg)
+
+        if pkgs:
+            self.install_pkg_sources(pkgs, self.julia_env_path(), trace=False)
 
     def install_pkg(self):
         """Install Julia package"""
@@ -28,13 +28,18 @@ EasyBuild support for installing a bundle of Python packages, implemented as a g
 @author: Kenneth Hoste (Ghent University)
 """
 import os
+import re
 import sys
 
 from easybuild.easyblocks.generic.bundle import Bundle
 from easybuild.easyblocks.generic.pythonpackage import EBPYTHONPREFIXES, EXTS_FILTER_PYTHON_PACKAGES
-from easybuild.easyblocks.generic.pythonpackage import PythonPackage, get_pylibdirs, pick_python_cmd
+from easybuild.easyblocks.generic.pythonpackage import PythonPackage, check_python_imports, get_pylibdirs
+from easybuild.easyblocks.generic.pythonpackage import pick_python_cmd
+from easybuild.framework.easyconfig import CUSTOM
+from easybuild.framework.extension import resolve_exts_filter_template
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.filetools import which
+from easybuild.tools.filetools import change_dir, which
+from easybuild.tools.utilities import nub
 from easybuild.tools.modules import get_software_root
 import easybuild.tools.environment as env
 
@@ -50,6 +55,10 @@ class PythonBundle(Bundle):
         """Easyconfig parameters specific to bundles of Python packages."""
         if extra_vars is None:
             extra_vars = {}
+        extra_vars.update({
+            'sanity_check_batched_imports': [True, "Check imports of all Python packages installed as extensions "
+                                                   "in a single Python session during sanity check", CUSTOM],
+        })
         # combine custom easyconfig parameters of Bundle & PythonPackage
         extra_vars = Bundle.extra_options(extra_vars)
         return PythonPackage.extra_options(extra_vars)
@@ -182,6 +191,51 @@ class PythonBundle(Bundle):
         # because the environment is reset to the initial environment right before loading the module
         env.setvar('PYTHONNOUSERSITE', '1', verbose=False)
 
+    def check_exts_imports(self):
+        """
+        Check imports of all Python packages installed as extensions in a single Python session,
+        rather than running a separate 'python' command for each of them via the extensions filter.
+        """
+        # only possible when standard extensions filter is used
+        exts_filter = self.cfg.get_ref('exts_filter')
+        exts_filter_regex = re.compile(r'^(?P<python_cmd>\S+) -c "import %\(ext_name\)s"$')
+        res = exts_filter_regex.match(exts_filter[0]) if exts_filter and not exts_filter[1] else None
+        if res is None:
+            self.log.info("Not checking imports of extensions together, non-standard extensions filter: %s",
+                          exts_filter)
+            return
+
+        exts = [ext for ext in self.ext_instances if isinstance(ext, PythonPackage) and
+                ext.cfg.get_ref('exts_filter') == exts_filter and ext.options.get('modulename') is not False]
+        modnames = nub(ext.options['modulename'] for ext in exts)
+        if not modnames:
+            return
+
+        # run check from installation directory, like is done for extensions filter
+        cwd = change_dir(self.installdir)
+        results = check_python_imports(res.group('python_cmd'), modnames)
+        change_dir(cwd)
+
+        if results is None:
+            self.log.info("Checking imports of extensions together failed, checking them one by one instead")
+        else:
+            for ext in exts:
+                cmd, _ = resolve_exts_filter_template(exts_filter, ext)
+                ec, output = results[ext.options['modulename']]
+                ext.import_check_result = (cmd, ec, output)
+
+    def _sanity_check_step_extensions(self):
+        """Sanity check on extensions, checking imports of Python packages together (if enabled)."""
+        if self.cfg['sanity_check_batched_imports'] and not self.multi_python and not self.dry_run:
+            if not self.ext_instances:
+                # class instances for extensions may not be initialized yet here,
+                # for example when using --module-only or --sanity-check-only
+                self.prepare_for_extensions()
+                self.init_ext_instances()
+            self.check_exts_imports()
+
+        super(PythonBundle, self)._sanity_check_step_extensions()
+
     def sanity_check_step(self, *args, **kwargs):
         """Custom sanity check for bundle of Python package."""
 
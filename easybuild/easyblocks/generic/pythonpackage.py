@@ -32,36 +32,66 @@ EasyBuild support for Python packages, implemented as an easyblock
 @author: Jens Timmerman (Ghent University)
 @author: Alexander Grund (TU Dresden)
 """
+import glob
+import hashlib
 import json
 import os
 import re
 import sys
+import tarfile
 import tempfile
+import zipfile
 from easybuild.tools import LooseVersion
+from email.parser import HeaderParser
 from distutils.sysconfig import get_config_vars
 
 import easybuild.tools.environment as env
 from easybuild.base import fancylogger
 from easybuild.easyblocks.python import EBPYTHONPREFIXES, EXTS_FILTER_PYTHON_PACKAGES
+from easybuild.easyblocks.sharedcache import SHARED_CACHE_FILE_PERMS, SharedCache
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.framework.easyconfig.default import DEFAULT_CONFIG
 from easybuild.framework.easyconfig.templates import TEMPLATE_CONSTANTS
 from easybuild.framework.extensioneasyblock import ExtensionEasyBlock
 from easybuild.tools.build_log import EasyBuildError, print_msg
-from easybuild.tools.config import build_option
-from easybuild.tools.filetools import change_dir, mkdir, remove_dir, symlink, which
+from easybuild.tools.config import IGNORE, build_option
+from easybuild.tools.filetools import adjust_permissions, change_dir, compute_checksum, copy_file, mkdir, read_file
+from easybuild.tools.filetools import remove_dir, symlink, which
 from easybuild.tools.modules import get_software_root
-from easybuild.tools.py2vs3 import string_type, subprocess_popen_text
+from easybuild.tools.py2vs3 import string_type
 from easybuild.tools.run import run_cmd
 from easybuild.tools.utilities import nub
 from easybuild.tools.hooks import CONFIGURE_STEP, BUILD_STEP, TEST_STEP, INSTALL_STEP
 
+try:
+    from packaging.requirements import InvalidRequirement, Requirement
+except ImportError:
+    # fall back to copy of packaging that is included in pip, and just do without if that's not available either
+    try:
+        from pip._vendor.packaging.requirements import InvalidRequirement, Requirement
+    except ImportError:
+        Requirement = None
+
+try:
+    import tomllib
+except ImportError:
+    # tomllib is only part of the Python standard library since Python 3.11,
+    # fall back to tomli (which it is based on), and just do without if that's not available either
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
 
 # not 'easy_install' deliberately, to avoid that pkg installations listed in easy-install.pth get preference
 # '.' is required at the end when using easy_install/pip in unpacked source dir
 EASY_INSTALL_TARGET = "easy_install"
 PIP_INSTALL_CMD = "%(python)s -m pip install --prefix=%(prefix)s %(installopts)s %(loc)s"
 SETUP_PY_INSTALL_CMD = "%(python)s setup.py %(install_target)s --prefix=%(prefix)s %(installopts)s"
+PIP_WHEEL_CMD = "%(python)s -m pip wheel --wheel-dir=%(wheel_dir)s %(wheelopts)s %(loc)s"
+# options for 'pip install' that are not supported by 'pip wheel'
+PIP_INSTALL_ONLY_OPTIONS = ['--egg', '--force-reinstall', '--ignore-installed', '--no-compile',
+                            '--no-warn-script-location', '--upgrade', '--user']
 UNKNOWN = 'UNKNOWN'
 
 # Python installation schemes, see https://docs.python.org/3/library/sysconfig.html#installation-paths;
@@ -76,11 +106,281 @@ PY_INSTALL_SCHEMES = [
 ]
 
 
+# prefix used to determine Python library directory, see det_pylibdir
+PYLIBDIR_PROBE_PREFIX = '/tmp/'
+
+# script used to determine all relevant facts about a 'python' command in one go, see det_python_facts;
+# must be compatible with both Python 2 and 3, result is printed as JSON on the last line of output;
+# only the version and search path are determined using nothing but 'sys', other facts are set to None
+# if they can not be determined (for example when distutils is not available), see also det_python_version
+PYTHON_FACTS_PROBE = """
+import json
+import sys
+
+prefix = "%(prefix)s"
+facts = {
+    "version": "%%s.%%s.%%s" %% sys.version_info[:3],
+    # search path for Python packages, see det_installed_python_packages
+    "sys_path": sys.path[:],
+    "marker_env": None,
+    "pylibdir": None,
+    "pylibdir_plat": None,
+    "py_install_scheme": None,
+    "pip_version": None,
+    # errors that occurred while determining facts (fact name as key)
+    "errors": {},
+}
+
+# environment used to evaluate markers in requirements, see https://peps.python.org/pep-0508/#environment-markers
+try:
+    import os
+    import platform
+    if hasattr(sys, "implementation"):
+        impl_version = "%%d.%%d.%%d" %% sys.implementation.version[:3]
+        if sys.implementation.version.releaselevel != "final":
+            impl_version += sys.implementation.version.releaselevel[0] + str(sys.implementation.version.serial)
+        impl_name = sys.implementation.name
+    else:
+        impl_version, impl_name = "0", ""
+    facts["marker_env"] = {
+        "implementation_name": impl_name,
+        "implementation_version": impl_version,
+        "os_name": os.name,
+        "platform_machine": platform.machine(),
+        "platform_python_implementation": platform.python_implementation(),
+        "platform_release": platform.release(),
+        "platform_system": platform.system(),
+        "platform_version": platform.version(),
+        "python_full_version": platform.python_version(),
+        "python_version": ".".join(platform.python_version_tuple()[:2]),
+        "sys_platform": sys.platform,
+    }
+except Exception as err:
+    facts["errors"]["marker_env"] = str(err)
+
+try:
+    if sys.version_info >= (3, 12):
+        # Python 3.12 removed distutils but has a core sysconfig module which is similar
+        import sysconfig
+        paths_vars = {"platbase": prefix, "base": prefix}
+        facts["pylibdir"] = sysconfig.get_path("purelib", vars=paths_vars)
+        facts["pylibdir_plat"] = sysconfig.get_path("platlib", vars=paths_vars)
+    else:
+        import distutils.sysconfig
+        facts["pylibdir"] = distutils.sysconfig.get_python_lib(plat_specific=False, prefix=prefix)
+        facts["pylibdir_plat"] = distutils.sysconfig.get_python_lib(plat_specific=True, prefix=prefix)
+except Exception as err:
+    facts["errors"]["pylibdir"] = facts["errors"]["pylibdir_plat"] = str(err)
+
+try:
+    import sysconfig
+    # sysconfig._get_default_scheme was renamed to sysconfig.get_default_scheme in Python 3.10
+    if sys.version_info >= (3, 10):
+        facts["py_install_scheme"] = sysconfig.get_default_scheme()
+    else:
+        facts["py_install_scheme"] = sysconfig._get_default_scheme()
+except Exception as err:
+    facts["errors"]["py_install_scheme"] = str(err)
+
+try:
+    import re
+    import pip
+    res = re.match("^[0-9.]+", pip.__version__)
+    facts["pip_version"] = res.group(0) if res else None
+except Exception:
+    pass
+
+print(json.dumps(facts))
+""" % {'prefix': PYLIBDIR_PROBE_PREFIX}
+
+# script used to check imports of Python packages in a single Python session, see check_python_imports;
+# each import is done in a separate forked process, so failing imports do not affect each other;
+# modules that were imported successfully are also imported in the parent process, so subsequent forks inherit them
+# (and common dependencies like numpy are only imported once);
+# must be compatible with both Python 2 and 3, result is printed as JSON on the last line of output
+PYTHON_IMPORTS_CHECK_SCRIPT = """
+import json
+import os
+import sys
+import traceback
+
+results = {}
+for modname in %(modnames)s:
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # child process: redirect stdout/stderr to pipe, and try importing
+        os.close(read_fd)
+        os.dup2(write_fd, 1)
+        os.dup2(write_fd, 2)
+        ec = 0
+        try:
+            exec("import " + modname)
+        except SystemExit as err:
+            # mimic how Python handles exiting via sys.exit
+            if err.code is None or isinstance(err.code, int):
+                ec = err.code or 0
+            else:
+                sys.stderr.write("%%s\\n" %% err.code)
+                ec = 1
+        except BaseException:
+            # skip traceback entry for this script, so output matches with 'python -c "import ..."'
+            etype, value, tb = sys.exc_info()
+            traceback.print_exception(etype, value, tb.tb_next)
+            ec = 1
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(ec)
+
+    os.close(write_fd)
+    output = []
+    chunk = os.read(read_fd, 65536)
+    while chunk:
+        output.append(chunk)
+        chunk = os.read(read_fd, 65536)
+    os.close(read_fd)
+
+    _, status = os.waitpid(pid, 0)
+    if os.WIFEXITED(status):
+        ec = os.WEXITSTATUS(status)
+    else:
+        ec = 128 + os.WTERMSIG(status)
+    results[modname] = [ec, b"".join(output).decode("utf-8", "replace")]
+
+    if ec == 0 and modname not in sys.modules:
+        # output produced by import in parent process is discarded
+        sys.stdout.flush()
+        sys.stderr.flush()
+        saved_fds = [os.dup(1), os.dup(2)]
+        devnull_fd = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull_fd, 1)
+        os.dup2(devnull_fd, 2)
+        try:
+            exec("import " + modname, {})
+        except BaseException:
+            pass
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved_fds[0], 1)
+            os.dup2(saved_fds[1], 2)
+            for fd in saved_fds + [devnull_fd]:
+                os.close(fd)
+
+print(json.dumps(results))
+"""
+
+# environment variables that affect facts determined for a 'python' command, see det_python_facts
+PYTHON_FACTS_ENV_VARS = ['PYTHONHOME', 'PYTHONNOUSERSITE', 'PYTHONPATH', 'PYTHONUSERBASE']
+
+# cache for facts about 'python' commands, see det_python_facts
+_python_facts_cache = {}
+
+# cache for metadata of Python packages installed in a particular directory, see read_python_pkgs_metadata
+_python_pkgs_metadata_cache = {}
+
+
+def python_facts_cache_key(python_cmd):
+    """
+    Determine key for facts cache of specified 'python' command:
+    full path to the command, together with modification time & inode of the Python interpreter,
+    and values of the environment variables that affect Python's search path.
+
+    Returns None if the 'python' command could not be resolved.
+    """
+    if os.path.isabs(python_cmd):
+        python_cmd_path = python_cmd
+    else:
+        python_cmd_path = which(python_cmd, log_ok=False, on_error=IGNORE)
+
+    if python_cmd_path is None:
+        return None
+
+    try:
+        stat_res = os.stat(python_cmd_path)
+    except OSError:
+        return None
+
+    env_values = tuple(os.getenv(key) for key in PYTHON_FACTS_ENV_VARS)
+
+    return (python_cmd_path, stat_res.st_mtime, stat_res.st_ino, env_values)
+
+
+def clear_python_facts_cache():
+    """Clear cache of facts about 'python' commands."""
+    _python_facts_cache.clear()
+
+
+def det_python_facts(python_cmd='python'):
+    """
+    Determine facts about specified 'python' command: Python version, Python library directories,
+    version of 'pip' module, and active installation scheme.
+
+    All facts are determined using a single invocation of the 'python' command,
+    and cached until the Python interpreter binary changes.
+    """
+    log = fancylogger.getLogger('det_python_facts', fname=False)
+
+    key = python_facts_cache_key(python_cmd)
+    if key in _python_facts_cache:
+        log.debug("Using cached facts for Python command '%s': %s", python_cmd, _python_facts_cache[key])
+        return dict(_python_facts_cache[key])
+
+    # use run_cmd, we can to talk to the active Python, not the system Python running EasyBuild;
+    # the probe script is passed via stdin to avoid trouble with quoting
+    cmd = "%s -" % python_cmd
+    log.debug("Determining facts for Python command '%s' using command '%s'", python_cmd, cmd)
+
+    out, _ = run_cmd(cmd, inp=PYTHON_FACTS_PROBE, simple=False, force_in_dry_run=True, verbose=False, trace=False)
+
+    # only consider last line of output, warnings (like DeprecationWarning for distutils) may be printed before it
+    txt = out.strip().split('\n')[-1]
+    try:
+        facts = json.loads(txt)
+    except ValueError as err:
+        raise EasyBuildError("Failed to determine facts for Python command '%s' from output of %s: %s (%s)",
+                             python_cmd, cmd, out, err)
+
+    log.debug("Determined facts for Python command '%s': %s", python_cmd, facts)
+
+    if key is not None:
+        _python_facts_cache[key] = facts
+
+    return dict(facts)
+
+
 def det_python_version(python_cmd):
     """Determine version of specified 'python' command."""
-    pycode = 'import sys; print("%s.%s.%s" % sys.version_info[:3])'
-    out, _ = run_cmd("%s -c '%s'" % (python_cmd, pycode), simple=False, trace=False)
-    return out.strip()
+    return det_python_facts(python_cmd)['version']
+
+
+def check_python_imports(python_cmd, modnames):
+    """
+    Check whether specified Python modules can be imported with specified 'python' command,
+    using a single Python session in which each import is done in a separate forked process.
+
+    :return: dict with exit code and output for each of the specified modules, or None if checking failed
+    """
+    log = fancylogger.getLogger('check_python_imports', fname=False)
+
+    # script is passed via stdin to avoid trouble with quoting
+    cmd = "%s -" % python_cmd
+    script = PYTHON_IMPORTS_CHECK_SCRIPT % {'modnames': json.dumps(modnames)}
+    log.info("Checking imports of Python modules with '%s': %s", cmd, ', '.join(modnames))
+
+    out, ec = run_cmd(cmd, inp=script, log_ok=False, simple=False, regexp=False, trace=False)
+
+    # only consider last line of output, output produced by imports is captured separately
+    try:
+        res = json.loads(out.strip().split('\n')[-1])
+    except ValueError:
+        res = None
+
+    if ec or not isinstance(res, dict) or sorted(res.keys()) != sorted(modnames):
+        log.warning("Failed to check imports of Python modules with '%s' (exit code %s): %s", cmd, ec, out)
+        return None
+
+    return dict((modname, tuple(res[modname])) for modname in modnames)
 
 
 def pick_python_cmd(req_maj_ver=None, req_min_ver=None, max_py_majver=None, max_py_minver=None):
@@ -183,31 +483,22 @@ def det_pylibdir(plat_specific=False, python_cmd=None):
         # use 'python' that is listed first in $PATH if none was specified
         python_cmd = 'python'
 
-    # determine Python lib dir via distutils
-    # use run_cmd, we can to talk to the active Python, not the system Python running EasyBuild
-    prefix = '/tmp/'
-    if LooseVersion(det_python_version(python_cmd)) >= LooseVersion('3.12'):
-        # Python 3.12 removed distutils but has a core sysconfig module which is similar
-        pathname = 'platlib' if plat_specific else 'purelib'
-        vars = {'platbase': prefix, 'base': prefix}
-        pycode = 'import sysconfig; print(sysconfig.get_path("%s", vars=%s))' % (pathname, vars)
-    else:
-        args = 'plat_specific=%s, prefix="%s"' % (plat_specific, prefix)
-        pycode = "import distutils.sysconfig; print(distutils.sysconfig.get_python_lib(%s))" % args
-    cmd = "%s -c '%s'" % (python_cmd, pycode.replace("'", '"'))
-
-    log.debug("Determining Python library directory using command '%s'", cmd)
-
-    out, ec = run_cmd(cmd, simple=False, force_in_dry_run=True, trace=False)
-    txt = out.strip().split('\n')[-1]
+    # determine Python lib dir via distutils (or sysconfig for Python 3.12 and newer)
+    prefix = PYLIBDIR_PROBE_PREFIX
+    fact = 'pylibdir_plat' if plat_specific else 'pylibdir'
+    facts = det_python_facts(python_cmd)
+    txt = facts[fact]
+    if txt is None:
+        raise EasyBuildError("Failed to determine Python library directory for %s: %s",
+                             python_cmd, facts.get('errors', {}).get(fact))
 
     # value obtained should start with specified prefix, otherwise something is very wrong
     if not txt.startswith(prefix):
-        raise EasyBuildError("Last line of output of %s does not start with specified prefix %s: %s (exit code %s)",
-                             cmd, prefix, out, ec)
+        raise EasyBuildError("Python library directory determined for %s does not start with specified prefix %s: %s",
+                             python_cmd, prefix, txt)
 
     pylibdir = txt[len(prefix):]
-    log.debug("Determined pylibdir using '%s': %s", cmd, pylibdir)
+    log.debug("Determined pylibdir for %s: %s", python_cmd, pylibdir)
     return pylibdir
 
 
@@ -242,15 +533,11 @@ def det_pip_version(python_cmd='python'):
     log = fancylogger.getLogger('det_pip_version', fname=False)
     log.info("Determining pip version...")
 
-    out, _ = run_cmd("%s -m pip --version" % python_cmd, verbose=False, simple=False, trace=False)
-
-    pip_version_regex = re.compile('^pip ([0-9.]+)')
-    res = pip_version_regex.search(out)
-    if res:
-        pip_version = res.group(1)
+    pip_version = det_python_facts(python_cmd)['pip_version']
+    if pip_version:
         log.info("Found pip version: %s", pip_version)
     else:
-        log.warning("Failed to determine pip version from '%s' using pattern '%s'", out, pip_version_regex.pattern)
+        log.warning("Failed to determine pip version for Python command '%s'", python_cmd)
 
     return pip_version
 
@@ -267,17 +554,7 @@ def det_py_install_scheme(python_cmd='python'):
 
     log = fancylogger.getLogger('det_py_install_scheme', fname=False)
 
-    # sysconfig._get_default_scheme was renamed to sysconfig.get_default_scheme in Python 3.10
-    pyver = det_python_version(python_cmd)
-    if LooseVersion(pyver) >= LooseVersion('3.10'):
-        get_default_scheme = 'get_default_scheme'
-    else:
-        get_default_scheme = '_get_default_scheme'
-
-    cmd = "%s -c 'import sysconfig; print(sysconfig.%s())'" % (python_cmd, get_default_scheme)
-    log.debug("Determining active Python installation scheme with: %s", cmd)
-    out, _ = run_cmd(cmd, verbose=False, simple=False, trace=False)
-    py_install_scheme = out.strip()
+    py_install_scheme = det_python_facts(python_cmd)['py_install_scheme']
 
     if py_install_scheme in PY_INSTALL_SCHEMES:
         log.info("Active Python installation scheme: %s", py_install_scheme)
@@ -337,6 +614,278 @@ def symlink_dist_site_packages(install_dir, pylibdirs):
             symlink(dist_pkgs, site_pkgs_path, use_abspath_source=False)
 
 
+def normalize_python_pkg_name(name):
+    """
+    Normalize name of Python package, see https://peps.python.org/pep-0503/#normalized-names
+    """
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def det_python_requirement_name(requirement, extras=None):
+    """
+    Determine name of required Python package from specified requirement
+    (e.g. "numpy>=1.20; python_version>='3.8'", see https://peps.python.org/pep-0508/).
+
+    Returns None if the requirement only applies to extras that are not listed in 'extras'.
+    """
+    if extras is None:
+        extras = []
+
+    if ';' in requirement:
+        requirement, marker = requirement.split(';', 1)
+        required_for_extras = re.findall(r'''extra\s*==\s*['"]([^'"]+)['"]''', marker)
+        if required_for_extras and not any(x in extras for x in required_for_extras):
+            return None
+
+    res = re.match(r'\s*([A-Za-z0-9][A-Za-z0-9._-]*)', requirement)
+    if res:
+        return res.group(1)
+    else:
+        return None
+
+
+def det_python_pkg_requirements(path, extras=None):
+    """
+    Determine list of Python packages required to build and install the Python package with specified source file,
+    by inspecting the metadata that is included in it (*.dist-info/METADATA for wheels,
+    PKG-INFO and pyproject.toml for source tarballs), without unpacking it.
+
+    Returns None if the required Python packages could not be determined reliably.
+    """
+    log = fancylogger.getLogger('det_python_pkg_requirements', fname=False)
+
+    if extras is None:
+        extras = []
+
+    # relevant metadata files are located in top-level directory of source file
+    if path.endswith('.whl'):
+        metadata_regex = re.compile(r'^[^/]+\.dist-info/(METADATA)$')
+    else:
+        metadata_regex = re.compile(r'^(?:\./)?[^/]+/(PKG-INFO|pyproject\.toml)$')
+
+    metadata = {}
+    try:
+        if zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for name in archive.namelist():
+                    res = metadata_regex.match(name)
+                    if res:
+                        metadata[res.group(1)] = archive.read(name).decode('utf-8', 'replace')
+        elif tarfile.is_tarfile(path):
+            # iterate over members of tarball, to avoid having to read the list of all members first
+            with tarfile.open(path) as archive:
+                for member in archive:
+                    res = metadata_regex.match(member.name)
+                    if res and member.isfile():
+                        metadata[res.group(1)] = archive.extractfile(member).read().decode('utf-8', 'replace')
+                        if len(metadata) == 2:
+                            break
+        else:
+            log.info("Don't know how to determine requirements from %s", path)
+            return None
+    except (IOError, OSError, tarfile.TarError, zipfile.BadZipfile) as err:
+        log.warning("Failed to determine requirements from %s: %s", path, err)
+        return None
+
+    reqs = []
+
+    if 'METADATA' in metadata:
+        # metadata included in wheels is always accurate, and there are no build requirements for wheels
+        reqs.extend(HeaderParser().parsestr(metadata['METADATA']).get_all('Requires-Dist') or [])
+
+    else:
+        build_reqs, install_reqs = None, None
+
+        if 'pyproject.toml' in metadata:
+            if tomllib is None:
+                log.info("Can't parse pyproject.toml included in %s without tomllib or tomli", path)
+                return None
+            try:
+                pyproject = tomllib.loads(metadata['pyproject.toml'])
+            except ValueError as err:
+                log.warning("Failed to parse pyproject.toml included in %s: %s", path, err)
+                return None
+
+            build_reqs = pyproject.get('build-system', {}).get('requires')
+            project = pyproject.get('project', {})
+            if 'dependencies' not in project.get('dynamic', []):
+                install_reqs = project.get('dependencies', [])
+                for extra in extras:
+                    install_reqs.extend(project.get('optional-dependencies', {}).get(extra, []))
+
+        # Python packages without build-system section in pyproject.toml are built with setuptools (legacy)
+        if build_reqs is None:
+            build_reqs = ['setuptools', 'wheel']
+
+        # requirements listed in PKG-INFO are only known to be accurate for metadata version 2.2 or newer,
+        # see https://peps.python.org/pep-0643/
+        if install_reqs is None and 'PKG-INFO' in metadata:
+            pkg_info = HeaderParser().parsestr(metadata['PKG-INFO'])
+            if LooseVersion(pkg_info.get('Metadata-Version', '0')) >= LooseVersion('2.2'):
+                if 'Requires-Dist' not in (pkg_info.get_all('Dynamic') or []):
+                    install_reqs = pkg_info.get_all('Requires-Dist') or []
+
+        if install_reqs is None:
+            log.info("Failed to reliably determine requirements from %s", path)
+            return None
+
+        reqs.extend(build_reqs + install_reqs)
+
+    res = nub(x for x in (det_python_requirement_name(req, extras=extras) for req in reqs) if x)
+    log.debug("Requirements for %s: %s", path, res)
+    return res
+
+
+def parse_egg_requires(txt):
+    """
+    Parse contents of requires.txt file in *.egg-info metadata directory into list of requirements (PEP 508 format);
+    requirements that only apply to extras are ignored.
+    """
+    reqs = []
+    marker = None
+    for line in txt.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if line.startswith('[') and line.endswith(']'):
+            # section header: [extra], [extra:marker] or [:marker]
+            extra, _, marker = line[1:-1].partition(':')
+            if extra:
+                marker = False
+            continue
+        if marker is False:
+            continue
+        reqs.append('%s; %s' % (line, marker) if marker else line)
+    return reqs
+
+
+def read_python_pkgs_metadata(path):
+    """
+    Read metadata (name, version, requirements) for all Python packages installed in specified directory,
+    by inspecting the *.dist-info and *.egg-info metadata.
+
+    Results are cached, until the contents of the directory change.
+    """
+    log = fancylogger.getLogger('read_python_pkgs_metadata', fname=False)
+
+    try:
+        entries = sorted(x for x in os.listdir(path) if x.endswith(('.dist-info', '.egg-info', '.egg')))
+        key = (path, os.stat(path).st_mtime, tuple(entries))
+    except OSError as err:
+        log.debug("Failed to list contents of %s: %s", path, err)
+        return []
+
+    if key in _python_pkgs_metadata_cache:
+        return _python_pkgs_metadata_cache[key]
+
+    dists = []
+    for entry in entries:
+        entry_path = os.path.join(path, entry)
+        # metadata file paths + function to obtain requirements from contents of those files
+        if entry.endswith('.dist-info'):
+            metadata_path, requires_path = os.path.join(entry_path, 'METADATA'), None
+        elif entry.endswith('.egg'):
+            metadata_path = os.path.join(entry_path, 'EGG-INFO', 'PKG-INFO')
+            requires_path = os.path.join(entry_path, 'EGG-INFO', 'requires.txt')
+        elif os.path.isdir(entry_path):
+            metadata_path = os.path.join(entry_path, 'PKG-INFO')
+            requires_path = os.path.join(entry_path, 'requires.txt')
+        else:
+            # *.egg-info may also be a single file
+            metadata_path, requires_path = entry_path, None
+
+        if not os.path.isfile(metadata_path):
+            log.debug("No metadata found for %s, ignoring it", entry_path)
+            continue
+
+        with open(metadata_path, 'rb') as fh:
+            metadata = HeaderParser().parsestr(fh.read().decode('utf-8', 'replace'))
+
+        name, version = metadata.get('Name'), metadata.get('Version')
+        if not name or version is None:
+            log.debug("Incomplete metadata found for %s, ignoring it", entry_path)
+            continue
+
+        if requires_path is None:
+            requires = metadata.get_all('Requires-Dist') or []
+        elif os.path.isfile(requires_path):
+            requires = parse_egg_requires(read_file(requires_path))
+        else:
+            requires = []
+
+        dists.append({'name': name, 'version': version, 'requires': requires})
+
+    log.debug("Found %d installed Python packages in %s", len(dists), path)
+    _python_pkgs_metadata_cache[key] = dists
+
+    return dists
+
+
+def det_installed_python_packages(python_cmd):
+    """
+    Determine which Python packages are available for specified 'python' command,
+    by scanning the metadata in the directories included in the Python search path (like 'pip list' does).
+
+    Only the first occurrence of a particular Python package is taken into account.
+
+    :return: list of dicts with name, version and requirements of installed Python packages
+    """
+    res, seen = [], set()
+    for path in det_python_facts(python_cmd)['sys_path']:
+        if path and os.path.isdir(path):
+            for dist in read_python_pkgs_metadata(path):
+                name = normalize_python_pkg_name(dist['name'])
+                if name not in seen:
+                    seen.add(name)
+                    res.append(dist)
+    return res
+
+
+def det_unmet_python_requirements(dists, marker_env):
+    """
+    Check whether requirements of specified installed Python packages are met (like 'pip check' does).
+
+    :param dists: list of installed Python packages, see det_installed_python_packages
+    :param marker_env: environment to evaluate markers in requirements with
+    :return: list of messages for unmet requirements, or None if requirements could not be checked
+    """
+    if Requirement is None:
+        return None
+
+    log = fancylogger.getLogger('det_unmet_python_requirements', fname=False)
+
+    # requirements for extras are not taken into account
+    marker_env = dict(marker_env, extra='')
+
+    versions = dict((normalize_python_pkg_name(dist['name']), dist['version']) for dist in dists)
+
+    res = []
+    for dist in sorted(dists, key=lambda x: normalize_python_pkg_name(x['name'])):
+        name = normalize_python_pkg_name(dist['name'])
+        for req_txt in dist['requires']:
+            try:
+                req = Requirement(req_txt)
+                if req.marker is not None and not req.marker.evaluate(marker_env):
+                    continue
+            except (InvalidRequirement, ValueError) as err:
+                log.warning("Ignoring invalid requirement '%s' for %s: %s", req_txt, dist['name'], err)
+                continue
+
+            req_name = normalize_python_pkg_name(req.name)
+            if req_name not in versions:
+                res.append("%s %s requires %s, which is not installed." % (name, dist['version'], req_name))
+            else:
+                try:
+                    ok = req.specifier.contains(versions[req_name], prereleases=True)
+                except ValueError:
+                    # invalid versions don't match any specifier
+                    ok = not req.specifier
+                if not ok:
+                    msg = "%s %s has requirement %s, but you have %s %s."
+                    res.append(msg % (name, dist['version'], req, req_name, versions[req_name]))
+    return res
+
+
 class PythonPackage(ExtensionEasyBlock):
     """Builds and installs a Python package, and provides a dedicated module file."""
 
@@ -381,6 +930,8 @@ class PythonPackage(ExtensionEasyBlock):
             'use_pip_for_deps': [False, "Install dependencies using '%s'" % PIP_INSTALL_CMD, CUSTOM],
             'use_pip_requirement': [False, "Install using 'python -m pip install --requirement'. The sources is " +
                                            "expected to be the requirements file.", CUSTOM],
+            'wheel_cache': [None, "Path to cache of wheels built with pip, used to reuse wheels when reinstalling "
+                                  "(if not specified, $EB_PYTHON_WHEEL_CACHE is used)", CUSTOM],
             'zipped_egg': [False, "Install as a zipped eggs", CUSTOM],
         })
         # Use PYPI_SOURCE as the default for source_urls.
@@ -412,6 +963,17 @@ class PythonPackage(ExtensionEasyBlock):
 
         self.install_cmd_output = ''
 
+        # key and build directory for wheel that is being built, to add it to cache of wheels after installation
+        self.wheel_cache_key = None
+        self.wheel_dir = None
+
+        self._required_deps = None
+        self._required_deps_determined = False
+
+        # result of checking import of this Python package as an extension,
+        # if it was already checked together with other extensions (see PythonBundle)
+        self.import_check_result = None
+
         # make sure there's no site.cfg in $HOME, because setup.py will find it and use it
         home = os.path.expanduser('~')
         if os.path.exists(os.path.join(home, 'site.cfg')):
@@ -584,26 +1146,17 @@ class PythonPackage(ExtensionEasyBlock):
     def get_installed_python_packages(self, names_only=True, python_cmd=None):
         """Return list of Python packages that are installed
 
-        When names_only is True then only the names are returned, else the full info from `pip list`.
+        When names_only is True then only the names are returned, else the name and version of each package
+        (like `pip list` reports them).
         Note that the names are reported by pip and might be different to the name that need to be used to import it
         """
         if python_cmd is None:
             python_cmd = self.python_cmd
-        # Check installed python packages but only check stdout, not stderr which might contain user facing warnings
-        cmd_list = [python_cmd, '-m', 'pip', 'list', '--isolated', '--disable-pip-version-check',
-                    '--format', 'json']
-        full_cmd = ' '.join(cmd_list)
-        self.log.info("Running command '%s'" % full_cmd)
-        proc = subprocess_popen_text(cmd_list, env=os.environ)
-        (stdout, stderr) = proc.communicate()
-        ec = proc.returncode
-        msg = "Command '%s' returned with %s: stdout: %s; stderr: %s" % (full_cmd, ec, stdout, stderr)
-        if ec:
-            self.log.info(msg)
-            raise EasyBuildError('Failed to determine installed python packages: %s', stderr)
-
-        self.log.debug(msg)
-        pkgs = json.loads(stdout.strip())
+
+        pkgs = [{'name': dist['name'], 'version': dist['version']}
+                for dist in det_installed_python_packages(python_cmd)]
+        self.log.debug("Installed Python packages for '%s': %s", python_cmd, pkgs)
+
         if names_only:
             return [pkg['name'] for pkg in pkgs]
         else:
@@ -671,14 +1224,37 @@ class PythonPackage(ExtensionEasyBlock):
                 # otherwise, self.src is a list of dicts, one element per source file
                 loc = self.src[0]['path']
 
-        if self.using_pip_install():
+        if installopts is None:
+            installopts = self.cfg['installopts']
+
+        wheel_cmd = None
+        wheel_cache = self.wheel_cache()
+        if wheel_cache and self.wheel_cacheable(loc):
+            wheelopts = nub(x for x in installopts.split() if x not in PIP_INSTALL_ONLY_OPTIONS)
+            key = self.wheel_cache_key_for(loc, wheelopts)
+            cached_wheel = wheel_cache.lookup(key)
+            if cached_wheel:
+                self.log.info("Installing %s from cached wheel %s", self.name, cached_wheel)
+                loc = cached_wheel
+            else:
+                # build wheel first (in a dedicated directory), and install it from there;
+                # wheel is added to cache of wheels after a successful installation (see post_install)
+                self.wheel_cache_key = key
+                self.wheel_dir = tempfile.mkdtemp(prefix='wheel-%s-' % self.name, dir=self.builddir)
+                wheel_cmd = PIP_WHEEL_CMD % {
+                    'loc': loc,
+                    'python': self.python_cmd,
+                    'wheel_dir': self.wheel_dir,
+                    'wheelopts': ' '.join(wheelopts),
+                }
+                # extras are irrelevant when installing the wheel, since dependencies are not installed by pip
+                loc = os.path.join(self.wheel_dir, '*.whl')
+
+        elif self.using_pip_install():
             extras = self.cfg.get('use_pip_extras')
             if extras:
                 loc += '[%s]' % extras
 
-        if installopts is None:
-            installopts = self.cfg['installopts']
-
         if self.cfg.get('use_pip_editable', False):
             # add --editable option when requested, in the right place (i.e. right before the location specification)
             loc = "--editable %s" % loc
@@ -687,8 +1263,10 @@ class PythonPackage(ExtensionEasyBlock):
             # add --requirement option when requested, in the right place (i.e. right before the location specification)
             loc = "--requirement %s" % loc
 
+        cmd.append(self.cfg['preinstallopts'])
+        if wheel_cmd:
+            cmd.extend([wheel_cmd, '&&'])
         cmd.extend([
-            self.cfg['preinstallopts'],
             self.install_cmd % {
                 'installopts': installopts,
                 'install_target': self.cfg['install_target'],
@@ -700,6 +1278,59 @@ class PythonPackage(ExtensionEasyBlock):
 
         return ' '.join(cmd)
 
+    def wheel_cache(self):
+        """
+        Return cache of wheels to use, if any.
+        """
+        cache = None
+        path = self.cfg.get('wheel_cache') or os.getenv('EB_PYTHON_WHEEL_CACHE')
+        if path:
+            cache = WheelCache(path)
+        return cache
+
+    def wheel_cacheable(self, loc):
+        """
+        Determine whether wheel for this Python package can be built and cached, when installing from given location.
+        """
+        # dependencies must not be installed by pip, since they would not be included in the (single) cached wheel
+        unsupported = ['use_pip_editable', 'use_pip_for_deps', 'use_pip_requirement']
+        if not self.using_pip_install() or any(self.cfg.get(x, False) for x in unsupported):
+            res = False
+        elif self.dry_run or loc.endswith('.whl') or not self.src:
+            res = False
+        else:
+            res = True
+        return res
+
+    def wheel_cache_key_for(self, loc, wheelopts):
+        """
+        Determine key in cache of wheels for this Python package, based on everything that determines the wheel
+        that is built: name, version, checksums of source file and patches, easyblock, toolchain, dependencies,
+        Python version, and the options passed to 'pip wheel'.
+
+        :return: SHA256 checksum
+        """
+        if isinstance(self.src, string_type):
+            src_path = self.src
+        else:
+            src_path = self.src[0]['path']
+        patch_paths = [x['path'] if isinstance(x, dict) else x for x in self.patches]
+
+        key_items = [
+            [self.name, self.version],
+            compute_checksum(src_path, checksum_type='sha256'),
+            [compute_checksum(x, checksum_type='sha256') for x in patch_paths],
+            self.__class__.__name__,
+            [self.toolchain.name, self.toolchain.version],
+            [[dep['name'], dep['version'], dep['versionsuffix']] for dep in self.cfg.dependencies()],
+            det_python_version(self.python_cmd),
+            [self.cfg['preinstallopts'], wheelopts, loc],
+        ]
+        key_txt = json.dumps(key_items, sort_keys=True, default=str)
+        key = hashlib.sha256(key_txt.encode('utf-8')).hexdigest()
+        self.log.info("Key for %s v%s in cache of wheels: %s", self.name, self.version, key)
+        return key
+
     def py_post_install_shenanigans(self, install_dir):
         """
         Run post-installation shenanigans on specified installation directory, incl:
@@ -823,11 +1454,12 @@ class PythonPackage(ExtensionEasyBlock):
             # We consider the build and install output together as downloads likely happen here if this is run
             self.install_cmd_output += out
 
-    def test_step(self, return_output_ec=False):
+    def test_step(self, return_output_ec=False, out_fn=None):
         """
         Test the built Python package.
 
         :param return_output: return output and exit code of test command
+        :param out_fn: path to file to redirect output of test command to (rather than keeping it in memory)
         """
 
         if isinstance(self.cfg['runtest'], string_type):
@@ -877,11 +1509,16 @@ class PythonPackage(ExtensionEasyBlock):
                     testcmd,
                     self.cfg['testopts'],
                 ])
+                if out_fn:
+                    cmd = "(%s) > %s 2>&1" % (cmd, out_fn)
 
                 if return_output_ec:
                     (out, ec) = run_cmd(cmd, log_all=False, log_ok=False, simple=False, regexp=False)
                     # need to log seperately, since log_all and log_ok need to be false to retrieve out and ec
-                    self.log.info("cmd '%s' exited with exit code %s and output:\n%s", cmd, ec, out)
+                    if out_fn:
+                        self.log.info("cmd '%s' exited with exit code %s, output is in %s", cmd, ec, out_fn)
+                    else:
+                        self.log.info("cmd '%s' exited with exit code %s and output:\n%s", cmd, ec, out)
                 else:
                     run_cmd(cmd, log_all=True, simple=True)
 
@@ -891,9 +1528,12 @@ class PythonPackage(ExtensionEasyBlock):
             if return_output_ec:
                 return (out, ec)
 
-    def install_step(self):
-        """Install Python package to a custom path using setup.py"""
+    def prepare_install_env(self):
+        """
+        Create expected installation subdirectories, and update $PYTHONPATH and $PATH accordingly.
 
+        :return: dict with original values of environment variables that were updated
+        """
         # if posix_local is the active installation scheme there will be
         # a 'local' subdirectory in the specified prefix;
         # see also https://github.com/easybuilders/easybuild-easyblocks/issues/2976
@@ -919,41 +1559,92 @@ class PythonPackage(ExtensionEasyBlock):
             if new_value:
                 env.setvar(name, new_value, verbose=False)
 
-        # actually install Python package
-        cmd = self.compose_install_command(self.installdir)
-        (out, _) = run_cmd(cmd, log_all=True, log_ok=True, simple=False)
+        return old_values
 
+    def restore_install_env(self, old_values):
+        """
+        Restore environment variables that were updated by prepare_install_env.
+        """
+        # restore env vars if it they were set
+        for name in ('PYTHONPATH', 'PATH'):
+            value = old_values[name]
+            if value is not None:
+                env.setvar(name, value, verbose=False)
+
+    def post_install(self, install_output):
+        """
+        Take required actions after installation command was run, incl. fixing shebangs (if specified).
+        """
         # keep track of all output from install command, so we can check for auto-downloaded dependencies;
         # take into account that install step may be run multiple times
         # (for iterated installations over multiply Python versions)
-        self.install_cmd_output += out
+        self.install_cmd_output += install_output
+
+        if self.wheel_cache_key:
+            self.wheel_cache().add(self.wheel_cache_key, self.wheel_dir)
+            remove_dir(self.wheel_dir)
+            self.wheel_cache_key, self.wheel_dir = None, None
 
         self.py_post_install_shenanigans(self.installdir)
 
+        # cached facts for 'python' command (incl. pip version) are no longer accurate when pip itself was installed
+        if self.name.lower() == 'pip':
+            clear_python_facts_cache()
+
         # fix shebangs if specified
         self.fix_shebang()
 
-        # restore env vars if it they were set
-        for name in ('PYTHONPATH', 'PATH'):
-            value = old_values[name]
-            if value is not None:
-                env.setvar(name, value, verbose=False)
+    def install_step(self):
+        """Install Python package to a custom path using setup.py"""
 
-    def run(self, *args, **kwargs):
-        """Perform the actual Python package build/installation procedure"""
+        old_values = self.prepare_install_env()
 
-        # we unpack unless explicitly told otherwise
-        kwargs.setdefault('unpack_src', self._should_unpack_source())
-        super(PythonPackage, self).run(*args, **kwargs)
+        # actually install Python package
+        cmd = self.compose_install_command(self.installdir)
+        (out, _) = run_cmd(cmd, log_all=True, log_ok=True, simple=False)
 
-        # configure, build, test, install
-        # See EasyBlock.get_steps
-        steps = [
-            (CONFIGURE_STEP, 'configuring', [lambda x: x.configure_step], True),
-            (BUILD_STEP, 'building', [lambda x: x.build_step], True),
-            (TEST_STEP, 'testing', [lambda x: x._test_step], True),
-            (INSTALL_STEP, "installing", [lambda x: x.install_step], True),
-        ]
+        self.restore_install_env(old_values)
+
+        self.post_install(out)
+
+    @property
+    def required_deps(self):
+        """
+        Return list of required dependencies for this extension,
+        based on the metadata included in the source file.
+
+        Only extensions that are listed earlier in the list of extensions are taken into account,
+        since the order in which extensions are listed should remain valid.
+        """
+        if not self._required_deps_determined:
+            self._required_deps_determined = True
+
+            if self.src and isinstance(self.src, string_type):
+                extras = [x.strip() for x in (self.cfg.get('use_pip_extras') or '').split(',')]
+                reqs = det_python_pkg_requirements(self.src, extras=extras)
+            else:
+                # no source => no required dependencies assumed
+                reqs = []
+
+            if reqs is None:
+                self.log.info("Required dependencies for %s could not be determined", self.name)
+                self._required_deps = None
+            else:
+                # map required Python packages to names of extensions that are listed before this one
+                ext_names = {}
+                for ext in self.master.exts_all:
+                    if ext['name'] == self.name:
+                        break
+                    ext_names.setdefault(normalize_python_pkg_name(ext['name']), ext['name'])
+
+                reqs = [normalize_python_pkg_name(req) for req in reqs]
+                self._required_deps = nub(ext_names[req] for req in reqs if req in ext_names)
+                self.log.info("Required dependencies for %s: %s", self.name, self._required_deps)
+
+        return self._required_deps
+
+    def run_steps(self, steps):
+        """Run specified steps of the build/installation procedure for this Python package."""
         self.skip = False  # --skip does not apply here
         self.silent = build_option('silent')
         # See EasyBlock.run_all_steps
@@ -968,6 +1659,71 @@ class PythonPackage(ExtensionEasyBlock):
                     for step_method in step_methods:
                         step_method(self)()
 
+    def run(self, *args, **kwargs):
+        """Perform the actual Python package build/installation procedure"""
+
+        # we unpack unless explicitly told otherwise
+        kwargs.setdefault('unpack_src', self._should_unpack_source())
+        super(PythonPackage, self).run(*args, **kwargs)
+
+        # configure, build, test, install
+        # See EasyBlock.get_steps
+        self.run_steps([
+            (CONFIGURE_STEP, 'configuring', [lambda x: x.configure_step], True),
+            (BUILD_STEP, 'building', [lambda x: x.build_step], True),
+            (TEST_STEP, 'testing', [lambda x: x._test_step], True),
+            (INSTALL_STEP, "installing", [lambda x: x.install_step], True),
+        ])
+
+    def run_async(self, *args, **kwargs):
+        """
+        Start installation of Python package as an extension asynchronously:
+        configure, build and test steps are run right away, only the installation command is run in the background.
+        """
+        # easyblocks that customize the installation procedure can not be installed asynchronously,
+        # so just install them right away
+        if self.__class__.run != PythonPackage.run or self.__class__.install_step != PythonPackage.install_step:
+            self.log.info("Custom installation procedure used for %s, so not installing it asynchronously", self.name)
+            self.run(*args, **kwargs)
+            # no asynchronous command being started, see Extension.async_cmd_check
+            self.async_cmd_info = False
+            return
+
+        kwargs.setdefault('unpack_src', self._should_unpack_source())
+        super(PythonPackage, self).run(*args, **kwargs)
+
+        self.run_steps([
+            (CONFIGURE_STEP, 'configuring', [lambda x: x.configure_step], True),
+            (BUILD_STEP, 'building', [lambda x: x.build_step], True),
+            (TEST_STEP, 'testing', [lambda x: x._test_step], True),
+        ])
+
+        if self.skip_step(INSTALL_STEP, True):
+            print_msg("\tinstalling [skipped]", log=self.log, silent=self.silent)
+            # no asynchronous command being started, see Extension.async_cmd_check
+            self.async_cmd_info = False
+        else:
+            # environment for installation command must only be set up while starting it
+            old_values = self.prepare_install_env()
+            cmd = self.compose_install_command(self.installdir)
+            self.async_cmd_start(cmd)
+            self.restore_install_env(old_values)
+
+    def async_cmd_check(self):
+        """
+        Check progress of installation command that was started asynchronously.
+
+        Post-installation actions are taken on completion.
+
+        :return: True if command completed, False otherwise
+        """
+        started = bool(self.async_cmd_info)
+        done = super(PythonPackage, self).async_cmd_check()
+        if done and started:
+            self.post_install(self.async_cmd_output)
+
+        return done
+
     def load_module(self, *args, **kwargs):
         """
         Make sure that $PYTHONNOUSERSITE is defined after loading module file for this software."""
@@ -1068,7 +1824,23 @@ class PythonPackage(ExtensionEasyBlock):
 
                     pip_check_errors = []
 
-                    pip_check_msg, ec = run_cmd(pip_check_command, log_ok=False)
+                    # metadata of installed Python packages is scanned only once, and used both to check
+                    # whether all requirements are met (like `pip check`) and to check versions (like `pip list`)
+                    dists = det_installed_python_packages(python_cmd)
+                    marker_env = det_python_facts(python_cmd)['marker_env']
+                    if marker_env is None:
+                        unmet_reqs = None
+                    else:
+                        unmet_reqs = det_unmet_python_requirements(dists, marker_env)
+                    if unmet_reqs is None:
+                        self.log.info("Can't check requirements of installed Python packages, running `%s`",
+                                      pip_check_command)
+                        pip_check_msg, ec = run_cmd(pip_check_command, log_ok=False)
+                    elif unmet_reqs:
+                        pip_check_msg, ec = '\n'.join(unmet_reqs), 1
+                    else:
+                        pip_check_msg, ec = "No broken requirements found.", 0
+
                     if ec:
                         pip_check_errors.append('`%s` failed:\n%s' % (pip_check_command, pip_check_msg))
                     else:
@@ -1078,7 +1850,7 @@ class PythonPackage(ExtensionEasyBlock):
                     # by using setup.py as the installation method for a package which is released as a generic wheel
                     # named name-version-py2.py3-none-any.whl. `tox` creates those from version controlled source code
                     # so it will contain a version, but the raw tar.gz does not.
-                    pkgs = self.get_installed_python_packages(names_only=False, python_cmd=python_cmd)
+                    pkgs = [{'name': dist['name'], 'version': dist['version']} for dist in dists]
                     faulty_version = '0.0.0'
                     faulty_pkg_names = [pkg['name'] for pkg in pkgs if pkg['version'] == faulty_version]
 
@@ -1125,7 +1897,27 @@ class PythonPackage(ExtensionEasyBlock):
             self.clean_up_fake_module(self.fake_mod_data)
             self.sanity_check_module_loaded = False
 
-        parent_success, parent_fail_msg = super(PythonPackage, self).sanity_check_step(*args, **kwargs)
+        if self.import_check_result is None:
+            parent_success, parent_fail_msg = super(PythonPackage, self).sanity_check_step(*args, **kwargs)
+        else:
+            # import was already checked together with other extensions,
+            # so only take into account the result, using the same error message as the extensions filter would
+            cmd, ec, output = self.import_check_result
+            if ec:
+                import_fail_msg = 'command "%s" failed; output:\n%s' % (cmd, output.strip())
+                self.log.warning("Sanity check for '%s' extension failed: %s", self.name, import_fail_msg)
+                self.sanity_check_fail_msgs.append(import_fail_msg)
+                success = False
+            else:
+                self.log.info("Import check for '%s' extension passed: %s", self.name, cmd)
+
+            # disable extensions filter temporarily, to avoid that import is checked again
+            modulename = self.options['modulename']
+            self.options['modulename'] = False
+            try:
+                parent_success, parent_fail_msg = super(PythonPackage, self).sanity_check_step(*args, **kwargs)
+            finally:
+                self.options['modulename'] = modulename
 
         if parent_fail_msg:
             parent_fail_msg += ', '
@@ -1171,3 +1963,50 @@ class PythonPackage(ExtensionEasyBlock):
                     txt += self.module_generator.prepend_paths('PYTHONPATH', path)
 
         return super(PythonPackage, self).make_module_extra(txt, *args, **kwargs)
+
+
+class WheelCache(SharedCache):
+    """
+    Cache of wheels built for Python packages, that is shared across installations.
+
+    Each entry is a directory named after the key for the Python package (see PythonPackage.wheel_cache_key_for),
+    which contains a single wheel.
+    """
+
+    def lookup(self, key):
+        """
+        Look up wheel for specified key in cache.
+
+        :return: path to cached wheel, or None if no wheel is available for specified key
+        """
+        entry_path = self.entry_path(key)
+        wheels = glob.glob(os.path.join(entry_path, '*.whl'))
+        if len(wheels) == 1:
+            self.touch(entry_path)
+            res = wheels[0]
+        else:
+            self.log.debug("No wheel found in cache of wheels for key %s", key)
+            res = None
+        return res
+
+    def add(self, key, wheel_dir):
+        """
+        Add wheel that was built in specified directory to cache, using specified key.
+        """
+        wheels = glob.glob(os.path.join(wheel_dir, '*.whl'))
+        if len(wheels) != 1:
+            self.log.warning("Expected a single wheel in %s, found %s; not adding anything to cache of wheels",
+                             wheel_dir, wheels)
+            return
+
+        self.log.info("Adding wheel %s to cache of wheels using key %s", wheels[0], key)
+        tmp_dir = self.mk_tmp_entry(is_dir=True)
+        try:
+            copy_file(wheels[0], tmp_dir)
+            adjust_permissions(os.path.join(tmp_dir, os.path.basename(wheels[0])), SHARED_CACHE_FILE_PERMS, add=True)
+        except BaseException:
+            remove_dir(tmp_dir)
+            raise
+
+        # wheel may have been added to the cache concurrently
+        self.commit_entry(tmp_dir, key)
@@ -34,6 +34,7 @@ EasyBuild support for building and installing R packages, implemented as an easy
 """
 import os
 import re
+import tarfile
 
 from easybuild.easyblocks.r import EXTS_FILTER_R_PACKAGES, EB_R
 from easybuild.easyblocks.generic.configuremake import check_config_guess, obtain_config_guess
@@ -42,9 +43,80 @@ from easybuild.framework.extensioneasyblock import ExtensionEasyBlock
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.environment import setvar
 from easybuild.tools.filetools import mkdir, copy_file
+from easybuild.tools.py2vs3 import string_type
 from easybuild.tools.run import run_cmd, parse_log_for_error
 
 
+# fields in DESCRIPTION file of R packages that specify required dependencies
+R_PKG_DEPS_FIELDS = ['Depends', 'Imports', 'LinkingTo']
+R_PKG_DESCRIPTION_FIELD_REGEX = re.compile(r'^(?P<field>[A-Za-z0-9._@/-]+):\s*(?P<value>.*)$')
+# version requirements for dependencies are specified between brackets, e.g. 'Rcpp (>= 0.11.0)'
+R_PKG_DEP_VERSION_REGEX = re.compile(r'\(.*$')
+
+# cache for required dependencies of R packages, with (source tarball key, package name) as key, see src_cache_key
+_r_pkg_deps_cache = {}
+
+
+def parse_r_pkg_description(txt):
+    """
+    Parse contents of DESCRIPTION file of an R package.
+
+    :return: dict with fields as keys and (stripped) values as values
+    """
+    fields = {}
+    field = None
+    for line in txt.splitlines():
+        # lines that start with whitespace are continuation lines of the previous field
+        if line[:1] in (' ', '\t'):
+            if field:
+                fields[field] += line
+        else:
+            res = R_PKG_DESCRIPTION_FIELD_REGEX.match(line)
+            if res:
+                field = res.group('field')
+                fields[field] = res.group('value')
+            else:
+                field = None
+
+    return dict((key, value.strip()) for (key, value) in fields.items())
+
+
+def det_r_pkg_deps(fields, name=None):
+    """
+    Determine names of required dependencies for R package, based on (parsed) DESCRIPTION file.
+    """
+    deps = []
+    for field in R_PKG_DEPS_FIELDS:
+        for dep in fields.get(field, '').split(','):
+            dep = R_PKG_DEP_VERSION_REGEX.sub('', dep).strip()
+            if dep not in ('', 'R', name) and dep not in deps:
+                deps.append(dep)
+    return deps
+
+
+def read_r_pkg_description(path, name):
+    """
+    Read DESCRIPTION file for R package with specified name from source tarball at specified path.
+
+    The tarball is read as a stream, and reading stops as soon as the DESCRIPTION file
+    for the specified R package is found (tarballs may include DESCRIPTION files for other packages too).
+
+    :return: dict with fields of DESCRIPTION file, or None if no DESCRIPTION file was found for the R package
+    """
+    try:
+        with tarfile.open(path, 'r|*') as tar:
+            for member in tar:
+                if member.isfile() and member.name.endswith('/DESCRIPTION'):
+                    txt = tar.extractfile(member).read().decode('utf-8', 'replace')
+                    fields = parse_r_pkg_description(txt)
+                    if fields.get('Package') == name:
+                        return fields
+    except (IOError, OSError, tarfile.TarError) as err:
+        raise EasyBuildError("Failed to read DESCRIPTION file for R package %s from %s: %s", name, path, err)
+
+    return None
+
+
 def make_R_install_option(opt, values, cmdline=False):
     """
     Make option list for install.packages, to specify in R environment.
@@ -210,51 +282,32 @@ class RPackage(ExtensionEasyBlock):
         cmd, stdin = self.make_cmdline_cmd(prefix=os.path.join(self.installdir, self.cfg['exts_subdir']))
         self.install_R_package(cmd, inp=stdin)
 
+    def src_cache_key(self):
+        """
+        Return key for source tarball of this R package, to use in cache of required dependencies:
+        SHA256 checksum specified in easyconfig (which was already verified) if available, path to source tarball
+        otherwise (source tarball is not hashed just to obtain a key).
+        """
+        checksums = self.ext.get('checksums') if isinstance(self.ext, dict) else None
+        checksum = checksums[0] if checksums else None
+        if isinstance(checksum, string_type) and len(checksum) == 64:
+            key = checksum
+        else:
+            key = self.src
+        return key
+
     @property
     def required_deps(self):
         """Return list of required dependencies for this extension."""
 
         if self._required_deps is None:
             if self.src:
-                cmd = "tar --wildcards --extract --file %s --to-stdout '*/DESCRIPTION'" % self.src
-                out, _ = run_cmd(cmd, simple=False, trace=False)
-
-                # lines that start with whitespace are merged with line above
-                lines = []
-                for line in out.splitlines():
-                    if line and line[0] in (' ', '\t'):
-                        lines[-1] = lines[-1] + line
-                    else:
-                        lines.append(line)
-                out = '\n'.join(lines)
-
-                pkg_key = 'Package:'
-                deps_map = {}
-                deps = []
-                pkg = None
-
-                for line in out.splitlines():
-                    if pkg_key in line:
-                        if pkg is not None:
-                            deps = []
-
-                        pkg_name_regex = re.compile(r'Package:\s*([^ ]+)')
-                        res = pkg_name_regex.search(line)
-                        if res:
-                            pkg = res.group(1)
-                            if pkg in deps_map:
-                                deps = deps_map[pkg]
-                        else:
-                            raise EasyBuildError("Failed to determine package name from line '%s'", line)
-
-                        deps_map[pkg] = deps
-
-                    elif any(line.startswith(x) for x in ('Depends:', 'Imports:', 'LinkingTo:')):
-                        # entries may specify version requirements between brackets (which we don't care about here)
-                        dep_names = [x.split('(')[0].strip() for x in line.split(':', 1)[1].split(',')]
-                        deps.extend([d for d in dep_names if d not in ('', 'R', self.name)])
-
-                self._required_deps = deps_map.get(self.name, [])
+                key = (self.src_cache_key(), self.name)
+                if key not in _r_pkg_deps_cache:
+                    fields = read_r_pkg_description(self.src, self.name)
+                    _r_pkg_deps_cache[key] = det_r_pkg_deps(fields or {}, name=self.name)
+
+                self._required_deps = _r_pkg_deps_cache[key][:]
                 self.log.info("Required dependencies for %s: %s", self.name, self._required_deps)
             else:
                 # no source => no required dependencies assumed
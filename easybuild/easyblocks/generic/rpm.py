@@ -38,6 +38,7 @@ import os
 import re
 import tempfile
 from easybuild.tools import LooseVersion
+from multiprocessing.pool import ThreadPool
 from os.path import expanduser
 
 import easybuild.tools.environment as env
@@ -45,15 +46,15 @@ from easybuild.base import fancylogger
 from easybuild.easyblocks.generic.binary import Binary
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.filetools import change_dir, mkdir, symlink, which
+from easybuild.tools.filetools import change_dir, mkdir, remove_dir, symlink, which
 from easybuild.tools.run import run_cmd
 
 
 _log = fancylogger.getLogger('easyblocks.generic.rpm')
 
 
-def rebuild_rpm(rpm_path, targetdir):
-    """Rebuild the RPM on the specified location, to make it relocatable."""
+def check_rpmrebuild():
+    """Check whether RPMs can be rebuilt using rpmrebuild."""
     # make sure that rpmrebuild command is available
     if not which('rpmrebuild'):
         raise EasyBuildError("Command 'rpmrebuild' is required but not available. " +
@@ -63,6 +64,36 @@ def rebuild_rpm(rpm_path, targetdir):
     if os.path.exists(rpmmacros):
         raise EasyBuildError("rpmmacros file %s found which will override any other settings, so exiting.", rpmmacros)
 
+
+def rebuild_rpm_cmd(rpm_path, targetdir, tmpdir=None):
+    """
+    Compose command to rebuild the RPM on the specified location, to make it relocatable.
+
+    :param rpm_path: path to RPM to rebuild
+    :param targetdir: directory in which rebuilt RPM should be stored
+    :param tmpdir: temporary directory to use for rpmrebuild (value for $RPMREBUILD_TMPDIR in command)
+    """
+    cmd = [
+        "rpmrebuild -v",
+        # replace whathever prefix is set with '/'
+        r"""--change-spec-whole='sed -e "s/^Prefix:.*/Prefix: \//"'""",
+        # comment out any specifications that involve relative file path (starting with '.') (??)
+        r"""--change-spec-whole='sed -e "s/^\(.*:[ ]\+\..*\)/#ERROR \1/"'""",
+        "--notest-install",
+        "-p -d",
+        targetdir,
+        rpm_path,
+    ]
+    if tmpdir:
+        cmd.insert(0, "RPMREBUILD_TMPDIR=%s" % tmpdir)
+
+    return ' '.join(cmd)
+
+
+def rebuild_rpm(rpm_path, targetdir):
+    """Rebuild the RPM on the specified location, to make it relocatable."""
+    check_rpmrebuild()
+
     rpmrebuild_tmpdir = os.path.join(tempfile.gettempdir(), "rpmrebuild")
     env.setvar("RPMREBUILD_TMPDIR", rpmrebuild_tmpdir)
 
@@ -77,18 +108,7 @@ def rebuild_rpm(rpm_path, targetdir):
         raise EasyBuildError("Failed to create directories for rebuilding RPM: %s", err)
 
     _log.debug("Rebuilding %s in %s to make it relocatable" % (rpm_path, targetdir))
-    cmd = ' '.join([
-        "rpmrebuild -v",
-        # replace whathever prefix is set with '/'
-        r"""--change-spec-whole='sed -e "s/^Prefix:.*/Prefix: \//"'""",
-        # comment out any specifications that involve relative file path (starting with '.') (??)
-        r"""--change-spec-whole='sed -e "s/^\(.*:[ ]\+\..*\)/#ERROR \1/"'""",
-        "--notest-install",
-        "-p -d",
-        targetdir,
-        rpm_path,
-    ])
-    run_cmd(cmd, log_all=True, simple=True)
+    run_cmd(rebuild_rpm_cmd(rpm_path, targetdir), log_all=True, simple=True)
 
 
 class Rpm(Binary):
@@ -164,9 +184,42 @@ class Rpm(Binary):
     # when installing RPMs under a non-default path for e.g. SL6,
     # --relocate doesn't seem to work (error: Unable to change root directory: Operation not permitted)
     def rebuild_rpms(self):
-        """Rebuild RPMs to make relocation work."""
-        for rpm in self.src:
-            rebuild_rpm(rpm['path'], targetdir=self.builddir)
+        """
+        Rebuild RPMs to make relocation work;
+        RPMs are rebuilt concurrently (up to 'parallel' at a time), each with its own $RPMREBUILD_TMPDIR.
+        """
+        check_rpmrebuild()
+
+        rpm_paths = [rpm['path'] for rpm in self.src]
+        if rpm_paths:
+            workers = max(1, min(self.cfg['parallel'] or 1, len(rpm_paths)))
+            self.log.info("Rebuilding %d RPMs in %s to make them relocatable, using %d workers",
+                          len(rpm_paths), self.builddir, workers)
+
+            # separate temporary directory for each rpmrebuild command,
+            # since concurrent rpmrebuild commands sharing $RPMREBUILD_TMPDIR step on each other's toes
+            tmpdirs = [tempfile.mkdtemp(prefix='rpmrebuild-') for _ in rpm_paths]
+            cmds = [rebuild_rpm_cmd(path, self.builddir, tmpdir=tmpdir) for path, tmpdir in zip(rpm_paths, tmpdirs)]
+
+            def run_rebuild_cmd(cmd):
+                """Run rpmrebuild command, return output and exit code."""
+                return run_cmd(cmd, log_all=False, log_ok=False, simple=False, path=self.builddir)
+
+            start_dir = os.getcwd()
+            pool = ThreadPool(workers)
+            try:
+                res = pool.map(run_rebuild_cmd, cmds)
+            finally:
+                pool.close()
+                pool.join()
+                change_dir(start_dir)
+                for tmpdir in tmpdirs:
+                    remove_dir(tmpdir)
+
+            failed = [(path, ec, out) for path, (out, ec) in zip(rpm_paths, res) if ec]
+            if failed:
+                msg = '\n'.join("* %s (exit code %s):\n%s" % fail for fail in failed)
+                raise EasyBuildError("Rebuilding %d RPM(s) failed:\n%s", len(failed), msg)
 
         self.oldsrc = self.src
         self.src = []
@@ -200,26 +253,26 @@ class Rpm(Binary):
 
         if self.rebuild_rpm:
             cmd_tpl = "%(preinstallopts)s rpm -i --dbpath %(inst)s/rpm %(force)s --relocate /=%(inst)s " \
-                      "%(pre)s %(post)s --nodeps --ignorearch %(rpm)s %(installopts)s"
+                      "%(pre)s %(post)s --nodeps --ignorearch %(rpms)s %(installopts)s"
         else:
             cmd_tpl = "%(preinstallopts)s rpm -i --dbpath /rpm %(force)s --root %(inst)s --relocate /=%(inst)s " \
-                      "%(pre)s %(post)s --nodeps %(rpm)s %(installopts)s"
+                      "%(pre)s %(post)s --nodeps %(rpms)s %(installopts)s"
 
         # exception for user root:
         # --relocate is not necessary -> --root will relocate more than enough
-        # cmd_tpl = "rpm -i --dbpath /rpm %(force)s --root %(inst)s %(pre)s %(post)s --nodeps %(rpm)s"
-
-        for rpm in self.src:
-            cmd = cmd_tpl % {
-                'preinstallopts': self.cfg['preinstallopts'],
-                'inst': self.installdir,
-                'rpm': rpm['path'],
-                'force': force,
-                'pre': preinstall,
-                'post': postinstall,
-                'installopts': self.cfg['installopts'],
-            }
-            run_cmd(cmd, log_all=True, simple=True)
+        # cmd_tpl = "rpm -i --dbpath /rpm %(force)s --root %(inst)s %(pre)s %(post)s --nodeps %(rpms)s"
+
+        # install all RPMs in a single transaction
+        cmd = cmd_tpl % {
+            'preinstallopts': self.cfg['preinstallopts'],
+            'inst': self.installdir,
+            'rpms': ' '.join(rpm['path'] for rpm in self.src),
+            'force': force,
+            'pre': preinstall,
+            'post': postinstall,
+            'installopts': self.cfg['installopts'],
+        }
+        run_cmd(cmd, log_all=True, simple=True)
 
         for path in self.cfg['makesymlinks']:
             # allow globs, always use first hit.
@@ -40,14 +40,17 @@ import os
 import shutil
 import tempfile
 from easybuild.tools import LooseVersion
+from multiprocessing.pool import ThreadPool
 
-import easybuild.tools.environment as env
 import easybuild.tools.toolchain as toolchain
+from easybuild.easyblocks.blasbenchmark import BLAS_LAPACK_BENCHMARK_EXTRA_OPTIONS
+from easybuild.easyblocks.blasbenchmark import blas_lapack_benchmark, load_blas_lapack_benchmarks
 from easybuild.easyblocks.generic.intelbase import IntelBase, ACTIVATION_NAME_2012, LICENSE_FILE_NAME_2012
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import build_option
-from easybuild.tools.filetools import apply_regex_substitutions, change_dir, mkdir, move_file, remove_dir, write_file
+from easybuild.tools.filetools import apply_regex_substitutions, change_dir, copy_dir, mkdir, move_file, remove_dir
+from easybuild.tools.filetools import write_file
 from easybuild.tools.modules import get_software_root
 from easybuild.tools.run import run_cmd
 from easybuild.tools.systemtools import get_shared_lib_ext
@@ -68,6 +71,7 @@ class EB_imkl(IntelBase):
             'flexiblas': [None, "Indicates whether FlexiBLAS-compatible libraries should be built, "
                           "default from version 2021", CUSTOM],
         }
+        extra_vars.update(BLAS_LAPACK_BENCHMARK_EXTRA_OPTIONS)
         return IntelBase.extra_options(extra_vars)
 
     def __init__(self, *args, **kwargs):
@@ -78,6 +82,7 @@ class EB_imkl(IntelBase):
         self.cfg.update('unwanted_env_vars', ['MKLROOT'])
         self.cdftlibs = []
         self.mpi_spec = None
+        self.prev_blas_lapack_benchmarks = None
 
         if self.cfg['flexiblas'] is None:
             self.cfg['flexiblas'] = LooseVersion(self.version) >= LooseVersion('2021')
@@ -140,6 +145,10 @@ class EB_imkl(IntelBase):
             else:
                 self.log.debug("No MPI or no compatible MPI found: do not build CDFT")
 
+        # collect benchmark results for previous installations, before installation directory is (re)created
+        if self.cfg['blas_lapack_benchmark'] and self.prev_blas_lapack_benchmarks is None:
+            self.prev_blas_lapack_benchmarks = load_blas_lapack_benchmarks(self.installdir)
+
     def install_step(self):
         """
         Actual installation
@@ -250,11 +259,13 @@ class EB_imkl(IntelBase):
             for liball in glob.glob(os.path.join(interfacedir, '*', 'makefile')):
                 apply_regex_substitutions(liball, regex_nvc_subs)
 
+        # compose matrix of builds: one for each combination of library, precision, interface and flags;
+        # each build is done in a copy of the interface directory, with its own environment,
+        # so they can be run concurrently
+        builds = []
         for lib in fftw2libs + fftw3libs + self.cdftlibs:
             buildopts = [compopt]
-            if lib in fftw3libs:
-                buildopts.append('install_to=$INSTALL_DIR')
-            elif lib in self.cdftlibs:
+            if lib in self.cdftlibs:
                 if self.mpi_spec is not None:
                     buildopts.append('mpi=%s' % self.mpi_spec)
 
@@ -272,11 +283,16 @@ class EB_imkl(IntelBase):
 
             for flags, extraopts in itertools.product(['', '-fPIC'], allopts):
                 tup = (lib, flags, buildopts, extraopts)
-                self.log.debug("Building lib %s with: flags %s, buildopts %s, extraopts %s" % tup)
+                self.log.debug("Composing build for lib %s with: flags %s, buildopts %s, extraopts %s" % tup)
 
                 tmpbuild = tempfile.mkdtemp(dir=self.builddir)
                 self.log.debug("Created temporary directory %s" % tmpbuild)
 
+                # copy of interface directory must be at the same depth, since makefiles use relative paths
+                workdir = os.path.join(interfacedir, '.%s-eb-%d' % (lib, len(builds)))
+                remove_dir(workdir)
+                copy_dir(os.path.join(interfacedir, lib), workdir)
+
                 # Avoid unused command line arguments (-Wl,rpath...) causing errors when using RPATH
                 # See https://github.com/easybuilders/easybuild-easyconfigs/pull/18439#issuecomment-1662671054
                 if build_option('rpath') and os.getenv('CC') in ('icx', 'clang'):
@@ -288,32 +304,73 @@ class EB_imkl(IntelBase):
                 # fftw2x(c|f): use $INSTALL_DIR, $CFLAGS and $COPTS
                 # fftw3x(c|f): use $CFLAGS
                 # fftw*cdft: use $INSTALL_DIR and $SPEC_OPT
-                env.setvar('INSTALL_DIR', tmpbuild)
-                env.setvar('SPEC_OPT', flags)
-                env.setvar('COPTS', flags)
-                env.setvar('CFLAGS', cflags)
-
-                intdir = os.path.join(interfacedir, lib)
-                change_dir(intdir)
-                self.log.info("Changed to interface %s directory %s", lib, intdir)
-
-                fullcmd = "%s %s" % (cmd, ' '.join(buildopts + extraopts))
-                res = run_cmd(fullcmd, log_all=True, simple=True)
-                if not res:
-                    raise EasyBuildError("Building %s (flags: %s, fullcmd: %s) failed", lib, flags, fullcmd)
-
-                for fn in os.listdir(tmpbuild):
-                    src = os.path.join(tmpbuild, fn)
-                    if flags == '-fPIC':
-                        # add _pic to filename
-                        ff = fn.split('.')
-                        fn = '.'.join(ff[:-1]) + '_pic.' + ff[-1]
-                    dest = os.path.join(libdir, fn)
-                    if os.path.isfile(src):
-                        move_file(src, dest)
-                        self.log.info("Moved %s to %s", src, dest)
-
-                remove_dir(tmpbuild)
+                build_env = [
+                    ('INSTALL_DIR', tmpbuild),
+                    ('SPEC_OPT', flags),
+                    ('COPTS', flags),
+                    ('CFLAGS', cflags),
+                ]
+                opts = buildopts + extraopts
+                if lib in fftw3libs:
+                    opts.append('install_to=%s' % tmpbuild)
+
+                build_env = ' '.join("%s='%s'" % x for x in build_env)
+                fullcmd = "cd %s && %s %s %s" % (workdir, build_env, cmd, ' '.join(opts))
+                builds.append({
+                    'lib': lib,
+                    'flags': flags,
+                    'cmd': fullcmd,
+                    'tmpbuild': tmpbuild,
+                    'workdir': workdir,
+                })
+
+        self.run_mkl_interface_builds(builds)
+
+        # collect resulting libraries, in the same order as the builds were composed
+        for build in builds:
+            tmpbuild = build['tmpbuild']
+            for fn in os.listdir(tmpbuild):
+                src = os.path.join(tmpbuild, fn)
+                if build['flags'] == '-fPIC':
+                    # add _pic to filename
+                    ff = fn.split('.')
+                    fn = '.'.join(ff[:-1]) + '_pic.' + ff[-1]
+                dest = os.path.join(libdir, fn)
+                if os.path.isfile(src):
+                    move_file(src, dest)
+                    self.log.info("Moved %s to %s", src, dest)
+
+            remove_dir(tmpbuild)
+
+    def run_mkl_interface_builds(self, builds):
+        """
+        Run builds for Intel MKL interfaces concurrently, using at most 'parallel' workers.
+
+        :param builds: list of builds, each a dict with build command ('cmd') and work directory ('workdir')
+        """
+        if not builds:
+            return
+
+        workers = max(1, min(self.cfg['parallel'] or 1, len(builds)))
+        self.log.info("Building %d variants of Intel MKL interfaces using %d workers", len(builds), workers)
+
+        def run_build(build):
+            """Run build command, return output and exit code."""
+            return run_cmd(build['cmd'], log_all=False, log_ok=False, simple=False)
+
+        pool = ThreadPool(workers)
+        try:
+            res = pool.map(run_build, builds)
+        finally:
+            pool.close()
+            pool.join()
+            for build in builds:
+                remove_dir(build['workdir'])
+
+        for build, (out, ec) in zip(builds, res):
+            if ec:
+                raise EasyBuildError("Building %s (flags: %s, fullcmd: %s) failed with exit code %s, output:\n%s",
+                                     build['lib'], build['flags'], build['cmd'], ec, out)
 
     def build_mkl_flexiblas(self, flexiblasdir):
         """
@@ -408,6 +465,14 @@ class EB_imkl(IntelBase):
         if self.cfg['flexiblas']:
             self.build_mkl_flexiblas(os.path.join(self.installdir, libdir, 'flexiblas'))
 
+        # run BLAS/LAPACK micro-benchmark, using GNU OpenMP threading layer (only requires a GCC-compatible compiler)
+        if loosever >= LooseVersion('10.3') and not self.cfg['m32']:
+            mkl_libs = ['mkl_gf_lp64', 'mkl_gnu_thread', 'mkl_core', 'gomp', 'pthread', 'm', 'dl']
+            link_opts = '-L%s -Wl,-rpath,%s ' % (libdir, libdir) + ' '.join('-l' + lib for lib in mkl_libs)
+            blas_lapack_benchmark(self, link_opts)
+        else:
+            self.log.info("Not running BLAS/LAPACK benchmark for Intel MKL %s", self.version)
+
     def get_mkl_fftw_interface_libs(self):
         """Returns list of library names produced by build_mkl_fftw_interfaces()"""
 
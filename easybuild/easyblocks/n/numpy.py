@@ -34,15 +34,16 @@ EasyBuild support for building and installing numpy, implemented as an easyblock
 import glob
 import os
 import re
-import tempfile
 
 import easybuild.tools.environment as env
 import easybuild.tools.toolchain as toolchain
+from easybuild.easyblocks.blasbenchmark import BENCHMARK_THREADS_DESCR, BLAS_BENCHMARK_SIZES, blas_benchmark
 from easybuild.easyblocks.generic.fortranpythonpackage import FortranPythonPackage
 from easybuild.easyblocks.generic.pythonpackage import det_pylibdir
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools.build_log import EasyBuildError
-from easybuild.tools.filetools import change_dir, mkdir, read_file, remove_dir
+from easybuild.tools.config import build_option
+from easybuild.tools.filetools import change_dir, read_file, remove_dir
 from easybuild.tools.modules import get_software_root
 from easybuild.tools.run import run_cmd
 from easybuild.tools import LooseVersion
@@ -55,7 +56,18 @@ class EB_numpy(FortranPythonPackage):
     def extra_options():
         """Easyconfig parameters specific to numpy."""
         extra_vars = ({
-            'blas_test_time_limit': [500, "Time limit (in ms) for 1000x1000 matrix dot product BLAS test", CUSTOM],
+            'blas_benchmark': [True, "Run BLAS micro-benchmark (matrix-matrix/matrix-vector product, FFT) "
+                                     "with installed numpy during sanity check; results are stored in JSON format "
+                                     "in easybuild subdirectory of installation directory", CUSTOM],
+            'blas_benchmark_min_efficiency': [None, "Minimal performance for matrix-matrix product in BLAS "
+                                                    "micro-benchmark, as fraction of estimated peak performance "
+                                                    "of CPU cores being used (if None: only logged)", CUSTOM],
+            'blas_benchmark_sizes': [None, "Matrix sizes to use in BLAS micro-benchmark "
+                                           "(if None: %s)" % BLAS_BENCHMARK_SIZES, CUSTOM],
+            'blas_benchmark_threads': [None, "Thread counts to use in BLAS micro-benchmark "
+                                             "(if None: %s)" % BENCHMARK_THREADS_DESCR, CUSTOM],
+            'blas_test_time_limit': [500, "Time limit (in ms) for 1000x1000 matrix-matrix product "
+                                          "in BLAS micro-benchmark, using most threads", CUSTOM],
             'ignore_test_result': [False, "Run numpy test suite, but ignore test result (only log)", CUSTOM],
         })
         return FortranPythonPackage.extra_options(extra_vars=extra_vars)
@@ -260,64 +272,6 @@ class EB_numpy(FortranPythonPackage):
 
         super(EB_numpy, self).test_step()
 
-        # temporarily install numpy, it doesn't alow to be used straight from the source dir
-        tmpdir = tempfile.mkdtemp()
-        abs_pylibdirs = [os.path.join(tmpdir, pylibdir) for pylibdir in self.all_pylibdirs]
-        for pylibdir in abs_pylibdirs:
-            mkdir(pylibdir, parents=True)
-        pythonpath = "export PYTHONPATH=%s &&" % os.pathsep.join(abs_pylibdirs + ['$PYTHONPATH'])
-        cmd = self.compose_install_command(tmpdir, extrapath=pythonpath)
-        run_cmd(cmd, log_all=True, simple=True, verbose=False)
-
-        try:
-            pwd = os.getcwd()
-            os.chdir(tmpdir)
-        except OSError as err:
-            raise EasyBuildError("Faild to change to %s: %s", tmpdir, err)
-
-        # evaluate performance of numpy.dot (3 runs, 3 loops each)
-        size = 1000
-        cmd = ' '.join([
-            pythonpath,
-            '%s -m timeit -n 3 -r 3' % self.python_cmd,
-            '-s "import numpy; x = numpy.random.random((%(size)d, %(size)d))"' % {'size': size},
-            '"numpy.dot(x, x.T)"',
-        ])
-        (out, ec) = run_cmd(cmd, simple=False)
-        self.log.debug("Test output: %s" % out)
-
-        # fetch result
-        time_msec = None
-        msec_re = re.compile(r"\d+ loops, best of \d+: (?P<time>[0-9.]+) msec per loop")
-        res = msec_re.search(out)
-        if res:
-            time_msec = float(res.group('time'))
-        else:
-            sec_re = re.compile(r"\d+ loops, best of \d+: (?P<time>[0-9.]+) sec per loop")
-            res = sec_re.search(out)
-            if res:
-                time_msec = 1000 * float(res.group('time'))
-            elif self.dry_run:
-                # use fake value during dry run
-                time_msec = 123
-                self.log.warning("Using fake value for time required for %dx%d matrix dot product under dry run: %s",
-                                 size, size, time_msec)
-            else:
-                raise EasyBuildError("Failed to determine time for numpy.dot test run.")
-
-        # make sure we observe decent performance
-        if time_msec < self.cfg['blas_test_time_limit']:
-            self.log.info("Time for %dx%d matrix dot product: %d msec < %d msec => OK",
-                          size, size, time_msec, self.cfg['blas_test_time_limit'])
-        else:
-            raise EasyBuildError("Time for %dx%d matrix dot product: %d msec >= %d msec => ERROR",
-                                 size, size, time_msec, self.cfg['blas_test_time_limit'])
-        try:
-            os.chdir(pwd)
-            remove_dir(tmpdir)
-        except OSError as err:
-            raise EasyBuildError("Failed to change back to %s: %s", pwd, err)
-
     def install_step(self):
         """Install numpy and remove numpy build dir, so scipy doesn't find it by accident."""
         super(EB_numpy, self).install_step()
@@ -388,8 +342,34 @@ class EB_numpy(FortranPythonPackage):
             # _dotblas is required for decent performance of numpy.dot(), but only there in numpy 1.9.x and older
             custom_commands.append("python -c 'import numpy.core._dotblas'")
 
+        if self.cfg['blas_benchmark'] and not self.dry_run and not build_option('module_only'):
+            self.sanity_check_blas_benchmark(**kwargs)
+
         return super(EB_numpy, self).sanity_check_step(custom_paths=custom_paths, custom_commands=custom_commands)
 
+    def sanity_check_blas_benchmark(self, **kwargs):
+        """Evaluate BLAS performance of installed numpy, using BLAS micro-benchmark."""
+        if self.multi_python:
+            self.log.info("Not running BLAS benchmark for numpy installation for multiple Python versions")
+            return
+
+        # numpy installation must be available to run benchmark, so load module early
+        if hasattr(self, 'sanity_check_module_loaded') and not self.sanity_check_module_loaded:
+            extension = self.is_extension or kwargs.get('extension', False)
+            extra_modules = kwargs.get('extra_modules', None)
+            self.fake_mod_data = self.sanity_check_load_module(extension=extension, extra_modules=extra_modules)
+
+        if self.python_cmd is None:
+            self.prepare_python()
+
+        fails = blas_benchmark(self, self.python_cmd, sizes=self.cfg['blas_benchmark_sizes'],
+                               threads=self.cfg['blas_benchmark_threads'],
+                               min_efficiency=self.cfg['blas_benchmark_min_efficiency'],
+                               time_limit=self.cfg['blas_test_time_limit'])
+        for fail in fails:
+            self.log.warning("Sanity check: %s", fail)
+        self.sanity_check_fail_msgs.extend(fails)
+
     def make_module_extra_numpy_include(self):
         """
         Return update statements for $CPATH specifically for numpy
@@ -7,17 +7,87 @@ EasyBuild support for building and installing OpenBLAS, implemented as an easybl
 """
 import os
 import re
+from multiprocessing.pool import ThreadPool
 from easybuild.tools import LooseVersion
+from easybuild.easyblocks.blasbenchmark import BLAS_LAPACK_BENCHMARK_EXTRA_OPTIONS
+from easybuild.easyblocks.blasbenchmark import blas_lapack_benchmark, load_blas_lapack_benchmarks
 from easybuild.easyblocks.generic.configuremake import ConfigureMake
 from easybuild.framework.easyconfig import CUSTOM
 from easybuild.tools.systemtools import POWER, get_cpu_architecture, get_shared_lib_ext
 from easybuild.tools.build_log import EasyBuildError, print_warning
 from easybuild.tools.config import ERROR
+from easybuild.tools.filetools import mkdir
 from easybuild.tools.run import run_cmd, check_log_for_errors
 
 LAPACK_TEST_TARGET = 'lapack-test'
 TARGET = 'TARGET'
 
+# shards in which LAPACK test drivers are run via lapack_testing.py: (precision, routine family);
+# eigenvalue tests take longest, so they are started first
+LAPACK_TEST_SHARDS = [(prec, 'eig') for prec in 'sdcz'] + [(prec, 'lin') for prec in 'sdcz']
+LAPACK_TEST_SHARDS += [(prec, 'rfp') for prec in 'sdcz'] + [('d', 'mixed'), ('z', 'mixed')]
+
+# example:
+#                         -->   LAPACK TESTING SUMMARY  <--
+# SUMMARY                 nb test run     numerical error         other error
+# ================        ===========     =================       ================
+# REAL                    1327023         0       (0.000%)        0       (0.000%)
+# ...
+# --> ALL PRECISIONS      4116982         4172    (0.101%)        0       (0.000%)
+LAPACK_TEST_SUMMARY_PATTERN = r'\s+'.join([
+    r"^(?P<label>--> ALL PRECISIONS|REAL|DOUBLE PRECISION|COMPLEX|COMPLEX16)",
+    r"(?P<test_cnt>[0-9]+)",
+    r"(?P<test_fail_num_error>[0-9]+)\s+\([0-9.]+\%\)",
+    r"(?P<test_fail_other_error>[0-9]+)\s+\([0-9.]+\%\)",
+])
+LAPACK_TEST_SUMMARY_REGEX = re.compile(LAPACK_TEST_SUMMARY_PATTERN)
+
+
+def parse_lapack_test_output(lines):
+    """
+    Parse output of LAPACK test suite one line at a time, so it doesn't need to be kept in memory entirely.
+
+    :param lines: iterable with lines of output (can be a file handle)
+    :return: tuple with test summary (None if no summary was found) and list of lines reporting a fatal error;
+             test summary is a tuple with total number of tests,
+             and number of tests failing due to numerical errors and due to other errors
+    """
+    summary, prec_summary, fatal_errors = None, None, []
+    for line in lines:
+        res = LAPACK_TEST_SUMMARY_REGEX.match(line)
+        if res:
+            counts = tuple(int(res.group(x)) for x in ['test_cnt', 'test_fail_num_error', 'test_fail_other_error'])
+            if res.group('label') == '--> ALL PRECISIONS':
+                summary = counts
+            else:
+                # keep track of totals for all precisions, in case there's no overall summary
+                prec_summary = tuple(x + y for (x, y) in zip(prec_summary or (0, 0, 0), counts))
+        elif 'FATAL ERROR' in line:
+            fatal_errors.append(line.strip())
+
+    return (summary or prec_summary, fatal_errors)
+
+
+def run_lapack_test_shard(lapack_dir, shard, out_fn, pre_cmd=''):
+    """
+    Run LAPACK test drivers for specified shard (precision, routine family) via lapack_testing.py,
+    and parse the output (which is redirected to specified file).
+
+    :return: tuple with exit code, test summary and lines reporting a fatal error (see parse_lapack_test_output)
+    """
+    (prec, family) = shard
+    # don't use path argument of run_cmd, since it changes the working directory for the whole process
+    cmd = "cd %s && %s ./lapack_testing.py -r -b TESTING -p %s -t %s" % (lapack_dir, pre_cmd, prec, family)
+    cmd += " > %s 2>&1" % out_fn
+    (_, ec) = run_cmd(cmd, log_all=False, log_ok=False, simple=False)
+
+    summary, fatal_errors = None, []
+    if os.path.exists(out_fn):
+        with open(out_fn) as handle:
+            summary, fatal_errors = parse_lapack_test_output(handle)
+
+    return (ec, summary, fatal_errors)
+
 
 class EB_OpenBLAS(ConfigureMake):
     """Support for building/installing OpenBLAS."""
@@ -30,12 +100,29 @@ class EB_OpenBLAS(ConfigureMake):
                                                     "due to numerical errors", CUSTOM],
             'max_failing_lapack_tests_other_errors': [0, "Maximum number of LAPACK tests failing "
                                                       "due to non-numerical errors", CUSTOM],
+            'parallel_lapack_tests': [True, "Run LAPACK test drivers concurrently, in shards per precision "
+                                            "and routine family", CUSTOM],
             'run_lapack_tests': [False, "Run LAPACK tests during test step, "
                                         "and check whether failing tests exceeds threshold", CUSTOM],
         }
+        extra_vars.update(BLAS_LAPACK_BENCHMARK_EXTRA_OPTIONS)
 
         return ConfigureMake.extra_options(extra_vars)
 
+    def __init__(self, *args, **kwargs):
+        """Constructor for OpenBLAS easyblock."""
+        super(EB_OpenBLAS, self).__init__(*args, **kwargs)
+
+        self.prev_blas_lapack_benchmarks = None
+
+    def prepare_step(self, *args, **kwargs):
+        """Prepare build environment, and collect benchmark results for previous installations."""
+        super(EB_OpenBLAS, self).prepare_step(*args, **kwargs)
+
+        # must be done before installation directory is (re)created
+        if self.cfg['blas_lapack_benchmark'] and self.prev_blas_lapack_benchmarks is None:
+            self.prev_blas_lapack_benchmarks = load_blas_lapack_benchmarks(self.installdir)
+
     def configure_step(self):
         """ set up some options - but no configure command to run"""
 
@@ -93,38 +180,79 @@ class EB_OpenBLAS(ConfigureMake):
         cmd = ' '.join([self.cfg['prebuildopts'], makecmd, ' '.join(build_parts), self.cfg['buildopts']])
         run_cmd(cmd, log_all=True, simple=True)
 
-    def check_lapack_test_results(self, test_output):
-        """Check output of OpenBLAS' LAPACK test suite ('make lapack-test')."""
+    def check_lapack_test_counts(self, tot_cnt, fail_cnt_num_errors, fail_cnt_other_errors):
+        """Check number of failing tests in OpenBLAS' LAPACK test suite against thresholds."""
+        msg = "%d LAPACK tests run - %d failed due to numerical errors - %d failed due to other errors"
+        self.log.info(msg, tot_cnt, fail_cnt_num_errors, fail_cnt_other_errors)
 
-        # example:
-        #                         -->   LAPACK TESTING SUMMARY  <--
-        # SUMMARY                 nb test run     numerical error         other error
-        # ================        ===========     =================       ================
-        # ...
-        # --> ALL PRECISIONS      4116982         4172    (0.101%)        0       (0.000%)
-        test_summary_pattern = r'\s+'.join([
-            r"^--> ALL PRECISIONS",
-            r"(?P<test_cnt>[0-9]+)",
-            r"(?P<test_fail_num_error>[0-9]+)\s+\([0-9.]+\%\)",
-            r"(?P<test_fail_other_error>[0-9]+)\s+\([0-9.]+\%\)",
-        ])
-        regex = re.compile(test_summary_pattern, re.M)
-        res = regex.search(test_output)
-        if res:
-            (tot_cnt, fail_cnt_num_errors, fail_cnt_other_errors) = [int(x) for x in res.groups()]
-            msg = "%d LAPACK tests run - %d failed due to numerical errors - %d failed due to other errors"
-            self.log.info(msg, tot_cnt, fail_cnt_num_errors, fail_cnt_other_errors)
+        if fail_cnt_other_errors > self.cfg['max_failing_lapack_tests_other_errors']:
+            raise EasyBuildError("Too many LAPACK tests failed due to non-numerical errors: %d (> %d)",
+                                 fail_cnt_other_errors, self.cfg['max_failing_lapack_tests_other_errors'])
 
-            if fail_cnt_other_errors > self.cfg['max_failing_lapack_tests_other_errors']:
-                raise EasyBuildError("Too many LAPACK tests failed due to non-numerical errors: %d (> %d)",
-                                     fail_cnt_other_errors, self.cfg['max_failing_lapack_tests_other_errors'])
+        if fail_cnt_num_errors > self.cfg['max_failing_lapack_tests_num_errors']:
+            raise EasyBuildError("Too many LAPACK tests failed due to numerical errors: %d (> %d)",
+                                 fail_cnt_num_errors, self.cfg['max_failing_lapack_tests_num_errors'])
 
-            if fail_cnt_num_errors > self.cfg['max_failing_lapack_tests_num_errors']:
-                raise EasyBuildError("Too many LAPACK tests failed due to numerical errors: %d (> %d)",
-                                     fail_cnt_num_errors, self.cfg['max_failing_lapack_tests_num_errors'])
+    def check_lapack_test_results(self, test_output):
+        """Check output of OpenBLAS' LAPACK test suite ('make lapack-test')."""
+        summary, _ = parse_lapack_test_output(test_output.splitlines())
+        if summary:
+            self.check_lapack_test_counts(*summary)
         else:
             raise EasyBuildError("Failed to find test summary using pattern '%s' in test output: %s",
-                                 test_summary_pattern, test_output)
+                                 LAPACK_TEST_SUMMARY_PATTERN, test_output)
+
+    def run_lapack_test_shards(self):
+        """
+        Run LAPACK test suite in shards (one per precision and routine family) concurrently,
+        and check aggregated results.
+        """
+        # only build LAPACK test drivers, they're run via lapack_testing.py below (cfr. 'lapack-test' in Makefile)
+        cmd = "%s make %s CROSS=1 %s" % (self.cfg['pretestopts'], LAPACK_TEST_TARGET, self.cfg['testopts'])
+        run_cmd(cmd, log_all=True, simple=True)
+
+        lapack_dir = os.path.join(self.cfg['start_dir'], 'lapack-netlib')
+        out_dir = os.path.join(self.builddir, 'lapack_test_shards')
+        mkdir(out_dir, parents=True)
+
+        # split available cores across shards that run concurrently, each shard gets at least one
+        parallel = self.cfg['parallel'] or 1
+        max_concurrent_shards = min(parallel, len(LAPACK_TEST_SHARDS))
+        threads = max(1, parallel // max_concurrent_shards)
+        pre_cmd = "%s OMP_NUM_THREADS=%s OPENBLAS_NUM_THREADS=%s" % (self.cfg['pretestopts'], threads, threads)
+        self.log.info("Running %d LAPACK test shards, up to %d concurrently, using %d threads each",
+                      len(LAPACK_TEST_SHARDS), max_concurrent_shards, threads)
+
+        def run_shard(shard):
+            """Run LAPACK tests for specified shard, return shard, output file and results."""
+            out_fn = os.path.join(out_dir, '%s_%s.out' % shard)
+            return (shard, out_fn) + run_lapack_test_shard(lapack_dir, shard, out_fn, pre_cmd=pre_cmd)
+
+        totals = (0, 0, 0)
+        failed = []
+        pool = ThreadPool(processes=max_concurrent_shards)
+        try:
+            # process results of each shard as soon as it completes
+            for (shard, out_fn, ec, summary, fatal_errors) in pool.imap_unordered(run_shard, LAPACK_TEST_SHARDS):
+                label = "precision '%s', %s routines" % shard
+                if ec:
+                    failed.append("%s: exit code %s (see %s)" % (label, ec, out_fn))
+                elif fatal_errors:
+                    failed.append("%s: %s" % (label, ', '.join(fatal_errors)))
+                elif summary is None:
+                    failed.append("%s: no test summary found in %s" % (label, out_fn))
+                else:
+                    self.log.info("LAPACK tests for %s: %d tests run - %d numerical errors - %d other errors",
+                                  label, *summary)
+                    totals = tuple(x + y for (x, y) in zip(totals, summary))
+        finally:
+            pool.close()
+            pool.join()
+
+        if failed:
+            raise EasyBuildError("Running LAPACK tests failed for %d shard(s):\n%s", len(failed), '\n'.join(failed))
+
+        self.check_lapack_test_counts(*totals)
 
     def test_step(self):
         """ Mandatory test step plus optional runtest"""
@@ -138,6 +266,10 @@ class EB_OpenBLAS(ConfigureMake):
             run_tests += [self.cfg['runtest']]
 
         for runtest in run_tests:
+            if runtest == LAPACK_TEST_TARGET and self.cfg['parallel_lapack_tests']:
+                self.run_lapack_test_shards()
+                continue
+
             cmd = "%s make %s %s" % (self.cfg['pretestopts'], runtest, self.cfg['testopts'])
             (out, _) = run_cmd(cmd, log_all=True, simple=False, regexp=False)
 
@@ -148,6 +280,15 @@ class EB_OpenBLAS(ConfigureMake):
             if runtest == LAPACK_TEST_TARGET:
                 self.check_lapack_test_results(out)
 
+    def post_install_step(self):
+        """Run BLAS/LAPACK micro-benchmark for installed OpenBLAS library."""
+        super(EB_OpenBLAS, self).post_install_step()
+
+        libdir = os.path.join(self.installdir, 'lib')
+        blas_lapack_benchmark(self, '-L%s -Wl,-rpath,%s -lopenblas' % (libdir, libdir),
+                              lapack=not re.search(r"\bNO_LAPACK='?1", self.cfg['buildopts']),
+                              ilp64=bool(re.search(r"\bINTERFACE64='?1", self.cfg['buildopts'])))
+
     def sanity_check_step(self):
         """ Custom sanity check for OpenBLAS """
         custom_paths = {
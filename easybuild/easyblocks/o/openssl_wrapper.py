@@ -40,13 +40,143 @@ from easybuild.tools import LooseVersion
 
 from easybuild.easyblocks.generic.bundle import Bundle
 from easybuild.framework.easyconfig import CUSTOM
+from easybuild.base import fancylogger
 from easybuild.tools.build_log import EasyBuildError, print_warning
+from easybuild.tools.config import IGNORE
 from easybuild.tools.filetools import change_dir, expand_glob_paths, mkdir, read_file, symlink, which, write_file
 from easybuild.tools.py2vs3 import string_type
 from easybuild.tools.run import run_cmd
 from easybuild.tools.systemtools import DARWIN, LINUX, get_os_type, get_shared_lib_ext, find_library_path
 
 
+# names of OpenSSL executables and pkg-config components that may be provided by the host system
+SYSTEM_OPENSSL_BINS = ['openssl', 'openssl11', 'openssl3']
+SYSTEM_OPENSSL_PC_NAMES = ['libcrypto', 'libssl', 'openssl', 'libcrypto11', 'libssl11', 'openssl11']
+
+# queries done via pkg-config for each OpenSSL component (name of query and pkg-config options)
+PKG_CONFIG_QUERIES = [
+    ('requires', '--print-requires'),
+    ('requires-private', '--print-requires-private'),
+    ('libs', '--libs'),
+    ('libs-static', '--libs --static'),
+]
+
+# shell script to collect all facts about OpenSSL installation in host system in a single pass
+SYSTEM_OPENSSL_PROBE_MARKER = '==> EB-OPENSSL-PROBE'
+SYSTEM_OPENSSL_PROBE = '\n'.join([
+    "for bin_name in %(bins)s; do",
+    "    bin_path=$(command -v $bin_name)",
+    "    if [ -n \"$bin_path\" ]; then",
+    "        echo \"%(marker)s bin $bin_name $bin_path\"",
+    "        $bin_path version 2>&1",
+    "    fi",
+    "done",
+    "echo \"%(marker)s include\"",
+    "LC_ALL=C gcc -E -Wp,-v -xc /dev/null 2>&1",
+    "for pc_name in %(pc_names)s; do",
+    "    if pkg-config --exists $pc_name 2>/dev/null; then",
+] + [
+    "        echo \"%%(marker)s pc-%s $pc_name\"; pkg-config %s $pc_name 2>&1" % query for query in PKG_CONFIG_QUERIES
+] + [
+    "    fi",
+    "done",
+])
+
+# environment variables that affect facts determined for OpenSSL installation in host system
+SYSTEM_OPENSSL_ENV_VARS = ['CPATH', 'C_INCLUDE_PATH', 'PATH', 'PKG_CONFIG_LIBDIR', 'PKG_CONFIG_PATH',
+                           'PKG_CONFIG_SYSTEM_INCLUDE_PATH', 'PKG_CONFIG_SYSTEM_LIBRARY_PATH']
+
+# cache for facts about OpenSSL installation in host system, see det_system_openssl_facts
+_system_openssl_facts_cache = {}
+
+
+def system_openssl_facts_cache_key():
+    """
+    Determine key for cache of facts about OpenSSL installation in host system (fingerprint of system OpenSSL):
+    location, modification time & inode of OpenSSL executables and tools being used,
+    together with values of the environment variables that affect where they are found.
+    """
+    key = []
+    for cmd in SYSTEM_OPENSSL_BINS + ['gcc', 'pkg-config']:
+        cmd_path = which(cmd, log_ok=False, on_error=IGNORE)
+        try:
+            stat_res = os.stat(cmd_path) if cmd_path else None
+        except OSError:
+            stat_res = None
+        key.append((cmd, cmd_path, stat_res.st_mtime if stat_res else None, stat_res.st_ino if stat_res else None))
+
+    key.append(tuple(os.getenv(var) for var in SYSTEM_OPENSSL_ENV_VARS))
+
+    return tuple(key)
+
+
+def clear_system_openssl_facts_cache():
+    """Clear cache of facts about OpenSSL installation in host system."""
+    _system_openssl_facts_cache.clear()
+
+
+def parse_system_openssl_probe(out):
+    """
+    Parse output of probe for OpenSSL installation in host system.
+
+    :return: dict with facts: 'bins' (dict with path and output of 'version' command per executable name),
+             'include_dirs' (list of system include directories), and 'pkgconfig' (dict with output of
+             pkg-config queries per OpenSSL component that is known to pkg-config)
+    """
+    facts = {
+        'bins': {},
+        'include_dirs': [],
+        'pkgconfig': {},
+    }
+
+    sections = []
+    for line in out.splitlines():
+        if line.startswith(SYSTEM_OPENSSL_PROBE_MARKER):
+            sections.append((line[len(SYSTEM_OPENSSL_PROBE_MARKER):].split(), []))
+        elif sections:
+            sections[-1][1].append(line)
+
+    for header, lines in sections:
+        txt = '\n'.join(lines) + '\n' if lines else ''
+        if header[0] == 'bin':
+            facts['bins'][header[1]] = (header[2], txt)
+        elif header[0] == 'include':
+            for match in re.finditer(r'^\s(/[^\0\n]*)+', txt, re.MULTILINE):
+                facts['include_dirs'].extend(match.groups())
+        elif header[0].startswith('pc-'):
+            facts['pkgconfig'].setdefault(header[1], {})[header[0][3:]] = txt
+
+    return facts
+
+
+def det_system_openssl_facts():
+    """
+    Determine facts about OpenSSL installation in host system: OpenSSL executables and their version,
+    system include directories, and pkg-config information for OpenSSL components.
+
+    All facts are collected using a single probe command, and cached for the same system OpenSSL fingerprint.
+    """
+    log = fancylogger.getLogger('det_system_openssl_facts', fname=False)
+
+    key = system_openssl_facts_cache_key()
+    if key in _system_openssl_facts_cache:
+        log.debug("Using cached facts about OpenSSL in host system: %s", _system_openssl_facts_cache[key])
+        return _system_openssl_facts_cache[key]
+
+    cmd = SYSTEM_OPENSSL_PROBE % {
+        'bins': ' '.join(SYSTEM_OPENSSL_BINS),
+        'marker': SYSTEM_OPENSSL_PROBE_MARKER,
+        'pc_names': ' '.join(SYSTEM_OPENSSL_PC_NAMES),
+    }
+    out, _ = run_cmd(cmd, simple=False, log_ok=False, force_in_dry_run=True, verbose=False, trace=False)
+
+    facts = parse_system_openssl_probe(out)
+    log.debug("Determined facts about OpenSSL in host system: %s", facts)
+    _system_openssl_facts_cache[key] = facts
+
+    return facts
+
+
 class EB_OpenSSL_wrapper(Bundle):
     """
     Find path to installation files of OpenSSL in the host system. Checks in
@@ -165,11 +295,16 @@ class EB_OpenSSL_wrapper(Bundle):
             'libs': [],
         }
 
+        # facts about OpenSSL installation in host system (see det_system_openssl_facts)
+        self.system_facts = None
+
         # early return when we're not wrapping the system OpenSSL installation
         if not self.cfg.get('wrap_system_openssl'):
             self.log.info("Not wrapping system OpenSSL installation by user request")
             return
 
+        self.system_facts = det_system_openssl_facts()
+
         # Check system OpenSSL binary
         target_ssl_bins = [self.generation_targets['bin']]
         if self.generation == '1.1':
@@ -265,12 +400,7 @@ class EB_OpenSSL_wrapper(Bundle):
             return
 
         # Check system include paths for OpenSSL headers
-        cmd = "LC_ALL=C gcc -E -Wp,-v -xc /dev/null"
-        (out, ec) = run_cmd(cmd, log_all=True, simple=False, trace=False)
-
-        sys_include_dirs = []
-        for match in re.finditer(r'^\s(/[^\0\n]*)+', out, re.MULTILINE):
-            sys_include_dirs.extend(match.groups())
+        sys_include_dirs = self.system_facts['include_dirs']
         self.log.debug("Found the following include directories in host system: %s", ', '.join(sys_include_dirs))
 
         # headers are located in 'include/openssl' by default
@@ -421,14 +551,12 @@ class EB_OpenSSL_wrapper(Bundle):
 
     def get_openssl_bin_version(self, bin_name):
         """Check OpenSSL executable version"""
-        bin_path = which(bin_name)
-        if not bin_path:
+        if bin_name in self.system_facts['bins']:
+            bin_path, out = self.system_facts['bins'][bin_name]
+        else:
             self.log.debug("OpenSSL executable '%s' not found", bin_name)
             return None, None
 
-        cmd = "%s version" % bin_path
-        out, _ = run_cmd(cmd, simple=False, log_ok=False, trace=False)
-
         try:
             bin_version = out.split(' ')[1]
         except (AttributeError, IndexError):
@@ -486,18 +614,18 @@ Version: %(version)s
             if self.generation == '1.1':
                 # check suffixed names with v1.1
                 pc_name_suffix = pc_name + '11'
-                pc_exists_cmd = "pkg-config --exists %s" % pc_name_suffix
-                if run_cmd(pc_exists_cmd, simple=True, log_ok=False, log_all=False, trace=False):
+                if pc_name_suffix in self.system_facts['pkgconfig']:
                     self.log.info("%s exists", pc_name_suffix)
                     pc_name = pc_name_suffix
 
+            # output of pkg-config queries for this component (empty if it is not known to pkg-config)
+            pc_info = self.system_facts['pkgconfig'].get(pc_name, {})
+            self.log.info("Output of pkg-config queries for %s: %s", pc_name, pc_info)
+
             # get requires from pkg-config
             pc_file['requires'] = []
             for require_type in ['Requires', 'Requires.private']:
-                require_print = require_type.lower().replace('.', '-')
-                pc_print_cmd = "pkg-config --print-%s %s" % (require_print, pc_name)
-                out, _ = run_cmd(pc_print_cmd, simple=False, log_ok=False, trace=False)
-                self.log.info("Output of '%s': %s", pc_print_cmd, out)
+                out = pc_info.get(require_type.lower().replace('.', '-'), '')
 
                 if out:
                     requires = out
@@ -516,14 +644,8 @@ Version: %(version)s
                 pc_file['libs'] = "Libs: -L${libdir} -l%s" % c_lib_name
                 pc_file['cflags'] = "Cflags: -I${includedir}"
                 # infer private libs through pkg-config
-                pc_libs_cmd = "pkg-config --libs %s" % pc_name
-                out, _ = run_cmd(pc_libs_cmd, simple=False, log_ok=False, trace=False)
-                self.log.info("Output of '%s': %s", pc_libs_cmd, out)
-                linker_libs = out
-
-                pc_libs_static_cmd = "pkg-config --libs --static %s" % pc_name
-                out, _ = run_cmd(pc_libs_static_cmd, simple=False, log_ok=False, trace=False)
-                self.log.info("Output of '%s': %s", pc_libs_static_cmd, out)
+                linker_libs = pc_info.get('libs', '')
+                out = pc_info.get('libs-static', '')
 
                 libs_priv = "%s " % out.rstrip()
                 for flag in linker_libs.rstrip().split(' '):
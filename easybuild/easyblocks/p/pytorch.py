@@ -32,6 +32,8 @@ import os
 import re
 import sys
 import tempfile
+from collections import deque
+
 import easybuild.tools.environment as env
 from easybuild.tools import LooseVersion
 from easybuild.easyblocks.generic.pythonpackage import PythonPackage
@@ -40,6 +42,7 @@ from easybuild.tools.build_log import EasyBuildError, print_warning
 from easybuild.tools.config import build_option
 from easybuild.tools.filetools import apply_regex_substitutions, mkdir, symlink
 from easybuild.tools.modules import get_software_root, get_software_version
+from easybuild.tools.py2vs3 import string_type
 from easybuild.tools.systemtools import POWER, get_cpu_architecture
 
 
@@ -58,147 +61,102 @@ else:
     TestResult = namedtuple('TestResult', ('test_cnt', 'error_cnt', 'failure_cnt', 'failed_suites'))
 
 
+# regular expressions used to parse output of PyTorch test suite, see PyTorchTestLogParser
+# (all are matched against a single line of output, without trailing newline)
+# === FAIL: test_add_scalar_relu (quantization.core.test_quantized_op.TestQuantizedOps) ===
+SEPARATOR_LINE_REGEX = re.compile(r"[=-]+$")
+FAILED_TEST_CASE_REGEX = re.compile(r"(FAIL|ERROR): (test_.*?)\s\(.*$")
+# FAILED [22.8699s] test_sparse_csr.py::TestSparseCompressedCPU::test_invalid_input_csr_large_cpu - [snip]
+FAILED_PYTEST_CASE_REGEX = re.compile(r"(FAILED) (?:\[.*?\] )?(?:\w|/)+\.py.*::(test_.*?) - ")
+# test_fx failed!
+FAILED_TEST_SUITE_REGEX = re.compile(r"(?P<failed_test_suite_name>.*) failed!(?: Received signal: \w+)?\s*$")
+FAILED_TEST_SUITE_STRICT_REGEX = re.compile(r"(?P<failed_test_suite_name>.*) failed!$")
+# Ran 219 tests in 67.325s
+UNITTEST_RAN_REGEX = re.compile(r"Ran (?P<test_cnt>[0-9]+) tests")
+UNITTEST_RAN_IN_REGEX = re.compile(r"Ran (?P<test_cnt>[0-9]+) tests in")
+# FAILED (errors=10, skipped=190, expected failures=6)
+UNITTEST_FAILED_REGEX = re.compile(r"FAILED \((?P<failure_summary>.*)\)$")
+# ===================== 2 failed, 128 passed, 2 skipped, 2 warnings in 63.43s (01:03:43) =========
+PYTEST_FAILED_SUMMARY_REGEX = re.compile(
+    r"=+ (?P<failure_summary>.*) in [0-9]+\.*[0-9]*[a-zA-Z]* (\([0-9]+:[0-9]+:[0-9]+\) )?=+$")
+PYTEST_SUMMARY_REGEX = re.compile(r"=+ (?P<summary>.*) in \d+.* =+$")
+PYTEST_SKIP_INFO = "skip info is located in the xml test reports"
+FINISHED_PRINTING_LOG = "FINISHED PRINTING LOG FILE"
+# AssertionError: 2 unit test(s) failed:
+UNIT_TESTS_FAILED_REGEX = re.compile(r"AssertionError: (?P<failure_summary>[0-9]+ unit test\(s\) failed):$")
+INDENTED_LINE_REGEX = re.compile(r"\s")
+
+FAILURES_CNT_REGEX = re.compile(r"(?<!expected )failures=([0-9]+)")
+ERRORS_CNT_REGEX = re.compile(r"errors=([0-9]+)")
+PYTEST_FAILED_CNT_REGEX = re.compile(r"([0-9]+) failed")
+PYTEST_ERROR_CNT_REGEX = re.compile(r"([0-9]+) error")
+PYTEST_COUNT_REGEXES = [re.compile(r"([0-9]+) " + reason) for reason in [
+    "failed",
+    "passed",
+    "skipped",
+    "deselected",
+    "xfailed",
+    "xpassed",
+]]
+UNIT_TESTS_FAILED_CNT_REGEX = re.compile(r"([0-9]+) unit test\(s\) failed")
+
+# number of lines at the end of the output of the test suite to include in the log
+TEST_OUTPUT_TAIL_LINES = 100
+
+
+def get_count_for_pattern(regex, text):
+    """Match the regexp containing a single group and return the integer value of the matched group.
+        Return zero if no or more than 1 match was found and warn for the latter case
+    """
+    match = regex.findall(text)
+    if len(match) == 1:
+        return int(match[0])
+    elif len(match) > 1:
+        # Shouldn't happen, but means something went wrong with the regular expressions.
+        # Throw warning, as the build might be fine, no need to error on this.
+        warn_msg = "Error in counting the number of test failures in the output of the PyTorch test suite.\n"
+        warn_msg += "Please check the EasyBuild log to verify the number of failures (if any) was acceptable."
+        print_warning(warn_msg)
+    return 0
+
+
+def iter_lines(txt):
+    """Iterate over lines (including trailing newline) in specified text, without copying the whole text."""
+    start = 0
+    while start < len(txt):
+        end = txt.find('\n', start)
+        if end == -1:
+            end = len(txt) - 1
+        yield txt[start:end + 1]
+        start = end + 1
+
+
+def parse_test_output(tests_out):
+    """
+    Parse the output of the PyTorch test suite, which can be either a string or an iterable of lines (like a file)
+
+    Return PyTorchTestLogParser instance, which provides the results
+    """
+    parser = PyTorchTestLogParser()
+    if isinstance(tests_out, string_type):
+        tests_out = iter_lines(tests_out)
+    for line in tests_out:
+        parser.feed(line)
+    parser.close()
+    return parser
+
+
 def find_failed_test_names(tests_out):
     """Find failed names of failed test cases in the output of the test step
 
     Return sorted list of names in FailedTestNames tuple
     """
-    # patterns like
-    # === FAIL: test_add_scalar_relu (quantization.core.test_quantized_op.TestQuantizedOps) ===
-    # --- ERROR: test_all_to_all_group_cuda (__main__.TestDistBackendWithSpawn) ---
-    regex = r"^[=-]+\n(FAIL|ERROR): (test_.*?)\s\(.*\n[=-]+\n"
-    failed_test_cases = re.findall(regex, tests_out, re.M)
-    # And patterns like:
-    # FAILED test_ops_gradients.py::TestGradientsCPU::test_fn_grad_linalg_det_singular_cpu_complex128 - [snip]
-    # FAILED [22.8699s] test_sparse_csr.py::TestSparseCompressedCPU::test_invalid_input_csr_large_cpu - [snip]
-    # FAILED [0.0623s] dynamo/test_dynamic_shapes.py::DynamicShapesExportTests::test_predispatch -  [snip]
-    regex = r"^(FAILED) (?:\[.*?\] )?(?:\w|/)+\.py.*::(test_.*?) - "
-    failed_test_cases.extend(re.findall(regex, tests_out, re.M))
-    return FailedTestNames(error=sorted(m[1] for m in failed_test_cases if m[0] == 'ERROR'),
-                           fail=sorted(m[1] for m in failed_test_cases if m[0] != 'ERROR'))
+    return parse_test_output(tests_out).failed_test_names()
 
 
 def parse_test_log(tests_out):
     """Parse the test output and return result as TestResult tuple"""
-
-    def get_count_for_pattern(regex, text):
-        """Match the regexp containing a single group and return the integer value of the matched group.
-            Return zero if no or more than 1 match was found and warn for the latter case
-        """
-        match = re.findall(regex, text)
-        if len(match) == 1:
-            return int(match[0])
-        elif len(match) > 1:
-            # Shouldn't happen, but means something went wrong with the regular expressions.
-            # Throw warning, as the build might be fine, no need to error on this.
-            warn_msg = "Error in counting the number of test failures in the output of the PyTorch test suite.\n"
-            warn_msg += "Please check the EasyBuild log to verify the number of failures (if any) was acceptable."
-            print_warning(warn_msg)
-        return 0
-
-    failure_cnt = 0
-    error_cnt = 0
-    failed_suites = []
-
-    # Remove empty lines to make RegExs below simpler
-    tests_out = re.sub(r'^[ \t]*\n', '', tests_out, flags=re.MULTILINE)
-
-    # Grep for patterns like:
-    # Ran 219 tests in 67.325s
-    #
-    # FAILED (errors=10, skipped=190, expected failures=6)
-    # test_fx failed!
-    regex = (r"^Ran (?P<test_cnt>[0-9]+) tests.*$\n"
-             r"FAILED \((?P<failure_summary>.*)\)$\n"
-             r"(?:^(?:(?!failed!).)*$\n){0,5}"
-             r"(?P<failed_test_suite_name>.*) failed!(?: Received signal: \w+)?\s*$")
-
-    for m in re.finditer(regex, tests_out, re.M):
-        # E.g. 'failures=3, errors=10, skipped=190, expected failures=6'
-        failure_summary = m.group('failure_summary')
-        total, test_suite = m.group('test_cnt', 'failed_test_suite_name')
-        failed_suites.append(
-            TestSuiteResult(test_suite, "{total} total tests, {failure_summary}".format(
-                total=total, failure_summary=failure_summary))
-        )
-        failure_cnt += get_count_for_pattern(r"(?<!expected )failures=([0-9]+)", failure_summary)
-        error_cnt += get_count_for_pattern(r"errors=([0-9]+)", failure_summary)
-
-    # Grep for patterns like:
-    # ===================== 2 failed, 128 passed, 2 skipped, 2 warnings in 3.43s =====================
-    # test_quantization failed!
-    # OR:
-    # ===================== 2 failed, 128 passed, 2 skipped, 2 warnings in 63.43s (01:03:43) =========
-    #
-    # FINISHED PRINTING LOG FILE
-    # test_quantization failed!
-    # OR:
-    # ===================== 2 failed, 128 passed, 2 skipped, 2 warnings in 63.43s (01:03:43) =========
-    # If in CI, skip info is located in the xml test reports, please either go to s3 or the hud to download them
-    #
-    # FINISHED PRINTING LOG FILE of test_ops_gradients (/tmp/vsc40023/easybuil...)
-    #
-    # test_quantization failed!
-
-    regex = (
-        r"^=+ (?P<failure_summary>.*) in [0-9]+\.*[0-9]*[a-zA-Z]* (\([0-9]+:[0-9]+:[0-9]+\) )?=+$\n"
-        r"(?:.*skip info is located in the xml test reports.*\n)?"
-        r"(?:.*FINISHED PRINTING LOG FILE.*\n)?"
-        r"(?P<failed_test_suite_name>.*) failed!$"
-    )
-
-    for m in re.finditer(regex, tests_out, re.M):
-        # E.g. '2 failed, 128 passed, 2 skipped, 2 warnings'
-        failure_summary = m.group('failure_summary')
-        test_suite = m.group('failed_test_suite_name')
-        failed_suites.append(TestSuiteResult(test_suite, failure_summary))
-        failure_cnt += get_count_for_pattern(r"([0-9]+) failed", failure_summary)
-        error_cnt += get_count_for_pattern(r"([0-9]+) error", failure_summary)
-
-    # Grep for patterns like:
-    # AssertionError: 2 unit test(s) failed:
-    #         DistributedDataParallelTest.test_find_unused_parameters_kwarg_debug_detail
-    #         DistributedDataParallelTest.test_find_unused_parameters_kwarg_grad_is_view_debug_detail
-    #
-    # FINISHED PRINTING LOG FILE of distributed/test_c10d_nccl (<snip>)
-    #
-    # distributed/test_c10d_nccl failed!
-
-    regex = (
-        r"^AssertionError: (?P<failure_summary>[0-9]+ unit test\(s\) failed):\n"
-        r"(\s+.*\n)+"
-        r"(((?!failed!).)*\n){0,5}"
-        r"(?P<failed_test_suite_name>.*) failed!$"
-    )
-
-    for m in re.finditer(regex, tests_out, re.M):
-        # E.g. '2 unit test(s) failed'
-        failure_summary = m.group('failure_summary')
-        test_suite = m.group('failed_test_suite_name')
-        failed_suites.append(TestSuiteResult(test_suite, failure_summary))
-        failure_cnt += get_count_for_pattern(r"([0-9]+) unit test\(s\) failed", failure_summary)
-
-    # Collect total number of tests
-
-    # Pattern for tests ran with unittest like:
-    # Ran 3 tests in 0.387s
-    regex = r"^Ran (?P<test_cnt>[0-9]+) tests in"
-    test_cnt = sum(int(hit) for hit in re.findall(regex, tests_out, re.M))
-    # Pattern for tests ran with pytest like:
-    # ============ 286 passed, 18 skipped, 2 xfailed in 38.71s ============
-    regex = r"=+ (?P<summary>.*) in \d+.* =+\n"
-    count_patterns = [re.compile(r"([0-9]+) " + reason) for reason in [
-        "failed",
-        "passed",
-        "skipped",
-        "deselected",
-        "xfailed",
-        "xpassed",
-    ]]
-    for m in re.finditer(regex, tests_out, re.M):
-        test_cnt += sum(get_count_for_pattern(p, m.group("summary")) for p in count_patterns)
-
-    return TestResult(test_cnt=test_cnt, error_cnt=error_cnt, failure_cnt=failure_cnt, failed_suites=failed_suites)
+    return parse_test_output(tests_out).test_result()
 
 
 class EB_PyTorch(PythonPackage):
@@ -462,7 +420,9 @@ class EB_PyTorch(PythonPackage):
             'excluded_tests': ' '.join(excluded_tests)
         })
 
-        test_result = super(EB_PyTorch, self).test_step(return_output_ec=True)
+        # output of PyTorch test suite can be huge, so it's redirected to a file rather than kept in memory
+        tests_out_fn = os.path.join(self.builddir, 'pytorch-tests.out')
+        test_result = super(EB_PyTorch, self).test_step(return_output_ec=True, out_fn=tests_out_fn)
         if test_result is None:
             if self.cfg['runtest'] is False:
                 msg = "Do not set 'runtest' to False, use --skip-test-step instead."
@@ -470,10 +430,22 @@ class EB_PyTorch(PythonPackage):
                 msg = "Tests did not run. Make sure 'runtest' is set to a command."
             raise EasyBuildError(msg)
 
-        tests_out, tests_ec = test_result
+        _, tests_ec = test_result
+
+        # Parse test output in a single pass, straight from the file
+        try:
+            with open(tests_out_fn) as handle:
+                test_log = parse_test_output(handle)
+            with open(tests_out_fn) as handle:
+                tail = ''.join(deque(handle, maxlen=TEST_OUTPUT_TAIL_LINES))
+        except (IOError, OSError) as err:
+            raise EasyBuildError("Failed to read output of test command from %s: %s", tests_out_fn, err)
+
+        self.log.info("Last %d lines of output of test command (see %s for full output):\n%s",
+                      TEST_OUTPUT_TAIL_LINES, tests_out_fn, tail)
 
         # Show failed subtests to aid in debugging failures
-        failed_test_names = find_failed_test_names(tests_out)
+        failed_test_names = test_log.failed_test_names()
         if failed_test_names.error or failed_test_names.fail:
             msg = []
             if failed_test_names.error:
@@ -485,14 +457,12 @@ class EB_PyTorch(PythonPackage):
             self.log.warning("\n".join(msg))
 
         # Create clear summary report
-        test_result = parse_test_log(tests_out)
+        test_result = test_log.test_result()
         failure_report = ['%s (%s)' % (suite.name, suite.summary) for suite in test_result.failed_suites]
         failed_test_suites = set(suite.name for suite in test_result.failed_suites)
         # Gather all failed tests suites in case we missed any (e.g. when it exited due to syntax errors)
         # Also unique to be able to compare the lists below
-        all_failed_test_suites = set(
-            re.findall(r"^(?P<test_name>.*) failed!(?: Received signal: \w+)?\s*$", tests_out, re.M)
-        )
+        all_failed_test_suites = set(test_log.all_failed_suites)
         # If we missed any test suites prepend a list of all failed test suites
         if failed_test_suites != all_failed_test_suites:
             failure_report = ['Failed tests (suites/files):'] + failure_report
@@ -542,7 +512,8 @@ class EB_PyTorch(PythonPackage):
         elif failure_report:
             raise EasyBuildError("Test ended with failures! Exit code: %s\n%s", tests_ec, failure_report)
         elif tests_ec:
-            raise EasyBuildError("Test command had non-zero exit code (%s), but no failed tests found?!", tests_ec)
+            raise EasyBuildError("Test command had non-zero exit code (%s), but no failed tests found?! "
+                                 "See %s for output of test command", tests_ec, tests_out_fn)
 
     def test_cases_step(self):
         self._set_cache_dir()
@@ -574,6 +545,275 @@ class EB_PyTorch(PythonPackage):
         return guesses
 
 
+class PyTorchTestLogParser(object):
+    """
+    Streaming parser for the output of the PyTorch test suite.
+
+    Output is fed line by line (see feed), and only a bounded number of lines is retained while parsing.
+    Results are the same as if the (complete) output is matched against these multi-line patterns
+    (where empty lines are ignored, except for failed test cases):
+
+    * failed test cases, like:
+        ======================================================================
+        FAIL: test_add_scalar_relu (quantization.core.test_quantized_op.TestQuantizedOps)
+        ----------------------------------------------------------------------
+      and:
+        FAILED [0.0623s] dynamo/test_dynamic_shapes.py::DynamicShapesExportTests::test_predispatch -  [snip]
+
+    * failed test suites with unittest, like:
+        Ran 219 tests in 67.325s
+        FAILED (errors=10, skipped=190, expected failures=6)
+        <up to 5 lines>
+        test_fx failed!
+
+    * failed test suites with pytest, like:
+        ===================== 2 failed, 128 passed, 2 skipped, 2 warnings in 63.43s (01:03:43) =========
+        If in CI, skip info is located in the xml test reports, please either go to s3 or the hud to download them
+        FINISHED PRINTING LOG FILE of test_ops_gradients (/tmp/vsc40023/easybuil...)
+        test_quantization failed!
+      (where the 2nd and 3rd line are optional)
+
+    * failed unit tests, like:
+        AssertionError: 2 unit test(s) failed:
+                DistributedDataParallelTest.test_find_unused_parameters_kwarg_debug_detail
+                DistributedDataParallelTest.test_find_unused_parameters_kwarg_grad_is_view_debug_detail
+        <up to 5 lines>
+        distributed/test_c10d_nccl failed!
+    """
+
+    def __init__(self):
+        """Constructor: initialise counters and state"""
+        self.test_cnt = 0
+        self.failure_cnt = 0
+        self.error_cnt = 0
+        self.unittest_failed_suites = []
+        self.pytest_failed_suites = []
+        self.unit_tests_failed_suites = []
+        # names of all failed test suites (including those for which failures were not counted)
+        self.all_failed_suites = []
+        self.failed_test_cases = []
+
+        # index of last (non-empty) line, and of last line of output (including empty lines)
+        self.idx = -1
+        self.raw_idx = -1
+        # last 2 lines of output (including empty lines), and last line that was part of a failed test case
+        self.prev_raw_lines = deque(maxlen=2)
+        self.failed_test_case_end = -1
+
+        # pending (partial) matches of failed test suites, with index of last line of last match
+        self.unittest_cands = []
+        self.unittest_end = -1
+        self.pytest_cands = []
+        self.pytest_end = -1
+        self.unit_tests_cands = []
+        self.unit_tests_end = -1
+
+    def feed(self, line):
+        """Process a single line of output (including trailing newline, if any)"""
+        if line.endswith('\n'):
+            text, has_newline = line[:-1], True
+        else:
+            text, has_newline = line, False
+
+        # cheap checks on contents of line are done first, since most lines are not relevant at all
+        self.raw_idx += 1
+        self._process_failed_test_cases(text, has_newline)
+
+        if ' failed!' in text:
+            res = FAILED_TEST_SUITE_REGEX.match(text)
+            if res:
+                self.all_failed_suites.append(res.group('failed_test_suite_name'))
+
+        # empty lines are ignored for everything else
+        if has_newline and not text.strip(' \t'):
+            return
+
+        self.idx += 1
+
+        # count total number of tests
+        if text.startswith('Ran '):
+            res = UNITTEST_RAN_IN_REGEX.match(text)
+            if res:
+                self.test_cnt += int(res.group('test_cnt'))
+        if has_newline and '= ' in text:
+            res = PYTEST_SUMMARY_REGEX.search(text)
+            if res:
+                self.test_cnt += sum(get_count_for_pattern(p, res.group('summary')) for p in PYTEST_COUNT_REGEXES)
+
+        if self.unittest_cands or text.startswith('Ran '):
+            self._process_unittest(text, has_newline)
+        if self.pytest_cands or text.startswith('='):
+            self._process_pytest(text, has_newline)
+        if self.unit_tests_cands or text.startswith('AssertionError: '):
+            self._process_unit_tests(text, has_newline)
+
+    def close(self):
+        """Process end of output: resolve pending partial matches"""
+        self.unittest_cands = []
+        while self.pytest_cands:
+            self._resolve_pytest(self.pytest_cands.pop(0))
+        while self.unit_tests_cands:
+            self._resolve_unit_tests(self.unit_tests_cands.pop(0))
+
+    def failed_test_names(self):
+        """Return sorted names of failed test cases as FailedTestNames tuple"""
+        return FailedTestNames(error=sorted(m[1] for m in self.failed_test_cases if m[0] == 'ERROR'),
+                               fail=sorted(m[1] for m in self.failed_test_cases if m[0] != 'ERROR'))
+
+    def test_result(self):
+        """Return test result as TestResult tuple"""
+        failed_suites = self.unittest_failed_suites + self.pytest_failed_suites + self.unit_tests_failed_suites
+        return TestResult(test_cnt=self.test_cnt, error_cnt=self.error_cnt, failure_cnt=self.failure_cnt,
+                          failed_suites=failed_suites)
+
+    def _process_failed_test_cases(self, text, has_newline):
+        """Look for failed test cases, in last 3 lines of output"""
+        if text.startswith('FAILED '):
+            res = FAILED_PYTEST_CASE_REGEX.match(text)
+            if res:
+                self.failed_test_cases.append(res.groups())
+
+        elif has_newline and text[:1] in ('=', '-') and len(self.prev_raw_lines) == 2 and \
+                SEPARATOR_LINE_REGEX.match(text):
+            (sep_idx, sep_text), (_, test_case_text) = self.prev_raw_lines
+            # separator line that ends a failed test case can't be the start of another one
+            if sep_idx > self.failed_test_case_end and SEPARATOR_LINE_REGEX.match(sep_text):
+                res = FAILED_TEST_CASE_REGEX.match(test_case_text)
+                if res:
+                    self.failed_test_cases.append(res.groups())
+                    self.failed_test_case_end = self.raw_idx
+
+        self.prev_raw_lines.append((self.raw_idx, text))
+
+    def _process_unittest(self, text, has_newline):
+        """Look for failed test suites with unittest"""
+        for cand in self.unittest_cands[:]:
+            offset = self.idx - cand['start']
+            if offset == 1:
+                res = UNITTEST_FAILED_REGEX.match(text)
+                if res:
+                    cand['failure_summary'] = res.group('failure_summary')
+                else:
+                    self.unittest_cands.remove(cand)
+            elif 'failed!' in text:
+                self.unittest_cands.remove(cand)
+                res = FAILED_TEST_SUITE_REGEX.match(text)
+                if res:
+                    failure_summary = cand['failure_summary']
+                    test_suite = res.group('failed_test_suite_name')
+                    self.unittest_failed_suites.append(
+                        TestSuiteResult(test_suite, "{total} total tests, {failure_summary}".format(
+                            total=cand['test_cnt'], failure_summary=failure_summary))
+                    )
+                    self.failure_cnt += get_count_for_pattern(FAILURES_CNT_REGEX, failure_summary)
+                    self.error_cnt += get_count_for_pattern(ERRORS_CNT_REGEX, failure_summary)
+                    # other pending matches overlap with this one
+                    self.unittest_cands = []
+                    self.unittest_end = self.idx
+                    break
+            elif offset == 7:
+                # no failed test suite found in 5 lines after summary
+                self.unittest_cands.remove(cand)
+
+        if self.idx > self.unittest_end and has_newline:
+            res = UNITTEST_RAN_REGEX.match(text)
+            if res:
+                self.unittest_cands.append({'start': self.idx, 'test_cnt': res.group('test_cnt')})
+
+    def _process_pytest(self, text, has_newline):
+        """Look for failed test suites with pytest"""
+        for cand in self.pytest_cands[:]:
+            cand['lines'].append((text, has_newline))
+            if len(cand['lines']) == 3:
+                self.pytest_cands.remove(cand)
+                self._resolve_pytest(cand)
+
+        if self.idx > self.pytest_end and has_newline:
+            res = PYTEST_FAILED_SUMMARY_REGEX.match(text)
+            if res:
+                self.pytest_cands.append({'start': self.idx, 'failure_summary': res.group('failure_summary'),
+                                          'lines': []})
+
+    def _resolve_pytest(self, cand):
+        """Determine whether partial match for failed test suite with pytest is a match"""
+        if cand['start'] <= self.pytest_end:
+            return
+
+        lines = cand['lines']
+        # lines with skip info and 'FINISHED PRINTING LOG FILE' are optional
+        for skip_info in (True, False):
+            for finished in (True, False):
+                pos = 0
+                if skip_info:
+                    if pos < len(lines) and lines[pos][1] and PYTEST_SKIP_INFO in lines[pos][0]:
+                        pos += 1
+                    else:
+                        continue
+                if finished:
+                    if pos < len(lines) and lines[pos][1] and FINISHED_PRINTING_LOG in lines[pos][0]:
+                        pos += 1
+                    else:
+                        continue
+                res = FAILED_TEST_SUITE_STRICT_REGEX.match(lines[pos][0]) if pos < len(lines) else None
+                if res:
+                    failure_summary = cand['failure_summary']
+                    test_suite = res.group('failed_test_suite_name')
+                    self.pytest_failed_suites.append(TestSuiteResult(test_suite, failure_summary))
+                    self.failure_cnt += get_count_for_pattern(PYTEST_FAILED_CNT_REGEX, failure_summary)
+                    self.error_cnt += get_count_for_pattern(PYTEST_ERROR_CNT_REGEX, failure_summary)
+                    self.pytest_end = cand['start'] + pos + 1
+                    return
+
+    def _process_unit_tests(self, text, has_newline):
+        """Look for failed unit tests"""
+        for cand in self.unit_tests_cands[:]:
+            if cand['post'] is None:
+                # list of failed unit tests consists of indented lines (at least one)
+                if INDENTED_LINE_REGEX.match(text):
+                    cand['run_len'] += 1
+                    if 'failed!' in text:
+                        cand['run_failed'].append((cand['run_len'], text))
+                    continue
+                elif cand['run_len'] == 0:
+                    self.unit_tests_cands.remove(cand)
+                    continue
+                cand['post'] = []
+
+            cand['post'].append(text)
+            if len(cand['post']) == 6:
+                self.unit_tests_cands.remove(cand)
+                self._resolve_unit_tests(cand)
+
+        if self.idx > self.unit_tests_end and has_newline:
+            res = UNIT_TESTS_FAILED_REGEX.match(text)
+            if res:
+                self.unit_tests_cands.append({'start': self.idx, 'failure_summary': res.group('failure_summary'),
+                                              'run_len': 0, 'run_failed': [], 'post': None})
+
+    def _resolve_unit_tests(self, cand):
+        """Determine whether partial match for failed unit tests is a match"""
+        if cand['start'] <= self.unit_tests_end or cand['run_len'] == 0:
+            return
+
+        run_len = cand['run_len']
+        # lines with 'failed!' after list of failed unit tests, with position relative to start of list
+        candidates = cand['run_failed'] + [(run_len + 1 + i, x) for i, x in enumerate(cand['post'] or [])
+                                           if 'failed!' in x]
+        # list of failed unit tests may be shorter than list of indented lines,
+        # since up to 5 lines (which don't include 'failed!') are allowed before the line with failed test suite
+        for list_len in range(run_len, 0, -1):
+            pos, txt = next(((pos, txt) for (pos, txt) in candidates if pos > list_len), (None, None))
+            if pos is not None and pos - list_len <= 6:
+                res = FAILED_TEST_SUITE_STRICT_REGEX.match(txt)
+                if res:
+                    failure_summary = cand['failure_summary']
+                    test_suite = res.group('failed_test_suite_name')
+                    self.unit_tests_failed_suites.append(TestSuiteResult(test_suite, failure_summary))
+                    self.failure_cnt += get_count_for_pattern(UNIT_TESTS_FAILED_CNT_REGEX, failure_summary)
+                    self.unit_tests_end = cand['start'] + pos
+                    return
+
+
 if __name__ == '__main__':
     arg = sys.argv[1]
     if not os.path.isfile(arg):
@@ -33,6 +33,7 @@ import re
 from easybuild.tools import LooseVersion
 
 import easybuild.tools.environment as env
+from easybuild.easyblocks.generic.bundle import order_exts_by_required_deps
 from easybuild.easyblocks.generic.configuremake import ConfigureMake
 from easybuild.tools.build_log import print_warning
 from easybuild.tools.modules import get_software_root
@@ -57,6 +58,11 @@ class EB_R(ConfigureMake):
         self.cfg['exts_defaultclass'] = "RPackage"
         self.cfg['exts_filter'] = EXTS_FILTER_R_PACKAGES
 
+    def install_extensions_parallel(self, *args, **kwargs):
+        """Install R packages in parallel, in order of their level in the graph of required dependencies."""
+        self.ext_instances = order_exts_by_required_deps(self.ext_instances, log=self.log)
+        super(EB_R, self).install_extensions_parallel(*args, **kwargs)
+
     def configure_step(self):
         """Custom configuration for R."""
 
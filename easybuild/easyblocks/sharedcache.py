@@ -0,0 +1,198 @@
+##
+# Copyright 2009-2024 Ghent University
+#
+# This file is part of EasyBuild,
+# originally created by the HPC team of Ghent University (http://ugent.be/hpc/en),
+# with support of Ghent University (http://ugent.be/hpc),
+# the Flemish Supercomputer Centre (VSC) (https://www.vscentrum.be),
+# Flemish Research Foundation (FWO) (http://www.fwo.be/en)
+# and the Department of Economy, Science and Innovation (EWI) (http://www.ewi-vlaanderen.be/en).
+#
+# https://github.com/easybuilders/easybuild
+#
+# EasyBuild is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation v2.
+#
+# EasyBuild is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with EasyBuild.  If not, see <http://www.gnu.org/licenses/>.
+##
+"""
+Helper classes and functions for caches that are shared across installations (and users),
+like the cache of stage 2 libraries for GCC, of bundle components, of wheels, and the store of unpacked crates.
+
+Note: this module does not provide an easyblock.
+
+@author: Kenneth Hoste (Ghent University)
+"""
+import os
+import stat
+import tarfile
+import tempfile
+
+from easybuild.base import fancylogger
+from easybuild.tools.build_log import EasyBuildError
+from easybuild.tools.filetools import mkdir, remove_dir
+
+# prefix for temporary files/directories in shared caches, which are (atomically) renamed to cache entries
+SHARED_CACHE_TMP_PREFIX = '.tmp-'
+
+# permissions to add to cache entries, so cache can be shared with other users
+SHARED_CACHE_DIR_PERMS = stat.S_IRWXU | stat.S_IRGRP | stat.S_IXGRP | stat.S_IROTH | stat.S_IXOTH
+SHARED_CACHE_FILE_PERMS = stat.S_IRGRP | stat.S_IROTH
+
+
+def tar_extract_kwargs():
+    """
+    Return named arguments to pass to TarFile.extractall:
+    use 'data' extraction filter if available (Python 3.12+, or a security backport)
+    """
+    extract_kwargs = {}
+    if hasattr(tarfile, 'data_filter'):
+        extract_kwargs['filter'] = 'data'
+    return extract_kwargs
+
+
+def safe_tar_members(members, tarball):
+    """
+    Generator for members of specified tarball, which raises an error for members with an unsafe path
+    (absolute path, or path that includes '..').
+    """
+    for member in members:
+        path_parts = os.path.normpath(member.name).split(os.path.sep)
+        if os.path.isabs(member.name) or '..' in path_parts:
+            raise EasyBuildError("Unsafe path %s found in %s", member.name, tarball)
+        yield member
+
+
+class SharedCache(object):
+    """
+    Cache that is shared across installations (and users), located at a particular path.
+
+    Entries are named after a key, and are added atomically (by renaming a temporary file or directory),
+    so the cache can be used by concurrent EasyBuild sessions.
+    """
+
+    # suffix for name of cache entries
+    entry_suffix = ''
+
+    def __init__(self, path):
+        """
+        Initialize cache located at specified path.
+        """
+        self.path = path
+        self.log = fancylogger.getLogger(self.__class__.__name__, fname=False)
+
+    def entry_path(self, key):
+        """
+        Return path to cache entry for specified key.
+        """
+        return os.path.join(self.path, key + self.entry_suffix)
+
+    def mk_tmp_entry(self, is_dir=False):
+        """
+        Create temporary file or directory in cache, which can be turned into a cache entry via commit_entry.
+
+        :return: path to temporary file or directory
+        """
+        mkdir(self.path, parents=True)
+        if is_dir:
+            tmp_path = tempfile.mkdtemp(prefix=SHARED_CACHE_TMP_PREFIX, dir=self.path)
+            # permissions of temporary directory are too strict to share it with other users
+            os.chmod(tmp_path, SHARED_CACHE_DIR_PERMS)
+        else:
+            fd, tmp_path = tempfile.mkstemp(prefix=SHARED_CACHE_TMP_PREFIX, suffix=self.entry_suffix, dir=self.path)
+            os.close(fd)
+        return tmp_path
+
+    def commit_entry(self, tmp_path, key):
+        """
+        Turn specified temporary file or directory (see mk_tmp_entry) into cache entry for specified key.
+        The temporary file or directory is always cleaned up.
+
+        :return: True if cache entry was added, False if an entry for the key was already there
+        """
+        try:
+            if os.path.isfile(tmp_path):
+                os.chmod(tmp_path, os.stat(tmp_path).st_mode | SHARED_CACHE_FILE_PERMS)
+            # rename is atomic, so other EasyBuild sessions never see a partial entry;
+            # renaming a directory fails if an entry was added concurrently
+            os.rename(tmp_path, self.entry_path(key))
+            res = True
+        except OSError as err:
+            self.log.info("Failed to add entry for key %s to %s: %s", key, self.path, err)
+            res = False
+        finally:
+            if os.path.isdir(tmp_path):
+                remove_dir(tmp_path)
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        return res
+
+    def touch(self, entry_path):
+        """
+        Keep track of when specified cache entry was last used, to allow cleaning up the cache based on access time.
+
+        This is only possible for entries owned by the current user, so failing to do so is not considered an error.
+        """
+        try:
+            os.utime(entry_path, None)
+        except OSError as err:
+            self.log.debug("Failed to update modification time of %s: %s", entry_path, err)
+
+
+class TarballCache(SharedCache):
+    """
+    Shared cache in which each entry is a tarball with files to restore in an installation prefix.
+    """
+
+    entry_suffix = '.tar.gz'
+
+    def add_files(self, key, prefix, paths, recursive=True):
+        """
+        Add specified files/directories (relative paths) in specified prefix to cache, using specified key.
+        """
+        tmp_path = self.mk_tmp_entry()
+        try:
+            with tarfile.open(tmp_path, 'w:gz') as tar:
+                for path in paths:
+                    tar.add(os.path.join(prefix, path), arcname=path, recursive=recursive)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+        self.commit_entry(tmp_path, key)
+
+    def restore(self, key, prefix):
+        """
+        Unpack cache entry for specified key into specified installation prefix.
+
+        :return: True if cache entry was found and unpacked, False otherwise
+        """
+        entry_path = self.entry_path(key)
+        if not os.path.exists(entry_path):
+            self.log.debug("No entry found in %s for key %s", self.path, key)
+            return False
+
+        with tarfile.open(entry_path, 'r:gz') as tar:
+            members = list(safe_tar_members(tar.getmembers(), entry_path))
+            mkdir(prefix, parents=True)
+            tar.extractall(prefix, members=members, **tar_extract_kwargs())
+
+        self.post_restore(prefix, members)
+
+        self.touch(entry_path)
+
+        return True
+
+    def post_restore(self, prefix, members):
+        """
+        Hook that is called after specified members of a cache entry were unpacked in specified prefix.
+        """
+        pass
@@ -34,6 +34,7 @@ EasyBuild support for building and installing WRF, implemented as an easyblock
 """
 import os
 import re
+from multiprocessing.pool import ThreadPool
 
 from easybuild.tools import LooseVersion
 
@@ -44,13 +45,17 @@ from easybuild.framework.easyblock import EasyBlock
 from easybuild.framework.easyconfig import CUSTOM, MANDATORY
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import build_option
-from easybuild.tools.filetools import apply_regex_substitutions, change_dir
+from easybuild.tools.filetools import apply_regex_substitutions, copy_file, mkdir
 from easybuild.tools.filetools import patch_perl_script_autoflush, read_file, which
-from easybuild.tools.filetools import remove_file, symlink
+from easybuild.tools.filetools import remove_dir, remove_file, symlink
 from easybuild.tools.modules import get_software_root
 from easybuild.tools.run import run_cmd, run_cmd_qa
 
 
+# regex to check for successful test run
+WRF_TEST_SUCCESS_REGEX = re.compile("SUCCESS COMPLETE WRF")
+
+
 def det_wrf_subdir(wrf_version):
     """Determine WRF subdirectory for given WRF version."""
 
@@ -64,6 +69,68 @@ def det_wrf_subdir(wrf_version):
     return wrf_subdir
 
 
+def prepare_wrf_test_dir(run_dir, test_run_dir, extra_files_dir=None):
+    """
+    Prepare dedicated directory to run a WRF test case in, based on contents of specified WRF 'run' directory
+    (right after building the test case): executables and the namelist are copied,
+    since they are overwritten when building the next test case; everything else (like physics tables,
+    which can be quite big) is symlinked (symlinks are resolved first).
+
+    :param extra_files_dir: directory with additional files to symlink (for test cases with subtests)
+    :return: path to prepared directory
+    """
+    remove_dir(test_run_dir)
+    mkdir(test_run_dir, parents=True)
+
+    for filename in os.listdir(run_dir):
+        path = os.path.realpath(os.path.join(run_dir, filename))
+        if not os.path.exists(path):
+            # skip broken symlinks
+            continue
+        elif filename.endswith('.exe') or filename == 'namelist.input':
+            # building a test case replaces run/namelist.input with a copy of the namelist of that test case
+            copy_file(path, os.path.join(test_run_dir, filename))
+        else:
+            symlink(path, os.path.join(test_run_dir, filename))
+
+    if extra_files_dir:
+        for filename in os.listdir(extra_files_dir):
+            target = os.path.join(test_run_dir, filename)
+            if os.path.lexists(target):
+                remove_file(target)
+            symlink(os.path.join(extra_files_dir, filename), target)
+
+    return test_run_dir
+
+
+def run_wrf_test(test, test_cmd, test_run_dir):
+    """
+    Run WRF test case in specified directory, and check for success.
+
+    :return: None if test ran successfully, error message otherwise
+    """
+    # run test (don't use path argument of run_cmd, since it changes the working directory for the whole process)
+    (_, ec) = run_cmd("cd %s && %s" % (test_run_dir, test_cmd), log_all=False, log_ok=False, simple=False)
+
+    # read output file
+    out_fn = os.path.join(test_run_dir, 'rsl.error.0000')
+    if os.path.exists(out_fn):
+        out_txt = read_file(out_fn)
+    else:
+        out_txt = 'FILE NOT FOUND'
+
+    error = None
+    if ec == 0:
+        # exit code zero suggests success, but let's make sure...
+        if not WRF_TEST_SUCCESS_REGEX.search(out_txt):
+            error = "pattern '%s' not found in %s: %s" % (WRF_TEST_SUCCESS_REGEX.pattern, out_fn, out_txt)
+    else:
+        # non-zero exit code means trouble, show command output
+        error = "failed with exit code %s, output: %s" % (ec, out_txt)
+
+    return error
+
+
 class EB_WRF(EasyBlock):
     """Support for building/installing WRF."""
 
@@ -298,7 +365,7 @@ class EB_WRF(EasyBlock):
             # get list of WRF test cases
             self.testcases = []
             if os.path.exists('test'):
-                self.testcases = os.listdir('test')
+                self.testcases = sorted(os.listdir('test'))
 
             elif not self.dry_run:
                 raise EasyBuildError("Test directory not found, failed to determine list of test cases")
@@ -328,6 +395,17 @@ class EB_WRF(EasyBlock):
             # since otherwise run may fail because domain size is too small
             n_mpi_ranks = min(self.cfg['parallel'] // 2 + 1, 4)
 
+            # run test cases concurrently, each in a dedicated directory,
+            # as many as fit in the number of available cores (each test case uses n_mpi_ranks cores)
+            # (serial builds only use a single core, OpenMP builds use as many threads as MPI ranks would be used)
+            if self.cfg['buildtype'] == 'serial':
+                test_slots = 1
+            else:
+                test_slots = n_mpi_ranks
+            max_concurrent_tests = max(1, self.cfg['parallel'] // test_slots)
+            self.log.info("Running up to %d WRF test cases concurrently, using %d cores each",
+                          max_concurrent_tests, test_slots)
+
             # prepare run command
 
             # stack limit needs to be set to unlimited for WRF to work well
@@ -337,82 +415,80 @@ class EB_WRF(EasyBlock):
             else:
                 test_cmd = "ulimit -s unlimited && ./ideal.exe && ./wrf.exe >rsl.error.0000 2>&1"
 
-            # regex to check for successful test run
-            re_success = re.compile("SUCCESS COMPLETE WRF")
-
-            def run_test():
-                """Run a single test and check for success."""
-
-                # run test
-                (_, ec) = run_cmd(test_cmd, log_all=False, log_ok=False, simple=False)
-
-                # read output file
-                out_fn = 'rsl.error.0000'
-                if os.path.exists(out_fn):
-                    out_txt = read_file(out_fn)
-                else:
-                    out_txt = 'FILE NOT FOUND'
-
-                if ec == 0:
-                    # exit code zero suggests success, but let's make sure...
-                    if re_success.search(out_txt):
-                        self.log.info("Test %s ran successfully (found '%s' in %s)", test, re_success.pattern, out_fn)
-                    else:
-                        raise EasyBuildError("Test %s failed, pattern '%s' not found in %s: %s",
-                                             test, re_success.pattern, out_fn, out_txt)
-                else:
-                    # non-zero exit code means trouble, show command output
-                    raise EasyBuildError("Test %s failed with exit code %s, output: %s", test, ec, out_txt)
-
-                # clean up stuff that gets in the way
-                fn_prefs = ["wrfinput_", "namelist.output", "wrfout_", "rsl.out.", "rsl.error."]
-                for filename in os.listdir('.'):
-                    for pref in fn_prefs:
-                        if filename.startswith(pref):
-                            remove_file(filename)
-                            self.log.debug("Cleaned up file %s", filename)
-
-            # build and run each test case individually
+            # limit number of OpenMP threads when test cases are run concurrently, to stay within available cores
+            if max_concurrent_tests > 1 and self.cfg['buildtype'] in ['smpar', 'dm+sm']:
+                omp_threads = test_slots if self.cfg['buildtype'] == 'smpar' else 1
+                test_cmd = "export OMP_NUM_THREADS=%s && %s" % (omp_threads, test_cmd)
+
+            # disable binding of MPI processes to cores when test cases are run concurrently,
+            # since by default each mpirun would pin its processes to the same cores
+            if max_concurrent_tests > 1 and self.cfg['buildtype'] in self.parallel_build_types:
+                no_binding_env_vars = {
+                    toolchain.INTELMPI: 'I_MPI_PIN=off',  # @UndefinedVariable
+                    toolchain.MPICH: 'HYDRA_BINDING=none',  # @UndefinedVariable
+                    toolchain.MPICH2: 'HYDRA_BINDING=none',  # @UndefinedVariable
+                    toolchain.MVAPICH2: 'MV2_ENABLE_AFFINITY=0',  # @UndefinedVariable
+                    toolchain.OPENMPI: 'OMPI_MCA_hwloc_base_binding_policy=none',  # @UndefinedVariable
+                }
+                no_binding = no_binding_env_vars.get(self.toolchain.mpi_family())
+                if no_binding:
+                    test_cmd = "export %s && %s" % (no_binding, test_cmd)
+
+            tests_dir = os.path.join(self.builddir, 'wrf_tests')
+            run_dir = os.path.abspath('run')
+
+            # build each test case individually (in the shared source tree), and run them concurrently
+            pool = ThreadPool(processes=max_concurrent_tests)
+            results = []
             for test in self.testcases:
 
                 self.log.debug("Building and running test %s" % test)
 
                 # build and install
                 cmd = "./compile %s %s" % (self.par, test)
-                run_cmd(cmd, log_all=True, simple=True)
-
-                # run test
                 try:
-                    prev_dir = change_dir('run')
+                    run_cmd(cmd, log_all=True, simple=True)
+                except EasyBuildError:
+                    # don't leave test cases that are already running behind
+                    pool.terminate()
+                    raise
 
+                try:
                     if test in ["em_fire"]:
 
                         # handle tests with subtests seperately
-                        testdir = os.path.join("..", "test", test)
-
-                        for subtest in [x for x in os.listdir(testdir) if os.path.isdir(x)]:
-
-                            subtestdir = os.path.join(testdir, subtest)
-
-                            # link required files
-                            for filename in os.listdir(subtestdir):
-                                if os.path.exists(filename):
-                                    remove_file(filename)
-                                symlink(os.path.join(subtestdir, filename), filename)
-
-                            # run test
-                            run_test()
-
+                        testdir = os.path.abspath(os.path.join("test", test))
+                        subtests = [x for x in os.listdir(testdir) if os.path.isdir(os.path.join(testdir, x))]
+                        test_runs = [('%s_%s' % (test, x), os.path.join(testdir, x)) for x in sorted(subtests)]
                     else:
+                        test_runs = [(test, None)]
 
-                        # run test
-                        run_test()
-
-                    change_dir(prev_dir)
+                    for (test_name, subtestdir) in test_runs:
+                        test_run_dir = prepare_wrf_test_dir(run_dir, os.path.join(tests_dir, test_name),
+                                                            extra_files_dir=subtestdir)
+                        results.append((test_name, test_run_dir,
+                                        pool.apply_async(run_wrf_test, (test_name, test_cmd, test_run_dir))))
 
                 except OSError as err:
+                    pool.terminate()
                     raise EasyBuildError("An error occured when running test %s: %s", test, err)
 
+            pool.close()
+            pool.join()
+
+            failed = []
+            for (test_name, test_run_dir, res) in results:
+                error = res.get()
+                if error:
+                    failed.append("* %s (see %s): %s" % (test_name, test_run_dir, error))
+                else:
+                    self.log.info("Test %s ran successfully", test_name)
+                    # clean up output of test case, which can be quite big
+                    remove_dir(test_run_dir)
+
+            if failed:
+                raise EasyBuildError("%d WRF test(s) failed:\n%s", len(failed), '\n'.join(failed))
+
     # building/installing is done in build_step, so we can run tests
     def install_step(self):
         """Building was done in install dir, so nothing to do in install_step."""
@@ -35,10 +35,12 @@ or
 import os
 import sys
 from distutils import log
+from distutils.command.build_py import build_py
 from distutils.core import setup
 
 sys.path.append('easybuild')
 from easyblocks import VERSION  # noqa
+from easyblocks.easyblocks_index import write_easyblocks_index  # noqa
 
 FRAMEWORK_MAJVER = str(VERSION).split('.')[0]
 
@@ -51,6 +53,17 @@ def read(fname):
     return open(os.path.join(os.path.dirname(__file__), fname)).read()
 
 
+class BuildPyWithEasyblocksIndex(build_py):
+    """Custom build_py command, which (re)generates the index of easyblocks for the easyblocks being installed."""
+
+    def run(self):
+        build_py.run(self)
+        if not self.dry_run:
+            easyblocks_dir = os.path.join(self.build_lib, 'easybuild', 'easyblocks')
+            index_path = write_easyblocks_index(easyblocks_dir)
+            log.info("Generated index of easyblocks at %s" % index_path)
+
+
 log.info("Installing version %s (required versions: API >= %s)" % (VERSION, FRAMEWORK_MAJVER))
 
 setup(
@@ -65,7 +78,8 @@ setup(
     url="https://easybuild.io",
     packages=["easybuild", "easybuild.easyblocks", "easybuild.easyblocks.generic"],
     package_dir={"easybuild.easyblocks": "easybuild/easyblocks"},
-    package_data={'easybuild.easyblocks': ["[a-z0-9]/*.py"]},
+    package_data={'easybuild.easyblocks': ["[a-z0-9]/*.py", "easyblocks_index.json"]},
+    cmdclass={'build_py': BuildPyWithEasyblocksIndex},
     long_description=read("README.rst"),
     classifiers=[
         "Development Status :: 5 - Production/Stable",
@@ -28,18 +28,28 @@ Unit tests for specific easyblocks.
 @author: Kenneth Hoste (Ghent University)
 """
 import copy
+import errno
+import glob
+import json
 import os
+import re
 import stat
 import sys
+import tarfile
 import tempfile
 import textwrap
+import zipfile
+from io import BytesIO
 from unittest import TestLoader, TextTestRunner
 from test.easyblocks.module import cleanup
 
 import easybuild.tools.options as eboptions
+import easybuild.easyblocks.blasbenchmark as blasbenchmark
+import easybuild.easyblocks.generic.juliapackage as juliapackage
 import easybuild.easyblocks.generic.pythonpackage as pythonpackage
 from easybuild.base.testing import TestCase
-from easybuild.easyblocks.generic.cmakemake import det_cmake_version
+from easybuild.easyblocks.generic.cargo import CratesStore
+from easybuild.easyblocks.generic.cmakemake import CMakeMake, det_cmake_version, det_compiler_launcher_stats
 from easybuild.easyblocks.generic.toolchain import Toolchain
 from easybuild.framework.easyblock import EasyBlock, get_easyblock_instance
 from easybuild.framework.easyconfig.easyconfig import process_easyconfig
@@ -47,10 +57,12 @@ from easybuild.tools import config
 from easybuild.tools.build_log import EasyBuildError
 from easybuild.tools.config import GENERAL_CLASS, get_module_syntax
 from easybuild.tools.environment import modify_env
-from easybuild.tools.filetools import adjust_permissions, mkdir, move_file, remove_dir, symlink, write_file
+from easybuild.tools.filetools import adjust_permissions, change_dir, compute_checksum, mkdir, move_file, read_file
+from easybuild.tools.filetools import remove_dir, remove_file, symlink, write_file
 from easybuild.tools.modules import modules_tool
 from easybuild.tools.options import set_tmpdir
 from easybuild.tools.py2vs3 import StringIO
+from easybuild.tools.run import run_cmd
 
 
 class EasyBlockSpecificTest(TestCase):
@@ -266,6 +278,73 @@ class EasyBlockSpecificTest(TestCase):
         """))
         self.assertEqual(det_cmake_version(), '1.2.3-rc4')
 
+    def test_cmakemake_compiler_launcher(self):
+        """Test support for using a compiler launcher in CMakeMake generic easyblock."""
+
+        # set up fake 'ccache' and 'sccache' commands
+        os.environ['PATH'] = '%s:%s' % (self.tmpdir, os.getenv('PATH'))
+        ccache = os.path.join(self.tmpdir, 'ccache')
+        write_file(ccache, '\n'.join([
+            "#!/bin/bash",
+            "echo -e 'cache_miss\\t8'",
+            "echo -e 'direct_cache_hit\\t10'",
+            "echo -e 'preprocessed_cache_hit\\t2'",
+        ]))
+        sccache = os.path.join(self.tmpdir, 'sccache')
+        write_file(sccache, '\n'.join([
+            "#!/bin/bash",
+            "echo '{\"stats\": {\"cache_hits\": {\"counts\": {\"C/C++\": 3, \"CUDA\": 1}}, "
+            "\"cache_misses\": {\"counts\": {\"C/C++\": 4}}}}'",
+        ]))
+        adjust_permissions(ccache, stat.S_IXUSR)
+        adjust_permissions(sccache, stat.S_IXUSR)
+
+        self.assertEqual(det_compiler_launcher_stats(ccache), (12, 8))
+        self.assertEqual(det_compiler_launcher_stats('sccache'), (4, 4))
+
+        write_file(ccache, "#!/bin/bash\necho 'unknown option: --print-stats'\nexit 1")
+        self.assertEqual(det_compiler_launcher_stats(ccache), None)
+        write_file(ccache, "#!/bin/bash\necho -e 'cache_miss\\t8'")
+        self.assertEqual(det_compiler_launcher_stats(ccache), None)
+
+        test_ec = os.path.join(self.tmpdir, 'test.eb')
+        write_file(test_ec, '\n'.join([
+            "easyblock = 'CMakeMake'",
+            "name = 'test'",
+            "version = '1.0'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+        ]))
+        cmake = get_easyblock_instance(process_easyconfig(test_ec)[0])
+        cmake.builddir = os.path.join(self.tmpdir, 'build')
+        self.assertEqual(cmake.setup_compiler_launcher(), {})
+        self.assertEqual(cmake.compiler_launcher_stats(), None)
+
+        cmake.cfg['compiler_launcher'] = 'ccache'
+        cmake.cfg['compiler_launcher_cache_dir'] = os.path.join(self.tmpdir, 'ccache_dir')
+        cmake.cfg['compiler_launcher_max_size'] = '5G'
+        self.assertEqual(cmake.setup_compiler_launcher(), {
+            'CMAKE_C_COMPILER_LAUNCHER': ccache,
+            'CMAKE_CXX_COMPILER_LAUNCHER': ccache,
+            'CMAKE_CUDA_COMPILER_LAUNCHER': ccache,
+        })
+        self.assertEqual(os.getenv('CCACHE_DIR'), os.path.join(self.tmpdir, 'ccache_dir'))
+        self.assertEqual(os.getenv('CCACHE_MAXSIZE'), '5G')
+        self.assertEqual(os.getenv('CCACHE_BASEDIR'), cmake.builddir)
+
+        cmake.cfg['compiler_launcher'] = 'sccache'
+        opts = cmake.setup_compiler_launcher()
+        self.assertEqual(opts['CMAKE_CXX_COMPILER_LAUNCHER'], sccache)
+        self.assertEqual(os.getenv('SCCACHE_DIR'), os.path.join(self.tmpdir, 'ccache_dir'))
+        self.assertEqual(os.getenv('SCCACHE_CACHE_SIZE'), '5G')
+        self.assertEqual(cmake.compiler_launcher_stats(), (4, 4))
+
+        cmake.cfg['compiler_launcher'] = 'distcc'
+        self.assertErrorRegex(EasyBuildError, "Unknown compiler launcher 'distcc'", cmake.setup_compiler_launcher)
+        cmake.cfg['compiler_launcher'] = os.path.join(self.tmpdir, 'nosuchdir', 'ccache')
+        self.assertErrorRegex(EasyBuildError, "Compiler launcher .* not found", cmake.setup_compiler_launcher)
+
     def test_det_py_install_scheme(self):
         """Test det_py_install_scheme function provided by PythonPackage easyblock."""
         res = pythonpackage.det_py_install_scheme(sys.executable)
@@ -279,6 +358,260 @@ class EasyBlockSpecificTest(TestCase):
         res = pythonpackage.det_py_install_scheme()
         self.assertTrue(isinstance(res, str))
 
+    def test_det_python_facts(self):
+        """Test det_python_facts function provided by PythonPackage easyblock."""
+        pythonpackage.clear_python_facts_cache()
+
+        # use wrapper for currently used python command that keeps track of how often it is run
+        counter = os.path.join(self.tmpdir, 'counter.txt')
+        python_cmd = os.path.join(self.tmpdir, 'python')
+        write_file(python_cmd, '#!/bin/bash\necho run >> %s\n%s "$@"\n' % (counter, sys.executable))
+        adjust_permissions(python_cmd, stat.S_IXUSR)
+
+        pyver = '%s.%s.%s' % sys.version_info[:3]
+        self.assertEqual(pythonpackage.det_python_version(python_cmd), pyver)
+        pylibdirs = pythonpackage.get_pylibdirs(python_cmd)
+        self.assertTrue(pylibdirs[0].startswith('lib'))
+        self.assertTrue(isinstance(pythonpackage.det_py_install_scheme(python_cmd), str))
+        self.assertTrue(isinstance(pythonpackage.det_pip_version(python_cmd), str))
+
+        # all facts should be determined with a single run of the python command
+        self.assertEqual(read_file(counter).splitlines(), ['run'])
+
+        facts = pythonpackage.det_python_facts(python_cmd)
+        self.assertEqual(sorted(facts.keys()), ['errors', 'marker_env', 'pip_version', 'py_install_scheme',
+                                                'pylibdir', 'pylibdir_plat', 'sys_path', 'version'])
+        self.assertEqual(facts['errors'], {})
+        self.assertEqual(facts['version'], pyver)
+        self.assertEqual(facts['marker_env']['python_version'], '%s.%s' % sys.version_info[:2])
+        self.assertEqual(facts['marker_env']['sys_platform'], sys.platform)
+        self.assertTrue(isinstance(facts['sys_path'], list))
+        self.assertEqual(read_file(counter).splitlines(), ['run'])
+
+        # cache is invalidated when python command changes
+        os.utime(python_cmd, (0, 0))
+        self.assertEqual(pythonpackage.det_python_version(python_cmd), pyver)
+        self.assertEqual(read_file(counter).splitlines(), ['run', 'run'])
+
+        # also when environment variables that affect Python search path are changed
+        os.environ['PYTHONPATH'] = self.tmpdir
+        self.assertEqual(pythonpackage.det_python_version(python_cmd), pyver)
+        self.assertEqual(read_file(counter).splitlines(), ['run', 'run', 'run'])
+
+        # clearing the cache also works
+        pythonpackage.clear_python_facts_cache()
+        self.assertEqual(pythonpackage.det_python_version(python_cmd), pyver)
+        self.assertEqual(read_file(counter).splitlines(), ['run', 'run', 'run', 'run'])
+
+        # version can be determined even if modules used to determine other facts are not available
+        # (like distutils, which is not installed by default on Debian/Ubuntu)
+        no_mods = ['distutils', 'distutils.sysconfig', 'platform', 'sysconfig']
+        pycode = "import sys; sys.modules.update((m, None) for m in %s); exec(sys.stdin.read())" % no_mods
+        python_cmd = os.path.join(self.tmpdir, 'python_without_distutils')
+        write_file(python_cmd, '#!/bin/bash\n%s -c "%s"\n' % (sys.executable, pycode))
+        adjust_permissions(python_cmd, stat.S_IXUSR)
+        self.assertEqual(pythonpackage.det_python_version(python_cmd), pyver)
+        facts = pythonpackage.det_python_facts(python_cmd)
+        for fact in ['marker_env', 'pylibdir', 'pylibdir_plat', 'py_install_scheme']:
+            self.assertEqual(facts[fact], None)
+        self.assertEqual(sorted(facts['errors']), ['marker_env', 'py_install_scheme', 'pylibdir', 'pylibdir_plat'])
+        error_pattern = "Failed to determine Python library directory for .*python_without_distutils: .*"
+        self.assertErrorRegex(EasyBuildError, error_pattern, pythonpackage.det_pylibdir, python_cmd=python_cmd)
+
+    def test_det_installed_python_packages(self):
+        """Test det_installed_python_packages and det_unmet_python_requirements functions."""
+        pythonpackage.clear_python_facts_cache()
+
+        sitedir1 = os.path.join(self.tmpdir, 'site1')
+        sitedir2 = os.path.join(self.tmpdir, 'site2')
+
+        write_file(os.path.join(sitedir1, 'foo_bar-1.0.dist-info', 'METADATA'), '\n'.join([
+            "Metadata-Version: 2.1",
+            "Name: Foo_Bar",
+            "Version: 1.0",
+            "Requires-Dist: baz>=2.0",
+            "Requires-Dist: nosuchpkg; python_version < '2.0'",
+            "Requires-Dist: test-only; extra == 'test'",
+            "Requires-Dist: oldpkg<1.0",
+        ]))
+        # *.egg-info directory with requires.txt, only requirements for extras are not met
+        write_file(os.path.join(sitedir1, 'baz-2.1.egg-info', 'PKG-INFO'), "Name: baz\nVersion: 2.1\n")
+        write_file(os.path.join(sitedir1, 'baz-2.1.egg-info', 'requires.txt'), '\n'.join([
+            "oldpkg",
+            "[test]",
+            "nosuchpkg",
+            "[:python_version < '2.0']",
+            "nosuchpkg",
+        ]))
+        # *.egg-info file, package is also installed in 2nd directory (which should be ignored)
+        write_file(os.path.join(sitedir1, 'oldpkg-1.2.egg-info'), "Name: oldpkg\nVersion: 1.2\n")
+        write_file(os.path.join(sitedir2, 'oldpkg-0.1.dist-info', 'METADATA'), "Name: oldpkg\nVersion: 0.1\n")
+        write_file(os.path.join(sitedir2, 'unversioned-0.0.0.dist-info', 'METADATA'),
+                   "Name: unversioned\nVersion: 0.0.0\nRequires-Dist: missing\n")
+        # metadata directory without metadata is ignored
+        mkdir(os.path.join(sitedir2, 'broken-1.0.dist-info'))
+
+        os.environ['PYTHONPATH'] = os.pathsep.join([sitedir1, sitedir2])
+        python_cmd = sys.executable
+        dists = pythonpackage.det_installed_python_packages(python_cmd)
+        pkgs = dict((dist['name'], (dist['version'], dist['requires'])) for dist in dists)
+        self.assertEqual(pkgs['Foo_Bar'][0], '1.0')
+        self.assertEqual(pkgs['baz'], ('2.1', ['oldpkg', "nosuchpkg; python_version < '2.0'"]))
+        self.assertEqual(pkgs['oldpkg'], ('1.2', []))
+        self.assertEqual(pkgs['unversioned'], ('0.0.0', ['missing']))
+        self.assertFalse('broken' in pkgs)
+
+        # metadata is cached per directory, until contents of directory change
+        self.assertTrue(pythonpackage.read_python_pkgs_metadata(sitedir1) is
+                        pythonpackage.read_python_pkgs_metadata(sitedir1))
+        write_file(os.path.join(sitedir1, 'new-1.0.dist-info', 'METADATA'), "Name: new\nVersion: 1.0\n")
+        dists = pythonpackage.det_installed_python_packages(python_cmd)
+        self.assertTrue('new' in [dist['name'] for dist in dists])
+
+        if pythonpackage.Requirement is None:
+            self.assertEqual(pythonpackage.det_unmet_python_requirements(dists, {}), None)
+        else:
+            marker_env = pythonpackage.det_python_facts(python_cmd)['marker_env']
+            self.assertEqual(pythonpackage.det_unmet_python_requirements(dists, marker_env), [
+                "foo-bar 1.0 has requirement oldpkg<1.0, but you have oldpkg 1.2.",
+                "unversioned 0.0.0 requires missing, which is not installed.",
+            ])
+
+    def test_check_python_imports(self):
+        """Test check_python_imports function provided by PythonPackage easyblock."""
+
+        # create Python modules that print something when imported, or fail to import
+        write_file(os.path.join(self.tmpdir, 'chatty.py'), "import sys; print('hello'); sys.stderr.write('world')")
+        write_file(os.path.join(self.tmpdir, 'broken.py'), "import this_module_does_not_exist")
+        write_file(os.path.join(self.tmpdir, 'exiting.py'), "import sys; sys.exit(3)")
+        write_file(os.path.join(self.tmpdir, 'exiting_msg.py'), "import sys; sys.exit('bye')")
+        os.environ['PYTHONPATH'] = self.tmpdir
+
+        modnames = ['os.path', 'chatty', 'broken', 'exiting', 'exiting_msg', 'nosuchmodule']
+        res = pythonpackage.check_python_imports(sys.executable, modnames)
+
+        self.assertEqual(sorted(res.keys()), sorted(modnames))
+        self.assertEqual(res['os.path'], (0, ''))
+        self.assertEqual(res['chatty'], (0, 'hello\nworld'))
+        self.assertEqual(res['exiting'], (3, ''))
+        self.assertEqual(res['exiting_msg'], (1, 'bye\n'))
+
+        # output for failing imports should match with output of 'python -c "import ..."'
+        for modname in ['broken', 'nosuchmodule']:
+            ec, out = res[modname]
+            self.assertEqual(ec, 1)
+            self.assertTrue(out.startswith('Traceback (most recent call last):\n'
+                                           '  File "<string>", line 1, in <module>'))
+        self.assertTrue(res['broken'][1].endswith("No module named 'this_module_does_not_exist'\n"))
+        self.assertTrue(res['nosuchmodule'][1].endswith("No module named 'nosuchmodule'\n"))
+
+        # failing imports are done in isolation
+        write_file(os.path.join(self.tmpdir, 'sets_flag.py'), "import os; os.environ['TEST_FLAG'] = '1'; 1 / 0")
+        write_file(os.path.join(self.tmpdir, 'needs_flag.py'), "import os; assert 'TEST_FLAG' in os.environ")
+        res = pythonpackage.check_python_imports(sys.executable, ['sets_flag', 'needs_flag'])
+        self.assertEqual(res['sets_flag'][0], 1)
+        self.assertEqual(res['needs_flag'][0], 1)
+
+        # successfully imported modules are only imported once more (in parent process), and are inherited by
+        # subsequent imports; output produced by import in parent process is discarded
+        imports_log = os.path.join(self.tmpdir, 'imports.log')
+        write_file(os.path.join(self.tmpdir, 'shared_dep.py'), '\n'.join([
+            "print('importing shared_dep')",
+            "with open(%r, 'a') as fh:" % imports_log,
+            "    fh.write('shared_dep\\n')",
+        ]))
+        for modname in ['uses_dep1', 'uses_dep2']:
+            write_file(os.path.join(self.tmpdir, modname + '.py'), "import shared_dep")
+        res = pythonpackage.check_python_imports(sys.executable, ['shared_dep', 'uses_dep1', 'uses_dep2'])
+        self.assertEqual(res, {
+            'shared_dep': (0, 'importing shared_dep\n'),
+            'uses_dep1': (0, ''),
+            'uses_dep2': (0, ''),
+        })
+        self.assertEqual(read_file(imports_log), 'shared_dep\n' * 2)
+
+        # None is returned if checking imports failed
+        self.assertEqual(pythonpackage.check_python_imports('false', ['os']), None)
+
+    def test_det_python_pkg_requirements(self):
+        """Test det_python_pkg_requirements function provided by PythonPackage easyblock."""
+
+        det_req_name = pythonpackage.det_python_requirement_name
+        self.assertEqual(det_req_name('numpy'), 'numpy')
+        self.assertEqual(det_req_name('scikit_build_core >= 0.4.3'), 'scikit_build_core')
+        self.assertEqual(det_req_name("tomli>=1.1.0; python_version < '3.11'"), 'tomli')
+        self.assertEqual(det_req_name('pytest; extra == "test"'), None)
+        self.assertEqual(det_req_name('pytest; extra == "test"', extras=['test']), 'pytest')
+
+        # wheel: only metadata in *.dist-info/METADATA is relevant
+        whl = os.path.join(self.tmpdir, 'example-1.0-py3-none-any.whl')
+        with zipfile.ZipFile(whl, 'w') as archive:
+            archive.writestr('example/__init__.py', '')
+            archive.writestr('example-1.0.dist-info/METADATA', '\n'.join([
+                "Metadata-Version: 2.1",
+                "Name: example",
+                "Version: 1.0",
+                "Requires-Dist: numpy (>=1.20)",
+                "Requires-Dist: Typing-Extensions; python_version < '3.8'",
+                'Requires-Dist: pytest ; extra == "test"',
+            ]))
+        res = pythonpackage.det_python_pkg_requirements(whl)
+        self.assertEqual(res, ['numpy', 'Typing-Extensions'])
+
+        def create_sdist(path, files):
+            """Create source tarball with specified files."""
+            with tarfile.open(path, 'w:gz') as archive:
+                for name, txt in files.items():
+                    info = tarfile.TarInfo(name=os.path.join('example-1.0', name))
+                    info.size = len(txt)
+                    archive.addfile(info, BytesIO(txt.encode('utf-8')))
+
+        sdist = os.path.join(self.tmpdir, 'example-1.0.tar.gz')
+
+        # requirements in PKG-INFO are not considered to be accurate with older metadata versions,
+        # and legacy builds require setuptools
+        pkg_info_lines = [
+            "Metadata-Version: 2.1",
+            "Name: example",
+            "Version: 1.0",
+            "Requires-Dist: scipy",
+        ]
+        create_sdist(sdist, {'PKG-INFO': '\n'.join(pkg_info_lines), 'setup.py': ''})
+        self.assertEqual(pythonpackage.det_python_pkg_requirements(sdist), None)
+
+        pkg_info_lines[0] = "Metadata-Version: 2.2"
+        create_sdist(sdist, {'PKG-INFO': '\n'.join(pkg_info_lines), 'setup.py': ''})
+        res = pythonpackage.det_python_pkg_requirements(sdist)
+        self.assertEqual(res, ['setuptools', 'wheel', 'scipy'])
+
+        create_sdist(sdist, {'PKG-INFO': '\n'.join(pkg_info_lines + ["Dynamic: Requires-Dist"]), 'setup.py': ''})
+        self.assertEqual(pythonpackage.det_python_pkg_requirements(sdist), None)
+
+        if pythonpackage.tomllib is not None:
+            pyproject_toml = '\n'.join([
+                "[build-system]",
+                "requires = ['hatchling', 'hatch-vcs']",
+                "[project]",
+                "name = 'example'",
+                "dependencies = ['numpy>=1.20']",
+                "[project.optional-dependencies]",
+                "test = ['pytest']",
+            ])
+            create_sdist(sdist, {'PKG-INFO': '\n'.join(pkg_info_lines[:3]), 'pyproject.toml': pyproject_toml})
+            res = pythonpackage.det_python_pkg_requirements(sdist)
+            self.assertEqual(res, ['hatchling', 'hatch-vcs', 'numpy'])
+            res = pythonpackage.det_python_pkg_requirements(sdist, extras=['test'])
+            self.assertEqual(res, ['hatchling', 'hatch-vcs', 'numpy', 'pytest'])
+
+            # dependencies may be specified dynamically, so can't be determined (without accurate PKG-INFO)
+            pyproject_toml = pyproject_toml.replace("name = 'example'", "name = 'example'\ndynamic = ['dependencies']")
+            pkg_info = '\n'.join(["Metadata-Version: 2.1"] + pkg_info_lines[1:])
+            create_sdist(sdist, {'PKG-INFO': pkg_info, 'pyproject.toml': pyproject_toml})
+            self.assertEqual(pythonpackage.det_python_pkg_requirements(sdist), None)
+
+        write_file(sdist, 'not a tarball')
+        self.assertEqual(pythonpackage.det_python_pkg_requirements(sdist), None)
+
     def test_handle_local_py_install_scheme(self):
         """Test handle_local_py_install_scheme function provided by PythonPackage easyblock."""
 
@@ -359,6 +692,1460 @@ class EasyBlockSpecificTest(TestCase):
         self.assertTrue(os.path.isdir(lib64_site_path))
         self.assertFalse(os.path.islink(lib64_site_path))
 
+    def test_pythonpackage_wheel_cache(self):
+        """Test use of cache of wheels by PythonPackage easyblock."""
+        sdist = os.path.join(self.tmpdir, 'test-1.0.tar.gz')
+        write_file(sdist, 'not a real sdist')
+        wheel_cache = os.path.join(self.tmpdir, 'wheels')
+
+        test_ec = os.path.join(self.tmpdir, 'test.eb')
+        test_ec_txt = '\n'.join([
+            "easyblock = 'PythonPackage'",
+            "name = 'test'",
+            "version = '1.0'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+            "use_pip = True",
+            "preinstallopts = 'CFLAGS=-O2'",
+            "wheel_cache = '%s'" % wheel_cache,
+        ])
+
+        def get_pypkg(deps=None):
+            """Get instance of PythonPackage easyblock for test easyconfig."""
+            ec_path, ec_txt = test_ec, test_ec_txt
+            if deps:
+                # use a different easyconfig file, since parsed easyconfig files are cached
+                ec_path = os.path.join(self.tmpdir, 'test-%s.eb' % len(os.listdir(self.tmpdir)))
+                ec_txt += "\ndependencies = %s" % str(deps)
+            write_file(ec_path, ec_txt)
+            pypkg = get_easyblock_instance(process_easyconfig(ec_path)[0])
+            pypkg.builddir = os.path.join(self.tmpdir, 'build')
+            mkdir(pypkg.builddir, parents=True)
+            pypkg.src = [{'name': os.path.basename(sdist), 'path': sdist}]
+            pypkg.python_cmd = sys.executable
+            return pypkg
+
+        # wheel is built first when it's not available in cache yet, and installed from where it was built
+        pypkg = get_pypkg()
+        cmd = pypkg.compose_install_command('/test/prefix')
+        wheel_dir = pypkg.wheel_dir
+        self.assertTrue(os.path.isdir(wheel_dir))
+        regex = re.compile(r'^CFLAGS=-O2 %s -m pip wheel --wheel-dir=%s --no-deps --no-build-isolation \. '
+                           r'&& %s -m pip install --prefix=/test/prefix .*--no-deps.* %s$' %
+                           (sys.executable, wheel_dir, sys.executable, os.path.join(wheel_dir, r'\*\.whl')))
+        self.assertTrue(regex.match(cmd), "Pattern '%s' should match: %s" % (regex.pattern, cmd))
+        self.assertNotIn('--ignore-installed --', cmd.split('&&')[0])
+
+        # wheel is added to cache after installation
+        wheel = 'test-1.0-py3-none-any.whl'
+        write_file(os.path.join(wheel_dir, wheel), 'wheel')
+        cache = pypkg.wheel_cache()
+        cache.add(pypkg.wheel_cache_key, wheel_dir)
+        cached_wheel = cache.lookup(pypkg.wheel_cache_key)
+        self.assertEqual(cached_wheel, os.path.join(wheel_cache, pypkg.wheel_cache_key, wheel))
+        # adding it again (for example by another session) is not a problem
+        cache.add(pypkg.wheel_cache_key, wheel_dir)
+        self.assertEqual(os.listdir(wheel_cache), [pypkg.wheel_cache_key])
+
+        # cached wheel is installed when reinstalling
+        pypkg = get_pypkg()
+        cmd = pypkg.compose_install_command('/test/prefix')
+        self.assertEqual(pypkg.wheel_dir, None)
+        self.assertNotIn('pip wheel', cmd)
+        self.assertTrue(cmd.endswith(' ' + cached_wheel))
+
+        # changing the source file implies that wheel is built again
+        write_file(sdist, 'changed sdist')
+        pypkg = get_pypkg()
+        cmd = pypkg.compose_install_command('/test/prefix')
+        self.assertIn('pip wheel', cmd)
+        self.assertNotEqual(pypkg.wheel_cache_key, os.listdir(wheel_cache)[0])
+
+        # dependencies are taken into account, incl. version and versionsuffix
+        keys = set()
+        for deps in [None, [('dep', '1.0')], [('dep', '2.0')], [('dep', '2.0', '-CUDA-12.1.1')]]:
+            keys.add(get_pypkg(deps=deps).wheel_cache_key_for('.', ''))
+        self.assertEqual(len(keys), 4)
+
+        # no wheel cache is used when installing from a wheel
+        pypkg.src = [{'name': wheel, 'path': os.path.join(self.tmpdir, wheel)}]
+        pypkg.wheel_dir = None
+        cmd = pypkg.compose_install_command('/test/prefix')
+        self.assertNotIn('pip wheel', cmd)
+        self.assertEqual(pypkg.wheel_dir, None)
+
+    def test_blas_benchmark(self):
+        """Test BLAS micro-benchmark harness for numpy installations."""
+        cmds_log = os.path.join(self.tmpdir, 'cmds.log')
+
+        # fake 'python' command that mimics benchmark script: performance scales perfectly with number of threads
+        fake_python = os.path.join(self.tmpdir, 'fake_python')
+        write_file(fake_python, '\n'.join([
+            "#!%s" % sys.executable,
+            "import json, os, sys",
+            "script, threads = sys.stdin.read(), int(os.environ['OMP_NUM_THREADS'])",
+            "if 'for size in [1000, 2000]' in script:",
+            "    with open('%s', 'a') as fh:" % cmds_log,
+            "        fh.write('%s %s\\n' % (threads, os.environ['MKL_NUM_THREADS']))",
+            "print('warning: this is a fake python')",
+            "print(json.dumps([",
+            "    {'kernel': 'gemm', 'size': 1000, 'time': 0.4 / threads, 'gflops': 5 * threads},",
+            "    {'kernel': 'gemm', 'size': 2000, 'time': 1.0, 'gflops': 8 * threads},",
+            "    {'kernel': 'gemv', 'size': 1000, 'time': 0.01, 'gflops': 0.2},",
+            "]))",
+        ]))
+        adjust_permissions(fake_python, stat.S_IXUSR, add=True)
+
+        res = blasbenchmark.run_blas_benchmark(fake_python, sizes=[1000, 2000], threads=[1, 4, 1])
+        self.assertEqual(read_file(cmds_log), '1 1\n4 4\n')
+        self.assertEqual([(x['kernel'], x['size'], x['threads']) for x in res], [
+            ('gemm', 1000, 1), ('gemm', 2000, 1), ('gemv', 1000, 1),
+            ('gemm', 1000, 4), ('gemm', 2000, 4), ('gemv', 1000, 4),
+        ])
+        self.assertEqual(res[4]['gflops'], 32)
+
+        error_pattern = "Unknown kernel\\(s\\) for BLAS benchmark: dgemm"
+        self.assertErrorRegex(EasyBuildError, error_pattern, blasbenchmark.run_blas_benchmark, fake_python,
+                              kernels=['gemm', 'dgemm'])
+        error_pattern = "BLAS benchmark using 1 thread\\(s\\) failed \\(exit code 1\\)"
+        self.assertErrorRegex(EasyBuildError, error_pattern, blasbenchmark.run_blas_benchmark, 'false', threads=[1])
+
+        # best matrix-matrix product performance for each thread count is compared to peak performance of cores
+        check = blasbenchmark.check_blas_benchmark
+        self.assertEqual(check(res, peak_gflops=40, min_efficiency=0.2, time_limit=500), [])
+        fails = check(res, peak_gflops=40, min_efficiency=0.25, time_limit=50)
+        self.assertEqual(len(fails), 3)
+        regex = re.compile(r"using 1 thread\(s\): 8.00 GFLOP/s \(20.0% of peak\) < 10.00 GFLOP/s$")
+        self.assertTrue(regex.search(fails[0]), "Pattern '%s' should be found in: %s" % (regex.pattern, fails[0]))
+        self.assertTrue(fails[1].startswith("Performance of matrix-matrix product using 4 thread(s): 32.00 GFLOP/s"))
+        self.assertEqual(fails[2], "Time for 1000x1000 matrix-matrix product using 4 thread(s): 100 msec >= 50 msec")
+        # efficiency is not checked if peak performance is unknown, or if no minimal efficiency is specified
+        self.assertEqual(check(res, min_efficiency=0.9), [])
+        self.assertEqual(check(res, peak_gflops=1000, time_limit=500), [])
+
+        peak_gflops = blasbenchmark.det_cpu_peak_gflops()
+        self.assertTrue(peak_gflops is None or peak_gflops > 0)
+
+        # results are stored in easybuild subdirectory of installation directory
+        test_ec = os.path.join(self.tmpdir, 'test_blas_benchmark.eb')
+        write_file(test_ec, '\n'.join([
+            "easyblock = 'PythonPackage'",
+            "name = 'test'",
+            "version = '1.0'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+        ]))
+        eb = get_easyblock_instance(process_easyconfig(test_ec)[0])
+        eb.installdir = os.path.join(self.tmpdir, 'install')
+        fails = blasbenchmark.blas_benchmark(eb, fake_python, threads=[2], min_efficiency=0.01, time_limit=500)
+        self.assertEqual(fails, [])
+        results_path = os.path.join(eb.installdir, 'easybuild', 'blas-benchmark-test.json')
+        data = json.loads(read_file(results_path))
+        self.assertEqual(data['name'], 'test')
+        self.assertEqual(data['peak_gflops_per_core'], peak_gflops)
+        self.assertEqual([(x['kernel'], x['threads'], x['gflops']) for x in data['results']],
+                         [('gemm', 2, 10), ('gemm', 2, 16), ('gemv', 2, 0.2)])
+
+        # installation directory is not touched when only running sanity check
+        remove_dir(eb.installdir)
+        config.update_build_option('sanity_check_only', True)
+        try:
+            self.assertEqual(blasbenchmark.blas_benchmark(eb, fake_python, threads=[2], time_limit=500), [])
+        finally:
+            config.update_build_option('sanity_check_only', False)
+        self.assertFalse(os.path.exists(eb.installdir))
+
+    def test_rpackage_required_deps(self):
+        """Test determining required dependencies of R packages, and ordering extensions accordingly."""
+        import easybuild.easyblocks.generic.rpackage as rpackage
+        from easybuild.easyblocks.generic.bundle import order_exts_by_required_deps
+
+        description = textwrap.dedent("""
+            Package: foo
+            Version: 1.0
+            Depends: R (>= 3.5.0), bar,
+                baz (>= 1.2)
+            Imports: methods,
+            \tRcpp (>= 0.11.0)
+            LinkingTo: Rcpp
+            Suggests: testthat
+        """).lstrip()
+        fields = rpackage.parse_r_pkg_description(description)
+        self.assertEqual(fields['Package'], 'foo')
+        self.assertEqual(rpackage.det_r_pkg_deps(fields, name='foo'), ['bar', 'baz', 'methods', 'Rcpp'])
+
+        tarball = os.path.join(self.tmpdir, 'foo_1.0.tar.gz')
+        with tarfile.open(tarball, 'w:gz') as tar:
+            # DESCRIPTION files for other packages may be included too
+            for name, txt in [('foo/inst/sub/DESCRIPTION', 'Package: sub\nDepends: other\n'),
+                              ('foo/DESCRIPTION', description)]:
+                data = txt.encode('utf-8')
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                tar.addfile(info, BytesIO(data))
+
+        self.assertEqual(rpackage.read_r_pkg_description(tarball, 'foo'), fields)
+        self.assertEqual(rpackage.read_r_pkg_description(tarball, 'sub')['Depends'], 'other')
+        self.assertEqual(rpackage.read_r_pkg_description(tarball, 'nosuchpkg'), None)
+
+        error_pattern = "Failed to read DESCRIPTION file for R package foo"
+        self.assertErrorRegex(EasyBuildError, error_pattern, rpackage.read_r_pkg_description, sys.executable, 'foo')
+
+        # required dependencies are cached, using SHA256 checksum from easyconfig or path of source tarball as key
+        test_ec = os.path.join(self.tmpdir, 'test.eb')
+        write_file(test_ec, '\n'.join([
+            "easyblock = 'RPackage'",
+            "name = 'foo'",
+            "version = '1.0'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+        ]))
+        eb = get_easyblock_instance(process_easyconfig(test_ec)[0])
+        eb.src = tarball
+        eb.ext = {'name': 'foo', 'checksums': ['md5sum']}
+        self.assertEqual(eb.src_cache_key(), tarball)
+        self.assertEqual(eb.required_deps, ['bar', 'baz', 'methods', 'Rcpp'])
+        self.assertEqual(rpackage._r_pkg_deps_cache[(tarball, 'foo')], ['bar', 'baz', 'methods', 'Rcpp'])
+        sha256 = compute_checksum(tarball, checksum_type='sha256')
+        eb.ext['checksums'] = [sha256]
+        self.assertEqual(eb.src_cache_key(), sha256)
+        rpackage._r_pkg_deps_cache.clear()
+
+        class FakeExt(object):
+            """Fake extension, with name and required dependencies."""
+            def __init__(self, name, required_deps):
+                self.name = name
+                self.required_deps = required_deps
+
+        exts = [
+            FakeExt('a', []),
+            FakeExt('b', ['a', 'installed_already']),
+            FakeExt('c', ['b']),
+            FakeExt('d', []),
+            FakeExt('e', ['a']),
+            FakeExt('f', []),
+        ]
+        res = order_exts_by_required_deps(exts)
+        self.assertEqual([ext.name for ext in res], ['a', 'd', 'f', 'b', 'e', 'c'])
+
+        # original order is retained if required dependencies are unknown for any extension
+        exts[3].required_deps = None
+        self.assertEqual(order_exts_by_required_deps(exts), exts)
+        # same for cyclic dependencies
+        exts[3].required_deps = ['c']
+        exts[0].required_deps = ['d']
+        self.assertEqual(order_exts_by_required_deps(exts), exts)
+
+    def test_openssl_wrapper_system_facts(self):
+        """Test determining facts about OpenSSL installation in host system for OpenSSL wrapper easyblock."""
+        import easybuild.easyblocks.o.openssl_wrapper as openssl_wrapper
+
+        bin_dir = os.path.join(self.tmpdir, 'bin')
+        log = os.path.join(self.tmpdir, 'pkg-config.log')
+        write_file(os.path.join(bin_dir, 'openssl3'), '#!/bin/bash\necho "OpenSSL 3.0.7 1 Nov 2022"')
+        write_file(os.path.join(bin_dir, 'pkg-config'), '\n'.join([
+            '#!/bin/bash',
+            'echo "$@" >> %s' % log,
+            'case "$@" in',
+            '    "--exists libssl" | "--exists libcrypto") exit 0;;',
+            '    --exists*) exit 1;;',
+            '    "--print-requires libssl") echo libcrypto;;',
+            '    "--libs libssl") echo "-lssl";;',
+            '    "--libs --static libssl") echo "-lssl -ldl -pthread";;',
+            '    "--libs libcrypto") echo "-lcrypto";;',
+            '    "--libs --static libcrypto") echo "-lcrypto -ldl";;',
+            'esac',
+        ]))
+        adjust_permissions(bin_dir, stat.S_IXUSR, add=True)
+        os.environ['PATH'] = os.pathsep.join([bin_dir, os.getenv('PATH', '')])
+
+        openssl_wrapper.clear_system_openssl_facts_cache()
+        facts = openssl_wrapper.det_system_openssl_facts()
+        self.assertEqual(facts['bins']['openssl3'], (os.path.join(bin_dir, 'openssl3'), "OpenSSL 3.0.7 1 Nov 2022\n"))
+        self.assertTrue(all(os.path.isabs(x) for x in facts['include_dirs']))
+        self.assertEqual(sorted(facts['pkgconfig']), ['libcrypto', 'libssl'])
+        self.assertEqual(facts['pkgconfig']['libssl'], {
+            'requires': 'libcrypto\n',
+            'requires-private': '',
+            'libs': '-lssl\n',
+            'libs-static': '-lssl -ldl -pthread\n',
+        })
+        pc_cmds_cnt = len(read_file(log).splitlines())
+
+        # facts are cached
+        self.assertTrue(openssl_wrapper.det_system_openssl_facts() is facts)
+        self.assertEqual(len(read_file(log).splitlines()), pc_cmds_cnt)
+
+        # facts are determined again when OpenSSL in host system changes
+        write_file(os.path.join(bin_dir, 'openssl'), '#!/bin/bash\necho "OpenSSL 1.1.1k  FIPS 25 Mar 2021"')
+        adjust_permissions(bin_dir, stat.S_IXUSR, add=True)
+        facts = openssl_wrapper.det_system_openssl_facts()
+        self.assertEqual(facts['bins']['openssl'][1].split(' ')[1], '1.1.1k')
+        self.assertEqual(len(read_file(log).splitlines()), 2 * pc_cmds_cnt)
+
+        openssl_wrapper.clear_system_openssl_facts_cache()
+
+    def test_julia_pkg_batch(self):
+        """Test querying Julia environment and installing Julia packages in a single Julia session."""
+        cwd = os.getcwd()
+
+        # set up fake 'julia' command, which keeps track of how it was called
+        julia_log = os.path.join(self.tmpdir, 'julia.log')
+        julia = os.path.join(self.tmpdir, 'bin', 'julia')
+        write_file(julia, '\n'.join([
+            "#!/bin/bash",
+            "echo \"$@\" >> %s" % julia_log,
+            "if [ \"$1\" == '-e' ]; then",
+            "    echo 'WARNING: this is just a warning'",
+            "    echo '[\"/tmp/.julia\", \"/software/Julia/share/julia\"]'",
+            "    echo 'String[]'",
+            "else",
+            "    cp $1 %s" % os.path.join(self.tmpdir, 'script.jl'),
+            "    if grep -q '/FAIL\"' $1; then",
+            "        echo 'EB_JULIA_PKG_FAILED: /path/to/FAIL: oops'",
+            "        exit 1",
+            "    fi",
+            "fi",
+        ]))
+        adjust_permissions(julia, stat.S_IXUSR)
+        os.environ['PATH'] = '%s:%s' % (os.path.dirname(julia), os.getenv('PATH'))
+
+        juliapackage._julia_env_cache.clear()
+
+        self.assertEqual(juliapackage.JuliaPackage.get_julia_env('DEPOT_PATH'),
+                         ['/tmp/.julia', '/software/Julia/share/julia'])
+        self.assertEqual(juliapackage.JuliaPackage.get_julia_env('LOAD_PATH'), [])
+        self.assertEqual(len(read_file(julia_log).splitlines()), 1)
+
+        # Julia is queried again when relevant environment variables change
+        os.environ['JULIA_DEPOT_PATH'] = self.tmpdir
+        self.assertEqual(juliapackage.JuliaPackage.get_julia_env('LOAD_PATH'), [])
+        self.assertEqual(len(read_file(julia_log).splitlines()), 2)
+
+        error_pattern = "Unknown Julia environment variable requested: FOO"
+        self.assertErrorRegex(EasyBuildError, error_pattern, juliapackage.JuliaPackage.get_julia_env, 'FOO')
+
+        test_ec = os.path.join(self.tmpdir, 'test.eb')
+        write_file(test_ec, '\n'.join([
+            "easyblock = 'JuliaPackage'",
+            "name = 'test'",
+            "version = '1.0'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+        ]))
+        julia_pkg = get_easyblock_instance(process_easyconfig(test_ec)[0])
+
+        pkgs_dir = os.path.join(self.tmpdir, 'packages')
+        pkgs = [os.path.join(pkgs_dir, x) for x in ['Foo', 'Bar', 'Baz$']]
+        mkdir(os.path.join(pkgs[0], '.git'), parents=True)
+        mkdir(pkgs[1])
+        mkdir(pkgs[2])
+        remove_file(julia_log)
+
+        julia_pkg.install_pkg_sources(pkgs, '/path/to/env')
+        self.assertEqual(len(read_file(julia_log).splitlines()), 1)
+        script = read_file(os.path.join(self.tmpdir, 'script.jl'))
+        self.assertIn('Pkg.activate("/path/to/env")', script)
+        self.assertIn('PackageSpec[PackageSpec(url="%s")]' % pkgs[0], script)
+        dev_specs = 'PackageSpec[PackageSpec(path="%s"), PackageSpec(path="%s\\$")]' % (pkgs[1], pkgs[2][:-1])
+        self.assertIn(dev_specs, script)
+        self.assertEqual(script.count('Pkg.precompile()'), 1)
+
+        error_pattern = r"Failed to install 1 out of 2 Julia packages:\n/path/to/FAIL: oops"
+        self.assertErrorRegex(EasyBuildError, error_pattern, julia_pkg.install_pkg_sources,
+                              [pkgs[1], os.path.join(pkgs_dir, 'FAIL')], '/path/to/env')
+
+        change_dir(cwd)
+
+    def test_rpm_rebuild_install(self):
+        """Test concurrent rebuilding of RPMs and installing them in a single transaction with Rpm easyblock."""
+        cwd = os.getcwd()
+
+        # set up fake 'rpmrebuild' and 'rpm' commands, which keep track of how they were called
+        bin_dir = os.path.join(self.tmpdir, 'bin')
+        rpmrebuild_log = os.path.join(self.tmpdir, 'rpmrebuild.log')
+        rpmrebuild = os.path.join(bin_dir, 'rpmrebuild')
+        write_file(rpmrebuild, '\n'.join([
+            "#!/bin/bash",
+            "echo \"$RPMREBUILD_TMPDIR\" >> %s" % rpmrebuild_log,
+            "if [[ \"${@: -1}\" == *fail* ]]; then echo oops; exit 1; fi",
+            'mkdir -p "${@: -2:1}/x86_64" && touch "${@: -2:1}/x86_64/$(basename ${@: -1})"',
+        ]))
+        rpm_log = os.path.join(self.tmpdir, 'rpm.log')
+        rpm = os.path.join(bin_dir, 'rpm')
+        write_file(rpm, '\n'.join([
+            "#!/bin/bash",
+            "echo \"$@\" >> %s" % rpm_log,
+        ]))
+        for cmd in (rpmrebuild, rpm):
+            adjust_permissions(cmd, stat.S_IXUSR)
+        os.environ['PATH'] = '%s:%s' % (bin_dir, os.getenv('PATH'))
+
+        test_ec = os.path.join(self.tmpdir, 'test.eb')
+        write_file(test_ec, '\n'.join([
+            "easyblock = 'Rpm'",
+            "name = 'test'",
+            "version = '1.0'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+            "parallel = 3",
+        ]))
+        rpm_eb = get_easyblock_instance(process_easyconfig(test_ec)[0])
+        rpm_eb.builddir = os.path.join(self.tmpdir, 'build')
+        rpm_eb.installdir = os.path.join(self.tmpdir, 'install')
+        mkdir(rpm_eb.builddir)
+        mkdir(rpm_eb.installdir)
+
+        names = ['pkg%d.rpm' % i for i in range(5)]
+        rpm_eb.src = [{'name': x, 'path': os.path.join(self.tmpdir, 'rpms', x)} for x in names]
+
+        rpm_eb.rebuild_rpms()
+        self.assertEqual(sorted(x['name'] for x in rpm_eb.src), names)
+        self.assertEqual(len(rpm_eb.oldsrc), 5)
+        # each rpmrebuild command used its own temporary directory, which got cleaned up
+        tmpdirs = read_file(rpmrebuild_log).splitlines()
+        self.assertEqual(len(set(tmpdirs)), 5)
+        self.assertFalse(any(os.path.exists(x) for x in tmpdirs))
+
+        rpm_eb.rebuild_rpm = True
+        rpm_eb.install_step()
+        rpm_cmds = read_file(rpm_log).splitlines()
+        # one command to initialise RPM database, one to install all RPMs in a single transaction
+        self.assertEqual(len(rpm_cmds), 2)
+        self.assertTrue(rpm_cmds[0].startswith('--initdb'))
+        self.assertTrue(rpm_cmds[1].startswith('-i'))
+        self.assertIn('--relocate /=%s' % rpm_eb.installdir, rpm_cmds[1])
+        for rpm_path in rpm_eb.src:
+            self.assertIn(rpm_path['path'], rpm_cmds[1])
+
+        # failures are reported for all RPMs that could not be rebuilt
+        rpm_eb.src = [{'name': x, 'path': os.path.join(self.tmpdir, 'rpms', x)} for x in ['ok.rpm', 'fail.rpm']]
+        error_pattern = r"Rebuilding 1 RPM\(s\) failed:\n\* .*/fail.rpm \(exit code 1\)"
+        self.assertErrorRegex(EasyBuildError, error_pattern, rpm_eb.rebuild_rpms)
+
+        change_dir(cwd)
+
+    def test_blas_lapack_benchmark(self):
+        """Test BLAS/LAPACK micro-benchmark for BLAS/LAPACK providers (OpenBLAS, imkl, FlexiBLAS)."""
+
+        # fake BLAS/LAPACK library that implements the routines being benchmarked
+        libdir = os.path.join(self.tmpdir, 'fakeblas')
+        write_file(os.path.join(libdir, 'fakeblas.c'), '\n'.join([
+            "void dgemm_(const char *ta, const char *tb, const int *m, const int *n, const int *k,",
+            "            const double *alpha, const double *a, const int *lda, const double *b, const int *ldb,",
+            "            const double *beta, double *c, const int *ldc) {",
+            "    int i, j, l;",
+            "    for (j = 0; j < *n; j++) for (i = 0; i < *m; i++) {",
+            "        c[i + j * *ldc] = 0;",
+            "        for (l = 0; l < *k; l++) c[i + j * *ldc] += a[i + l * *lda] * b[l + j * *ldb];",
+            "    }",
+            "}",
+            "void dgetrf_(const int *m, const int *n, double *a, const int *lda, int *ipiv, int *info) { *info = 0; }",
+            "void dpotrf_(const char *uplo, const int *n, double *a, const int *lda, int *info) {",
+            "    *info = a[0] < 0;",
+            "}",
+        ]))
+        cmd = "cd %s && cc -shared -fPIC -o libfakeblas.so fakeblas.c" % libdir
+        self.assertEqual(run_cmd(cmd, simple=False, log_ok=False)[1], 0)
+        link_opts = '-L%s -Wl,-rpath,%s -lfakeblas' % (libdir, libdir)
+
+        res = blasbenchmark.run_blas_lapack_benchmark(link_opts, sizes=[20, 40], threads=[1, 2, 1], repeat=2)
+        expected = [(k, n, t) for t in [1, 2] for n in [20, 40] for k in ['dgemm', 'dgetrf', 'dpotrf']]
+        self.assertEqual([(x['kernel'], x['size'], x['threads']) for x in res], expected)
+        self.assertTrue(all(x['time'] >= 0 and x['gflops'] >= 0 for x in res))
+
+        res = blasbenchmark.run_blas_lapack_benchmark(link_opts, sizes=[20], threads=[3], lapack=False)
+        self.assertEqual([(x['kernel'], x['size'], x['threads']) for x in res], [('dgemm', 20, 3)])
+
+        error_pattern = "Failed to compile BLAS/LAPACK benchmark"
+        self.assertErrorRegex(EasyBuildError, error_pattern, blasbenchmark.run_blas_lapack_benchmark, '-lnosuchblas')
+
+        # comparing with results of previous installation
+        prev = [
+            {'kernel': 'dgemm', 'size': 1000, 'threads': 1, 'gflops': 10.0},
+            {'kernel': 'dgemm', 'size': 1000, 'threads': 4, 'gflops': 40.0},
+            {'kernel': 'dpotrf', 'size': 1000, 'threads': 4, 'gflops': 20.0},
+        ]
+        res = [
+            {'kernel': 'dgemm', 'size': 1000, 'threads': 1, 'gflops': 9.0},
+            {'kernel': 'dgemm', 'size': 1000, 'threads': 4, 'gflops': 20.0},
+            {'kernel': 'dpotrf', 'size': 1000, 'threads': 4, 'gflops': 21.0},
+            {'kernel': 'dpotrf', 'size': 2000, 'threads': 4, 'gflops': 1.0},
+        ]
+        regressions = blasbenchmark.det_blas_lapack_benchmark_regressions(res, prev, 0.2)
+        self.assertEqual(regressions, ["dgemm (size 1000, 4 threads): 20.00 GFLOP/s vs 40.00 GFLOP/s (-50.0%)"])
+        self.assertEqual(len(blasbenchmark.det_blas_lapack_benchmark_regressions(res, prev, 0.05)), 2)
+
+        # results are stored next to installation, and compared with previous installation on same CPU model
+        test_ec = os.path.join(self.tmpdir, 'test_blas_lapack_benchmark.eb')
+        write_file(test_ec, '\n'.join([
+            "name = 'OpenBLAS'",
+            "version = '0.3.24'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+            "blas_lapack_benchmark_sizes = [20]",
+            "blas_lapack_benchmark_threads = [1]",
+        ]))
+        eb = get_easyblock_instance(process_easyconfig(test_ec)[0])
+        eb.installdir = os.path.join(self.tmpdir, 'software', 'OpenBLAS', '0.3.24')
+
+        self.assertEqual(blasbenchmark.load_blas_lapack_benchmarks(eb.installdir), [])
+        blasbenchmark.blas_lapack_benchmark(eb, link_opts)
+        benchmarks = blasbenchmark.load_blas_lapack_benchmarks(eb.installdir)
+        self.assertEqual(len(benchmarks), 1)
+        self.assertEqual(benchmarks[0]['version'], '0.3.24')
+        self.assertEqual([x['kernel'] for x in benchmarks[0]['results']], ['dgemm', 'dgetrf', 'dpotrf'])
+        self.assertFalse('regressions' in benchmarks[0])
+
+        # fake results for previous installation on same CPU model with much better performance
+        prev_installdir = os.path.join(self.tmpdir, 'software', 'OpenBLAS', '0.3.23')
+        prev_data = dict(benchmarks[0], installdir=prev_installdir, version='0.3.23')
+        prev_data['results'] = [dict(x, gflops=1e6) for x in prev_data['results']]
+        blasbenchmark.write_blas_lapack_benchmark(prev_installdir, prev_data)
+        # results for other CPU models are not taken into account
+        other_cpu_installdir = os.path.join(self.tmpdir, 'software', 'OpenBLAS', '0.3.25')
+        other_cpu_data = dict(prev_data, cpu_model='other CPU', timestamp=prev_data['timestamp'] + 1)
+        blasbenchmark.write_blas_lapack_benchmark(other_cpu_installdir, other_cpu_data)
+
+        eb.prev_blas_lapack_benchmarks = blasbenchmark.load_blas_lapack_benchmarks(eb.installdir)
+        self.assertEqual(len(eb.prev_blas_lapack_benchmarks), 3)
+
+        self.mock_stderr(True)
+        blasbenchmark.blas_lapack_benchmark(eb, link_opts)
+        stderr = self.get_stderr()
+        self.mock_stderr(False)
+        regex = re.compile(r"WARNING: Performance of OpenBLAS regressed by more than 20% compared to installation "
+                           r"in .*/0.3.23 \(0.3.23\):\ndgemm \(size 20, 1 threads\): .* vs 1000000.00 GFLOP/s")
+        self.assertTrue(regex.search(stderr), "Pattern '%s' should be found in: %s" % (regex.pattern, stderr))
+        data = json.loads(read_file(os.path.join(eb.installdir, 'easybuild', 'blas-lapack-benchmark.json')))
+        self.assertEqual(len(data['regressions']), 3)
+
+        eb.cfg['blas_lapack_benchmark_fail_on_regression'] = True
+        error_pattern = "Performance of OpenBLAS regressed by more than 20%"
+        self.assertErrorRegex(EasyBuildError, error_pattern, blasbenchmark.blas_lapack_benchmark, eb, link_opts)
+
+        # failing to run benchmark only results in a warning
+        self.mock_stderr(True)
+        blasbenchmark.blas_lapack_benchmark(eb, '-lnosuchblas')
+        stderr = self.get_stderr()
+        self.mock_stderr(False)
+        self.assertTrue("WARNING: Failed to run BLAS/LAPACK benchmark for OpenBLAS" in stderr)
+
+    def test_openblas_lapack_test_shards(self):
+        """Test running LAPACK tests in shards concurrently with OpenBLAS easyblock."""
+        from easybuild.easyblocks import openblas
+
+        # parsing of LAPACK test output
+        out = '\n'.join([
+            "                        -->   LAPACK TESTING SUMMARY  <--",
+            "SUMMARY                 nb test run     numerical error         other error",
+            "================        ===========     =================       ================",
+            "REAL                    1000            1       (0.100%)        0       (0.000%)",
+            "DOUBLE PRECISION        2000            0       (0.000%)        2       (0.100%)",
+            "",
+        ])
+        self.assertEqual(openblas.parse_lapack_test_output(out.splitlines()), ((3000, 1, 2), []))
+        out += "--> ALL PRECISIONS      3001            1       (0.033%)        2       (0.067%)\n"
+        out += " *** FATAL ERROR in test driver\n"
+        self.assertEqual(openblas.parse_lapack_test_output(out.splitlines()),
+                         ((3001, 1, 2), ["*** FATAL ERROR in test driver"]))
+        self.assertEqual(openblas.parse_lapack_test_output(['foo', 'bar']), (None, []))
+
+        test_ec = os.path.join(self.tmpdir, 'test.eb')
+        write_file(test_ec, '\n'.join([
+            "name = 'OpenBLAS'",
+            "version = '0.3.24'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+            "run_lapack_tests = True",
+            "max_failing_lapack_tests_num_errors = 20",
+            "parallel = 4",
+        ]))
+        eb = get_easyblock_instance(process_easyconfig(test_ec)[0])
+        eb.builddir = os.path.join(self.tmpdir, 'build')
+        eb.cfg['start_dir'] = os.path.join(eb.builddir, 'OpenBLAS-0.3.24')
+
+        # fake 'make' command, which only logs how it was called
+        bin_dir = os.path.join(self.tmpdir, 'bin')
+        make_log = os.path.join(self.tmpdir, 'make.log')
+        write_file(os.path.join(bin_dir, 'make'), '#!/bin/bash\necho "$@" >> %s' % make_log)
+        adjust_permissions(os.path.join(bin_dir, 'make'), stat.S_IXUSR, add=True)
+        os.environ['PATH'] = '%s:%s' % (bin_dir, os.getenv('PATH'))
+
+        # fake lapack_testing.py script, which reports one numerical error per shard
+        lapack_testing = os.path.join(eb.cfg['start_dir'], 'lapack-netlib', 'lapack_testing.py')
+        write_file(lapack_testing, '\n'.join([
+            "#!/bin/bash",
+            "echo \"$@ $OPENBLAS_NUM_THREADS\" > args.txt",
+            "[ -z \"$FAIL_SHARD\" ] || [[ \"$@\" != *\"$FAIL_SHARD\"* ]] || echo ' *** FATAL ERROR'",
+            "echo '--> ALL PRECISIONS      100     1       (1.000%)        0       (0.000%)'",
+        ]))
+        adjust_permissions(lapack_testing, stat.S_IXUSR, add=True)
+
+        eb.test_step()
+        self.assertEqual(read_file(make_log).split('\n')[:2], ['tests', 'lapack-test CROSS=1'])
+        out_dir = os.path.join(eb.builddir, 'lapack_test_shards')
+        self.assertEqual(sorted(os.listdir(out_dir)), sorted('%s_%s.out' % x for x in openblas.LAPACK_TEST_SHARDS))
+        # available cores are split across concurrent shards
+        args = read_file(os.path.join(eb.cfg['start_dir'], 'lapack-netlib', 'args.txt'))
+        self.assertTrue(re.match(r"^-r -b TESTING -p [sdcz] -t [a-z]+ 1$", args), args)
+
+        # results of all shards are aggregated before checking against thresholds
+        eb.cfg['max_failing_lapack_tests_num_errors'] = 10
+        error_pattern = r"Too many LAPACK tests failed due to numerical errors: 14 \(> 10\)"
+        self.assertErrorRegex(EasyBuildError, error_pattern, eb.test_step)
+
+        os.environ['FAIL_SHARD'] = '-p d -t lin'
+        error_pattern = r"Running LAPACK tests failed for 1 shard\(s\):\nprecision 'd', lin routines: \*\*\* FATAL"
+        self.assertErrorRegex(EasyBuildError, error_pattern, eb.test_step)
+        del os.environ['FAIL_SHARD']
+
+        # LAPACK tests can still be run in one go
+        remove_file(make_log)
+        eb.cfg['parallel_lapack_tests'] = False
+        self.assertErrorRegex(EasyBuildError, "Failed to find test summary", eb.test_step)
+        self.assertEqual(read_file(make_log).split('\n')[:2], ['tests', 'lapack-test'])
+
+    def test_imkl_fftw_interfaces(self):
+        """Test concurrent building of Intel MKL FFTW interfaces with imkl easyblock."""
+        cwd = os.getcwd()
+
+        test_ec = os.path.join(self.tmpdir, 'test.eb')
+        write_file(test_ec, '\n'.join([
+            "name = 'imkl'",
+            "version = '2020.1.217'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+            "parallel = 4",
+        ]))
+        imkl = get_easyblock_instance(process_easyconfig(test_ec)[0])
+        imkl.builddir = os.path.join(self.tmpdir, 'build')
+        imkl.installdir = os.path.join(self.tmpdir, 'install')
+        mkdir(imkl.builddir)
+        imkl.cdftlibs = ['fftw2x_cdft']
+        imkl.mpi_spec = 'openmpi'
+        os.environ['EBROOTGCC'] = '/fake/software/GCC/13.2.0'
+
+        # set up fake interfaces, with makefiles that produce a library that depends on the build options
+        interfacedir = os.path.join(imkl.installdir, 'mkl', 'interfaces')
+        libs = ['fftw2xc', 'fftw2xf', 'fftw3xc', 'fftw3xf', 'fftw2x_cdft']
+        for lib in libs:
+            write_file(os.path.join(interfacedir, lib, 'makefile'), '\n'.join([
+                "libintel64:",
+                "\ttest -f ../../include/mkl.h",
+                "\tmkdir obj",
+                "\techo \"$(compiler) $(mpi) $(CFLAGS)\" > "
+                "$(or $(install_to),$(INSTALL_DIR))/lib%s$(PRECISION)$(interface).a" % lib,
+            ]))
+        write_file(os.path.join(imkl.installdir, 'mkl', 'include', 'mkl.h'), '')
+
+        libdir = os.path.join(imkl.installdir, 'mkl', 'lib', 'intel64')
+        mkdir(os.path.dirname(libdir), parents=True)
+        imkl.build_mkl_fftw_interfaces(libdir)
+
+        expected = []
+        for lib in libs:
+            variants = ['']
+            if lib.startswith('fftw2x'):
+                variants = ['MKL_DOUBLE', 'MKL_SINGLE']
+            if lib.endswith('cdft'):
+                variants = [x + y for x in variants for y in ('interface=lp64', 'interface=ilp64')]
+                variants = [x.replace('interface=', '') for x in variants]
+            expected.extend('lib%s%s%s.a' % (lib, x, y) for x in variants for y in ('', '_pic'))
+        self.assertEqual(sorted(os.listdir(libdir)), sorted(expected))
+
+        self.assertEqual(read_file(os.path.join(libdir, 'libfftw3xc.a')).split(), ['gnu'])
+        self.assertEqual(read_file(os.path.join(libdir, 'libfftw3xc_pic.a')).split(), ['gnu', '-fPIC'])
+        self.assertEqual(read_file(os.path.join(libdir, 'libfftw2x_cdftMKL_SINGLEilp64_pic.a')).split(),
+                         ['gnu', 'openmpi', '-fPIC'])
+
+        # copies of interface directories and temporary install directories are cleaned up
+        self.assertEqual(sorted(os.listdir(interfacedir)), sorted(libs))
+        self.assertEqual(os.listdir(imkl.builddir), [])
+
+        # failing builds are reported
+        write_file(os.path.join(interfacedir, 'fftw3xf', 'makefile'), "libintel64:\n\tfalse\n")
+        error_pattern = r"Building fftw3xf \(flags: , fullcmd: .*\) failed with exit code"
+        self.assertErrorRegex(EasyBuildError, error_pattern, imkl.build_mkl_fftw_interfaces, libdir)
+        self.assertEqual(sorted(os.listdir(interfacedir)), sorted(libs))
+
+        change_dir(cwd)
+
+    def test_wrf_test_step(self):
+        """Test running WRF test cases concurrently in dedicated directories with WRF easyblock."""
+        cwd = os.getcwd()
+
+        test_ec = os.path.join(self.tmpdir, 'test.eb')
+        write_file(test_ec, '\n'.join([
+            "name = 'WRF'",
+            "version = '4.5.2'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+            "buildtype = 'serial'",
+            "parallel = 4",
+        ]))
+        wrf = get_easyblock_instance(process_easyconfig(test_ec)[0])
+        wrf.builddir = os.path.join(self.tmpdir, 'build')
+        wrf.par = ''
+        wrf.parallel_build_types = ['dmpar', 'dm+sm']
+        wrfdir = os.path.join(wrf.builddir, 'WRFV4.5.2')
+        log = os.path.join(self.tmpdir, 'tests.log')
+
+        # fake WRF source tree: compile script (re)creates executables in main/ and links them (and namelist) in run/
+        testcases = ['em_b_wave', 'em_fire', 'em_hill2d_x', 'em_quarter_ss']
+        for test in testcases:
+            write_file(os.path.join(wrfdir, 'test', test, 'namelist.input'), test)
+        write_file(os.path.join(wrfdir, 'test', 'em_b_wave', 'input_jet'), 'jet')
+        for subtest in ['one_fire', 'two_fires']:
+            write_file(os.path.join(wrfdir, 'test', 'em_fire', subtest, 'namelist.input'), 'em_fire_' + subtest)
+        write_file(os.path.join(wrfdir, 'run', 'LANDUSE.TBL'), 'table')
+        write_file(os.path.join(wrfdir, 'compile'), '\n'.join([
+            "#!/bin/bash",
+            "case=${@: -1}",
+            "mkdir -p main",
+            "echo 'touch wrfinput_d01' > main/ideal.exe",
+            # wrf.exe reports content of namelist, test case specified in 'fail' file fails
+            "echo 'sleep 1; grep -q \"^$(cat namelist.input)$\" %s/fail && exit 1; "
+            "echo $(cat namelist.input) >> %s; echo SUCCESS COMPLETE WRF' > main/wrf.exe" % (self.tmpdir, log),
+            "chmod +x main/*.exe",
+            "ln -sf ../main/ideal.exe run/ideal.exe",
+            "ln -sf ../main/wrf.exe run/wrf.exe",
+            "[ ! -f test/$case/input_jet ] || ln -sf ../test/$case/input_jet run/input_jet",
+            # like WRF's Makefile, namelist of test case is copied into run/
+            "rm -f run/namelist.input; cp test/$case/namelist.input run/namelist.input",
+        ]))
+        adjust_permissions(os.path.join(wrfdir, 'compile'), stat.S_IXUSR, add=True)
+        write_file(os.path.join(self.tmpdir, 'fail'), '')
+        change_dir(wrfdir)
+
+        wrf.test_step()
+
+        expected = ['em_b_wave', 'em_fire_one_fire', 'em_fire_two_fires', 'em_hill2d_x', 'em_quarter_ss']
+        self.assertEqual(sorted(read_file(log).split()), expected)
+        # run directory is not polluted, and dedicated test directories are cleaned up
+        self.assertEqual(sorted(os.listdir(os.path.join(wrfdir, 'run'))),
+                         ['LANDUSE.TBL', 'ideal.exe', 'input_jet', 'namelist.input', 'wrf.exe'])
+        self.assertEqual(os.listdir(os.path.join(wrf.builddir, 'wrf_tests')), [])
+
+        # all failing test cases are reported, output of failing test cases is retained
+        write_file(os.path.join(self.tmpdir, 'fail'), 'em_b_wave\nem_fire_two_fires\n')
+        remove_file(log)
+        error_pattern = r"2 WRF test\(s\) failed:\n\* em_b_wave \(see .*\): failed with exit code 1.*"
+        error_pattern += r"\n\* em_fire_two_fires .*"
+        self.assertErrorRegex(EasyBuildError, error_pattern, wrf.test_step)
+        self.assertEqual(sorted(read_file(log).split()), ['em_fire_one_fire', 'em_hill2d_x', 'em_quarter_ss'])
+        tests_dir = os.path.join(wrf.builddir, 'wrf_tests')
+        self.assertEqual(sorted(os.listdir(tests_dir)), ['em_b_wave', 'em_fire_two_fires'])
+        self.assertTrue(os.path.exists(os.path.join(tests_dir, 'em_b_wave', 'wrfinput_d01')))
+        self.assertTrue(os.path.islink(os.path.join(tests_dir, 'em_b_wave', 'input_jet')))
+        self.assertFalse(os.path.islink(os.path.join(tests_dir, 'em_b_wave', 'wrf.exe')))
+        self.assertEqual(read_file(os.path.join(tests_dir, 'em_b_wave', 'namelist.input')), 'em_b_wave')
+        # tables are symlinked rather than copied
+        table = os.path.join(tests_dir, 'em_b_wave', 'LANDUSE.TBL')
+        self.assertTrue(os.path.islink(table))
+        self.assertEqual(os.path.realpath(table), os.path.join(os.path.realpath(wrfdir), 'run', 'LANDUSE.TBL'))
+
+        # failure to build a test case results in an error
+        write_file(os.path.join(wrfdir, 'compile'), '\n[ "${@: -1}" != "em_hill2d_x" ] || exit 1', append=True)
+        error_pattern = "cmd .*compile .*em_hill2d_x.* exited with exit code 1"
+        self.assertErrorRegex(EasyBuildError, error_pattern, wrf.test_step)
+
+        change_dir(cwd)
+
+    def test_bundle_parallel_components(self):
+        """Test concurrent installation of components with Bundle easyblock."""
+        cwd = os.getcwd()
+
+        srcdir = os.path.join(self.tmpdir, 'sources')
+        mkdir(srcdir)
+        names = ['compa', 'compb', 'compc', 'compd']
+        for name in names:
+            with tarfile.open(os.path.join(srcdir, '%s-1.0.tar.gz' % name), 'w:gz') as tar:
+                info = tarfile.TarInfo('%s-1.0/README' % name)
+                info.size = len(name)
+                tar.addfile(info, BytesIO(name.encode('utf-8')))
+
+        log = os.path.join(self.tmpdir, 'steps.log')
+        test_ec_txt = '\n'.join([
+            "easyblock = 'Bundle'",
+            "name = 'test'",
+            "version = '1.0'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+            "default_easyblock = 'ConfigureMake'",
+            "default_component_specs = {",
+            "    'sources': ['%(name)s-%(version)s.tar.gz'],",
+            "    'start_dir': '%(name)s-%(version)s',",
+            "    'configure_cmd': 'true',",
+            "    'build_cmd': 'true',",
+            "    'install_cmd': 'true',",
+            "    'preconfigopts': 'echo start-%%(name)s >> %s && '," % log,
+            "    'prebuildopts': 'sleep 1 && ',",
+            "    'preinstallopts': 'echo install-%%(name)s >> %s && sleep 0.2 && echo end-%%(name)s >> %s && '," % (
+                log, log),
+            "}",
+            "parallel_components = 2",
+            "parallel = 4",
+        ])
+        components = [
+            ('compa', '1.0', {'depends_on': []}),
+            ('compb', '1.0', {'depends_on': []}),
+            ('compc', '1.0', {'depends_on': ['compa']}),
+            # no depends_on specified, so depends on all components listed before it
+            ('compd', '1.0'),
+        ]
+
+        def get_bundle(components):
+            """Get instance of Bundle easyblock for test easyconfig with specified components"""
+            # use different easyconfig file every time, since parsed easyconfig files are cached
+            test_ec = os.path.join(self.tmpdir, 'test%s.eb' % len(glob.glob(os.path.join(self.tmpdir, '*.eb'))))
+            write_file(test_ec, test_ec_txt + '\ncomponents = %s' % str(components))
+            bundle = get_easyblock_instance(process_easyconfig(test_ec)[0])
+            bundle.builddir = os.path.join(self.tmpdir, 'build')
+            bundle.installdir = os.path.join(self.tmpdir, 'install')
+            change_dir(self.tmpdir)
+            remove_dir(bundle.builddir)
+            mkdir(bundle.builddir)
+            bundle.src = [{'name': '%s-1.0.tar.gz' % x, 'path': os.path.join(srcdir, '%s-1.0.tar.gz' % x),
+                           'cmd': None, 'finalpath': None} for x in names]
+            bundle.extract_step()
+            return bundle
+
+        self.mock_stdout(True)
+        get_bundle(components).install_step()
+        stdout = self.get_stdout()
+        self.mock_stdout(False)
+        self.assertIn("installing bundle component compd v1.0 (4/4)...", stdout)
+
+        steps = read_file(log).split()
+        self.assertEqual(sorted(steps), sorted(x + '-' + y for x in ('start', 'install', 'end') for y in names))
+        # a and b are built concurrently
+        self.assertEqual(sorted(steps[:2]), ['start-compa', 'start-compb'])
+        # installations are serialised
+        install_steps = [x for x in steps if x.startswith(('install-', 'end-'))]
+        for idx in range(0, len(install_steps), 2):
+            self.assertEqual(install_steps[idx].replace('install-', 'end-'), install_steps[idx + 1])
+        # dependencies between components are taken into account
+        self.assertTrue(steps.index('start-compc') > steps.index('end-compa'))
+        self.assertTrue(steps.index('start-compd') > max(steps.index('end-' + x) for x in names[:3]))
+
+        # failing installations are reported
+        remove_file(log)
+        test_comps = copy.deepcopy(components)
+        test_comps[1][2]['buildopts'] = '&& false'
+        bundle = get_bundle(test_comps)
+        error_pattern = r"Installation of 1 bundle component\(s\) failed:\n"
+        error_pattern += r"compb v1.0: cmd .*&& false.* exited with exit code 1"
+        self.mock_stdout(True)
+        self.assertErrorRegex(EasyBuildError, error_pattern, bundle.install_step)
+        self.mock_stdout(False)
+        steps = read_file(log).split()
+        # no new components are started after a failure
+        self.assertNotIn('start-compd', steps)
+
+        test_comps = copy.deepcopy(components)
+        test_comps[0][2]['depends_on'] = ['compd']
+        bundle = get_bundle(test_comps)
+        error_pattern = "Cyclic dependencies found between components: compa, compc, compd"
+        self.assertErrorRegex(EasyBuildError, error_pattern, bundle.install_step)
+
+        test_comps[0][2]['depends_on'] = ['nosuchcomponent']
+        bundle = get_bundle(test_comps)
+        error_pattern = "Unknown component 'nosuchcomponent' listed in depends_on for component compa"
+        self.assertErrorRegex(EasyBuildError, error_pattern, bundle.install_step)
+
+        change_dir(cwd)
+
+    def test_bundle_component_cache(self):
+        """Test restoring unchanged components from cache of components with Bundle easyblock."""
+        cwd = os.getcwd()
+
+        srcdir = os.path.join(self.tmpdir, 'sources')
+        mkdir(srcdir)
+        names = ['compa', 'compb', 'compc']
+        for name in names:
+            with tarfile.open(os.path.join(srcdir, '%s-1.0.tar.gz' % name), 'w:gz') as tar:
+                info = tarfile.TarInfo('%s-1.0/README' % name)
+                info.size = len(name)
+                tar.addfile(info, BytesIO(name.encode('utf-8')))
+
+        log = os.path.join(self.tmpdir, 'steps.log')
+        installdir = os.path.join(self.tmpdir, 'install')
+        cache_dir = os.path.join(self.tmpdir, 'cache')
+        os.environ['EB_BUNDLE_COMPONENT_CACHE'] = cache_dir
+
+        test_ec_txt = '\n'.join([
+            "easyblock = 'Bundle'",
+            "name = 'test'",
+            "version = '1.0'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+            "default_easyblock = 'ConfigureMake'",
+            "default_component_specs = {",
+            "    'sources': ['%(name)s-%(version)s.tar.gz'],",
+            "    'start_dir': '%(name)s-%(version)s',",
+            "    'configure_cmd': 'true',",
+            "    'build_cmd': 'true',",
+            "    'install_cmd': 'true',",
+            "    'preconfigopts': 'echo build-%%(name)s >> %s && '," % log,
+            "    'preinstallopts': 'mkdir -p %(inst)s/%%(name)s && printf %%(name)s > %(inst)s/%%(name)s/README && ',"
+            % {'inst': installdir},
+            "}",
+        ])
+
+        def install_bundle(components, extra_txt=''):
+            """Install bundle with specified components, return list of components that were built."""
+            # use different easyconfig file every time, since parsed easyconfig files are cached
+            test_ec = os.path.join(self.tmpdir, 'test%s.eb' % len(glob.glob(os.path.join(self.tmpdir, '*.eb'))))
+            write_file(test_ec, '\n'.join([test_ec_txt, extra_txt, 'components = %s' % str(components)]))
+            bundle = get_easyblock_instance(process_easyconfig(test_ec)[0])
+            bundle.builddir = os.path.join(self.tmpdir, 'build')
+            bundle.installdir = installdir
+            change_dir(self.tmpdir)
+            remove_dir(bundle.builddir)
+            remove_dir(installdir)
+            remove_file(log)
+            mkdir(bundle.builddir)
+            bundle.src = [{'name': '%s-1.0.tar.gz' % x, 'path': os.path.join(srcdir, '%s-1.0.tar.gz' % x),
+                           'cmd': None, 'finalpath': None} for x in names]
+            bundle.extract_step()
+            self.mock_stdout(True)
+            bundle.install_step()
+            self.mock_stdout(False)
+
+            # files installed for all components must be there, regardless of whether they were restored
+            for name in names:
+                self.assertEqual(read_file(os.path.join(installdir, name, 'README')), name)
+
+            return sorted(x.replace('build-', '') for x in read_file(log).split()) if os.path.exists(log) else []
+
+        try:
+            components = [(name, '1.0', {}) for name in names]
+            self.assertEqual(install_bundle(components), names)
+            self.assertEqual(len(glob.glob(os.path.join(cache_dir, '*.tar.gz'))), 3)
+
+            # all components are restored from cache when reinstalling
+            self.assertEqual(install_bundle(components), [])
+
+            # when a component changes, that component and all components that follow it are rebuilt
+            components[1][2]['configopts'] = '--enable-foo'
+            self.assertEqual(install_bundle(components), ['compb', 'compc'])
+            self.assertEqual(install_bundle(components), [])
+
+            # when dependencies between components are specified, only the components that depend on it are rebuilt
+            components = [
+                ('compa', '1.0', {'depends_on': []}),
+                ('compb', '1.0', {'depends_on': []}),
+                ('compc', '1.0', {'depends_on': ['compa']}),
+            ]
+            # first component doesn't depend on any other components (as before), so it can be restored from cache
+            self.assertEqual(install_bundle(components, "parallel_components = 2"), ['compb', 'compc'])
+            components[0][2]['configopts'] = '--enable-foo'
+            self.assertEqual(install_bundle(components, "parallel_components = 2"), ['compa', 'compc'])
+            self.assertEqual(install_bundle(components, "parallel_components = 2"), [])
+        finally:
+            change_dir(cwd)
+
+    def test_shared_cache(self):
+        """Test helper classes for caches that are shared across installations."""
+        from easybuild.easyblocks.sharedcache import SharedCache, TarballCache
+
+        prefix = os.path.join(self.tmpdir, 'prefix')
+        write_file(os.path.join(prefix, 'lib', 'libfoo.a'), 'foo')
+        write_file(os.path.join(prefix, 'include', 'foo.h'), 'foo')
+
+        cache = TarballCache(os.path.join(self.tmpdir, 'cache'))
+        self.assertFalse(cache.restore('foo', prefix))
+        cache.add_files('foo', prefix, ['lib'])
+        self.assertEqual(os.listdir(cache.path), ['foo.tar.gz'])
+        self.assertTrue(os.stat(cache.entry_path('foo')).st_mode & stat.S_IROTH)
+
+        target = os.path.join(self.tmpdir, 'target')
+        self.assertTrue(cache.restore('foo', target))
+        self.assertEqual(os.listdir(target), ['lib'])
+        self.assertEqual(read_file(os.path.join(target, 'lib', 'libfoo.a')), 'foo')
+
+        # entries with unsafe paths are not restored
+        with tarfile.open(cache.entry_path('evil'), 'w:gz') as tar:
+            tar.addfile(tarfile.TarInfo('../evil.txt'), BytesIO(b''))
+        self.assertErrorRegex(EasyBuildError, "Unsafe path ../evil.txt found in", cache.restore, 'evil', target)
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir, 'evil.txt')))
+
+        # directory entries can not be replaced, temporary directory is cleaned up
+        cache = SharedCache(os.path.join(self.tmpdir, 'dircache'))
+        for res in [True, False]:
+            tmp_dir = cache.mk_tmp_entry(is_dir=True)
+            self.assertTrue(os.stat(tmp_dir).st_mode & stat.S_IXOTH)
+            write_file(os.path.join(tmp_dir, 'test.txt'), 'test')
+            self.assertEqual(cache.commit_entry(tmp_dir, 'test'), res)
+            self.assertEqual(os.listdir(cache.path), ['test'])
+
+        # failing to update modification time of entry (owned by another user) is not an error
+        def fail_utime(*args, **kwargs):
+            raise OSError(errno.EPERM, "Operation not permitted")
+
+        orig_utime = os.utime
+        os.utime = fail_utime
+        try:
+            cache.touch(cache.entry_path('test'))
+        finally:
+            os.utime = orig_utime
+
+    def test_cargo_extract_step(self):
+        """Test extract_step of Cargo easyblock."""
+        cwd = os.getcwd()
+
+        def create_tarball(path, topdir, files):
+            """Create tarball at specified path with specified files in specified top-level directory."""
+            with tarfile.open(path, 'w:gz') as tar:
+                for name, txt in files.items():
+                    data = txt.encode('utf-8')
+                    info = tarfile.TarInfo(os.path.join(topdir, name))
+                    info.size = len(data)
+                    tar.addfile(info, BytesIO(data))
+
+        srcdir = os.path.join(self.tmpdir, 'sources')
+        mkdir(srcdir)
+        create_tarball(os.path.join(srcdir, 'test-1.0.tar.gz'), 'test-1.0', {'Cargo.toml': '[package]'})
+        create_tarball(os.path.join(srcdir, 'foo-0.1.0.tar.gz'), 'foo-0.1.0', {'src/lib.rs': 'foo'})
+        create_tarball(os.path.join(srcdir, 'bar-1.2.3.tar.gz'), 'bar-1.2.3', {'src/lib.rs': 'bar'})
+        create_tarball(os.path.join(srcdir, 'baz-2.0.tar.gz'), 'repo', {'baz/src/lib.rs': 'baz'})
+
+        test_ec = os.path.join(self.tmpdir, 'test.eb')
+        write_file(test_ec, '\n'.join([
+            "easyblock = 'Cargo'",
+            "name = 'test'",
+            "version = '1.0'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+            "sources = ['test-1.0.tar.gz']",
+            "crates = [",
+            "    ('foo', '0.1.0'),",
+            "    ('bar', '1.2.3'),",
+            "    ('baz', '2.0', 'https://github.com/example/repo.git', 'abc123'),",
+            "]",
+            "parallel = 2",
+        ]))
+        cargo = get_easyblock_instance(process_easyconfig(test_ec)[0])
+        cargo.builddir = os.path.join(self.tmpdir, 'build')
+        cargo.vendor_dir = os.path.join(cargo.builddir, 'easybuild_vendor')
+        cargo.cargo_home = os.path.join(cargo.builddir, '.cargo')
+        mkdir(cargo.builddir)
+
+        src_names = ['test-1.0.tar.gz', 'foo-0.1.0.tar.gz', 'bar-1.2.3.tar.gz', 'baz-2.0.tar.gz']
+        cargo.src = [{'name': x, 'path': os.path.join(srcdir, x), 'cmd': None, 'finalpath': None} for x in src_names]
+        cargo.extract_step()
+
+        self.assertEqual([x['finalpath'] for x in cargo.src], [
+            os.path.join(cargo.builddir, 'test-1.0'),
+            os.path.join(cargo.vendor_dir, 'foo-0.1.0'),
+            os.path.join(cargo.vendor_dir, 'bar-1.2.3'),
+            os.path.join(cargo.vendor_dir, 'repo'),
+        ])
+        self.assertEqual(read_file(os.path.join(cargo.vendor_dir, 'bar-1.2.3', 'src', 'lib.rs')), 'bar')
+
+        # checksum files are created for unpacked crates
+        for crate_dir, src_name in [('foo-0.1.0', 'foo-0.1.0.tar.gz'), ('repo', 'baz-2.0.tar.gz')]:
+            chksum = compute_checksum(os.path.join(srcdir, src_name), checksum_type='sha256')
+            chkfile = os.path.join(cargo.vendor_dir, crate_dir, '.cargo-checksum.json')
+            self.assertEqual(read_file(chkfile), '{"files": {}, "package": "%s"}' % chksum)
+
+        config_toml = read_file(os.path.join(cargo.cargo_home, 'config.toml'))
+        self.assertTrue('directory = "%s"' % cargo.vendor_dir in config_toml)
+        regex = re.compile(r'\[patch."https://github.com/example/repo.git"\]\nbaz = { path = "%s" }' %
+                           os.path.join(cargo.vendor_dir, 'repo'))
+        self.assertTrue(regex.search(config_toml), "Pattern '%s' found in: %s" % (regex.pattern, config_toml))
+
+        # test use of store of unpacked crates
+        store = os.path.join(self.tmpdir, 'store')
+        os.environ['EB_CARGO_CRATES_STORE'] = store
+        for builddir in ['build1', 'build2']:
+            cargo.builddir = os.path.join(self.tmpdir, builddir)
+            cargo.vendor_dir = os.path.join(cargo.builddir, 'easybuild_vendor')
+            mkdir(cargo.builddir)
+            cargo.extract_step()
+
+        chksum = compute_checksum(os.path.join(srcdir, 'bar-1.2.3.tar.gz'), checksum_type='sha256')
+        self.assertTrue(os.path.isdir(os.path.join(store, 'bar-1.2.3-%s' % chksum, 'bar-1.2.3')))
+        self.assertEqual(len([x for x in os.listdir(store) if not x.startswith('.')]), 3)
+
+        # unpacked crates in vendor directory are hard links to files in store
+        libs = [os.path.join(self.tmpdir, x, 'easybuild_vendor', 'bar-1.2.3', 'src', 'lib.rs')
+                for x in ['build1', 'build2']]
+        self.assertEqual(read_file(libs[1]), 'bar')
+        self.assertEqual(os.stat(libs[0]).st_ino, os.stat(libs[1]).st_ino)
+        chkfile = os.path.join(self.tmpdir, 'build2', 'easybuild_vendor', 'bar-1.2.3', '.cargo-checksum.json')
+        self.assertEqual(read_file(chkfile), '{"files": {}, "package": "%s"}' % chksum)
+
+        # entries owned by another user can still be used, even though their modification time can't be updated
+        def fail_utime(*args, **kwargs):
+            raise OSError(errno.EPERM, "Operation not permitted")
+
+        # (store must not be bypassed, since unpacking crate again would rewrite files in store via hard links)
+        store_lib = os.path.join(store, 'bar-1.2.3-%s' % chksum, 'bar-1.2.3', 'src', 'lib.rs')
+        adjust_permissions(store_lib, stat.S_IWUSR, add=True)
+        write_file(store_lib, 'bar from store')
+        adjust_permissions(store_lib, stat.S_IWUSR, add=False)
+
+        orig_utime = os.utime
+        os.utime = fail_utime
+        try:
+            cargo.builddir = os.path.join(self.tmpdir, 'build3')
+            cargo.vendor_dir = os.path.join(cargo.builddir, 'easybuild_vendor')
+            mkdir(cargo.builddir)
+            cargo.extract_step()
+        finally:
+            os.utime = orig_utime
+        lib = os.path.join(cargo.vendor_dir, 'bar-1.2.3', 'src', 'lib.rs')
+        self.assertEqual(os.stat(lib).st_ino, os.stat(store_lib).st_ino)
+        self.assertEqual(read_file(store_lib), 'bar from store')
+
+        # crates that were used least recently are evicted from store when it becomes too large
+        for entry in os.listdir(store):
+            os.utime(os.path.join(store, entry), (0, 0))
+        os.utime(os.path.join(store, 'bar-1.2.3-%s' % chksum), None)
+        CratesStore(store, 5).evict()
+        self.assertEqual([x for x in os.listdir(store) if not x.startswith('.')], ['bar-1.2.3-%s' % chksum])
+        del os.environ['EB_CARGO_CRATES_STORE']
+
+        # unpacking crate with unsafe paths fails
+        with tarfile.open(os.path.join(srcdir, 'foo-0.1.0.tar.gz'), 'w:gz') as tar:
+            info = tarfile.TarInfo('../evil.txt')
+            tar.addfile(info, BytesIO(b''))
+        change_dir(self.tmpdir)
+        remove_dir(cargo.builddir)
+        mkdir(cargo.builddir)
+        error_pattern = "Unpacking sources of 'foo-0.1.0.tar.gz' failed: Unsafe path"
+        self.assertErrorRegex(EasyBuildError, error_pattern, cargo.extract_step)
+        self.assertFalse(os.path.exists(os.path.join(cargo.builddir, 'evil.txt')))
+
+        change_dir(cwd)
+
+    def test_pytorch_parse_test_log(self):
+        """Test parsing of output of PyTorch test suite."""
+        tests_out = textwrap.dedent("""
+            ======================================================================
+            FAIL: test_add_scalar_relu (quantization.core.test_quantized_op.TestQuantizedOps)
+            ----------------------------------------------------------------------
+            Traceback (most recent call last):
+            AssertionError: False is not true
+
+            ======================================================================
+            ERROR: test_all_to_all_group_cuda (__main__.TestDistBackendWithSpawn)
+            ----------------------------------------------------------------------
+            RuntimeError: oops
+
+            Ran 219 tests in 67.325s
+
+            FAILED (failures=1, errors=1, skipped=190, expected failures=6)
+            test_quantization failed!
+            Running test_ops_gradients ...
+            FAILED [22.8699s] test_ops_gradients.py::TestGradientsCPU::test_fn_grad_det_cpu_complex128 - [snip]
+            ===================== 2 failed, 128 passed, 2 skipped, 2 warnings in 63.43s (01:03:43) =========
+            If in CI, skip info is located in the xml test reports, please either go to s3 or the hud to download them
+
+            FINISHED PRINTING LOG FILE of test_ops_gradients (/tmp/test_ops_gradients_xyz.log)
+
+            test_ops_gradients failed!
+            ============ 286 passed, 18 skipped, 2 xfailed in 38.71s ============
+            AssertionError: 2 unit test(s) failed:
+                    DistributedDataParallelTest.test_find_unused_parameters_kwarg_debug_detail
+                    DistributedDataParallelTest.test_find_unused_parameters_kwarg_grad_is_view_debug_detail
+
+            FINISHED PRINTING LOG FILE of distributed/test_c10d_nccl (/tmp/test_c10d_nccl_xyz.log)
+
+            distributed/test_c10d_nccl failed!
+            test_jit failed! Received signal: SIGSEGV
+        """)
+
+        from easybuild.easyblocks.p.pytorch import find_failed_test_names, parse_test_log, parse_test_output
+
+        failed_test_names = find_failed_test_names(tests_out)
+        self.assertEqual(failed_test_names.error, ['test_all_to_all_group_cuda'])
+        self.assertEqual(failed_test_names.fail, ['test_add_scalar_relu', 'test_fn_grad_det_cpu_complex128'])
+
+        res = parse_test_log(tests_out)
+        self.assertEqual(res.test_cnt, 219 + 132 + 306)
+        self.assertEqual(res.failure_cnt, 1 + 2 + 2)
+        self.assertEqual(res.error_cnt, 1)
+        self.assertEqual(res.failed_suites, [
+            ('test_quantization', '219 total tests, failures=1, errors=1, skipped=190, expected failures=6'),
+            ('test_ops_gradients', '2 failed, 128 passed, 2 skipped, 2 warnings'),
+            ('distributed/test_c10d_nccl', '2 unit test(s) failed'),
+        ])
+
+        # output can also be fed line by line
+        test_log = parse_test_output(tests_out.splitlines(True))
+        self.assertEqual(test_log.failed_test_names(), failed_test_names)
+        self.assertEqual(test_log.test_result(), res)
+        self.assertEqual(sorted(set(test_log.all_failed_suites)), ['distributed/test_c10d_nccl', 'test_jit',
+                                                                   'test_ops_gradients', 'test_quantization'])
+
+    def test_pytorch_test_step(self):
+        """Test test step of PyTorch easyblock, which parses output of test suite from file."""
+        tests_out = os.path.join(self.tmpdir, 'tests.out')
+        write_file(tests_out, '\n'.join(['Running test_foo ...', 'Ran 10 tests in 1.0s', '', 'OK', '']))
+
+        test_ec = os.path.join(self.tmpdir, 'test.eb')
+        write_file(test_ec, '\n'.join([
+            "easyblock = 'EB_PyTorch'",
+            "name = 'PyTorch'",
+            "version = '2.1.2'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+            "runtest = 'cat %s; echo oops >&2; exit 1'" % tests_out,
+        ]))
+        eb = get_easyblock_instance(process_easyconfig(test_ec)[0])
+        eb.builddir = os.path.join(self.tmpdir, 'build')
+        mkdir(eb.builddir)
+        eb.python_cmd = sys.executable
+
+        # output of test command (incl. stderr) ends up in file in build directory
+        error_pattern = "Test command had non-zero exit code \\(1\\), but no failed tests found"
+        self.assertErrorRegex(EasyBuildError, error_pattern, eb.test_step)
+        out_fn = os.path.join(eb.builddir, 'pytorch-tests.out')
+        self.assertEqual(read_file(out_fn), read_file(tests_out) + 'oops\n')
+
+        # failing tests are found in output
+        write_file(tests_out, '\n'.join(['Ran 10 tests in 1.0s', '', 'FAILED (failures=2)', 'test_foo failed!', '']))
+        error_pattern = "2 test failures, 0 test errors \\(out of 10\\):\ntest_foo \\(10 total tests, failures=2\\)"
+        self.assertErrorRegex(EasyBuildError, error_pattern, eb.test_step)
+
+    def test_gromacs_build_variants(self):
+        """Test concurrent builds of variants in GROMACS easyblock."""
+        cwd = os.getcwd()
+
+        test_ec = os.path.join(self.tmpdir, 'test.eb')
+        write_file(test_ec, '\n'.join([
+            "easyblock = 'EB_GROMACS'",
+            "name = 'GROMACS'",
+            "version = '2023.3'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+            "concurrent_variant_builds = True",
+            "build_cmd = 'echo'",
+            "parallel = 5",
+        ]))
+        gromacs = get_easyblock_instance(process_easyconfig(test_ec)[0])
+
+        gromacs.variants = []
+        for idx, skip in enumerate([False, True, False]):
+            builddir = os.path.join(self.tmpdir, 'easybuild_obj_%d' % idx)
+            mkdir(builddir, parents=True)
+            gromacs.variants.append({
+                'builddir': builddir,
+                'buildopts': '> out.txt',
+                'configopts': '',
+                'env': None,
+                'installopts': '',
+                'skip': skip,
+            })
+
+        gromacs.build_step()
+        self.assertEqual(os.getcwd(), cwd)
+
+        # available build jobs are split across variants that are actually built
+        self.assertEqual(read_file(os.path.join(self.tmpdir, 'easybuild_obj_0', 'out.txt')), '-j 3\n')
+        self.assertFalse(os.path.exists(os.path.join(self.tmpdir, 'easybuild_obj_1', 'out.txt')))
+        self.assertEqual(read_file(os.path.join(self.tmpdir, 'easybuild_obj_2', 'out.txt')), '-j 2\n')
+
+        # failing build of a variant results in an error
+        gromacs.variants[2]['buildopts'] = '&& false'
+        self.assertErrorRegex(EasyBuildError, "Building GROMACS variant failed, cmd .* exit code 1",
+                              gromacs.build_step)
+
+        # separate build directories are always used when building variants concurrently
+        gromacs = get_easyblock_instance(process_easyconfig(test_ec)[0])
+        gromacs.cfg['separate_build_dir'] = False
+        orig_run_all_steps = CMakeMake.run_all_steps
+        CMakeMake.run_all_steps = lambda *args, **kwargs: True
+        try:
+            gromacs.run_all_steps(False)
+        finally:
+            CMakeMake.run_all_steps = orig_run_all_steps
+        self.assertEqual(len(gromacs.variants), 2)
+        self.assertTrue(gromacs.cfg['separate_build_dir'])
+
+        change_dir(cwd)
+
+    def test_fftw_concurrent_precision_builds(self):
+        """Test shared configure cache and concurrent builds of precisions in FFTW easyblock."""
+        cwd = os.getcwd()
+
+        install_log = os.path.join(self.tmpdir, 'install.log')
+        test_ec = os.path.join(self.tmpdir, 'test.eb')
+        write_file(test_ec, '\n'.join([
+            "name = 'FFTW'",
+            "version = '3.3.10'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+            "concurrent_precision_builds = True",
+            "build_cmd = 'echo'",
+            "buildopts = '> build.txt'",
+            "install_cmd = 'pwd >> %s'" % install_log,
+            "parallel = 3",
+        ]))
+        fftw = get_easyblock_instance(process_easyconfig(test_ec)[0])
+        fftw.builddir = os.path.join(self.tmpdir, 'build')
+        fftw.installdir = os.path.join(self.tmpdir, 'install')
+
+        # fake configure script, which only performs (expensive) checks if there's no cache file for them yet
+        srcdir = os.path.join(fftw.builddir, 'fftw-3.3.10')
+        write_file(os.path.join(srcdir, 'configure'), '\n'.join([
+            "#!/bin/bash",
+            "echo \"$@\" > configure_args.txt",
+            "cache=$(echo \"$@\" | tr ' ' '\\n' | sed -n 's/^--cache-file=//p')",
+            "if [ -f \"$cache\" ]; then echo cached > checks.txt",
+            "else echo probed > checks.txt; [ -z \"$cache\" ] || touch $cache; fi",
+        ]))
+        adjust_permissions(os.path.join(srcdir, 'configure'), stat.S_IXUSR, add=True)
+        change_dir(srcdir)
+
+        try:
+            fftw.precisions = []
+            for prec in ['single', 'double']:
+                fftw.precisions.append({'name': prec, 'configopts': '--enable-%s-test' % prec})
+
+            fftw.configure_step()
+            self.assertEqual(os.getcwd(), srcdir)
+            objdirs = [os.path.join(fftw.builddir, 'easybuild_obj_%s' % x) for x in ['single', 'double']]
+            self.assertEqual([p['builddir'] for p in fftw.precisions], objdirs)
+            self.assertEqual([read_file(os.path.join(d, 'checks.txt')) for d in objdirs], ['probed\n', 'cached\n'])
+            cache_opt = '--cache-file=%s' % os.path.join(fftw.builddir, 'config.cache')
+            for objdir, prec in zip(objdirs, ['single', 'double']):
+                configure_args = read_file(os.path.join(objdir, 'configure_args.txt'))
+                self.assertTrue(configure_args.startswith('--prefix=%s --enable-%s-test ' % (fftw.installdir, prec)))
+                self.assertTrue(cache_opt in configure_args)
+            self.assertEqual(fftw.cfg['configopts'], '')
+
+            # available build jobs are split across precisions
+            fftw.build_step()
+            self.assertEqual(os.getcwd(), srcdir)
+            self.assertEqual([read_file(os.path.join(d, 'build.txt')) for d in objdirs], ['-j 2\n', '-j 1\n'])
+
+            # installation is done one precision at a time, in build directory for that precision
+            fftw.install_step()
+            self.assertEqual(os.getcwd(), srcdir)
+            self.assertEqual(read_file(install_log).split(), objdirs)
+
+            # failing build of a precision results in an error
+            fftw.cfg['buildopts'] = '&& false'
+            error_pattern = "Building single precision of FFTW failed with exit code 1"
+            self.assertErrorRegex(EasyBuildError, error_pattern, fftw.build_step)
+
+            # configure cache can be disabled
+            fftw.cfg['share_configure_cache'] = False
+            fftw.precisions = None
+            fftw.configure_step()
+            self.assertFalse('--cache-file' in read_file(os.path.join(srcdir, 'configure_args.txt')))
+        finally:
+            change_dir(cwd)
+
+    def test_gcc_build_stage2_libs(self):
+        """Test building of stage 2 libraries in GCC easyblock, incl. use of cache of stage 2 libraries."""
+        cwd = os.getcwd()
+        cache_dir = os.path.join(self.tmpdir, 'cache')
+
+        test_ec = os.path.join(self.tmpdir, 'test.eb')
+        write_file(test_ec, '\n'.join([
+            "easyblock = 'EB_GCC'",
+            "name = 'GCC'",
+            "version = '12.3.0'",
+            "homepage = 'https://example.com'",
+            "description = 'test'",
+            "toolchain = SYSTEM",
+            "build_type = host_type = 'x86_64-pc-linux-gnu'",
+            "withisl = True",
+            "parallel = 3",
+            "stage2_cache = '%s'" % cache_dir,
+        ]))
+        gcc = get_easyblock_instance(process_easyconfig(test_ec)[0])
+
+        gcc.src = []
+        for src_name in ['gmp-6.2.1.tar.bz2', 'isl-0.26.tar.bz2']:
+            src_path = os.path.join(self.tmpdir, src_name)
+            write_file(src_path, src_name)
+            gcc.src.append({'name': src_name, 'path': src_path})
+
+        stage2_info = {
+            'names': {'gmp': 'gmp', 'isl': 'isl'},
+            'versions': {'gmp': '6.2.1', 'isl': '0.26'},
+        }
+
+        makefile_lines = [
+            "all:",
+            "\techo $(LIB) > lib$(LIB).a",
+            "install:",
+            "\tmkdir -p $(DESTDIR)$(PREFIX)/lib",
+            "\tcp lib$(LIB).a $(DESTDIR)$(PREFIX)/lib/",
+            "\techo \"libdir='$(PREFIX)/lib'\" > $(DESTDIR)$(PREFIX)/lib/lib$(LIB).la",
+        ]
+        configure_script = '\n'.join([
+            "#!/bin/bash",
+            "echo \"LIB=$(basename $PWD)\" > Makefile",
+            "echo \"PREFIX=$1\" >> Makefile",
+            "cat >> Makefile << 'EOF'",
+        ] + makefile_lines + ["EOF"])
+
+        def prepare_stage2(name, configure_txt):
+            """Prepare directory for stage 2 libraries."""
+            stage2prefix = os.path.join(self.tmpdir, name)
+            configure_cmds = {}
+            for lib in ['gmp', 'isl']:
+                configure = os.path.join(stage2prefix, lib, 'configure')
+                write_file(configure, configure_txt)
+                adjust_permissions(configure, stat.S_IXUSR, add=True)
+                configure_cmds[lib] = "./configure %s" % stage2prefix
+            return stage2prefix, configure_cmds
+
+        orig_cppflags = os.getenv('CPPFLAGS', '')
+
+        stage2prefix, configure_cmds = prepare_stage2('stage2_stuff', configure_script)
+        gcc.build_stage2_libs(stage2prefix, stage2_info, configure_cmds)
+        for lib in ['gmp', 'isl']:
+            self.assertEqual(read_file(os.path.join(stage2prefix, 'lib', 'lib%s.a' % lib)), lib + '\n')
+        self.assertTrue(os.getenv('CPPFLAGS').endswith("-L%s/lib -I%s/include " % (stage2prefix, stage2prefix)))
+        self.assertEqual(len(glob.glob(os.path.join(cache_dir, '*.tar.gz'))), 2)
+
+        # second build with same inputs in another location uses cache, configure script is not used
+        os.environ['CPPFLAGS'] = orig_cppflags
+        stage2prefix, configure_cmds = prepare_stage2('stage2_stuff_bis', "#!/bin/bash\nexit 1")
+        gcc.build_stage2_libs(stage2prefix, stage2_info, configure_cmds)
+        for lib in ['gmp', 'isl']:
+            self.assertEqual(read_file(os.path.join(stage2prefix, 'lib', 'lib%s.a' % lib)), lib + '\n')
+            la_file = os.path.join(stage2prefix, 'lib', 'lib%s.la' % lib)
+            self.assertEqual(read_file(la_file), "libdir='%s/lib'\n" % stage2prefix)
+
+        # different GMP sources result in rebuilding GMP and ISL (since it depends on GMP)
+        os.environ['CPPFLAGS'] = orig_cppflags
+        write_file(gcc.src[0]['path'], 'gmp-6.2.1.tar.bz2 (changed)')
+        stage2prefix, configure_cmds = prepare_stage2('stage2_stuff_ter', configure_script)
+        gcc.build_stage2_libs(stage2prefix, stage2_info, configure_cmds)
+        self.assertEqual(len(glob.glob(os.path.join(cache_dir, '*.tar.gz'))), 4)
+
+        os.environ['CPPFLAGS'] = orig_cppflags
+        stage2prefix, configure_cmds = prepare_stage2('stage2_stuff_fail', "#!/bin/bash\nexit 1")
+        write_file(gcc.src[0]['path'], 'gmp-6.2.1.tar.bz2 (changed again)')
+        self.assertErrorRegex(EasyBuildError, "exited with exit code != 0", gcc.build_stage2_libs,
+                              stage2prefix, stage2_info, configure_cmds)
+
+        change_dir(cwd)
+
 
 def suite():
     """Return all easyblock-specific tests."""
@@ -180,6 +180,117 @@ class GeneralEasyblockTest(TestCase):
         # importing EB_R class from easybuild.easyblocks.r still works fine
         run_cmd("python -c 'from easybuild.easyblocks.r import EB_R'")
 
+    def test_easyblocks_index(self):
+        """Test index of easyblocks."""
+        from easybuild.easyblocks import easyblocks_index as ebi
+
+        easyblocks_dir = os.path.dirname(os.path.abspath(ebi.__file__))
+
+        # index that is included with easyblocks must be up-to-date
+        index = ebi.load_easyblocks_index()
+        msg = "Index of easyblocks is outdated, regenerate it with: "
+        msg += "python -c 'from easybuild.easyblocks.easyblocks_index import write_easyblocks_index as w; w(\"%s\")'"
+        self.assertEqual(index, ebi.generate_easyblocks_index(easyblocks_dir), msg % easyblocks_dir)
+
+        self.assertEqual(index['EB_GCC']['module'], 'easybuild.easyblocks.gcc')
+        self.assertEqual(index['ConfigureMake']['module'], 'easybuild.easyblocks.generic.configuremake')
+        self.assertEqual(index['CMakeMake']['bases'], ['ConfigureMake'])
+        self.assertIn('prefix_opt', index['ConfigureMake']['extra_options'])
+        # helper classes that are not easyblocks are not included
+        self.assertNotIn('CratesStore', index)
+
+        # custom easyconfig parameters can be determined without importing easyblocks (incl. inherited ones)
+        params = ebi.get_easyblock_params('CMakeNinja')
+        for param in ('configure_cmd', 'generator', 'prefix_opt', 'build_cmd'):
+            self.assertIn(param, params)
+        self.assertEqual(ebi.get_easyblock_params('NoSuchEasyblock'), None)
+
+        cls = ebi.get_easyblock_class_from_index(None, name='GCC')
+        self.assertEqual((cls.__module__, cls.__name__), ('easybuild.easyblocks.gcc', 'EB_GCC'))
+        cls = ebi.get_easyblock_class_from_index('ConfigureMake')
+        self.assertEqual(cls.__module__, 'easybuild.easyblocks.generic.configuremake')
+        self.assertEqual(cls.__name__, 'ConfigureMake')
+        self.assertEqual(ebi.get_easyblock_class_from_index(None, name='no-such-software'), None)
+        self.assertEqual(ebi.get_easyblock_class_from_index('easybuild.easyblocks.generic.configuremake.Foo'), None)
+
+        # index with outdated entries results in no easyblock class being found
+        test_index = {'EB_Foo': {'module': 'easybuild.easyblocks.nosuchmodule', 'bases': [], 'extra_options': []}}
+        self.assertEqual(ebi.get_easyblock_class_from_index(None, name='Foo', index=test_index), None)
+
+        # generating index for custom easyblocks repository
+        test_easyblocks = os.path.join(self.tmpdir, 'easybuild', 'easyblocks')
+        for subdir in ('f', 'generic'):
+            os.makedirs(os.path.join(test_easyblocks, subdir))
+        # dicts with parameter specs can be shared across easyblocks, via helper modules
+        with open(os.path.join(test_easyblocks, 'myhelper.py'), 'w') as handle:
+            handle.write("SHARED_PARAMS = {'shared': [None, 'Shared', CUSTOM]}\nOTHER = {'x': 1}\n")
+        with open(os.path.join(test_easyblocks, 'generic', 'mygeneric.py'), 'w') as handle:
+            handle.write('\n'.join([
+                "from easybuild.easyblocks.generic.configuremake import ConfigureMake",
+                "from easybuild.easyblocks.myhelper import OTHER, SHARED_PARAMS",
+                "class MyGeneric(ConfigureMake):",
+                "    @staticmethod",
+                "    def extra_options(extra_vars=None):",
+                "        extra_vars = ConfigureMake.extra_options(extra_vars)",
+                "        extra_vars.update({'foo': [None, 'Foo', CUSTOM], 'bar': [{'x': 1}, 'Bar', CUSTOM]})",
+                "        extra_vars['baz'] = [False, 'Baz', CUSTOM]",
+                "        extra_vars.update(SHARED_PARAMS)",
+                "        extra_vars.update(OTHER)",
+                "        return extra_vars",
+                "class Helper(object):",
+                "    pass",
+            ]))
+        with open(os.path.join(test_easyblocks, 'f', 'foo.py'), 'w') as handle:
+            handle.write("import easybuild.easyblocks.generic.mygeneric as mg\nclass EB_Foo(mg.MyGeneric):\n    pass\n")
+
+        # custom generic easyblock derives from an easyblock that is not known, so it's not considered an easyblock
+        index_path = ebi.write_easyblocks_index(test_easyblocks)
+        self.assertEqual(index_path, os.path.join(test_easyblocks, 'easyblocks_index.json'))
+        self.assertEqual(ebi.load_easyblocks_index(index_path), {})
+
+        ebi.write_easyblocks_index(test_easyblocks, known_easyblocks=index.keys())
+        ebi._easyblocks_index_cache.clear()
+        expected = {
+            'EB_Foo': {'module': 'easybuild.easyblocks.foo', 'bases': ['MyGeneric'], 'extra_options': []},
+            'MyGeneric': {
+                'module': 'easybuild.easyblocks.generic.mygeneric',
+                'bases': ['ConfigureMake'],
+                'extra_options': ['bar', 'baz', 'foo', 'shared'],
+            },
+        }
+        self.assertEqual(ebi.load_easyblocks_index(index_path), expected)
+
+    def test_import_easyblocks_package(self):
+        """Test whether importing easybuild.easyblocks package is cheap and free of side effects."""
+        easyblocks_path = up(os.path.abspath(__file__), 3)
+        os.chdir(self.tmpdir)
+
+        cmd = "PYTHONPATH=%s:$PYTHONPATH python -c '%s'" % (easyblocks_path, '; '.join([
+            "import sys, time",
+            "start = time.time()",
+            "import easybuild.easyblocks",
+            "print(time.time() - start)",
+            # git revision should not be determined on import
+            "print(sorted(x for x in (\"git\", \"easybuild.tools.version\") if x in sys.modules))",
+            "print(len(easybuild.easyblocks.__path__))",
+            "print(easybuild.easyblocks.VERBOSE_VERSION)",
+        ]))
+
+        # benchmark: best out of 3 runs, to avoid being affected by hiccups on the system
+        import_times = []
+        for _ in range(3):
+            out, _ = run_cmd(cmd, simple=False)
+            import_time, imported, path_len, verbose_version = out.strip().split('\n')[-4:]
+            import_times.append(float(import_time))
+            self.assertEqual(imported, '[]')
+            # package dir + subdirectories in which easyblocks are located
+            self.assertTrue(int(path_len) >= 28)
+            self.assertTrue(verbose_version.startswith(str(VERSION)))
+
+        max_import_time = 1.0
+        self.assertTrue(min(import_times) < max_import_time,
+                        "Importing easybuild.easyblocks takes < %s seconds: %s" % (max_import_time, import_times))
+
 
 def suite():
     """Return all general easybuild-easyblocks tests."""